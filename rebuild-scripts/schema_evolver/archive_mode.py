@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+OncoVista Archive Mode
+Reversible drops: tables and columns are renamed into an archive and purged after a retention window
+"""
+
+import hashlib
+import re
+from dataclasses import dataclass, replace
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+
+from sql_emitter import quote_literal, schema_name, schema_prefix, short_name
+
+DEFAULT_ARCHIVE_SCHEMA = 'oncovista_archive'
+DEFAULT_RETENTION_DAYS = 30
+REGISTRY_TABLE = 'archived_objects'
+ARCHIVE_SUFFIX = '__archived_'
+# PostgreSQL truncates longer identifiers, which could merge two archived names
+MAX_IDENTIFIER_LENGTH = 63
+# Archived objects stay reversible, so they rank below the drops they replace
+ARCHIVE_RISK = {'CRITICAL': 'HIGH'}
+ARCHIVED_CHANGES = {'DROP_TABLE': 'ARCHIVE_TABLE', 'DROP_COLUMN': 'ARCHIVE_COLUMN'}
+
+FOREIGN_KEY_COLUMNS_PATTERN = re.compile(r'FOREIGN\s+KEY\s*\(([^)]*)\)', re.IGNORECASE)
+
+@dataclass
+class ArchivePolicy:
+    """Where archived objects go and how long they are kept before the purge script may drop them"""
+    schema: str = DEFAULT_ARCHIVE_SCHEMA
+    retention_days: int = DEFAULT_RETENTION_DAYS
+
+    def __post_init__(self):
+        if self.retention_days < 0:
+            raise ValueError('retention_days must not be negative')
+
+    @property
+    def registry(self) -> str:
+        return f'{self.schema}.{REGISTRY_TABLE}'
+
+    def registry_sql(self) -> str:
+        return (f'CREATE SCHEMA IF NOT EXISTS {self.schema};\n'
+                f'CREATE TABLE IF NOT EXISTS {self.registry} (\n'
+                f'    migration_id TEXT NOT NULL,\n'
+                f'    object_type TEXT NOT NULL,\n'
+                f'    original_name TEXT NOT NULL,\n'
+                f'    archived_name TEXT NOT NULL,\n'
+                f'    archived_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),\n'
+                f'    purge_after TIMESTAMPTZ NOT NULL,\n'
+                f'    PRIMARY KEY (migration_id, original_name)\n'
+                f');')
+
+@dataclass(frozen=True)
+class ArchivedObject:
+    """A dropped table or column kept under an archive name until purged.
+
+    foreign_keys holds (name, definition) pairs of the constraints that
+    point out of the archived object: they are dropped so archived rows
+    never block deletes in live tables, and re-added NOT VALID on restore.
+    """
+    kind: str  # 'TABLE' or 'COLUMN'
+    table: str
+    column: Optional[str]
+    archived_name: str
+    migration_id: str
+    policy: ArchivePolicy
+    foreign_keys: Tuple[Tuple[str, str], ...] = ()
+    not_null: bool = False
+
+    @property
+    def original_name(self) -> str:
+        return f'{self.table}.{self.column}' if self.column else self.table
+
+    @property
+    def archived_path(self) -> str:
+        """Where the object lives while archived, as recorded in the registry"""
+        if self.column:
+            return f'{self.table}.{self.archived_name}'
+        return f'{self.policy.schema}.{self.archived_name}'
+
+    def archive_sql(self) -> str:
+        """Forward SQL: rename out of the way, release constraints and register for the purge.
+
+        The registry must exist first (see ArchivePolicy.registry_sql).
+        """
+        sql = [f'ALTER TABLE {self.table} DROP CONSTRAINT IF EXISTS {name};' for name, _ in self.foreign_keys]
+        if self.column:
+            sql.append(f'ALTER TABLE {self.table} RENAME COLUMN {self.column} TO {self.archived_name};')
+            if self.not_null:
+                # Inserts that no longer know the column must still succeed
+                sql.append(f'ALTER TABLE {self.table} ALTER COLUMN {self.archived_name} DROP NOT NULL;')
+        else:
+            sql.append(f'ALTER TABLE {self.table} RENAME TO {self.archived_name};')
+            sql.append(f'ALTER TABLE {schema_prefix(self.table)}{self.archived_name} SET SCHEMA {self.policy.schema};')
+        sql.append(f'INSERT INTO {self.policy.registry} '
+                   f'(migration_id, object_type, original_name, archived_name, purge_after)\n'
+                   f'VALUES ({quote_literal(self.migration_id)}, {quote_literal(self.kind)}, '
+                   f'{quote_literal(self.original_name)}, '
+                   f"{quote_literal(self.archived_path)}, NOW() + INTERVAL '{self.policy.retention_days} days');")
+        return '\n'.join(sql)
+
+    def restore_sql(self) -> str:
+        """Rollback SQL: catalog-only renames back, constraints re-added without scanning rows"""
+        if self.column:
+            sql = [f'ALTER TABLE {self.table} RENAME COLUMN {self.archived_name} TO {self.column};']
+            if self.not_null:
+                check = f'{short_name(self.table)}_{self.column}_not_null'
+                # Rows written while archived hold NULL; VALIDATE CONSTRAINT once they are filled
+                sql.append(f'ALTER TABLE {self.table} ADD CONSTRAINT {check} CHECK ({self.column} IS NOT NULL) '
+                           f'NOT VALID;')
+        else:
+            schema = schema_name(self.table)
+            sql = [f'ALTER TABLE {self.archived_path} SET SCHEMA {schema};',
+                   f'ALTER TABLE {schema}.{self.archived_name} RENAME TO {short_name(self.table)};']
+        sql += [f'ALTER TABLE {self.table} ADD CONSTRAINT {name} {definition} NOT VALID;'
+                for name, definition in self.foreign_keys]
+        sql.append(f'DELETE FROM {self.policy.registry} WHERE migration_id = {quote_literal(self.migration_id)} '
+                   f'AND original_name = {quote_literal(self.original_name)};')
+        return '\n'.join(sql)
+
+    def purge_sql(self) -> str:
+        if self.column:
+            return f'ALTER TABLE IF EXISTS {self.table} DROP COLUMN IF EXISTS {self.archived_name};'
+        return f'DROP TABLE IF EXISTS {self.archived_path};'
+
+def archived_name(name: str, migration_id: str) -> str:
+    """name__archived_<migration id>, shortened with a hash when it would exceed the identifier limit"""
+    suffix = f'{ARCHIVE_SUFFIX}{migration_id}'
+    if len(name) + len(suffix) <= MAX_IDENTIFIER_LENGTH:
+        return name + suffix
+    digest = hashlib.md5(name.encode()).hexdigest()[:8]
+    return f'{name[:MAX_IDENTIFIER_LENGTH - len(suffix) - len(digest) - 1]}_{digest}{suffix}'
+
+def is_archived_name(name: str, schema: str = DEFAULT_ARCHIVE_SCHEMA) -> bool:
+    """Whether a table or column name belongs to the archive, so diffs leave it alone"""
+    return ARCHIVE_SUFFIX in short_name(name) or schema_name(name) == schema
+
+def archive_changes(changes: List[Any], policy: ArchivePolicy, migration_id: str) -> List[Any]:
+    """Replace DROP_TABLE and DROP_COLUMN changes with reversible ARCHIVE_TABLE and ARCHIVE_COLUMN ones.
+
+    The original details are kept, so dependency ordering and cost
+    estimates treat an archived object like the dropped one; details
+    gain 'archive' with the ArchivedObject the SQL is rendered from.
+    """
+    archived = []
+    for change in changes:
+        if change.change_type not in ARCHIVED_CHANGES:
+            archived.append(change)
+            continue
+        if change.change_type == 'DROP_TABLE':
+            target = _archived_table(change.table_name, change.details['table_def'], policy, migration_id)
+        else:
+            target = _archived_column(change.table_name, change.details['column'], change.details['definition'],
+                                      policy, migration_id)
+        archived.append(replace(
+            change,
+            change_type=ARCHIVED_CHANGES[change.change_type],
+            details={**change.details, 'archive': target},
+            risk_level=ARCHIVE_RISK.get(change.risk_level, 'MEDIUM'),
+            rollback_sql=target.restore_sql()
+        ))
+    return archived
+
+def archived_objects(changes: List[Any]) -> List[ArchivedObject]:
+    return [change.details['archive'] for change in changes if 'archive' in change.details]
+
+def archive_policy(changes: List[Any]) -> Optional[ArchivePolicy]:
+    """The policy changes were archived under, or None when none were"""
+    objects = archived_objects(changes)
+    return objects[0].policy if objects else None
+
+def render_purge_script(changes: List[Any], migration_name: str) -> Optional[str]:
+    """The deferred script dropping what changes archived; None when nothing was archived.
+
+    It refuses to run, inside its transaction, while any object of the
+    migration is still within its retention window. Objects already
+    restored by the rollback are gone from the registry and skipped.
+    """
+    objects = archived_objects(changes)
+    if not objects:
+        return None
+    policy, migration_id = objects[0].policy, quote_literal(objects[0].migration_id)
+    message = quote_literal(f'archived objects of migration {objects[0].migration_id} are still within retention')
+    sql = (f"-- OncoVista Archive Purge Script: {migration_name}\n"
+           f"-- Generated: {datetime.now().isoformat()}\n"
+           f"-- 🗑️  Permanently drops {len(objects)} archived objects once their "
+           f"{policy.retention_days}-day retention has passed.\n"
+           f"-- After this runs the rollback script can no longer restore their data.\n\n"
+           f"BEGIN;\n\n"
+           f"DO $purge$\n"
+           f"BEGIN\n"
+           f"    IF EXISTS (SELECT 1 FROM {policy.registry} WHERE migration_id = {migration_id} "
+           f"AND purge_after > NOW()) THEN\n"
+           f"        RAISE EXCEPTION {message};\n"
+           f"    END IF;\n"
+           f"END\n"
+           f"$purge$;\n\n")
+    for target in objects:
+        sql += f"-- Purge: {target.kind} {target.original_name}\n{target.purge_sql()}\n\n"
+    sql += f"DELETE FROM {policy.registry} WHERE migration_id = {migration_id};\n\nCOMMIT;\n"
+    return sql
+
+def _archived_table(table_name: str, table: Any, policy: ArchivePolicy, migration_id: str) -> ArchivedObject:
+    short = short_name(table_name)
+    foreign_keys = [
+        (f'{short}_{name}_fkey', f'FOREIGN KEY ({name}) REFERENCES {column["references"]}')
+        for name, column in table['columns'].items() if column.get('references')
+    ]
+    for constraint in table['constraints']:
+        match = FOREIGN_KEY_COLUMNS_PATTERN.search(constraint['definition'])
+        if match:
+            columns = '_'.join(column.strip().strip('"') for column in match.group(1).split(','))
+            foreign_keys.append((constraint['name'] or f'{short}_{columns}_fkey', constraint['definition']))
+    return ArchivedObject('TABLE', table_name, None, archived_name(short, migration_id), migration_id, policy,
+                          tuple(foreign_keys))
+
+def _archived_column(table_name: str, name: str, column: Any, policy: ArchivePolicy,
+                     migration_id: str) -> ArchivedObject:
+    foreign_keys = ()
+    if column.get('references'):
+        foreign_keys = ((f'{short_name(table_name)}_{name}_fkey',
+                         f'FOREIGN KEY ({name}) REFERENCES {column["references"]}'),)
+    # A primary key column cannot drop NOT NULL; its table is rarely kept anyway
+    not_null = not column['nullable'] and 'PRIMARY KEY' not in column['constraints']
+    return ArchivedObject('COLUMN', table_name, name, archived_name(name, migration_id), migration_id, policy,
+                          foreign_keys, not_null)
+
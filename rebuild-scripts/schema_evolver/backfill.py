@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+OncoVista Backfill Generator
+Chunked, throttled and resumable data backfills for schema changes
+"""
+
+from dataclasses import dataclass, replace
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sql_emitter import quote_literal
+
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_BATCH_SLEEP = 0.1
+CHECKPOINT_TABLE = 'schema_evolver_backfill_progress'
+# Serial pseudo-types are only valid in column definitions
+SERIAL_TYPES = {'SMALLSERIAL': 'SMALLINT', 'SERIAL': 'INTEGER', 'BIGSERIAL': 'BIGINT'}
+
+@dataclass
+class BackfillJob:
+    """Fill column with expression for existing rows, batched by a single-column key"""
+    table: str
+    column: str
+    expression: str
+    key_column: Optional[str] = None
+    key_type: Optional[str] = None
+    source: Optional[str] = None
+    not_null: bool = False  # set NOT NULL once every row is filled
+
+    @property
+    def job_id(self) -> str:
+        """Stable id; a changed expression is a different job"""
+        return f'{self.table}.{self.column}={self.expression}'
+
+    @property
+    def condition(self) -> str:
+        """Rows still to fill; keeps re-runs idempotent"""
+        condition = f'{self.column} IS NULL'
+        if self.source:
+            condition += f' AND {self.source} IS NOT NULL'
+        return condition
+
+    @classmethod
+    def for_change(cls, change, column: str, expression: str, source: Optional[str] = None) -> 'BackfillJob':
+        """Build a job for an ADD_COLUMN or MODIFY_COLUMN change"""
+        key = change.details.get('primary_key')
+        return cls(
+            table=change.table_name,
+            column=column,
+            expression=expression,
+            key_column=key['name'] if key else None,
+            key_type=key['type'] if key else None,
+            source=source
+        )
+
+class BackfillGenerator:
+    """Renders backfill jobs as PL/pgSQL blocks that commit after every batch.
+
+    Rows are walked in primary-key order with keyset pagination, each batch
+    commits and then sleeps, and the last key reached is stored in a
+    checkpoint table so an interrupted run resumes after it. Tables without
+    a usable key fall back to ctid batches over the rows still matching the
+    job condition. Blocks must run outside a transaction block, since
+    COMMIT inside DO needs PostgreSQL 11+ in autocommit mode.
+    """
+
+    def __init__(self, batch_size: int = DEFAULT_BATCH_SIZE, sleep_seconds: float = DEFAULT_BATCH_SLEEP,
+                 checkpoint_table: str = CHECKPOINT_TABLE):
+        if batch_size < 1:
+            raise ValueError('batch_size must be at least 1')
+        self.batch_size = batch_size
+        self.sleep_seconds = sleep_seconds
+        self.checkpoint_table = checkpoint_table
+
+    def checkpoint_table_sql(self) -> str:
+        return (f'CREATE TABLE IF NOT EXISTS {self.checkpoint_table} (\n'
+                f'    job_id TEXT PRIMARY KEY,\n'
+                f'    table_name TEXT NOT NULL,\n'
+                f'    column_name TEXT NOT NULL,\n'
+                f'    last_key TEXT,\n'
+                f'    rows_updated BIGINT NOT NULL DEFAULT 0,\n'
+                f'    started_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),\n'
+                f'    updated_at TIMESTAMPTZ,\n'
+                f'    completed_at TIMESTAMPTZ\n'
+                f');')
+
+    def render_block(self, job: BackfillJob) -> str:
+        """Render one job as a resumable DO block"""
+        job_id = quote_literal(job.job_id)
+        loop = self._keyset_loop(job, job_id) if job.key_column else self._ctid_loop(job, job_id)
+        key_type = SERIAL_TYPES.get((job.key_type or 'TEXT').upper(), job.key_type or 'TEXT')
+
+        return (f'-- Backfill {job.table}.{job.column} = {job.expression} '
+                f'({self.batch_size} rows per batch, {self.sleep_seconds}s pause)\n'
+                f'DO $backfill$\n'
+                f'DECLARE\n'
+                f'    v_last_key {key_type};\n'
+                f'    v_batch_end {key_type};\n'
+                f'    v_updated BIGINT;\n'
+                f'BEGIN\n'
+                f'    INSERT INTO {self.checkpoint_table} (job_id, table_name, column_name)\n'
+                f'    VALUES ({job_id}, {quote_literal(job.table)}, {quote_literal(job.column)})\n'
+                f'    ON CONFLICT (job_id) DO NOTHING;\n'
+                f'    IF EXISTS (SELECT 1 FROM {self.checkpoint_table} WHERE job_id = {job_id} '
+                f'AND completed_at IS NOT NULL) THEN\n'
+                f'        RETURN;\n'
+                f'    END IF;\n'
+                f'    SELECT p.last_key::{key_type} INTO v_last_key FROM {self.checkpoint_table} p WHERE p.job_id = {job_id};\n'
+                f'    COMMIT;\n'
+                f'{loop}'
+                f'    UPDATE {self.checkpoint_table} SET completed_at = NOW(), updated_at = NOW() WHERE job_id = {job_id};\n'
+                f'    COMMIT;\n'
+                f'END\n'
+                f'$backfill$;')
+
+    def render_script(self, jobs: List[BackfillJob], migration_name: str) -> str:
+        """Render a standalone backfill script for jobs"""
+        sql = (f"-- OncoVista Backfill Script: {migration_name}\n"
+               f"-- Generated: {datetime.now().isoformat()}\n"
+               f"-- 🐢 Run after the migration, outside a transaction block (psql autocommit).\n"
+               f"-- Safe to interrupt and re-run: progress is tracked in {self.checkpoint_table}.\n\n")
+        sql += self.checkpoint_table_sql() + "\n\n"
+        sql += "\n\n".join(self.render_block(job) for job in jobs)
+        for job in jobs:
+            if job.not_null:
+                sql += f"\n\n-- Every row of {job.table} now has {job.column}\n"
+                sql += f"ALTER TABLE {job.table} ALTER COLUMN {job.column} SET NOT NULL;"
+        return sql + "\n"
+
+    def _keyset_loop(self, job: BackfillJob, job_id: str) -> str:
+        key = job.key_column
+        after_last = f'(v_last_key IS NULL OR {key} > v_last_key)'
+        return (f'    LOOP\n'
+                f'        SELECT max(k.{key}) INTO v_batch_end FROM (\n'
+                f'            SELECT {key} FROM {job.table} WHERE {after_last} ORDER BY {key} LIMIT {self.batch_size}\n'
+                f'        ) k;\n'
+                f'        EXIT WHEN v_batch_end IS NULL;\n'
+                f'        UPDATE {job.table} SET {job.column} = {job.expression}\n'
+                f'        WHERE {after_last} AND {key} <= v_batch_end AND {job.condition};\n'
+                f'        GET DIAGNOSTICS v_updated = ROW_COUNT;\n'
+                f'        UPDATE {self.checkpoint_table}\n'
+                f'        SET last_key = v_batch_end::TEXT, rows_updated = rows_updated + v_updated, updated_at = NOW()\n'
+                f'        WHERE job_id = {job_id};\n'
+                f'        COMMIT;\n'
+                f'        v_last_key := v_batch_end;\n'
+                f'        PERFORM pg_sleep({self.sleep_seconds});\n'
+                f'    END LOOP;\n')
+
+    def _ctid_loop(self, job: BackfillJob, job_id: str) -> str:
+        return (f'    -- ⚠️  {job.table} has no single-column primary key: batching by ctid over rows still to fill\n'
+                f'    LOOP\n'
+                f'        UPDATE {job.table} SET {job.column} = {job.expression}\n'
+                f'        WHERE ctid = ANY (ARRAY(\n'
+                f'            SELECT ctid FROM {job.table} WHERE {job.condition} LIMIT {self.batch_size}\n'
+                f'        ));\n'
+                f'        GET DIAGNOSTICS v_updated = ROW_COUNT;\n'
+                f'        EXIT WHEN v_updated = 0;\n'
+                f'        UPDATE {self.checkpoint_table}\n'
+                f'        SET rows_updated = rows_updated + v_updated, updated_at = NOW() WHERE job_id = {job_id};\n'
+                f'        COMMIT;\n'
+                f'        PERFORM pg_sleep({self.sleep_seconds});\n'
+                f'    END LOOP;\n')
+
+def detect_backfills(changes: List[Any], expressions: Optional[Dict[str, str]] = None) -> List[BackfillJob]:
+    """Jobs for added columns that need values derived from existing rows.
+
+    expressions maps 'table.column' (schema qualification optional) to the
+    SQL expression computing the value. Volatile defaults and type
+    conversions only need backfills in online plans, which create those
+    jobs themselves. A NOT NULL column is only constrained once filled.
+    """
+    jobs = []
+    for change in changes:
+        if change.change_type == 'ADD_COLUMN':
+            expression = lookup_expression(expressions, change.table_name, change.details['column'])
+            if expression:
+                job = BackfillJob.for_change(change, change.details['column'], expression)
+                job.not_null = not change.details['definition']['nullable']
+                jobs.append(job)
+    return jobs
+
+def mark_backfilled(changes: List[Any], expressions: Optional[Dict[str, str]]) -> List[Any]:
+    """Mark added columns with a backfill expression, for migrations run before a standalone backfill script.
+
+    Marked changes gain details['backfill']: their column is added without
+    its default, which would otherwise fill every existing row before the
+    backfill sees it, and without NOT NULL, which the backfill script sets
+    once rows are filled. The default is set right after the column is
+    added, so it still applies to new rows.
+    """
+    marked = []
+    for change in changes:
+        expression = None
+        if change.change_type == 'ADD_COLUMN':
+            expression = lookup_expression(expressions, change.table_name, change.details['column'])
+        marked.append(replace(change, details={**change.details, 'backfill': expression}) if expression else change)
+    return marked
+
+def lookup_expression(expressions: Optional[Dict[str, str]], table: str, column: str) -> Optional[str]:
+    """Find a backfill expression by qualified or bare table name"""
+    if not expressions:
+        return None
+    return expressions.get(f'{table}.{column}') or expressions.get(f'{table.rsplit(".", 1)[-1]}.{column}')
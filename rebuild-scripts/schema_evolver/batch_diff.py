@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+OncoVista Batch Tenant Diff
+Diffs many tenant schemas against a canonical schema in one process pool
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from catalog_introspection import IntrospectionError, is_database_url
+from dependency_graph import DependencyCycleError
+from migration_generator import MigrationSurgeon
+from schema_model import SchemaModel
+from sql_emitter import ROLLBACK_SUFFIX, write_script
+
+TENANT_NAME_PATTERN = re.compile(r'^[\w.-]+$')
+DEFAULT_MIGRATION_PREFIX = 'sync'
+
+# Per-process state set up once by the pool initializer
+_worker: Dict[str, Any] = {}
+
+@dataclass
+class TenantDiff:
+    """One schema pair: migrate the tenant's old schema to new"""
+    name: str
+    old_schema: str
+    new_schema: str
+
+def load_manifest(path: str) -> List[TenantDiff]:
+    """Load a batch manifest; relative schema paths resolve against the manifest's directory.
+
+    Either {"canonical": FILE, "tenants": [{"name", "schema"}, ...]} to bring
+    every tenant schema up to the canonical one, or explicit pairs
+    {"tenants": [{"name", "old", "new"}, ...]}. Both forms can be mixed,
+    and any schema may be a postgresql://...?schema=NAME URL instead.
+    """
+    with open(path) as f:
+        data = json.load(f)
+
+    base = Path(path).parent
+    resolve = lambda source: source if is_database_url(source) else os.path.normpath(base / source)
+    canonical = data.get('canonical')
+    tenants = []
+    seen = set()
+
+    for entry in data.get('tenants') or []:
+        name = entry.get('name')
+        if not name or not TENANT_NAME_PATTERN.match(name):
+            raise ValueError(f"invalid tenant name {name!r}: use letters, digits, '_', '-' or '.'")
+        if name in seen:
+            raise ValueError(f"duplicate tenant '{name}'")
+        seen.add(name)
+
+        old, new = entry.get('old', entry.get('schema')), entry.get('new', canonical)
+        if not old or not new:
+            raise ValueError(f"tenant '{name}' needs 'schema' (with a top-level 'canonical') or 'old' and 'new'")
+        tenants.append(TenantDiff(name, resolve(old), resolve(new)))
+
+    if not tenants:
+        raise ValueError('manifest lists no tenants')
+    return tenants
+
+class BatchDiffRunner:
+    """Diffs tenant schema pairs in a process pool, parsing shared files only once.
+
+    Any schema file used by more than one pair (normally the canonical
+    schema) is parsed once in the parent and handed to each worker when
+    the pool starts; every other file goes through the on-disk DNA cache,
+    so unchanged tenants are not re-parsed on the next run either. Each
+    worker writes its tenant's migration and rollback into
+    output_dir/<tenant>/ and returns a small summary, so only summaries
+    cross process boundaries.
+    """
+
+    def __init__(self, output_dir: str = 'migrations', workers: int = 1, streaming: bool = False,
+                 cache_dir: Optional[str] = None, use_cache: bool = True,
+                 migration_prefix: str = DEFAULT_MIGRATION_PREFIX):
+        self.output_dir = output_dir
+        self.workers = workers
+        self.streaming = streaming
+        self.cache_dir = cache_dir
+        self.use_cache = use_cache
+        self.migration_prefix = migration_prefix
+
+    def run(self, tenants: List[TenantDiff]) -> Dict[str, Any]:
+        """Diff every tenant and return the batch report"""
+        started = time.perf_counter()
+        surgeon = MigrationSurgeon(streaming=self.streaming, cache_dir=self.cache_dir)
+        usage = Counter(path for tenant in tenants for path in {tenant.old_schema, tenant.new_schema})
+        shared = {
+            path: surgeon.analyzer.extract_schema_model(path, use_cache=self.use_cache)
+            for path, count in usage.items() if count > 1
+        }
+
+        options = {
+            'streaming': self.streaming,
+            'cache_dir': self.cache_dir,
+            'use_cache': self.use_cache,
+            'output_dir': self.output_dir,
+            'timestamp': datetime.now().strftime('%Y%m%d%H%M%S'),
+            'prefix': self.migration_prefix
+        }
+        if self.workers > 1 and len(tenants) > 1:
+            chunksize = max(1, len(tenants) // (self.workers * 4))
+            with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                     initargs=(shared, options)) as executor:
+                results = list(executor.map(_diff_tenant, tenants, chunksize=chunksize))
+        else:
+            _init_worker(shared, options)
+            results = [_diff_tenant(tenant) for tenant in tenants]
+
+        return {
+            'generated': datetime.now().isoformat(),
+            'summary': {
+                'tenants': len(results),
+                'drifted': sum(1 for result in results if result['changes']),
+                'failed': sum(1 for result in results if result['error']),
+                'changes': sum(len(result['changes']) for result in results),
+                'shared_schemas': sorted(shared),
+                'seconds': round(time.perf_counter() - started, 3)
+            },
+            'tenants': results
+        }
+
+def _init_worker(shared: Dict[str, SchemaModel], options: Dict[str, Any]):
+    """Process pool initializer: keep the shared models and one surgeon per worker"""
+    _worker['shared'] = shared
+    _worker['options'] = options
+    _worker['surgeon'] = MigrationSurgeon(streaming=options['streaming'], cache_dir=options['cache_dir'])
+
+def _diff_tenant(tenant: TenantDiff) -> Dict[str, Any]:
+    """Process pool entry point: diff one tenant and write its scripts"""
+    surgeon, shared, options = _worker['surgeon'], _worker['shared'], _worker['options']
+    result = {
+        'tenant': tenant.name,
+        'old_schema': tenant.old_schema,
+        'new_schema': tenant.new_schema,
+        'changes': [],
+        'risk_summary': {},
+        'migration': None,
+        'rollback': None,
+        'error': None
+    }
+
+    try:
+        old, new = (
+            shared.get(path) or surgeon.analyzer.extract_schema_model(path, use_cache=options['use_cache'])
+            for path in (tenant.old_schema, tenant.new_schema)
+        )
+        changes = surgeon.compare_models(old, new)
+        result['changes'] = [
+            {'type': change.change_type, 'table': change.table_name, 'risk': change.risk_level}
+            for change in changes
+        ]
+        result['risk_summary'] = dict(Counter(change.risk_level for change in changes))
+        if changes:
+            directory = Path(options['output_dir']) / tenant.name
+            directory.mkdir(parents=True, exist_ok=True)
+            stem = f"{options['timestamp']}_{options['prefix']}_{tenant.name}"
+            name = f"{options['prefix']}_{tenant.name}"
+            result['migration'] = write_script(
+                directory / f'{stem}.sql', lambda emitter: surgeon.emit_migration(changes, name, emitter)
+            )
+            result['rollback'] = write_script(
+                directory / f'{stem}{ROLLBACK_SUFFIX}.sql',
+                lambda emitter: surgeon.emit_rollback_script(changes, emitter)
+            )
+    except (OSError, DependencyCycleError, IntrospectionError) as e:
+        result['error'] = f'{type(e).__name__}: {e}'
+    return result
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(
+        prog='batch_diff.py',
+        description='Diff many tenant schemas against a canonical schema and write one JSON report'
+    )
+    parser.add_argument('manifest', help='JSON manifest of tenant schema pairs')
+    parser.add_argument('--report', default=None,
+                        help='Write the JSON report here (default: <output-dir>/batch_report.json)')
+    parser.add_argument('--output-dir', default='migrations',
+                        help='Directory receiving one subdirectory of scripts per drifted tenant (default: migrations)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='Diff tenants in a pool of this many processes (default: CPU count)')
+    parser.add_argument('--name', default=DEFAULT_MIGRATION_PREFIX,
+                        help=f'Migration name prefix; files are named <timestamp>_<name>_<tenant>.sql '
+                             f'(default: {DEFAULT_MIGRATION_PREFIX})')
+    parser.add_argument('--stream', action='store_true',
+                        help='Read schema files statement by statement with bounded memory')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Parse every schema from scratch without reading or writing the schema DNA cache')
+    parser.add_argument('--cache-dir', default=None,
+                        help='Schema DNA cache directory (default: $ONCOVISTA_SCHEMA_CACHE or ~/.cache/oncovista/schema_dna)')
+    return parser.parse_args(argv)
+
+def main():
+    """Main execution function"""
+    args = parse_args(sys.argv[1:])
+
+    try:
+        tenants = load_manifest(args.manifest)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"❌ Cannot load manifest {args.manifest}: {e}")
+        sys.exit(1)
+
+    print(f"🏥 Diffing {len(tenants)} tenant schemas with {args.workers} workers...")
+    runner = BatchDiffRunner(args.output_dir, args.workers, args.stream, args.cache_dir,
+                             use_cache=not args.no_cache, migration_prefix=args.name)
+    try:
+        report = runner.run(tenants)
+    except (OSError, IntrospectionError) as e:
+        print(f"❌ Cannot read shared schema: {e}")
+        sys.exit(1)
+
+    for result in report['tenants']:
+        if result['error']:
+            print(f"  ❌ {result['tenant']}: {result['error']}")
+        elif result['changes']:
+            risks = ', '.join(f'{risk}: {count}' for risk, count in result['risk_summary'].items())
+            print(f"  🧬 {result['tenant']}: {len(result['changes'])} mutations ({risks}) -> {result['migration']}")
+
+    report_file = args.report or os.path.join(args.output_dir, 'batch_report.json')
+    Path(report_file).parent.mkdir(parents=True, exist_ok=True)
+    with open(report_file, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    summary = report['summary']
+    print(f"\n📋 {summary['drifted']} of {summary['tenants']} tenants drifted, {summary['failed']} failed "
+          f"in {summary['seconds']}s. Report: {report_file}")
+    if summary['failed']:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,443 @@
+#!/usr/bin/env python3
+"""
+OncoVista Schema Evolver Benchmarks
+Times and memory-profiles the evolver on synthetic schemas, with baseline regression checks
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List, Tuple
+
+from catalog_introspection import CATALOG_QUERIES, CatalogIntrospector
+from ddl_lexer import split_statements
+from dna_cache import SchemaDNACache
+from migration_generator import MigrationSurgeon, SchemaDNAAnalyzer
+from schema_model import SchemaModel
+from synthetic_schema import (
+    MutationRates, SyntheticSchemaConfig, SyntheticSchemaGenerator, generate_schema_sql, render_schema
+)
+
+DEFAULT_SIZES = [100, 500, 1000]
+# Relative slowdown or memory growth against the baseline that fails a run
+DEFAULT_TOLERANCE = 0.25
+# Phases faster or smaller than this are too noisy to compare
+MIN_COMPARABLE_SECONDS = 0.005
+MIN_COMPARABLE_BYTES = 256 * 1024
+
+def benchmark_parse_scaling(sizes: List[int], repeats: int = 3) -> List[dict]:
+    """Time statement splitting plus DNA extraction across schema sizes"""
+    analyzer = SchemaDNAAnalyzer()
+    results = []
+
+    for size in sizes:
+        sql = generate_schema_sql(size)
+        best = float('inf')
+        for _ in range(repeats):
+            start = time.perf_counter()
+            dna = analyzer.extract_schema_dna_from_statements(split_statements(sql))
+            best = min(best, time.perf_counter() - start)
+
+        assert len(dna['tables']) == size
+        results.append({
+            'tables': size,
+            'bytes': len(sql),
+            'seconds': best,
+            'microseconds_per_table': best / size * 1e6
+        })
+
+    return results
+
+def write_dump_with_data(path: str, table_count: int, rows_per_table: int):
+    """Write a pg_dump-like file whose size is dominated by COPY data sections"""
+    with open(path, 'w') as f:
+        f.write(generate_schema_sql(table_count))
+        for t in range(table_count):
+            f.write(f'COPY public.table_{t} (id, status, amount) FROM stdin;\n')
+            for r in range(rows_per_table):
+                f.write(f'{t:08d}-0000-0000-0000-{r:012d}\tactive\t{r}.00\n')
+            f.write('\\.\n\n')
+            f.write(f"INSERT INTO public.table_{t} (id, status, amount) VALUES "
+                    + ', '.join(f"('{t}-{r}', 'closed', 0)" for r in range(rows_per_table // 10)) + ';\n')
+
+def benchmark_streaming_memory(rows_per_table: List[int], table_count: int = 50) -> List[dict]:
+    """Compare peak Python memory of in-memory and streaming parses as data sections grow"""
+    results = []
+
+    for rows in rows_per_table:
+        fd, path = tempfile.mkstemp(suffix='.sql')
+        os.close(fd)
+        try:
+            write_dump_with_data(path, table_count, rows)
+            row = {'rows_per_table': rows, 'bytes': os.path.getsize(path)}
+
+            for mode, streaming in (('in_memory', False), ('streaming', True)):
+                tracemalloc.start()
+                start = time.perf_counter()
+                SchemaDNAAnalyzer(streaming=streaming).extract_schema_dna(path)
+                row[f'{mode}_seconds'] = time.perf_counter() - start
+                row[f'{mode}_peak_bytes'] = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+
+            results.append(row)
+        finally:
+            os.unlink(path)
+
+    return results
+
+def benchmark_cache(table_count: int = 2000) -> dict:
+    """Compare a cold parse with a warm schema DNA cache hit"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'schema.sql')
+        with open(path, 'w') as f:
+            f.write(generate_schema_sql(table_count))
+        analyzer = SchemaDNAAnalyzer(cache=SchemaDNACache(os.path.join(tmp, 'cache')))
+
+        start = time.perf_counter()
+        analyzer.extract_schema_dna(path)
+        cold = time.perf_counter() - start
+
+        start = time.perf_counter()
+        analyzer.extract_schema_dna(path)
+        warm = time.perf_counter() - start
+
+    return {'tables': table_count, 'cold_seconds': cold, 'warm_seconds': warm}
+
+def benchmark_parallel(table_count: int = 4000, worker_counts: List[int] = None) -> List[dict]:
+    """Time serial versus process-pool parsing of an old/new schema pair"""
+    worker_counts = worker_counts or sorted({1, 2, os.cpu_count() or 1})
+    results = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for name, size in (('old.sql', table_count), ('new.sql', table_count + table_count // 20)):
+            path = os.path.join(tmp, name)
+            with open(path, 'w') as f:
+                f.write(generate_schema_sql(size))
+            paths.append(path)
+
+        analyzer = SchemaDNAAnalyzer()
+        start = time.perf_counter()
+        serial = [analyzer.extract_schema_model(path) for path in paths]
+        serial_seconds = time.perf_counter() - start
+
+        for workers in worker_counts:
+            start = time.perf_counter()
+            parallel = analyzer.extract_schema_models(paths, workers, shard_bytes=1024 * 1024)
+            seconds = time.perf_counter() - start
+            assert parallel == serial
+            results.append({
+                'workers': workers,
+                'seconds': seconds,
+                'speedup': serial_seconds / seconds
+            })
+
+    return results
+
+def benchmark_model_memory(table_count: int = 2000) -> dict:
+    """Compare retained memory of the slotted schema model and the plain dict form"""
+    statements = list(split_statements(generate_schema_sql(table_count)))
+    analyzer = SchemaDNAAnalyzer()
+    row = {'tables': table_count}
+
+    for label, build in (('dict', analyzer.extract_schema_dna_from_statements),
+                         ('model', analyzer.extract_schema_model_from_statements)):
+        tracemalloc.start()
+        result = build(statements)
+        row[f'{label}_bytes'] = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del result
+
+    return row
+
+def benchmark_dependency_ordering(sizes: List[int], columns_per_table: int = 12) -> List[dict]:
+    """Time dependency graph construction, topological ordering and batching for full create/drop plans"""
+    surgeon = MigrationSurgeon()
+    results = []
+
+    for size in sizes:
+        config = SyntheticSchemaConfig(tables=size, columns_per_table=columns_per_table, foreign_key_rate=0.3)
+        model = surgeon.analyzer.extract_schema_model_from_statements(
+            split_statements(render_schema(SyntheticSchemaGenerator(config).build()))
+        )
+        changes = surgeon.compare_models(SchemaModel(), model) + surgeon.compare_models(model, SchemaModel())
+
+        start = time.perf_counter()
+        graph = surgeon.build_dependency_graph(changes)
+        build_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        surgeon._sort_changes_by_risk(changes)
+        sort_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        batches = surgeon.plan_batches(changes)
+        batch_seconds = time.perf_counter() - start
+
+        results.append({
+            'nodes': len(graph),
+            'edges': graph.edge_count(),
+            'build_seconds': build_seconds,
+            'sort_seconds': sort_seconds,
+            'batch_seconds': batch_seconds,
+            'batches': len(batches)
+        })
+
+    return results
+
+class _CatalogReplayConnection:
+    """In-memory DB-API connection that answers catalog queries with prepared rows"""
+
+    def __init__(self, catalog: Dict[str, List[dict]]):
+        self.catalog = catalog
+        self.by_sql = {sql: name for name, sql in CATALOG_QUERIES.items()}
+
+    def cursor(self):
+        return _CatalogReplayCursor(self)
+
+    def rollback(self):
+        pass
+
+class _CatalogReplayCursor:
+    def __init__(self, connection: _CatalogReplayConnection):
+        self.connection = connection
+        self.description = None
+        self.rows = []
+
+    def execute(self, sql: str, params=None):
+        name = self.connection.by_sql.get(sql)
+        self.rows = self.connection.catalog.get(name, []) if name else []
+        self.description = [(key,) for key in self.rows[0]] if self.rows else None
+
+    def fetchall(self):
+        return [tuple(row.values()) for row in self.rows]
+
+    def close(self):
+        pass
+
+def catalog_rows(model: SchemaModel, schema: str = 'public') -> Dict[str, List[dict]]:
+    """Catalog query results a database holding model would return"""
+    rows = {name: [] for name in CATALOG_QUERIES}
+    for table_name, table in model.tables.items():
+        relname = table_name.rsplit('.', 1)[-1]
+        rows['tables'].append({'schema_name': schema, 'table_name': relname})
+        for column in table.columns.values():
+            rows['columns'].append({'schema_name': schema, 'table_name': relname, 'column_name': column.name,
+                                    'data_type': column.type, 'not_null': not column.nullable,
+                                    'column_default': column.default})
+            if column.references:
+                rows['constraints'].append({
+                    'schema_name': schema, 'table_name': relname, 'constraint_name': f'{relname}_{column.name}_fkey',
+                    'constraint_type': 'f', 'definition': f'FOREIGN KEY ({column.name}) REFERENCES {column.references}',
+                    'columns': [column.name], 'referenced_schema': schema,
+                    'referenced_table': column.references.rsplit('.', 1)[-1]
+                })
+        for index in table.indexes:
+            rows['indexes'].append({
+                'schema_name': schema, 'table_name': relname, 'index_name': index.name, 'is_unique': index.unique,
+                'definition': f'CREATE INDEX {index.name} ON {schema}.{relname} USING btree ({", ".join(index.columns)})'
+            })
+    rows['functions'] = [{'schema_name': schema, 'function_name': f.name.rsplit('.', 1)[-1], 'arguments': f.parameters}
+                         for f in model.functions]
+    return rows
+
+def benchmark_catalog_introspection(sizes: List[int]) -> List[dict]:
+    """Compare parsing a schema file with building the same model from bulk catalog query results.
+
+    Query execution is replaced by prepared rows, so this measures the
+    client side; the round-trip count is what stays fixed on a real server.
+    """
+    analyzer = SchemaDNAAnalyzer()
+    results = []
+
+    for size in sizes:
+        sql = generate_schema_sql(size)
+        start = time.perf_counter()
+        model = analyzer.extract_schema_model_from_statements(split_statements(sql))
+        parse_seconds = time.perf_counter() - start
+
+        introspector = CatalogIntrospector(connection=_CatalogReplayConnection(catalog_rows(model)),
+                                           schemas=['public'])
+        start = time.perf_counter()
+        introspected = introspector.introspect_model()
+        introspect_seconds = time.perf_counter() - start
+
+        results.append({
+            'tables': len(introspected.tables),
+            'parse_seconds': parse_seconds,
+            'introspect_seconds': introspect_seconds,
+            'queries': introspector.queries
+        })
+
+    return results
+
+def measure_phase(run: Callable[[], object], repeats: int) -> Dict[str, float]:
+    """Best-of-N wall time plus peak traced memory from one extra run"""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {'seconds': best, 'peak_bytes': peak}
+
+def run_suite(sizes: List[int], repeats: int = 3, rates: MutationRates = None, seed: int = 0) -> dict:
+    """Benchmark every evolver phase on generated old/new schema pairs of each size"""
+    rates = rates or MutationRates()
+    results = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            generator = SyntheticSchemaGenerator(SyntheticSchemaConfig(
+                tables=size, functions=max(1, size // 10), triggers=size // 2, types=max(1, size // 20), seed=seed
+            ))
+            old_sql, new_sql = generator.generate_pair(rates)
+            old_path = os.path.join(tmp, f'old_{size}.sql')
+            new_path = os.path.join(tmp, f'new_{size}.sql')
+            for path, sql in ((old_path, old_sql), (new_path, new_sql)):
+                with open(path, 'w') as f:
+                    f.write(sql)
+
+            surgeon = MigrationSurgeon(cache_dir=os.path.join(tmp, 'cache'))
+            changes = surgeon.diagnose_changes(old_path, new_path, use_cache=False)
+            phases: List[Tuple[str, Callable[[], object]]] = [
+                ('extract_schema_dna', lambda: surgeon.analyzer.extract_schema_dna(new_path, use_cache=False)),
+                ('diagnose_changes', lambda: surgeon.diagnose_changes(old_path, new_path, use_cache=False)),
+                ('diagnose_changes_lazy', lambda: surgeon.diagnose_changes_lazy(old_path, new_path)),
+                ('generate_migration', lambda: surgeon.generate_migration(changes, 'benchmark')),
+                ('generate_rollback_script', lambda: surgeon.generate_rollback_script(changes)),
+            ]
+
+            for phase, run in phases:
+                row = {'size': size, 'phase': phase, 'changes': len(changes), 'bytes': len(new_sql)}
+                row.update(measure_phase(run, repeats))
+                results.append(row)
+
+    return {
+        'meta': {
+            'generated': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'repeats': repeats,
+            'seed': seed,
+            'mutation_rates': vars(rates)
+        },
+        'results': results
+    }
+
+def compare_to_baseline(current: dict, baseline: dict, tolerance: float = DEFAULT_TOLERANCE) -> List[str]:
+    """List phases whose time or peak memory regressed beyond tolerance"""
+    baseline_rows = {(row['size'], row['phase']): row for row in baseline.get('results', [])}
+    regressions = []
+
+    for row in current['results']:
+        previous = baseline_rows.get((row['size'], row['phase']))
+        if previous is None:
+            continue
+
+        if max(row['seconds'], previous['seconds']) >= MIN_COMPARABLE_SECONDS \
+                and row['seconds'] > previous['seconds'] * (1 + tolerance):
+            regressions.append(
+                f"{row['phase']} @ {row['size']} tables: {previous['seconds'] * 1000:.1f} ms -> "
+                f"{row['seconds'] * 1000:.1f} ms"
+            )
+        if max(row['peak_bytes'], previous['peak_bytes']) >= MIN_COMPARABLE_BYTES \
+                and row['peak_bytes'] > previous['peak_bytes'] * (1 + tolerance):
+            regressions.append(
+                f"{row['phase']} @ {row['size']} tables: peak {previous['peak_bytes'] / 2**20:.1f} MiB -> "
+                f"{row['peak_bytes'] / 2**20:.1f} MiB"
+            )
+
+    return regressions
+
+def run_micro_benchmarks():
+    """Print the focused parser, streaming, cache, model, parallel, ordering and introspection benchmarks"""
+    print("⏱️  Schema DNA parse scaling")
+    for row in benchmark_parse_scaling([100, 500, 1000, 2000, 4000]):
+        print(f"  {row['tables']:>6} tables  {row['bytes'] / 1024:>9.1f} KiB  "
+              f"{row['seconds'] * 1000:>9.1f} ms  {row['microseconds_per_table']:>8.1f} µs/table")
+
+    print("\n💾 Peak memory with COPY/INSERT data sections (in-memory vs streaming)")
+    for row in benchmark_streaming_memory([1000, 5000, 20000]):
+        print(f"  {row['bytes'] / 2**20:>8.1f} MiB file  "
+              f"{row['in_memory_peak_bytes'] / 2**20:>8.1f} MiB  vs  {row['streaming_peak_bytes'] / 2**20:>6.1f} MiB")
+
+    cache = benchmark_cache()
+    print(f"\n🗄️  Schema DNA cache ({cache['tables']} tables): cold parse {cache['cold_seconds'] * 1000:.1f} ms, "
+          f"cache hit {cache['warm_seconds'] * 1000:.1f} ms")
+
+    memory = benchmark_model_memory()
+    print(f"\n🧬 Retained schema DNA ({memory['tables']} tables): dict form {memory['dict_bytes'] / 2**20:.1f} MiB, "
+          f"slotted model {memory['model_bytes'] / 2**20:.1f} MiB")
+
+    print(f"\n🧵 Parallel old/new parse ({os.cpu_count()} CPUs)")
+    for row in benchmark_parallel():
+        print(f"  {row['workers']:>3} workers  {row['seconds'] * 1000:>9.1f} ms  {row['speedup']:>5.2f}x vs serial")
+
+    print("\n🕸️  Dependency ordering (create + drop plans with foreign keys)")
+    for row in benchmark_dependency_ordering([500, 2000, 5000]):
+        print(f"  {row['nodes']:>6} nodes  {row['edges']:>6} edges  build {row['build_seconds'] * 1000:>7.1f} ms  "
+              f"sort {row['sort_seconds'] * 1000:>7.1f} ms  batch {row['batch_seconds'] * 1000:>7.1f} ms  "
+              f"{row['batches']:>4} batches")
+
+    print("\n🛰️  Catalog introspection vs file parsing (client side, prepared catalog rows)")
+    for row in benchmark_catalog_introspection([500, 2000, 5000]):
+        print(f"  {row['tables']:>6} tables  parse {row['parse_seconds'] * 1000:>7.1f} ms  "
+              f"introspect {row['introspect_seconds'] * 1000:>7.1f} ms  in {row['queries']} queries")
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description='Benchmark the schema evolver on synthetic schemas')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='Table counts to benchmark')
+    parser.add_argument('--repeats', type=int, default=3, help='Timed runs per phase (best is kept)')
+    parser.add_argument('--seed', type=int, default=0, help='Synthetic schema seed')
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    parser.add_argument('--baseline', help='Fail if results regress against this JSON results file')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='Allowed relative slowdown or memory growth against the baseline (default: 0.25)')
+    parser.add_argument('--micro', action='store_true',
+                        help='Run the focused parser/streaming/cache/model/parallel benchmarks instead')
+    return parser.parse_args(argv)
+
+def main():
+    """Run the benchmark suite and enforce the baseline"""
+    args = parse_args(sys.argv[1:])
+
+    if args.micro:
+        run_micro_benchmarks()
+        return
+
+    print("⏱️  Schema evolver benchmark suite")
+    current = run_suite(args.sizes, args.repeats, seed=args.seed)
+    for row in current['results']:
+        print(f"  {row['size']:>6} tables  {row['phase']:<26} {row['seconds'] * 1000:>9.1f} ms  "
+              f"peak {row['peak_bytes'] / 2**20:>7.1f} MiB  ({row['changes']} changes)")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(current, f, indent=2)
+        print(f"\n✅ Results saved: {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(current, baseline, args.tolerance)
+        if regressions:
+            print(f"\n🚨 {len(regressions)} performance regressions against {args.baseline}:")
+            for regression in regressions:
+                print(f"   {regression}")
+            sys.exit(1)
+        print(f"\n✅ No regressions against {args.baseline}")
+
+if __name__ == "__main__":
+    main()
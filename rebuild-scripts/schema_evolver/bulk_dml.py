@@ -0,0 +1,432 @@
+#!/usr/bin/env python3
+"""
+OncoVista Bulk DML Compiler
+Rewrites row-by-row seed and data-fix scripts into COPY blocks and multi-row INSERT/UPDATE batches
+"""
+
+import argparse
+import os
+import re
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+from catalog_introspection import IntrospectionError
+from ddl_lexer import IDENTIFIER, read_parenthesized, split_top_level, stream_statements
+from migration_generator import SchemaDNAAnalyzer
+from schema_model import SchemaModel, Table
+from schema_replay import SchemaReplayer, resolve_table
+from type_system import storage_type_sql
+
+DEFAULT_BATCH_ROWS = 500
+# Batches waiting behind an open one; past this the oldest is written out
+MAX_PENDING_BATCHES = 64
+
+INSERT_HEAD_PATTERN = re.compile(rf'INSERT\s+INTO\s+({IDENTIFIER})\s*', re.IGNORECASE)
+UPDATE_PATTERN = re.compile(rf'UPDATE\s+({IDENTIFIER})\s+SET\s+(.*?)\s+WHERE\s+(.*)$', re.IGNORECASE | re.DOTALL)
+ON_CONFLICT_PATTERN = re.compile(
+    rf'ON\s+CONFLICT(?:\s*\([^)]*\)|\s+ON\s+CONSTRAINT\s+{IDENTIFIER})?\s+DO\s+NOTHING', re.IGNORECASE
+)
+ASSIGNMENT_PATTERN = re.compile(r'^([A-Za-z_][\w$]*)\s*=\s*(.+)$', re.DOTALL)
+AND_PATTERN = re.compile(r'\s+AND\s+', re.IGNORECASE)
+LITERAL_PATTERN = re.compile(
+    r"^(?:'(?:[^']|'')*'|[-+]?(?:\d+\.?\d*|\.\d+)(?:e[-+]?\d+)?|NULL|TRUE|FALSE)"
+    r"(\s*::\s*[a-z_][\w .]*?(?:\(\s*\d+(?:\s*,\s*\d+)?\s*\))?(?:\[\])*)?$",
+    re.IGNORECASE
+)
+QUOTED_PATTERN = re.compile(r"'(?:[^']|'')*'")
+# E'' strings are not split reliably; subqueries and sequence reads see earlier rows of the same statement
+ESCAPE_STRING_PATTERN = re.compile(r"(?<![\w'])[eE]'")
+ROW_DEPENDENT_PATTERN = re.compile(r'\b(?:SELECT|CURRVAL|LASTVAL)\b', re.IGNORECASE)
+COPY_FROM_STDIN_PATTERN = re.compile(r'COPY\b.*\bFROM\s+STDIN\b', re.IGNORECASE | re.DOTALL)
+COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+class BulkDMLError(Exception):
+    """A script the compiler cannot rewrite faithfully"""
+
+@dataclass
+class InsertRows:
+    """A single-table INSERT ... VALUES statement"""
+    table: str
+    columns: Optional[Tuple[str, ...]]
+    rows: List[Tuple[str, ...]]
+    on_conflict: Optional[str] = None
+
+    @property
+    def key(self) -> Tuple:
+        return ('INSERT', self.table, self.columns, self.on_conflict)
+
+@dataclass
+class KeyedUpdate:
+    """UPDATE of literal values on rows found by equality on literal keys"""
+    table: str
+    assignments: Tuple[Tuple[str, str], ...]
+    conditions: Tuple[Tuple[str, str], ...]
+
+    @property
+    def key(self) -> Tuple:
+        return ('UPDATE', self.table, tuple(c for c, _ in self.assignments), tuple(c for c, _ in self.conditions))
+
+    @property
+    def match(self) -> Tuple[str, ...]:
+        """The key values with quoting and casts stripped, so '1' and 1::int find the same rows"""
+        return tuple(_bare_literal(value) for _, value in self.conditions)
+
+@dataclass
+class DMLBatch:
+    """Statements merged into one output statement, in source order"""
+    operation: Union[InsertRows, KeyedUpdate]  # the first statement; all share its table and columns
+    rows: List[Tuple[str, ...]] = field(default_factory=list)
+    matches: Set[Tuple[str, ...]] = field(default_factory=set)
+    statements: int = 0
+    open: bool = True
+
+@dataclass
+class CompileReport:
+    """Statement, row and size counts of one compilation"""
+    statements_in: int = 0
+    statements_out: int = 0
+    batched_statements: int = 0
+    rows: int = 0
+    batches: int = 0
+    copy_blocks: int = 0
+    bytes_in: int = 0
+    bytes_out: int = 0
+
+    @property
+    def reduction(self) -> float:
+        """Fraction of the input size saved"""
+        return 1 - self.bytes_out / self.bytes_in if self.bytes_in else 0.0
+
+    def describe(self) -> str:
+        change = f'{self.reduction:.0%} smaller' if self.reduction >= 0 else f'{-self.reduction:.0%} larger'
+        return (f'{self.statements_in:,} statements -> {self.statements_out:,} '
+                f'({self.batched_statements:,} row statements merged into {self.batches:,} batches, '
+                f'{self.copy_blocks:,} as COPY; {self.rows:,} rows), '
+                f'{self.bytes_in:,} -> {self.bytes_out:,} bytes ({change})')
+
+class BulkDMLCompiler:
+    """Groups compatible single-row statements per table into batched statements.
+
+    INSERT ... VALUES statements with the same table, column list and ON
+    CONFLICT DO NOTHING clause merge into multi-row INSERTs, or COPY blocks
+    when every value is a plain literal. UPDATEs that set literal values on
+    rows found by equality on literal keys merge into UPDATE ... FROM
+    (VALUES ...); their VALUES columns are typed from the schema, so they
+    are only batched for tables whose columns are known.
+
+    A statement may only join an earlier open batch when no batch opened
+    after it touches the same table or a table related to it by a foreign
+    key (any table, when the schema is unknown). Anything else (DDL,
+    SELECT, DELETE, other UPDATEs) is a barrier: pending batches are
+    written out before it, and DDL is replayed into the schema so tables
+    created by the script itself are known. Triggers with side effects on
+    other tables are not visible to the compiler.
+    """
+
+    def __init__(self, batch_rows: int = DEFAULT_BATCH_ROWS, copy: bool = False,
+                 model: Optional[SchemaModel] = None, analyzer: Optional[SchemaDNAAnalyzer] = None):
+        if batch_rows < 1:
+            raise ValueError('batch_rows must be at least 1')
+        self.batch_rows = batch_rows
+        self.copy = copy
+        self.model = model if model is not None else SchemaModel()
+        self.replayer = SchemaReplayer(analyzer or SchemaDNAAnalyzer())
+        self.report = CompileReport()
+        self.pending: List[DMLBatch] = []
+
+    def compile(self, statements: Iterable[str]) -> Iterator[str]:
+        """Yield the compiled script statement by statement, keeping memory bounded by the pending batches"""
+        for statement in statements:
+            self.report.statements_in += 1
+            self.report.bytes_in += _size(statement + ';\n')
+            if COPY_FROM_STDIN_PATTERN.match(statement):
+                raise BulkDMLError('COPY ... FROM stdin data is not kept by the statement splitter; '
+                                   'the script is already in bulk form')
+
+            operation = parse_dml(statement)
+            if isinstance(operation, KeyedUpdate) and not self._update_types(operation):
+                operation = None
+            if operation is None:
+                yield from self._flush()
+                yield self._output(statement + ';\n\n')
+                self.report.statements_out += 1
+                self.replayer.apply_statement(self.model, statement)
+                continue
+
+            self._add(operation)
+            yield from self._ready()
+        yield from self._flush()
+
+    def _add(self, operation):
+        """Append the operation's rows to its batch, or to new batches at the end"""
+        self.report.batched_statements += 1
+        if isinstance(operation, InsertRows):
+            rows, match = operation.rows, None
+        else:
+            rows, match = [tuple(value for _, value in operation.assignments + operation.conditions)], operation.match
+
+        batch = self._joinable(operation, match)
+        for row in rows:
+            if batch is None or not batch.open:
+                batch = DMLBatch(operation)
+                self.pending.append(batch)
+            batch.rows.append(row)
+            if match is not None:
+                batch.matches.add(match)
+            if len(batch.rows) >= self.batch_rows:
+                batch.open = False
+        batch.statements += 1
+
+    def _joinable(self, operation, match: Optional[Tuple[str, ...]]) -> Optional[DMLBatch]:
+        """The open batch with the operation's key, if moving the operation up to it keeps every dependency"""
+        for position, batch in enumerate(self.pending):
+            if not batch.open or batch.operation.key != operation.key:
+                continue
+            later = self.pending[position + 1:]
+            # Two updates of the same row in one UPDATE ... FROM apply only one of them
+            if (match is not None and match in batch.matches) or any(
+                    self._related(operation.table, other.operation.table) for other in later):
+                batch.open = False
+                return None
+            return batch
+        return None
+
+    def _related(self, first: str, second: str) -> bool:
+        """Whether statements on the two tables must keep their relative order"""
+        first_name, second_name = resolve_table(self.model, first), resolve_table(self.model, second)
+        if first_name is None or second_name is None:
+            return True
+        if first_name == second_name:
+            return True
+        return (second_name in self._references(first_name)) or (first_name in self._references(second_name))
+
+    def _references(self, table_name: str) -> Set[str]:
+        return {resolve_table(self.model, target) or target
+                for target in self.model.tables[table_name].referenced_tables()}
+
+    def _ready(self) -> Iterator[str]:
+        """Write out closed batches at the head, which nothing can move in front of any more"""
+        if len(self.pending) > MAX_PENDING_BATCHES:
+            self.pending[0].open = False
+        while self.pending and not self.pending[0].open:
+            yield self._render(self.pending.pop(0))
+
+    def _flush(self) -> Iterator[str]:
+        while self.pending:
+            yield self._render(self.pending.pop(0))
+
+    def _render(self, batch: DMLBatch) -> str:
+        operation = batch.operation
+        self.report.batches += 1
+        self.report.statements_out += 1
+        self.report.rows += len(batch.rows)
+        if isinstance(operation, InsertRows):
+            return self._output(self._render_insert(operation, batch))
+        return self._output(self._render_update(operation, batch))
+
+    def _render_insert(self, insert: InsertRows, batch: DMLBatch) -> str:
+        columns = f' ({", ".join(insert.columns)})' if insert.columns else ''
+        if self.copy and not insert.on_conflict and all(_copy_value(value) is not None
+                                                        for row in batch.rows for value in row):
+            self.report.copy_blocks += 1
+            lines = ['\t'.join(_copy_value(value) for value in row) for row in batch.rows]
+            return f'COPY {insert.table}{columns} FROM STDIN;\n' + '\n'.join(lines) + '\n\\.\n\n'
+        rows = ',\n'.join(f'    ({", ".join(row)})' for row in batch.rows)
+        conflict = f'\n{insert.on_conflict}' if insert.on_conflict else ''
+        return f'INSERT INTO {insert.table}{columns} VALUES\n{rows}{conflict};\n\n'
+
+    def _render_update(self, update: KeyedUpdate, batch: DMLBatch) -> str:
+        set_columns = [column for column, _ in update.assignments]
+        key_columns = [column for column, _ in update.conditions]
+        if len(batch.rows) == 1:
+            assignments = ', '.join(f'{column} = {value}' for column, value in update.assignments)
+            conditions = ' AND '.join(f'{column} = {value}' for column, value in update.conditions)
+            return f'UPDATE {update.table} SET {assignments} WHERE {conditions};\n\n'
+        # VALUES columns take their type from the first row
+        types = self._update_types(update)
+        first = tuple(value if LITERAL_PATTERN.match(value).group(1) else f'{value}::{column_type}'
+                      for value, column_type in zip(batch.rows[0], types))
+        rows = ',\n'.join(f'    ({", ".join(row)})' for row in [first] + batch.rows[1:])
+        names = [f'new_{column}' for column in set_columns] + [f'key_{column}' for column in key_columns]
+        assignments = ', '.join(f'{column} = v.new_{column}' for column in set_columns)
+        conditions = ' AND '.join(f't.{column} = v.key_{column}' for column in key_columns)
+        return (f'UPDATE {update.table} AS t SET {assignments}\n'
+                f'FROM (VALUES\n{rows}\n) AS v ({", ".join(names)})\n'
+                f'WHERE {conditions};\n\n')
+
+    def _update_types(self, update: KeyedUpdate) -> Optional[List[str]]:
+        """Storage types of the set and key columns, or None when the table or a column is unknown"""
+        table_name = resolve_table(self.model, update.table)
+        if table_name is None:
+            return None
+        table: Table = self.model.tables[table_name]
+        columns = [column for column, _ in update.assignments + update.conditions]
+        if any(column not in table.columns for column in columns):
+            return None
+        return [storage_type_sql(table.columns[column].type) for column in columns]
+
+    def _output(self, text: str) -> str:
+        self.report.bytes_out += _size(text)
+        return text
+
+def parse_dml(statement: str):
+    """An InsertRows or KeyedUpdate for batchable statements, otherwise None"""
+    head = statement[:6].upper()
+    if head not in ('INSERT', 'UPDATE') or ESCAPE_STRING_PATTERN.search(statement):
+        return None
+    return parse_insert(statement) if head == 'INSERT' else parse_update(statement)
+
+def parse_insert(statement: str) -> Optional[InsertRows]:
+    """INSERT INTO table [(columns)] VALUES (...), ... [ON CONFLICT ... DO NOTHING]"""
+    match = INSERT_HEAD_PATTERN.match(statement)
+    if not match:
+        return None
+    position = match.end()
+    columns = None
+    if statement.startswith('(', position):
+        body, position = read_parenthesized(statement, position)
+        columns = tuple(split_top_level(body))
+
+    rest = statement[position:].lstrip()
+    if rest[:6].upper() != 'VALUES':
+        return None
+    position = len(statement) - len(rest) + 6
+    rows = []
+    while True:
+        while position < len(statement) and statement[position].isspace():
+            position += 1
+        if not statement.startswith('(', position):
+            return None
+        body, position = read_parenthesized(statement, position)
+        values = tuple(split_top_level(body))
+        if (columns and len(values) != len(columns)) or ROW_DEPENDENT_PATTERN.search(_mask(body)):
+            return None
+        rows.append(values)
+        tail = statement[position:].lstrip()
+        if not tail.startswith(','):
+            break
+        position = len(statement) - len(tail) + 1
+
+    on_conflict = None
+    if tail:
+        conflict = ON_CONFLICT_PATTERN.fullmatch(tail)
+        if not conflict:
+            return None
+        on_conflict = ' '.join(tail.split())
+    return InsertRows(match.group(1), columns, rows, on_conflict)
+
+def parse_update(statement: str) -> Optional[KeyedUpdate]:
+    """UPDATE table SET column = literal, ... WHERE key = literal AND ..."""
+    masked = _mask(statement)
+    match = UPDATE_PATTERN.match(masked)
+    if not match:
+        return None
+    set_text = statement[match.start(2):match.end(2)]
+    where_text = statement[match.start(3):match.end(3)]
+
+    assignments = _literal_pairs(split_top_level(set_text))
+    bounds = [0] + [end for found in AND_PATTERN.finditer(masked[match.start(3):match.end(3)])
+                    for end in (found.start(), found.end())] + [len(where_text)]
+    conditions = _literal_pairs([where_text[start:end] for start, end in zip(bounds[::2], bounds[1::2])])
+    if not assignments or not conditions:
+        return None
+    # A key that is also set could chain one statement's result into the next
+    if {column for column, _ in assignments} & {column for column, _ in conditions}:
+        return None
+    if len({column for column, _ in conditions}) != len(conditions):
+        return None
+    return KeyedUpdate(match.group(1), assignments, conditions)
+
+def _literal_pairs(items: List[str]) -> Optional[Tuple[Tuple[str, str], ...]]:
+    pairs = []
+    for item in items:
+        match = ASSIGNMENT_PATTERN.match(item.strip())
+        if not match or not LITERAL_PATTERN.match(match.group(2).strip()):
+            return None
+        pairs.append((match.group(1), match.group(2).strip()))
+    return tuple(pairs)
+
+def _bare_literal(value: str) -> str:
+    value = LITERAL_PATTERN.match(value).group(0)
+    cast = LITERAL_PATTERN.match(value).group(1)
+    if cast:
+        value = value[:-len(cast)].rstrip()
+    return value[1:-1].replace("''", "'") if value.startswith("'") else value.upper()
+
+def _copy_value(value: str) -> Optional[str]:
+    """The value in COPY text format, or None unless it is a plain uncast literal"""
+    match = LITERAL_PATTERN.match(value)
+    if not match or match.group(1):
+        return None
+    if value.startswith("'"):
+        return value[1:-1].replace("''", "'").translate(COPY_ESCAPES)
+    upper = value.upper()
+    if upper == 'NULL':
+        return '\\N'
+    if upper in ('TRUE', 'FALSE'):
+        return upper[0].lower()
+    return value
+
+def _mask(text: str) -> str:
+    """The text with string literal contents blanked, keeping positions"""
+    return QUOTED_PATTERN.sub(lambda match: "'" + ' ' * (len(match.group()) - 2) + "'", text)
+
+def _size(text: str) -> int:
+    return len(text.encode('utf-8'))
+
+def compile_file(input_file: str, output_file: str, batch_rows: int = DEFAULT_BATCH_ROWS, copy: bool = False,
+                 model: Optional[SchemaModel] = None) -> CompileReport:
+    """Stream input_file through the compiler into output_file"""
+    compiler = BulkDMLCompiler(batch_rows, copy, model)
+    with open(output_file, 'w', encoding='utf-8') as f:
+        copy_note = ', plain-literal inserts as COPY (run with psql)' if copy else ''
+        f.write(f'-- OncoVista Bulk DML: compiled from {os.path.basename(input_file)}\n'
+                f'-- Batches of up to {batch_rows} rows{copy_note}; source comments are not kept\n\n')
+        for chunk in compiler.compile(stream_statements(input_file)):
+            f.write(chunk)
+    return compiler.report
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(
+        prog='bulk_dml.py',
+        description='Rewrite row-by-row INSERT/UPDATE scripts into COPY blocks and multi-row batches'
+    )
+    parser.add_argument('script', help='Seed or data-fix SQL script')
+    parser.add_argument('--output', metavar='FILE', default=None,
+                        help='Compiled script (default: SCRIPT with a .bulk.sql suffix)')
+    parser.add_argument('--batch-rows', type=int, default=DEFAULT_BATCH_ROWS,
+                        help=f'Rows per batched statement (default: {DEFAULT_BATCH_ROWS})')
+    parser.add_argument('--copy', action='store_true',
+                        help='Write inserts of plain literals as COPY ... FROM STDIN blocks (psql only)')
+    parser.add_argument('--schema', metavar='FILE', default=None,
+                        help='Schema SQL file, or a postgresql:// URL, giving column types and foreign keys; '
+                             'without it UPDATEs are only batched for tables the script creates itself')
+    return parser.parse_args(argv)
+
+def main():
+    """Main execution function"""
+    args = parse_args(sys.argv[1:])
+    output = args.output or str(Path(args.script).with_suffix('.bulk.sql'))
+
+    model = None
+    if args.schema:
+        try:
+            model = SchemaDNAAnalyzer().extract_schema_model(args.schema)
+        except (OSError, IntrospectionError) as e:
+            print(f"❌ Cannot read schema {args.schema}: {e}")
+            sys.exit(1)
+
+    try:
+        report = compile_file(args.script, output, args.batch_rows, args.copy, model)
+    except (OSError, ValueError, BulkDMLError) as e:
+        print(f"❌ Cannot compile {args.script}: {e}")
+        sys.exit(1)
+
+    print(f"📦 Compiled script saved: {output}")
+    print(f"   {report.describe()}")
+
+if __name__ == "__main__":
+    main()
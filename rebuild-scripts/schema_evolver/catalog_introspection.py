@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+OncoVista Catalog Introspection
+Builds schema DNA straight from pg_catalog with a fixed set of bulk queries
+"""
+
+import re
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qsl, unquote, urlencode, urlsplit, urlunsplit
+
+from ddl_lexer import read_parenthesized, split_top_level
+from schema_model import (
+    DEFAULT_INDEX_METHOD, Column, Constraint, Function, Index, NamedObject, SchemaModel, Table, index_options,
+    intern_text
+)
+
+try:
+    import psycopg2
+    import psycopg2.pool
+except ImportError:
+    psycopg2 = None
+
+DATABASE_ERRORS = (psycopg2.Error,) if psycopg2 else ()
+DATABASE_URL_PREFIXES = ('postgresql://', 'postgres://')
+DEFAULT_PORT = '5432'
+DEFAULT_POOL_SIZE = 4
+# Query parameter naming the schemas to introspect; stripped before connecting
+SCHEMA_PARAMETER = 'schema'
+DSN_PAIR_PATTERN = re.compile(r"(\w+)\s*=\s*('(?:[^'\\]|\\.)*'|\S+)")
+INDEX_COLUMNS_PATTERN = re.compile(r'\s+USING\s+(\w+)\s*\(|\s+ON\s+\S+\s*\(', re.IGNORECASE)
+
+SNAPSHOT_SQL = 'SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY'
+
+# Every query takes %(schemas)s (NULL for all user schemas) and returns whole-database result sets
+SCHEMA_FILTER = ("n.nspname NOT IN ('pg_catalog', 'information_schema') AND n.nspname NOT LIKE 'pg\\_%%' "
+                 "AND (%(schemas)s::text[] IS NULL OR n.nspname = ANY(%(schemas)s::text[]))")
+NOT_EXTENSION_MEMBER = ("NOT EXISTS (SELECT 1 FROM pg_depend d WHERE d.classid = '{catalog}'::regclass "
+                        "AND d.objid = {oid} AND d.deptype = 'e')")
+
+TABLES_SQL = f"""SELECT n.nspname AS schema_name, c.relname AS table_name
+FROM pg_class c
+JOIN pg_namespace n ON n.oid = c.relnamespace
+WHERE c.relkind IN ('r', 'p') AND NOT c.relispartition AND {SCHEMA_FILTER}
+ORDER BY n.nspname, c.relname"""
+
+COLUMNS_SQL = f"""SELECT n.nspname AS schema_name, c.relname AS table_name, a.attname AS column_name,
+       format_type(a.atttypid, a.atttypmod) AS data_type, a.attnotnull AS not_null,
+       pg_get_expr(d.adbin, d.adrelid) AS column_default
+FROM pg_attribute a
+JOIN pg_class c ON c.oid = a.attrelid
+JOIN pg_namespace n ON n.oid = c.relnamespace
+LEFT JOIN pg_attrdef d ON d.adrelid = a.attrelid AND d.adnum = a.attnum
+WHERE c.relkind IN ('r', 'p') AND NOT c.relispartition AND a.attnum > 0 AND NOT a.attisdropped AND {SCHEMA_FILTER}
+ORDER BY n.nspname, c.relname, a.attnum"""
+
+CONSTRAINTS_SQL = f"""SELECT n.nspname AS schema_name, c.relname AS table_name, con.conname AS constraint_name,
+       con.contype AS constraint_type, pg_get_constraintdef(con.oid) AS definition,
+       ARRAY(SELECT a.attname FROM unnest(con.conkey) WITH ORDINALITY k(attnum, ord)
+             JOIN pg_attribute a ON a.attrelid = con.conrelid AND a.attnum = k.attnum
+             ORDER BY k.ord)::text[] AS columns,
+       rn.nspname AS referenced_schema, rc.relname AS referenced_table
+FROM pg_constraint con
+JOIN pg_class c ON c.oid = con.conrelid
+JOIN pg_namespace n ON n.oid = c.relnamespace
+LEFT JOIN pg_class rc ON rc.oid = con.confrelid
+LEFT JOIN pg_namespace rn ON rn.oid = rc.relnamespace
+WHERE con.contype IN ('p', 'u', 'f', 'c', 'x') AND con.conislocal AND {SCHEMA_FILTER}
+ORDER BY n.nspname, c.relname, con.conname"""
+
+# Indexes backing PRIMARY KEY, UNIQUE and EXCLUDE constraints belong to the constraint, as in DDL
+INDEXES_SQL = f"""SELECT n.nspname AS schema_name, c.relname AS table_name, i.relname AS index_name,
+       x.indisunique AS is_unique, pg_get_indexdef(x.indexrelid) AS definition
+FROM pg_index x
+JOIN pg_class i ON i.oid = x.indexrelid
+JOIN pg_class c ON c.oid = x.indrelid
+JOIN pg_namespace n ON n.oid = c.relnamespace
+WHERE c.relkind IN ('r', 'p') AND {SCHEMA_FILTER}
+  AND NOT EXISTS (SELECT 1 FROM pg_constraint con WHERE con.conindid = x.indexrelid AND con.contype IN ('p', 'u', 'x'))
+ORDER BY n.nspname, c.relname, i.relname"""
+
+FUNCTIONS_SQL = f"""SELECT n.nspname AS schema_name, p.proname AS function_name,
+       pg_get_function_arguments(p.oid) AS arguments
+FROM pg_proc p
+JOIN pg_namespace n ON n.oid = p.pronamespace
+WHERE p.prokind = 'f' AND {NOT_EXTENSION_MEMBER.format(catalog='pg_proc', oid='p.oid')} AND {SCHEMA_FILTER}
+ORDER BY n.nspname, p.proname, arguments"""
+
+TRIGGERS_SQL = f"""SELECT t.tgname AS trigger_name
+FROM pg_trigger t
+JOIN pg_class c ON c.oid = t.tgrelid
+JOIN pg_namespace n ON n.oid = c.relnamespace
+WHERE NOT t.tgisinternal AND {SCHEMA_FILTER}
+ORDER BY n.nspname, c.relname, t.tgname"""
+
+TYPES_SQL = f"""SELECT n.nspname AS schema_name, t.typname AS type_name
+FROM pg_type t
+JOIN pg_namespace n ON n.oid = t.typnamespace
+LEFT JOIN pg_class c ON c.oid = t.typrelid
+WHERE (t.typtype IN ('e', 'd', 'r', 'm') OR (t.typtype = 'c' AND c.relkind = 'c'))
+  AND {NOT_EXTENSION_MEMBER.format(catalog='pg_type', oid='t.oid')} AND {SCHEMA_FILTER}
+ORDER BY n.nspname, t.typname"""
+
+CATALOG_QUERIES = {
+    'tables': TABLES_SQL,
+    'columns': COLUMNS_SQL,
+    'constraints': CONSTRAINTS_SQL,
+    'indexes': INDEXES_SQL,
+    'functions': FUNCTIONS_SQL,
+    'triggers': TRIGGERS_SQL,
+    'types': TYPES_SQL
+}
+
+_pools: Dict[str, Any] = {}
+
+class IntrospectionError(RuntimeError):
+    """Raised when the catalog cannot be read"""
+
+def is_database_url(source: str) -> bool:
+    """Whether a schema source names a database instead of a SQL file"""
+    return source.startswith(DATABASE_URL_PREFIXES)
+
+def parse_connection_string(connection_string: str) -> Dict[str, Any]:
+    """Split a postgresql:// URL or key=value DSN into its parts.
+
+    Returns host, port, database, user and password as strings (None when
+    absent), schemas from any ?schema=a,b parameter, and dsn: the
+    connection string without that parameter, ready for libpq.
+    """
+    if is_database_url(connection_string):
+        url = urlsplit(connection_string)
+        query = parse_qsl(url.query)
+        schemas = [schema for key, value in query if key == SCHEMA_PARAMETER for schema in value.split(',') if schema]
+        dsn = urlunsplit(url._replace(query=urlencode([(k, v) for k, v in query if k != SCHEMA_PARAMETER])))
+        try:
+            port = url.port
+        except ValueError:
+            raise ValueError(f'invalid port in connection string: {connection_string}') from None
+        return {
+            'host': url.hostname,
+            'port': str(port) if port else DEFAULT_PORT,
+            'database': unquote(url.path.lstrip('/')) or None,
+            'user': unquote(url.username) if url.username else None,
+            'password': unquote(url.password) if url.password else None,
+            'schemas': schemas or None,
+            'dsn': dsn
+        }
+
+    pairs = {key: value.strip("'") for key, value in DSN_PAIR_PATTERN.findall(connection_string)}
+    if not pairs:
+        raise ValueError(f'unrecognized connection string: {connection_string}')
+    schemas = [schema for schema in pairs.pop(SCHEMA_PARAMETER, '').split(',') if schema]
+    return {
+        'host': pairs.get('host'),
+        'port': pairs.get('port', DEFAULT_PORT),
+        'database': pairs.get('dbname'),
+        'user': pairs.get('user'),
+        'password': pairs.get('password'),
+        'schemas': schemas or None,
+        'dsn': ' '.join(f'{key}={value}' for key, value in DSN_PAIR_PATTERN.findall(connection_string)
+                        if key != SCHEMA_PARAMETER)
+    }
+
+def connection_pool(dsn: str, size: int = DEFAULT_POOL_SIZE):
+    """Return the process-wide connection pool for dsn, creating it on first use"""
+    if psycopg2 is None:
+        raise IntrospectionError('psycopg2 is required for catalog introspection: pip install psycopg2-binary')
+    if dsn not in _pools:
+        try:
+            _pools[dsn] = psycopg2.pool.ThreadedConnectionPool(1, size, dsn)
+        except psycopg2.Error as e:
+            raise IntrospectionError(f'cannot connect: {e}') from e
+    return _pools[dsn]
+
+class CatalogIntrospector:
+    """Reads schema DNA from a live database instead of a SQL file.
+
+    One REPEATABLE READ READ ONLY transaction runs seven whole-database
+    catalog queries (tables, columns, constraints, indexes, functions,
+    triggers, types), so the round-trip count does not grow with the
+    number of tables. The model matches what the file parser builds from
+    CREATE TABLE statements with inline constraints: single-column keys,
+    unique constraints and foreign keys become column constraints and
+    references, everything else a table-level constraint. Types come back
+    in canonical format_type spelling (character varying(255), integer).
+
+    Names are schema-qualified unless exactly one schema is introspected,
+    in which case they are bare so per-tenant schemas line up with each
+    other and with unqualified DDL. Pass connection to use an existing
+    DB-API connection (or a test double); otherwise dsn is served from a
+    shared pool.
+    """
+
+    def __init__(self, connection=None, dsn: Optional[str] = None, schemas: Optional[List[str]] = None):
+        if connection is None and dsn is None:
+            raise ValueError('either connection or dsn is required')
+        self.connection = connection
+        self.dsn = dsn
+        self.schemas = schemas
+        self.queries = 0
+        self._active = None
+
+    @classmethod
+    def from_url(cls, connection_string: str) -> 'CatalogIntrospector':
+        """Introspect the schemas selected by a connection string's schema parameter"""
+        parts = parse_connection_string(connection_string)
+        return cls(dsn=parts['dsn'], schemas=parts['schemas'])
+
+    def query_database(self, sql: str, params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Run one query and return its rows as dicts keyed by column name"""
+        with self._session() as connection:
+            cursor = connection.cursor()
+            try:
+                cursor.execute(sql, params)
+                if cursor.description is None:
+                    return []
+                names = [column[0] for column in cursor.description]
+                return [dict(zip(names, row)) for row in cursor.fetchall()]
+            finally:
+                self.queries += 1
+                cursor.close()
+
+    def fetch_catalog(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Run every catalog query inside one consistent snapshot"""
+        params = {'schemas': self.schemas}
+        try:
+            with self._session():
+                self.query_database(SNAPSHOT_SQL)
+                return {name: self.query_database(sql, params) for name, sql in CATALOG_QUERIES.items()}
+        except DATABASE_ERRORS as e:
+            raise IntrospectionError(f'catalog query failed: {e}') from e
+
+    def introspect_model(self) -> SchemaModel:
+        """Build the schema model from the catalog"""
+        return build_schema_model(self.fetch_catalog(), qualify=self.schemas is None or len(self.schemas) != 1)
+
+    def introspect_schema(self) -> Dict[str, Any]:
+        """Build schema DNA in the plain dict form"""
+        return self.introspect_model().to_dict()
+
+    @contextmanager
+    def _session(self) -> Iterator[Any]:
+        """Yield the connection for the current snapshot, opening one if none is active"""
+        if self._active is not None:
+            yield self._active
+            return
+
+        pool = None
+        if self.connection is not None:
+            connection = self.connection
+        else:
+            pool = connection_pool(self.dsn)
+            connection = pool.getconn()
+        self._active = connection
+        try:
+            yield connection
+        finally:
+            self._active = None
+            connection.rollback()
+            if pool is not None:
+                pool.putconn(connection)
+
+def build_schema_model(catalog: Dict[str, List[Dict[str, Any]]], qualify: bool = True) -> SchemaModel:
+    """Assemble catalog rows (as returned by fetch_catalog) into a schema model"""
+    name = lambda schema, relation: intern_text(f'{schema}.{relation}' if qualify else relation)
+
+    inline: Dict[Tuple[str, str], List[str]] = {}
+    references: Dict[Tuple[str, str], str] = {}
+    constraints: Dict[str, List[Constraint]] = {}
+    for row in catalog.get('constraints', ()):
+        table = name(row['schema_name'], row['table_name'])
+        kind, columns = row['constraint_type'], list(row['columns'] or ())
+        if len(columns) == 1 and kind in ('p', 'u'):
+            inline.setdefault((table, columns[0]), []).append('PRIMARY KEY' if kind == 'p' else 'UNIQUE')
+        elif len(columns) == 1 and kind == 'f' and (table, columns[0]) not in references:
+            references[(table, columns[0])] = name(row['referenced_schema'], row['referenced_table'])
+        else:
+            constraints.setdefault(table, []).append(Constraint(row['constraint_name'], row['definition']))
+
+    columns: Dict[str, Dict[str, Column]] = {}
+    for row in catalog.get('columns', ()):
+        table, column = name(row['schema_name'], row['table_name']), intern_text(row['column_name'])
+        flags = sorted(inline.get((table, column), ()), key=('PRIMARY KEY', 'UNIQUE').index)
+        if row['not_null']:
+            flags.append('NOT NULL')
+        columns.setdefault(table, {})[column] = Column(
+            name=column,
+            type=intern_text(row['data_type']),
+            nullable=not row['not_null'],
+            default=intern_text(row['column_default']),
+            constraints=tuple(intern_text(flag) for flag in dict.fromkeys(flags)),
+            references=references.get((table, column))
+        )
+
+    indexes: Dict[str, List[Index]] = {}
+    for row in catalog.get('indexes', ()):
+        table = name(row['schema_name'], row['table_name'])
+        method, key_columns, include, predicate = index_definition(row['definition'])
+        indexes.setdefault(table, []).append(Index(
+            name=row['index_name'],
+            columns=tuple(intern_text(column) for column in key_columns),
+            unique=bool(row['is_unique']),
+            method=intern_text(method),
+            include=include,
+            predicate=predicate
+        ))
+
+    tables = {}
+    for row in catalog.get('tables', ()):
+        table = name(row['schema_name'], row['table_name'])
+        tables[table] = Table(
+            name=table,
+            columns=columns.get(table, {}),
+            constraints=tuple(constraints.get(table, ())),
+            indexes=tuple(indexes.get(table, ()))
+        )
+
+    return SchemaModel(
+        tables=tables,
+        functions=[Function(name(row['schema_name'], row['function_name']), row['arguments'])
+                   for row in catalog.get('functions', ())],
+        triggers=[NamedObject(row['trigger_name']) for row in catalog.get('triggers', ())],
+        types=[NamedObject(name(row['schema_name'], row['type_name'])) for row in catalog.get('types', ())]
+    )
+
+def index_columns(definition: str) -> List[str]:
+    """Key columns or expressions of a pg_get_indexdef() result"""
+    return index_definition(definition)[1]
+
+def index_definition(definition: str) -> Tuple[str, List[str], Tuple[str, ...], Optional[str]]:
+    """Access method, key columns, INCLUDE columns and predicate of a pg_get_indexdef() result"""
+    match = INDEX_COLUMNS_PATTERN.search(definition)
+    if not match:
+        return DEFAULT_INDEX_METHOD, [], (), None
+    columns_sql, end = read_parenthesized(definition, match.end() - 1)
+    include, predicate = index_options(definition[end:])
+    return (match.group(1) or DEFAULT_INDEX_METHOD).lower(), split_top_level(columns_sql), include, predicate
+
+def introspect_database(connection_string: str) -> SchemaModel:
+    """Schema model for the database (and optional ?schema=) named by connection_string"""
+    return CatalogIntrospector.from_url(connection_string).introspect_model()
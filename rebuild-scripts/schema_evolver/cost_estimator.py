@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+OncoVista Migration Cost Estimator
+Rewrite, lock and I/O estimates from a table statistics snapshot
+"""
+
+import json
+import sys
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from online_migration import ACCESS_EXCLUSIVE, SHARE_ROW_EXCLUSIVE, is_volatile_default
+from type_system import REWRITE, VALIDATION_SCAN, classify_column_change, classify_type_change, validation_reasons
+
+# Run with psql -At and save the output as the --stats file
+STATS_EXPORT_SQL = """SELECT json_build_object(
+    'captured_at', now(),
+    'tables', json_agg(json_build_object(
+        'table', n.nspname || '.' || c.relname,
+        'rows', GREATEST(COALESCE(s.n_live_tup, c.reltuples::bigint), 0),
+        'table_bytes', pg_table_size(c.oid),
+        'index_bytes', pg_indexes_size(c.oid)
+    ))
+)
+FROM pg_class c
+JOIN pg_namespace n ON n.oid = c.relnamespace
+LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid
+WHERE c.relkind IN ('r', 'p') AND n.nspname NOT IN ('pg_catalog', 'information_schema');"""
+
+# Conservative single-session throughput on shared production storage
+DEFAULT_SCAN_BYTES_PER_SECOND = 200 * 1024 * 1024
+DEFAULT_REWRITE_BYTES_PER_SECOND = 50 * 1024 * 1024
+DEFAULT_INDEX_BUILD_BYTES_PER_SECOND = 40 * 1024 * 1024
+
+# Lock-hold thresholds (seconds) for the cost levels shown in the migration header
+COST_LEVELS = [(1.0, 'LOW'), (10.0, 'MEDIUM'), (60.0, 'HIGH')]
+
+@dataclass
+class TableStats:
+    """Size snapshot for one table"""
+    name: str
+    rows: int = 0
+    table_bytes: int = 0
+    index_bytes: int = 0
+
+@dataclass
+class OperationCost:
+    """Estimated cost of one schema change"""
+    lock: Optional[str] = None
+    lock_seconds: float = 0.0
+    io_bytes: int = 0
+    rows: int = 0
+    rewrite: bool = False
+    scan: bool = False
+    notes: List[str] = field(default_factory=list)
+
+    @property
+    def level(self) -> str:
+        for limit, level in COST_LEVELS:
+            if self.lock_seconds < limit:
+                return level
+        return 'CRITICAL'
+
+    def describe(self) -> str:
+        if not self.lock:
+            return 'no table lock'
+        kind = 'rewrite' if self.rewrite else 'scan' if self.scan else 'catalog-only'
+        text = f'{kind}, ~{format_seconds(self.lock_seconds)} {self.lock}'
+        if self.io_bytes:
+            text += f', {format_bytes(self.io_bytes)} I/O over {self.rows:,} rows'
+        return text + ''.join(f'; {note}' for note in self.notes)
+
+class CostEstimator:
+    """Estimates per-change rewrite cost, lock hold time and I/O from table statistics.
+
+    Tables missing from the snapshot are treated as empty and noted, so an
+    estimate never blocks generation. Estimates describe the standard
+    (single-transaction) migration SQL.
+    """
+
+    def __init__(self, stats: Dict[str, TableStats], captured_at: Optional[str] = None,
+                 scan_bytes_per_second: float = DEFAULT_SCAN_BYTES_PER_SECOND,
+                 rewrite_bytes_per_second: float = DEFAULT_REWRITE_BYTES_PER_SECOND,
+                 index_build_bytes_per_second: float = DEFAULT_INDEX_BUILD_BYTES_PER_SECOND):
+        self.stats = stats
+        self.captured_at = captured_at
+        self.scan_bytes_per_second = scan_bytes_per_second
+        self.rewrite_bytes_per_second = rewrite_bytes_per_second
+        self.index_build_bytes_per_second = index_build_bytes_per_second
+
+    @classmethod
+    def from_file(cls, path: str, **throughput) -> 'CostEstimator':
+        """Build an estimator from a statistics snapshot file"""
+        stats, captured_at = load_table_stats(path)
+        return cls(stats, captured_at, **throughput)
+
+    def table_stats(self, name: str) -> Optional[TableStats]:
+        """Look up stats by exact, public-qualified or bare name"""
+        short = name.rsplit('.', 1)[-1]
+        return self.stats.get(name) or self.stats.get(f'public.{name}') or self.stats.get(short)
+
+    def estimate(self, change) -> OperationCost:
+        """Estimate one change"""
+        estimator = getattr(self, f'_estimate_{change.change_type.lower()}', None)
+        if not estimator:
+            return OperationCost()
+
+        stats = self.table_stats(change.table_name)
+        cost = estimator(change, stats or TableStats(change.table_name))
+        if stats is None and cost.lock and change.change_type != 'ADD_TABLE':
+            cost.notes.append('no statistics, assumed empty')
+        return cost
+
+    def estimate_all(self, changes: List[Any]) -> List[OperationCost]:
+        return [self.estimate(change) for change in changes]
+
+    def summary_lines(self, costs: List[OperationCost], changes: List[Any], top: int = 3) -> List[str]:
+        """Header lines with totals and the most expensive operations"""
+        lock_seconds = sum(cost.lock_seconds for cost in costs)
+        io_bytes = sum(cost.io_bytes for cost in costs)
+        lines = [f'Estimated lock time: ~{format_seconds(lock_seconds)}, I/O: {format_bytes(io_bytes)}'
+                 + (f' (stats captured {self.captured_at})' if self.captured_at else '')]
+        ranked = sorted(range(len(costs)), key=lambda i: costs[i].lock_seconds, reverse=True)
+        for i in ranked[:top]:
+            if costs[i].lock_seconds <= 0:
+                break
+            change = changes[i]
+            lines.append(f'[{costs[i].level}] {change.change_type} on {change.table_name}: {costs[i].describe()}')
+        return lines
+
+    def _scan_seconds(self, stats: TableStats) -> float:
+        return stats.table_bytes / self.scan_bytes_per_second
+
+    def _rewrite(self, stats: TableStats, note: str) -> OperationCost:
+        """A full table rewrite plus rebuild of every index"""
+        seconds = (stats.table_bytes / self.rewrite_bytes_per_second
+                   + stats.index_bytes / self.index_build_bytes_per_second)
+        return OperationCost(ACCESS_EXCLUSIVE, seconds, 2 * stats.table_bytes + stats.index_bytes, stats.rows,
+                             rewrite=True, notes=[note])
+
+    def _scan(self, stats: TableStats, lock: str, note: str) -> OperationCost:
+        return OperationCost(lock, self._scan_seconds(stats), stats.table_bytes, stats.rows, scan=True, notes=[note])
+
+    def _estimate_add_table(self, change, stats: TableStats) -> OperationCost:
+        return OperationCost(ACCESS_EXCLUSIVE, notes=['new table'])
+
+    def _estimate_drop_table(self, change, stats: TableStats) -> OperationCost:
+        cost = OperationCost(ACCESS_EXCLUSIVE, rows=stats.rows)
+        cost.notes.append(f'discards {stats.rows:,} rows, frees {format_bytes(stats.table_bytes + stats.index_bytes)}')
+        return cost
+
+    def _estimate_drop_column(self, change, stats: TableStats) -> OperationCost:
+        return OperationCost(ACCESS_EXCLUSIVE, rows=stats.rows, notes=[f'hides data in {stats.rows:,} rows'])
+
+    def _estimate_archive_table(self, change, stats: TableStats) -> OperationCost:
+        return OperationCost(ACCESS_EXCLUSIVE, notes=[f'catalog-only rename, keeps {stats.rows:,} rows until purged'])
+
+    def _estimate_archive_column(self, change, stats: TableStats) -> OperationCost:
+        return OperationCost(ACCESS_EXCLUSIVE, notes=['catalog-only rename, data kept until purged'])
+
+    def _estimate_add_column(self, change, stats: TableStats) -> OperationCost:
+        definition = change.details['definition']
+        if definition['default'] and is_volatile_default(definition['default']):
+            cost = self._rewrite(stats, 'volatile default')
+        else:
+            cost = OperationCost(ACCESS_EXCLUSIVE)
+        if definition.get('references'):
+            cost.lock_seconds += self._scan_seconds(stats)
+            cost.io_bytes += stats.table_bytes
+            cost.rows = stats.rows
+            cost.scan = True
+            cost.notes.append(f'foreign key check holds {SHARE_ROW_EXCLUSIVE} on {definition["references"]}')
+        return cost
+
+    def _estimate_modify_column(self, change, stats: TableStats) -> OperationCost:
+        old, new = change.details['old_def'], change.details['new_def']
+        change_class = classify_column_change(old, new)
+        if change_class == REWRITE:
+            return self._rewrite(stats, f'{old["type"]} -> {new["type"]}')
+        if change_class == VALIDATION_SCAN:
+            return self._scan(stats, ACCESS_EXCLUSIVE, f'{", ".join(validation_reasons(old, new))} scan')
+        return OperationCost(ACCESS_EXCLUSIVE)
+
+    def _estimate_add_index(self, change, stats: TableStats) -> OperationCost:
+        seconds = self._scan_seconds(stats) + stats.table_bytes / self.index_build_bytes_per_second
+        return OperationCost('SHARE', seconds, stats.table_bytes, stats.rows, scan=True, notes=['blocks writes'])
+
+    def _estimate_drop_index(self, change, stats: TableStats) -> OperationCost:
+        return OperationCost(ACCESS_EXCLUSIVE)
+
+    def _estimate_rename_table(self, change, stats: TableStats) -> OperationCost:
+        return OperationCost(ACCESS_EXCLUSIVE)
+
+    def _estimate_rename_column(self, change, stats: TableStats) -> OperationCost:
+        return OperationCost(ACCESS_EXCLUSIVE)
+
+def requires_rewrite(old_type: str, new_type: str) -> bool:
+    """Whether ALTER COLUMN ... TYPE rewrites the table (see type_system.classify_type_change)"""
+    return classify_type_change(old_type, new_type) == REWRITE
+
+def load_table_stats(path: str) -> Tuple[Dict[str, TableStats], Optional[str]]:
+    """Load a statistics snapshot ({'captured_at', 'tables': [...]} or a bare table list)"""
+    with open(path) as f:
+        data = json.load(f)
+
+    if isinstance(data, dict):
+        captured_at, rows = data.get('captured_at'), data.get('tables') or []
+    else:
+        captured_at, rows = None, data
+
+    stats = {}
+    for row in rows:
+        name = row['table']
+        stats[name] = TableStats(
+            name=name,
+            rows=int(row.get('rows', 0)),
+            table_bytes=int(row.get('table_bytes', 0)),
+            index_bytes=int(row.get('index_bytes', 0))
+        )
+    return stats, captured_at
+
+def format_bytes(size: float) -> str:
+    for unit in ('B', 'KiB', 'MiB', 'GiB'):
+        if size < 1024:
+            return f'{size:.0f} {unit}' if unit == 'B' else f'{size:.1f} {unit}'
+        size /= 1024
+    return f'{size:.1f} TiB'
+
+def format_seconds(seconds: float) -> str:
+    if seconds < 1:
+        return f'{seconds * 1000:.0f}ms'
+    if seconds < 120:
+        return f'{seconds:.1f}s'
+    return f'{seconds / 60:.1f}min'
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ['--export-query']:
+        print("Usage: cost_estimator.py --export-query")
+        print("  Prints the SQL that exports a statistics snapshot: psql -Atc \"$(./cost_estimator.py --export-query)\" > stats.json")
+        sys.exit(1)
+    print(STATS_EXPORT_SQL)
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+OncoVista DDL Lexer
+Single-pass statement splitter for PostgreSQL schema files
+"""
+
+import re
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+# Tokens that can change lexer state outside of literals and comments
+_SIGNIFICANT = re.compile(r"""'|"|--|/\*|\$(?:[A-Za-z_][A-Za-z_0-9]*)?\$|;""")
+_BLOCK_COMMENT = re.compile(r'/\*|\*/')
+_ESCAPE_STRING_END = re.compile(r"\\.|'", re.DOTALL)
+_COPY_FROM_STDIN = re.compile(r'COPY\b.*\bFROM\s+STDIN\b', re.IGNORECASE | re.DOTALL)
+_COPY_DATA_END = re.compile(r'^\\\.\r?$', re.MULTILINE)
+
+# Characters of statement text needed before a keep() filter is consulted
+HEAD_SIZE = 64
+
+# Tokens that matter when splitting a statement body at the top level
+_NESTING = re.compile(r"""'[^']*'|"[^"]*"|[()\[\],]""")
+_NESTING_WORDS = re.compile(r"""'[^']*'|"[^"]*"|[()\[\]]|\s+""")
+
+IDENTIFIER = r'(?:"[^"]+"|[A-Za-z_][\w$]*)(?:\s*\.\s*(?:"[^"]+"|[A-Za-z_][\w$]*))*'
+
+class StatementSplitter:
+    """Incrementally splits SQL text into top-level statements.
+
+    Handles single-quoted literals (including E'' escapes), quoted
+    identifiers, line and nested block comments and dollar-quoted bodies.
+    Comments are replaced by a single space in the emitted statements.
+    The data block following COPY ... FROM stdin is skipped up to its
+    terminating \\. line. Text may be fed in arbitrary chunks as long as no
+    token or COPY terminator straddles two chunks; feeding whole lines is
+    always safe.
+
+    When keep is given it is called with the first HEAD_SIZE characters of
+    each statement; statements it rejects stop being buffered, so memory
+    stays bounded by the largest kept statement.
+    """
+
+    def __init__(self, keep: Optional[Callable[[str], bool]] = None):
+        self._parts: List[str] = []
+        self._state: Optional[str] = None  # None, "'", '"', '--', '/*', 'COPY' or a dollar tag
+        self._escape = False
+        self._comment_depth = 0
+        self._keep = keep
+        self._size = 0
+        self._checked = keep is None
+        self._discarding = False
+
+    def feed(self, chunk: str) -> List[str]:
+        """Consume a chunk of SQL and return the statements it completed"""
+        statements = []
+        pos = 0
+        end = len(chunk)
+
+        while pos < end:
+            state = self._state
+
+            if state is None:
+                match = _SIGNIFICANT.search(chunk, pos)
+                if not match:
+                    self._append(chunk[pos:])
+                    break
+
+                token = match.group(0)
+                start = match.start()
+                if token == ';':
+                    self._append(chunk[pos:start])
+                    self._emit(statements)
+                elif token == '--':
+                    self._append(chunk[pos:start])
+                    self._append(' ')
+                    self._state = '--'
+                elif token == '/*':
+                    self._append(chunk[pos:start])
+                    self._append(' ')
+                    self._state = '/*'
+                    self._comment_depth = 1
+                else:
+                    if token == "'":
+                        self._escape = self._is_escape_string(chunk, start)
+                    self._append(chunk[pos:match.end()])
+                    self._state = token
+                pos = match.end()
+
+            elif state == 'COPY':
+                match = _COPY_DATA_END.search(chunk, pos)
+                if not match:
+                    break
+                self._state = None
+                pos = match.end()
+
+            elif state == '--':
+                newline = chunk.find('\n', pos)
+                if newline < 0:
+                    break
+                self._state = None
+                pos = newline
+
+            elif state == '/*':
+                match = _BLOCK_COMMENT.search(chunk, pos)
+                if not match:
+                    break
+                self._comment_depth += 1 if match.group(0) == '/*' else -1
+                if self._comment_depth == 0:
+                    self._state = None
+                pos = match.end()
+
+            else:
+                if state == "'" and self._escape:
+                    match = _ESCAPE_STRING_END.search(chunk, pos)
+                    while match and match.group(0) != "'":
+                        match = _ESCAPE_STRING_END.search(chunk, match.end())
+                    close = match.end() if match else -1
+                else:
+                    close = chunk.find(state, pos)
+                    if close >= 0:
+                        close += len(state)
+
+                if close < 0:
+                    self._append(chunk[pos:])
+                    break
+                # A doubled quote simply re-enters the literal on the next token
+                self._append(chunk[pos:close])
+                self._state = None
+                pos = close
+
+        return statements
+
+    def close(self) -> List[str]:
+        """Flush a trailing statement that has no terminating semicolon"""
+        statements = []
+        self._emit(statements)
+        self._state = None
+        return statements
+
+    def _append(self, text: str):
+        """Buffer statement text unless the current statement is being discarded"""
+        if self._discarding:
+            return
+        if not self._parts:
+            text = text.lstrip()
+            if not text:
+                return
+        self._parts.append(text)
+
+        if not self._checked:
+            self._size += len(text)
+            if self._size >= HEAD_SIZE:
+                self._check_head(''.join(self._parts))
+
+    def _check_head(self, text: str):
+        """Decide from the statement head whether to keep buffering it"""
+        self._checked = True
+        if not (text[:4].upper() == 'COPY' or self._keep(text[:HEAD_SIZE])):
+            self._discarding = True
+            self._parts.clear()
+
+    def _emit(self, statements: List[str]):
+        """Append the buffered statement if it has any content"""
+        text = ''.join(self._parts).strip()
+        if text and not self._checked:
+            self._check_head(text)
+        if text and not self._discarding:
+            statements.append(text)
+            if _COPY_FROM_STDIN.match(text):
+                self._state = 'COPY'
+
+        self._parts.clear()
+        self._size = 0
+        self._checked = self._keep is None
+        self._discarding = False
+
+    @staticmethod
+    def _is_escape_string(chunk: str, quote_pos: int) -> bool:
+        """Check whether the quote at quote_pos opens an E'' literal"""
+        if quote_pos == 0 or chunk[quote_pos - 1] not in 'eE':
+            return False
+        return quote_pos == 1 or not (chunk[quote_pos - 2].isalnum() or chunk[quote_pos - 2] == '_')
+
+def iter_statements(lines: Iterable[str], keep: Optional[Callable[[str], bool]] = None) -> Iterator[str]:
+    """Yield the top-level statements found in a sequence of lines"""
+    splitter = StatementSplitter(keep)
+    for line in lines:
+        yield from splitter.feed(line)
+    yield from splitter.close()
+
+def split_statements(content: str, keep: Optional[Callable[[str], bool]] = None) -> Iterator[str]:
+    """Yield the top-level statements of an in-memory SQL script in order"""
+    return iter_statements(content.splitlines(keepends=True), keep)
+
+def stream_statements(path: str, keep: Optional[Callable[[str], bool]] = None,
+                      buffer_size: int = 1 << 20) -> Iterator[str]:
+    """Yield the top-level statements of a SQL file without reading it whole.
+
+    Peak memory is bounded by the read buffer, the longest line and the
+    largest statement accepted by keep, independent of the file size.
+    """
+    with open(path, 'r', encoding='utf-8', errors='replace', buffering=buffer_size) as f:
+        yield from iter_statements(f, keep)
+
+def split_top_level(text: str, separator: str = ',') -> List[str]:
+    """Split text on separators that are outside parentheses, brackets and quotes"""
+    pattern = _NESTING if separator == ',' else _NESTING_WORDS
+    items = []
+    depth = 0
+    start = 0
+
+    for match in pattern.finditer(text):
+        token = match.group(0)
+        if token in '([':
+            depth += 1
+        elif token in ')]':
+            depth -= 1
+        elif depth == 0 and (token == ',' if separator == ',' else token.isspace()):
+            items.append(text[start:match.start()].strip())
+            start = match.end()
+
+    items.append(text[start:].strip())
+    return [item for item in items if item]
+
+def split_words(text: str) -> List[str]:
+    """Split text on whitespace that is outside parentheses and quotes"""
+    if '(' not in text and "'" not in text and '"' not in text:
+        return text.split()
+    return split_top_level(text, separator=' ')
+
+def read_parenthesized(text: str, open_pos: int) -> Tuple[str, int]:
+    """Return the contents of the parenthesis group opening at open_pos and the index after it"""
+    depth = 0
+    for match in _NESTING.finditer(text, open_pos):
+        token = match.group(0)
+        if token == '(':
+            depth += 1
+        elif token == ')':
+            depth -= 1
+            if depth == 0:
+                return text[open_pos + 1:match.start()], match.end()
+    return text[open_pos + 1:], len(text)
+
+def unquote_identifier(name: str) -> str:
+    """Strip identifier quoting and whitespace around qualification dots"""
+    return '.'.join(part.strip().strip('"') for part in re.split(r'\.(?=(?:[^"]*"[^"]*")*[^"]*$)', name))
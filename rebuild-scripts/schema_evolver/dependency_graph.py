@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+OncoVista Dependency Graph
+Topological ordering, cycle detection and parallel batching of schema operations
+"""
+
+import heapq
+from typing import Any, Callable, Dict, Hashable, List, Optional, Set
+
+class DependencyCycleError(ValueError):
+    """Raised when operations depend on each other in a cycle"""
+
+    def __init__(self, cycle: List[Hashable]):
+        self.cycle = cycle
+        super().__init__('Dependency cycle: ' + ' -> '.join(str(node) for node in cycle))
+
+class DependencyGraph:
+    """Directed graph where an edge (before, after) means before must run first.
+
+    Nodes keep their insertion order, which together with an optional
+    priority key makes every ordering deterministic. Sorting uses Kahn's
+    algorithm with a heap and cycle detection an iterative DFS, so both run
+    in O((V + E) log V) without recursion limits on graphs of thousands of
+    nodes.
+    """
+
+    def __init__(self):
+        self._successors: Dict[Hashable, Set[Hashable]] = {}
+        self._indegree: Dict[Hashable, int] = {}
+        self._position: Dict[Hashable, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._successors)
+
+    def __contains__(self, node: Hashable) -> bool:
+        return node in self._successors
+
+    def add_node(self, node: Hashable):
+        """Add a node if it is not already present"""
+        if node not in self._successors:
+            self._position[node] = len(self._position)
+            self._successors[node] = set()
+            self._indegree[node] = 0
+
+    def add_edge(self, before: Hashable, after: Hashable):
+        """Require before to run ahead of after; self-edges are ignored"""
+        if before == after:
+            return
+        self.add_node(before)
+        self.add_node(after)
+        if after not in self._successors[before]:
+            self._successors[before].add(after)
+            self._indegree[after] += 1
+
+    def successors(self, node: Hashable) -> Set[Hashable]:
+        return self._successors[node]
+
+    def edge_count(self) -> int:
+        return sum(len(successors) for successors in self._successors.values())
+
+    def topological_order(self, priority: Optional[Callable[[Hashable], Any]] = None) -> List[Hashable]:
+        """Return every node after its predecessors, preferring lower priority among ready nodes"""
+        key = priority or (lambda node: 0)
+        indegree = dict(self._indegree)
+        ready = [(key(node), self._position[node], node) for node, degree in indegree.items() if degree == 0]
+        heapq.heapify(ready)
+        order = []
+
+        while ready:
+            _, _, node = heapq.heappop(ready)
+            order.append(node)
+            for successor in self._successors[node]:
+                indegree[successor] -= 1
+                if indegree[successor] == 0:
+                    heapq.heappush(ready, (key(successor), self._position[successor], successor))
+
+        if len(order) < len(self._successors):
+            raise DependencyCycleError(self.find_cycle() or [])
+        return order
+
+    def batches(self, priority: Optional[Callable[[Hashable], Any]] = None) -> List[List[Hashable]]:
+        """Group nodes into levels; nodes in one level do not depend on each other"""
+        order = self.topological_order(priority)
+        level: Dict[Hashable, int] = {}
+        for node in order:
+            depth = level.setdefault(node, 0)
+            for successor in self._successors[node]:
+                if level.get(successor, 0) <= depth:
+                    level[successor] = depth + 1
+
+        batches: List[List[Hashable]] = [[] for _ in range(max(level.values(), default=-1) + 1)]
+        for node in order:
+            batches[level[node]].append(node)
+        return batches
+
+    def find_cycle(self) -> Optional[List[Hashable]]:
+        """Return one cycle as a node list whose first and last entries match, or None"""
+        WHITE, GREY, BLACK = 0, 1, 2
+        color = dict.fromkeys(self._successors, WHITE)
+
+        for root in self._successors:
+            if color[root] != WHITE:
+                continue
+            color[root] = GREY
+            path = [root]
+            stack = [iter(sorted(self._successors[root], key=self._position.__getitem__))]
+            while stack:
+                successor = next(stack[-1], None)
+                if successor is None:
+                    color[path.pop()] = BLACK
+                    stack.pop()
+                elif color[successor] == GREY:
+                    return path[path.index(successor):] + [successor]
+                elif color[successor] == WHITE:
+                    color[successor] = GREY
+                    path.append(successor)
+                    stack.append(iter(sorted(self._successors[successor], key=self._position.__getitem__)))
+        return None
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+OncoVista Schema DNA Cache
+Content-addressed on-disk cache of parsed schema DNA
+"""
+
+import hashlib
+import hmac
+import os
+import pickle
+import secrets
+import stat
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'oncovista', 'schema_dna')
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_MAX_AGE_SECONDS = 30 * 24 * 3600
+
+# Bumping the format version invalidates every signed entry written before it
+SIGNED_FORMAT_VERSION = b'oncovista-signed-pickle-1'
+SIGNING_KEY_FILE = '.signing_key'
+SIGNING_KEY_BYTES = 32
+
+def content_hash(path: str, parser_version: str) -> str:
+    """Hash a file's contents together with the parser version, reading in blocks"""
+    digest = hashlib.sha256(parser_version.encode())
+    digest.update(b'\0')
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _owned_privately(st: os.stat_result) -> bool:
+    """True when a file belongs to the current user and nobody else can write it"""
+    getuid = getattr(os, 'getuid', None)
+    if getuid is not None and st.st_uid != getuid():
+        return False
+    return not st.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+
+def signing_key(directory: Path, create: bool = False) -> Optional[bytes]:
+    """Return the per-directory HMAC key, or None if it is missing or not trustworthy.
+
+    The key file is created with mode 0600 on first use. It is only accepted
+    when both it and its directory belong to the current user and are not
+    writable by group or others, so a shared directory cannot hand us a key.
+    """
+    directory = Path(directory)
+    path = directory / SIGNING_KEY_FILE
+    if create:
+        directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_NOFOLLOW', 0), 0o600)
+        except FileExistsError:
+            pass
+        else:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(secrets.token_bytes(SIGNING_KEY_BYTES))
+
+    try:
+        if not _owned_privately(directory.stat()):
+            return None
+        fd = os.open(path, os.O_RDONLY | getattr(os, 'O_NOFOLLOW', 0))
+    except OSError:
+        return None
+    with os.fdopen(fd, 'rb') as f:
+        if not stat.S_ISREG(os.fstat(f.fileno()).st_mode) or not _owned_privately(os.fstat(f.fileno())):
+            return None
+        key = f.read(SIGNING_KEY_BYTES + 1)
+    return key if len(key) == SIGNING_KEY_BYTES else None
+
+def _signature(key: bytes, name: str, payload: bytes) -> bytes:
+    """HMAC over the format version, the entry name and the payload"""
+    return hmac.new(key, b'\0'.join((SIGNED_FORMAT_VERSION, name.encode(), payload)), hashlib.sha256).digest()
+
+def dump_signed(obj: Any, key: bytes, name: str) -> bytes:
+    """Pickle obj and prefix it with a signature bound to name"""
+    payload = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+    return _signature(key, name, payload) + payload
+
+def load_signed(data: bytes, key: bytes, name: str) -> Any:
+    """Unpickle data written by dump_signed, refusing anything whose signature does not match"""
+    size = hashlib.sha256().digest_size
+    signature, payload = data[:size], data[size:]
+    if not hmac.compare_digest(signature, _signature(key, name, payload)):
+        raise ValueError(f'Bad signature on {name}')
+    return pickle.loads(payload)
+
+class SchemaDNACache:
+    """Stores parsed schema DNA keyed by file content hash and parser version.
+
+    Entries are pickled with the highest protocol, which loads an order of
+    magnitude faster than re-parsing. Each entry is signed with an HMAC key
+    private to the cache directory and is only unpickled once the signature
+    checks out, so a file planted in a shared or world-writable cache is
+    never executed. A hit refreshes the entry's mtime, and eviction drops
+    entries older than max_age_seconds first and then the least recently
+    used ones until the cache fits in max_bytes. Any failure to read, verify
+    or unpickle an entry is treated as a miss so a read-only or full disk or
+    a corrupt file never breaks a diff.
+    """
+
+    SUFFIX = '.dna.pickle'
+
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: int = DEFAULT_MAX_BYTES,
+                 max_age_seconds: float = DEFAULT_MAX_AGE_SECONDS):
+        self.cache_dir = Path(cache_dir or os.environ.get('ONCOVISTA_SCHEMA_CACHE', DEFAULT_CACHE_DIR))
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.hits = 0
+        self.misses = 0
+
+    def key_for(self, schema_file: str, parser_version: str) -> str:
+        """Hash the schema file contents together with the parser version"""
+        return content_hash(schema_file, parser_version)
+
+    def load(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return cached schema DNA for key, or None on a miss"""
+        path = self._path(key)
+        try:
+            signing = signing_key(self.cache_dir)
+            if signing is None:
+                raise ValueError(f'No trusted signing key in {self.cache_dir}')
+            with open(path, 'rb') as f:
+                dna = load_signed(f.read(), signing, key)
+            os.utime(path)
+        except Exception:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return dna
+
+    def store(self, key: str, dna: Dict[str, Any]):
+        """Write schema DNA for key atomically, then enforce eviction limits"""
+        path = self._path(key)
+        tmp_path = path.with_suffix(f'.{os.getpid()}.tmp')
+        try:
+            signing = signing_key(self.cache_dir, create=True)
+            if signing is None:
+                return
+            with open(tmp_path, 'wb') as f:
+                f.write(dump_signed(dna, signing, key))
+            os.replace(tmp_path, path)
+        except OSError:
+            tmp_path.unlink(missing_ok=True)
+            return
+
+        self.evict()
+
+    def evict(self) -> int:
+        """Drop expired entries, then least recently used ones over the size budget"""
+        entries = []
+        now = time.time()
+        removed = 0
+
+        for path in self._entries():
+            try:
+                info = path.stat()
+            except OSError:
+                continue
+            if now - info.st_mtime > self.max_age_seconds:
+                removed += self._remove(path)
+            else:
+                entries.append((info.st_mtime, info.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+            if total <= self.max_bytes:
+                break
+            removed += self._remove(path)
+            total -= size
+
+        return removed
+
+    def clear(self) -> int:
+        """Remove every cached entry and return how many were deleted"""
+        return sum(self._remove(path) for path in self._entries())
+
+    def _entries(self):
+        """List cache entry files"""
+        if not self.cache_dir.is_dir():
+            return []
+        return list(self.cache_dir.glob(f'*{self.SUFFIX}'))
+
+    def _path(self, key: str) -> Path:
+        """Map a cache key to its entry file"""
+        return self.cache_dir / f'{key}{self.SUFFIX}'
+
+    @staticmethod
+    def _remove(path: Path) -> int:
+        """Delete an entry file, tolerating concurrent removal"""
+        try:
+            path.unlink()
+        except OSError:
+            return 0
+        return 1
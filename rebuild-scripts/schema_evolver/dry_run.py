@@ -0,0 +1,661 @@
+#!/usr/bin/env python3
+"""
+OncoVista Migration Dry Run
+Times a migration and its rollback statement by statement against a seeded throwaway database
+"""
+
+import argparse
+import json
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from catalog_introspection import IntrospectionError, parse_connection_string
+from ddl_lexer import IDENTIFIER, split_statements, stream_statements, unquote_identifier
+from dependency_graph import DependencyCycleError, DependencyGraph
+from migration_generator import MigrationSurgeon
+from schema_model import SchemaModel, Table
+
+try:
+    import psycopg2
+except ImportError:
+    psycopg2 = None
+
+DEFAULT_ROWS = 10000
+DEFAULT_SERVER = 'postgresql://localhost/postgres'
+DEFAULT_POLL_INTERVAL = 0.01
+DEFAULT_TOLERANCE = 0.25
+# Statements or lock holds faster than this on both runs are noise, not regressions
+MIN_COMPARABLE_SECONDS = 0.005
+SCRATCH_DATABASE_PREFIX = 'oncovista_dry_run'
+REPORT_VERSION = 1
+
+TRANSACTION_START = {'BEGIN', 'START'}
+TRANSACTION_END = {'COMMIT', 'END', 'ROLLBACK', 'ABORT'}
+# Weakest to strongest, as pg_locks names them
+LOCK_MODES = [
+    'AccessShareLock', 'RowShareLock', 'RowExclusiveLock', 'ShareUpdateExclusiveLock', 'ShareLock',
+    'ShareRowExclusiveLock', 'ExclusiveLock', 'AccessExclusiveLock'
+]
+
+BACKEND_PID_SQL = 'SELECT pg_backend_pid()'
+# Relation locks the session holds right now, outside the system catalogs the query itself touches
+HELD_LOCKS_SQL = """SELECT n.nspname || '.' || c.relname AS relation, l.mode
+FROM pg_locks l
+JOIN pg_class c ON c.oid = l.relation
+JOIN pg_namespace n ON n.oid = c.relnamespace
+WHERE l.pid = pg_backend_pid() AND l.locktype = 'relation' AND l.granted
+  AND n.nspname NOT IN ('pg_catalog', 'information_schema', 'pg_toast')
+ORDER BY 1, 2"""
+WAIT_EVENT_SQL = 'SELECT wait_event_type FROM pg_stat_activity WHERE pid = %s'
+
+SERIAL_TYPES = {'SMALLSERIAL': 'SMALLINT', 'SERIAL': 'INTEGER', 'BIGSERIAL': 'BIGINT'}
+TYPE_PATTERN = re.compile(r'^([a-z ]+?)\s*(?:\(\s*(\d+)\s*(?:,\s*(\d+)\s*)?\))?(?:\s+(with(?:out)? time zone))?$')
+TABLE_FOREIGN_KEY_PATTERN = re.compile(
+    rf'FOREIGN\s+KEY\s*\(([^)]*)\)\s*REFERENCES\s+({IDENTIFIER})', re.IGNORECASE
+)
+
+class DryRunError(RuntimeError):
+    """Raised when the scratch database cannot be prepared"""
+
+@dataclass
+class StatementTiming:
+    """One executed statement: wall time, time spent waiting for locks and locks it took"""
+    index: int
+    sql: str
+    seconds: float
+    lock_wait_seconds: float = 0.0
+    locks: List[Dict[str, str]] = field(default_factory=list)
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'index': self.index,
+            'sql': self.sql,
+            'seconds': self.seconds,
+            'lock_wait_seconds': self.lock_wait_seconds,
+            'locks': self.locks,
+            'error': self.error
+        }
+
+@dataclass
+class SeedPlan:
+    """INSERT ... SELECT statements in foreign key order, and tables left empty"""
+    statements: List[Tuple[str, str, int]] = field(default_factory=list)  # (table, sql, rows)
+    skipped: Dict[str, str] = field(default_factory=dict)
+
+def value_expression(column_type: str, g: str) -> Optional[str]:
+    """SQL producing a distinct, type-correct value for row number g, or None if the type is unsupported"""
+    spelled = ' '.join(column_type.lower().split())
+    if spelled.endswith('[]'):
+        return f'ARRAY[]::{spelled}'
+    match = TYPE_PATTERN.match(spelled)
+    if not match:
+        return None
+    base, size, scale, zone = match.groups()
+    base = SERIAL_TYPES.get(base.upper(), base.upper()).lower()
+
+    if base in ('smallint', 'int2'):
+        return f'({g} % 32767)::smallint'
+    if base in ('integer', 'int', 'int4'):
+        return f'{g}::integer'
+    if base in ('bigint', 'int8'):
+        return f'{g}::bigint'
+    if base in ('numeric', 'decimal'):
+        if size is None:
+            return f'({g} * 1.5)::numeric'
+        whole = int(size) - int(scale or 0)
+        return f'({g} % {10 ** min(whole, 9)})::{spelled}' if whole > 0 else f'0::{spelled}'
+    if base in ('real', 'float4', 'double precision', 'float8', 'float'):
+        return f'({g} * 1.5)::{base}'
+    if base in ('varchar', 'character varying', 'char', 'character', 'bpchar'):
+        # Row number first, so values stay unique whenever the width can hold it
+        value = f"{g}::text || '-' || md5({g}::text)"
+        return f'left({value}, {size})' if size else value
+    if base in ('text', 'citext'):
+        return f"'row ' || {g} || ' ' || md5({g}::text)"
+    if base in ('boolean', 'bool'):
+        return f'{g} % 2 = 0'
+    if base == 'date':
+        return f'current_date - ({g} % 3650)::integer'
+    if base in ('timestamp', 'timestamptz'):
+        return f"now() - {g} * interval '1 second'"
+    if base in ('time', 'timetz'):
+        return f"time '00:00' + ({g} % 86400) * interval '1 second'"
+    if base == 'interval':
+        return f"{g} * interval '1 second'"
+    if base == 'uuid':
+        return f'md5({g}::text)::uuid'
+    if base in ('json', 'jsonb'):
+        return f"jsonb_build_object('row', {g})::{base}"
+    if base == 'bytea':
+        return f"decode(md5({g}::text), 'hex')"
+    return None
+
+def plan_seed(model: SchemaModel, rows: int = DEFAULT_ROWS,
+              table_rows: Optional[Dict[str, int]] = None) -> SeedPlan:
+    """Plan synthetic rows for every table, parents before the tables that reference them.
+
+    Row g of every table is generated from g alone, so a foreign key can
+    point at parent row ((g - 1) % parent_rows) + 1 by generating that
+    row's key the same way. Columns with a default keep it unless they are
+    keys; nullable columns whose values cannot be generated (an unknown
+    type, a self-reference, a parent that is missing or filled later in a
+    cycle) stay NULL. A table with such a NOT NULL column is left empty.
+    """
+    table_rows = table_rows or {}
+    tables = model.tables
+    graph = DependencyGraph()
+    for name, table in tables.items():
+        graph.add_node(name)
+        for target in table.referenced_tables():
+            parent = _resolve_table(target, tables)
+            if parent is not None and parent != name:
+                graph.add_edge(parent, name)
+    try:
+        order = graph.topological_order(priority=lambda name: name)
+    except DependencyCycleError:
+        order = sorted(tables)
+
+    plan = SeedPlan()
+    filled: Dict[str, int] = {}
+    for name in order:
+        count = table_rows.get(name, table_rows.get(name.rsplit('.', 1)[-1], rows))
+        if count <= 0:
+            plan.skipped[name] = 'no rows requested'
+            continue
+        try:
+            columns = _seed_columns(tables[name], tables, filled)
+        except ValueError as e:
+            plan.skipped[name] = str(e)
+            continue
+        targets = ', '.join(column for column, _ in columns)
+        values = ', '.join(expression for _, expression in columns)
+        target_list = f' ({targets})' if targets else ''
+        plan.statements.append(
+            (name, f'INSERT INTO {name}{target_list} SELECT {values} FROM generate_series(1, {count}) AS g', count)
+        )
+        filled[name] = count
+    return plan
+
+def _seed_columns(table: Table, tables: Dict[str, Table], filled: Dict[str, int]) -> List[Tuple[str, str]]:
+    """Column names and value expressions for one table's INSERT"""
+    foreign_keys = {name: column.references for name, column in table.columns.items() if column.references}
+    for constraint in table.constraints:
+        match = TABLE_FOREIGN_KEY_PATTERN.search(constraint.definition)
+        if match:
+            local = [unquote_identifier(name.strip()) for name in match.group(1).split(',')]
+            for name in local:
+                # Composite keys cannot be generated row by row from a single parent key
+                foreign_keys[name] = unquote_identifier(match.group(2)) if len(local) == 1 else None
+
+    keys = set(table.primary_key())
+    columns = []
+    for name, column in table.columns.items():
+        is_key = name in keys or 'UNIQUE' in column.constraints or 'PRIMARY KEY' in column.constraints
+        if name in foreign_keys:
+            expression = _foreign_key_expression(foreign_keys[name], table.name, tables, filled)
+        elif column.default is not None and not is_key:
+            continue
+        else:
+            expression = value_expression(column.type, 'g')
+        if expression is None:
+            if column.nullable or column.default is not None:
+                continue
+            raise ValueError(f'cannot generate NOT NULL column {name} ({column.type})')
+        columns.append((name, expression))
+    return columns
+
+def _foreign_key_expression(target: Optional[str], table_name: str, tables: Dict[str, Table],
+                            filled: Dict[str, int]) -> Optional[str]:
+    """The parent key of a row already seeded, or None if there is no such row"""
+    parent = _resolve_table(target, tables) if target else None
+    if parent is None or parent == table_name or parent not in filled:
+        return None
+    key = tables[parent].primary_key()
+    if len(key) != 1:
+        return None
+    return value_expression(tables[parent].columns[key[0]].type, f'((g - 1) % {filled[parent]} + 1)')
+
+def _resolve_table(name: str, tables: Dict[str, Table]) -> Optional[str]:
+    """Match a reference with or without its public schema prefix"""
+    for candidate in (name, f'public.{name}', name[len('public.'):] if name.startswith('public.') else None):
+        if candidate in tables:
+            return candidate
+    return None
+
+def _leading_word(sql: str) -> str:
+    words = sql.split(None, 2)
+    return words[0].upper().rstrip(';') if words else ''
+
+def _ends_transaction(sql: str) -> bool:
+    words = sql.upper().split()
+    # ROLLBACK TO SAVEPOINT keeps the transaction open
+    return bool(words) and words[0].rstrip(';') in TRANSACTION_END and 'TO' not in words[1:2]
+
+def strongest_lock(modes: Iterable[str]) -> Optional[str]:
+    """The most restrictive of the given pg_locks modes"""
+    ranked = [mode for mode in modes if mode in LOCK_MODES]
+    return max(ranked, key=LOCK_MODES.index) if ranked else None
+
+class LockWaitMonitor:
+    """Samples the dry-run session's wait event from a second connection.
+
+    Time between two samples that both see the session waiting on a
+    heavyweight lock is counted as lock wait; a statement's share is the
+    difference of the running total before and after it.
+    """
+
+    def __init__(self, connection, pid: int, interval: float = DEFAULT_POLL_INTERVAL):
+        self.connection = connection
+        self.pid = pid
+        self.interval = interval
+        self._total = 0.0
+        self._guard = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='dry-run-lock-monitor', daemon=True)
+
+    @property
+    def lock_wait_seconds(self) -> float:
+        with self._guard:
+            return self._total
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        cursor = self.connection.cursor()
+        waiting_since = None
+        try:
+            while not self._stop.is_set():
+                cursor.execute(WAIT_EVENT_SQL, (self.pid,))
+                row = cursor.fetchone()
+                now = time.perf_counter()
+                if row and row[0] == 'Lock':
+                    if waiting_since is not None:
+                        with self._guard:
+                            self._total += now - waiting_since
+                    waiting_since = now
+                else:
+                    waiting_since = None
+                self._stop.wait(self.interval)
+        finally:
+            cursor.close()
+
+class DryRunHarness:
+    """Loads a schema, seeds it and runs migration scripts one statement at a time.
+
+    The connection must be in autocommit mode, so each script's own
+    BEGIN/COMMIT decide the transactions. Inside a transaction, relation
+    locks are read from pg_locks after every statement (untimed), and a
+    lock is held from the start of the statement that first shows it
+    until the COMMIT or ROLLBACK; statements outside a transaction report
+    only their duration. A failing statement aborts the script (rolling
+    back an open transaction), since everything after it would fail too.
+    """
+
+    def __init__(self, connection, monitor: Optional[LockWaitMonitor] = None):
+        self.connection = connection
+        self.monitor = monitor
+
+    def load_schema(self, statements: Iterable[str]) -> Dict[str, Any]:
+        """Create the old schema; statements the scratch database rejects are reported and skipped"""
+        started = time.perf_counter()
+        count, errors = 0, []
+        for sql in statements:
+            count += 1
+            error = self._execute(sql)[1]
+            if error:
+                errors.append({'sql': sql, 'error': error})
+        return {'statements': count, 'seconds': time.perf_counter() - started, 'errors': errors}
+
+    def seed(self, plan: SeedPlan) -> Dict[str, Any]:
+        """Insert the planned synthetic rows, then ANALYZE so the planner sees them"""
+        started = time.perf_counter()
+        tables, errors = {}, []
+        for table, sql, rows in plan.statements:
+            seconds, error = self._execute(sql)
+            if error:
+                errors.append({'table': table, 'error': error})
+            else:
+                tables[table] = {'rows': rows, 'seconds': seconds}
+        self._execute('ANALYZE')
+        return {
+            'tables': tables,
+            'rows': sum(entry['rows'] for entry in tables.values()),
+            'seconds': time.perf_counter() - started,
+            'skipped': dict(plan.skipped),
+            'errors': errors
+        }
+
+    def run_script(self, sql: str) -> Dict[str, Any]:
+        """Execute a script statement by statement, timing each and tracking lock holds"""
+        statements: List[StatementTiming] = []
+        holds: List[Dict[str, Any]] = []
+        held: Dict[Tuple[str, str], Tuple[float, int]] = {}
+        in_transaction = False
+        failed = False
+        started = time.perf_counter()
+
+        for index, statement in enumerate(split_statements(sql), 1):
+            waited = self.monitor.lock_wait_seconds if self.monitor else 0.0
+            began = time.perf_counter()
+            seconds, error = self._execute(statement)
+            timing = StatementTiming(index, statement, seconds, error=error)
+            if self.monitor:
+                timing.lock_wait_seconds = self.monitor.lock_wait_seconds - waited
+            statements.append(timing)
+
+            word = _leading_word(statement)
+            if error:
+                failed = True
+                if in_transaction:
+                    self._execute('ROLLBACK')
+                    holds.extend(self._release(held, time.perf_counter()))
+                break
+            if word in TRANSACTION_START:
+                in_transaction = True
+            elif _ends_transaction(statement):
+                in_transaction = False
+                holds.extend(self._release(held, began + seconds))
+            elif in_transaction:
+                for relation, mode in self._held_locks():
+                    if (relation, mode) not in held:
+                        held[(relation, mode)] = (began, index)
+                        timing.locks.append({'relation': relation, 'mode': mode})
+
+        if in_transaction and not failed:
+            # A script that never commits would leave the next phase inside its transaction
+            self._execute('ROLLBACK')
+            holds.extend(self._release(held, time.perf_counter()))
+
+        return {
+            'seconds': time.perf_counter() - started,
+            'lock_wait_seconds': sum(timing.lock_wait_seconds for timing in statements),
+            'failed': failed,
+            'statements': [timing.to_dict() for timing in statements],
+            'lock_holds': sorted(holds, key=lambda hold: (-hold['seconds'], hold['relation'], hold['mode']))
+        }
+
+    def run(self, old_statements: Iterable[str], model: SchemaModel, migration_sql: str, rollback_sql: str,
+            rows: int = DEFAULT_ROWS, table_rows: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+        """Load, seed, migrate and roll back, returning the full report"""
+        report = {
+            'version': REPORT_VERSION,
+            'generated': datetime.now().isoformat(),
+            'rows': rows,
+            'table_rows': dict(table_rows or {}),
+            'load': self.load_schema(old_statements),
+            'seed': self.seed(plan_seed(model, rows, table_rows)),
+            'phases': {}
+        }
+        report['phases']['migration'] = self.run_script(migration_sql)
+        if not report['phases']['migration']['failed']:
+            report['phases']['rollback'] = self.run_script(rollback_sql)
+        return report
+
+    def _execute(self, sql: str) -> Tuple[float, Optional[str]]:
+        """Run one statement; returns its wall time and the error message, if it failed"""
+        cursor = self.connection.cursor()
+        started = time.perf_counter()
+        try:
+            cursor.execute(sql)
+            error = None
+        except Exception as e:  # Whatever the driver raises, a rejected statement is a result to report
+            error = str(e).strip().splitlines()[0] if str(e).strip() else type(e).__name__
+        finally:
+            seconds = time.perf_counter() - started
+            cursor.close()
+        return seconds, error
+
+    def _held_locks(self) -> List[Tuple[str, str]]:
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(HELD_LOCKS_SQL)
+            return [(relation, mode) for relation, mode in cursor.fetchall()]
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def _release(held: Dict[Tuple[str, str], Tuple[float, int]], released: float) -> List[Dict[str, Any]]:
+        holds = [
+            {'relation': relation, 'mode': mode, 'seconds': released - acquired, 'acquired_by': index}
+            for (relation, mode), (acquired, index) in held.items()
+        ]
+        held.clear()
+        return holds
+
+def compare_reports(current: dict, baseline: dict, tolerance: float = DEFAULT_TOLERANCE) -> List[str]:
+    """List statements, phases and lock holds that got slower beyond tolerance, and new failures"""
+    if (current.get('rows'), current.get('table_rows')) != (baseline.get('rows'), baseline.get('table_rows')):
+        raise ValueError(f"reports were seeded differently ({baseline.get('rows')} vs {current.get('rows')} rows)")
+
+    def slower(now: float, before: float) -> bool:
+        return max(now, before) >= MIN_COMPARABLE_SECONDS and now > before * (1 + tolerance)
+
+    regressions = []
+    for phase, result in current['phases'].items():
+        previous = baseline.get('phases', {}).get(phase)
+        if previous is None:
+            continue
+        if slower(result['seconds'], previous['seconds']):
+            regressions.append(f"{phase}: {previous['seconds'] * 1000:.1f} ms -> {result['seconds'] * 1000:.1f} ms")
+        if result['failed'] and not previous['failed']:
+            failure = next(statement for statement in result['statements'] if statement['error'])
+            regressions.append(f"{phase}: statement {failure['index']} now fails: {failure['error']}")
+
+        earlier = _statements_by_key(previous['statements'])
+        for key, statement in _statements_by_key(result['statements']).items():
+            before = earlier.get(key)
+            if before is None:
+                continue
+            label = f"{phase} statement {statement['index']} ({_summary(statement['sql'])})"
+            if slower(statement['seconds'], before['seconds']):
+                regressions.append(f"{label}: {before['seconds'] * 1000:.1f} ms -> {statement['seconds'] * 1000:.1f} ms")
+            if slower(statement['lock_wait_seconds'], before['lock_wait_seconds']):
+                regressions.append(f"{label}: lock wait {before['lock_wait_seconds'] * 1000:.1f} ms -> "
+                                   f"{statement['lock_wait_seconds'] * 1000:.1f} ms")
+
+        held_before = _longest_holds(previous['lock_holds'])
+        for key, seconds in _longest_holds(result['lock_holds']).items():
+            if key in held_before and slower(seconds, held_before[key]):
+                regressions.append(f"{phase}: {key[1]} on {key[0]} held {held_before[key] * 1000:.1f} ms -> "
+                                   f"{seconds * 1000:.1f} ms")
+    return regressions
+
+def _statements_by_key(statements: List[Dict[str, Any]]) -> Dict[Tuple[str, int], Dict[str, Any]]:
+    """Statements keyed by text and occurrence, so edits elsewhere in the script do not shift them"""
+    keyed, seen = {}, {}
+    for statement in statements:
+        text = ' '.join(statement['sql'].split())
+        seen[text] = seen.get(text, 0) + 1
+        keyed[(text, seen[text])] = statement
+    return keyed
+
+def _longest_holds(holds: List[Dict[str, Any]]) -> Dict[Tuple[str, str], float]:
+    longest = {}
+    for hold in holds:
+        key = (hold['relation'], hold['mode'])
+        longest[key] = max(longest.get(key, 0.0), hold['seconds'])
+    return longest
+
+def _summary(sql: str, width: int = 60) -> str:
+    text = ' '.join(sql.split())
+    return text if len(text) <= width else text[:width - 3] + '...'
+
+@contextmanager
+def scratch_database(server: str, name: Optional[str] = None, keep: bool = False) -> Iterator[str]:
+    """Create an empty database next to server's and yield a DSN for it; dropped afterwards unless keep"""
+    if psycopg2 is None:
+        raise DryRunError('psycopg2 is required for dry runs: pip install psycopg2-binary')
+    dsn = parse_connection_string(server)['dsn']
+    name = name or f"{SCRATCH_DATABASE_PREFIX}_{datetime.now().strftime('%Y%m%d%H%M%S')}"
+    try:
+        admin = psycopg2.connect(dsn)
+    except psycopg2.Error as e:
+        raise DryRunError(f'cannot connect: {e}') from e
+    admin.autocommit = True
+    try:
+        with admin.cursor() as cursor:
+            cursor.execute(f'CREATE DATABASE "{name}"')
+        try:
+            yield name
+        finally:
+            if not keep:
+                with admin.cursor() as cursor:
+                    cursor.execute(f'DROP DATABASE IF EXISTS "{name}"')
+    except psycopg2.Error as e:
+        raise DryRunError(f'scratch database {name}: {e}') from e
+    finally:
+        admin.close()
+
+def connect(server: str, database: str):
+    """Autocommit connection to database on server"""
+    connection = psycopg2.connect(parse_connection_string(server)['dsn'], dbname=database)
+    connection.autocommit = True
+    return connection
+
+def dry_run(old_schema: str, new_schema: str, migration_name: str, server: str = DEFAULT_SERVER,
+            rows: int = DEFAULT_ROWS, table_rows: Optional[Dict[str, int]] = None, keep: bool = False,
+            poll_interval: float = DEFAULT_POLL_INTERVAL) -> Dict[str, Any]:
+    """Run the migration between two SQL schema files, and its rollback, in a throwaway database"""
+    surgeon = MigrationSurgeon()
+    old_model = surgeon.analyzer.extract_schema_model(old_schema)
+    new_model = surgeon.analyzer.extract_schema_model(new_schema)
+    changes = surgeon.compare_models(old_model, new_model)
+    migration_sql = surgeon.generate_migration(changes, migration_name)
+    rollback_sql = surgeon.generate_rollback_script(changes)
+
+    with scratch_database(server, keep=keep) as database:
+        connection = connect(server, database)
+        observer = connect(server, database)
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(BACKEND_PID_SQL)
+                pid = cursor.fetchone()[0]
+            monitor = LockWaitMonitor(observer, pid, poll_interval)
+            monitor.start()
+            try:
+                report = DryRunHarness(connection, monitor).run(
+                    stream_statements(old_schema), old_model, migration_sql, rollback_sql, rows, table_rows
+                )
+            finally:
+                monitor.stop()
+            with connection.cursor() as cursor:
+                cursor.execute('SHOW server_version')
+                report['server_version'] = cursor.fetchone()[0]
+        finally:
+            observer.close()
+            connection.close()
+
+    report.update({'old_schema': old_schema, 'new_schema': new_schema, 'migration': migration_name,
+                   'changes': len(changes), 'database': database if keep else None})
+    return report
+
+def parse_table_rows(values: Iterable[str]) -> Dict[str, int]:
+    """TABLE=N command line values as a dict"""
+    table_rows = {}
+    for item in values:
+        table, separator, count = item.partition('=')
+        if not separator or not table.strip() or not count.strip().isdigit():
+            raise ValueError(f"invalid --table-rows '{item}': expected TABLE=N")
+        table_rows[table.strip()] = int(count)
+    return table_rows
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(
+        prog='dry_run.py',
+        description='Time a migration and its rollback statement by statement in a seeded throwaway database'
+    )
+    parser.add_argument('old_schema', help='Current schema SQL file (loaded into the scratch database)')
+    parser.add_argument('new_schema', help='Target schema SQL file')
+    parser.add_argument('migration_name', nargs='?', default='dry_run', help='Migration name (default: dry_run)')
+    parser.add_argument('--server', default=DEFAULT_SERVER,
+                        help=f'PostgreSQL server to create the scratch database on (default: {DEFAULT_SERVER})')
+    parser.add_argument('--rows', type=int, default=DEFAULT_ROWS,
+                        help=f'Synthetic rows per table (default: {DEFAULT_ROWS})')
+    parser.add_argument('--table-rows', action='append', default=[], metavar='TABLE=N',
+                        help='Rows for one table, overriding --rows (repeatable)')
+    parser.add_argument('--keep-database', action='store_true',
+                        help='Leave the scratch database in place for inspection')
+    parser.add_argument('--poll-interval', type=float, default=DEFAULT_POLL_INTERVAL,
+                        help=f'Seconds between lock wait samples (default: {DEFAULT_POLL_INTERVAL})')
+    parser.add_argument('--output', default=None, help='Write the JSON report to this file')
+    parser.add_argument('--baseline', default=None, help='Previous JSON report to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help=f'Allowed slowdown as a fraction (default: {DEFAULT_TOLERANCE})')
+    return parser.parse_args(argv)
+
+def main():
+    """Main execution function"""
+    args = parse_args(sys.argv[1:])
+    try:
+        table_rows = parse_table_rows(args.table_rows)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    print(f"🧪 Dry run: {args.old_schema} -> {args.new_schema} with {args.rows} rows per table...")
+    try:
+        report = dry_run(args.old_schema, args.new_schema, args.migration_name, args.server, args.rows,
+                         table_rows, args.keep_database, args.poll_interval)
+    except (OSError, DryRunError, IntrospectionError, DependencyCycleError) as e:
+        print(f"❌ Dry run failed: {e}")
+        sys.exit(1)
+
+    load, seed = report['load'], report['seed']
+    print(f"📥 Loaded {load['statements']} statements ({len(load['errors'])} rejected), "
+          f"seeded {seed['rows']} rows into {len(seed['tables'])} tables in {seed['seconds']:.2f}s")
+    for table, reason in seed['skipped'].items():
+        print(f"   ⚠️  {table} left empty: {reason}")
+    for entry in seed['errors']:
+        print(f"   ⚠️  {entry['table']} not seeded: {entry['error']}")
+
+    for phase, result in report['phases'].items():
+        print(f"\n⏱️  {phase}: {result['seconds'] * 1000:.1f} ms, lock wait {result['lock_wait_seconds'] * 1000:.1f} ms")
+        for statement in result['statements']:
+            status = f"❌ {statement['error']}" if statement['error'] else ''
+            print(f"  {statement['index']:>4}  {statement['seconds'] * 1000:>9.1f} ms  "
+                  f"wait {statement['lock_wait_seconds'] * 1000:>7.1f} ms  {_summary(statement['sql'])} {status}")
+        for hold in result['lock_holds'][:5]:
+            print(f"  🔒 {hold['mode']} on {hold['relation']} held {hold['seconds'] * 1000:.1f} ms")
+    if report['database']:
+        print(f"\n🗄️  Scratch database kept: {report['database']}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✅ Report saved: {args.output}")
+
+    failed = [phase for phase, result in report['phases'].items() if result['failed']]
+    if failed:
+        print(f"\n❌ Failed during {', '.join(failed)}")
+        sys.exit(1)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        try:
+            regressions = compare_reports(report, baseline, args.tolerance)
+        except ValueError as e:
+            print(f"❌ Cannot compare with {args.baseline}: {e}")
+            sys.exit(1)
+        if regressions:
+            print(f"\n🚨 {len(regressions)} slow-migration regressions against {args.baseline}:")
+            for regression in regressions:
+                print(f"   {regression}")
+            sys.exit(1)
+        print(f"\n✅ No regressions against {args.baseline}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+OncoVista Index Analysis
+Flags duplicate and redundant indexes and foreign keys without a supporting index
+"""
+
+import argparse
+import json
+import re
+import sys
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from catalog_introspection import IntrospectionError
+from cost_estimator import CostEstimator, format_bytes
+from ddl_lexer import IDENTIFIER, unquote_identifier
+from migration_generator import SchemaDNAAnalyzer
+from schema_model import DEFAULT_INDEX_METHOD, Index, SchemaModel, Table
+
+TABLE_FOREIGN_KEY_PATTERN = re.compile(r'FOREIGN\s+KEY\s*\(([^)]*)\)', re.IGNORECASE)
+TABLE_UNIQUE_PATTERN = re.compile(r'UNIQUE\s*\(([^)]*)\)', re.IGNORECASE)
+PLAIN_IDENTIFIER_PATTERN = re.compile(rf'^{IDENTIFIER}$')
+MAX_IDENTIFIER_LENGTH = 63
+
+# Order of findings on tables of equal size
+FINDING_ORDER = {'MISSING_FK_INDEX': 1, 'DUPLICATE': 2, 'REDUNDANT': 3}
+
+@dataclass
+class IndexFinding:
+    """One index problem with the statement that fixes it"""
+    kind: str  # 'DUPLICATE', 'REDUNDANT' or 'MISSING_FK_INDEX'
+    table: str
+    columns: Tuple[str, ...]
+    index: Optional[str]
+    covered_by: Optional[str]
+    suggestion: str
+    rows: Optional[int] = None
+    table_bytes: Optional[int] = None
+
+    def describe(self) -> str:
+        columns = ', '.join(self.columns)
+        if self.kind == 'DUPLICATE':
+            return f'{self.table}.{self.index} ({columns}) duplicates {self.covered_by}'
+        if self.kind == 'REDUNDANT':
+            return f'{self.table}.{self.index} ({columns}) is a prefix of {self.covered_by}'
+        return f'{self.table} foreign key ({columns}) has no supporting index'
+
+@dataclass(frozen=True)
+class _Candidate:
+    """An explicit index, or the one PostgreSQL builds for a PRIMARY KEY or UNIQUE constraint"""
+    index: Index
+    key: Tuple[str, ...]
+    implicit: bool
+    position: int
+
+class IndexAnalyzer:
+    """Finds index problems in a schema model, ranked by table size when statistics are available.
+
+    Duplicates index the same key columns with the same method, INCLUDE
+    list and predicate; the constraint-backed or unique copy is kept.
+    Redundant indexes are plain btree indexes whose columns are a leading
+    prefix of another btree index with the same predicate, which can
+    serve the same lookups. A foreign key is supported when some
+    non-partial btree index starts with its columns, in any order; without
+    one, every update or delete on the parent scans the child table.
+    """
+
+    def __init__(self, estimator: Optional[CostEstimator] = None):
+        self.estimator = estimator
+
+    def analyze(self, model: SchemaModel) -> List[IndexFinding]:
+        findings = []
+        for table in model.tables.values():
+            findings.extend(self.analyze_table(table))
+
+        for finding in findings:
+            stats = self.estimator.table_stats(finding.table) if self.estimator else None
+            if stats:
+                finding.rows, finding.table_bytes = stats.rows, stats.table_bytes
+        return sorted(findings, key=lambda finding: (-(finding.table_bytes or 0), -(finding.rows or 0),
+                                                     FINDING_ORDER[finding.kind]))
+
+    def analyze_table(self, table: Table) -> List[IndexFinding]:
+        """Findings for one table, in definition order"""
+        candidates = _candidates(table)
+        findings = []
+        flagged = set()
+
+        groups: Dict[Tuple[Any, ...], List[_Candidate]] = {}
+        for candidate in candidates:
+            index = candidate.index
+            groups.setdefault((candidate.key, index.method, index.include, index.predicate), []).append(candidate)
+        for group in groups.values():
+            keeper = min(group, key=lambda candidate: (not candidate.implicit, not candidate.index.unique,
+                                                       candidate.position))
+            for candidate in group:
+                if candidate is keeper or candidate.implicit:
+                    continue
+                flagged.add(candidate.index.name)
+                findings.append(self._drop_finding('DUPLICATE', table, candidate, keeper))
+
+        for candidate in candidates:
+            index = candidate.index
+            if (candidate.implicit or index.unique or index.method != DEFAULT_INDEX_METHOD
+                    or index.name in flagged):
+                continue
+            wider = next((
+                other for other in candidates
+                if other is not candidate and other.index.method == DEFAULT_INDEX_METHOD
+                and other.index.predicate == index.predicate and len(other.key) > len(candidate.key)
+                and other.key[:len(candidate.key)] == candidate.key
+            ), None)
+            if wider:
+                flagged.add(index.name)
+                findings.append(self._drop_finding('REDUNDANT', table, candidate, wider))
+
+        for columns in _foreign_key_columns(table):
+            wanted = set(columns)
+            if not any(
+                {_bare_column(column) for column in candidate.key[:len(columns)]} == wanted
+                for candidate in candidates
+                if candidate.index.method == DEFAULT_INDEX_METHOD and not candidate.index.predicate
+            ):
+                name = _index_name(table.name, columns)
+                findings.append(IndexFinding(
+                    'MISSING_FK_INDEX', table.name, columns, None, None,
+                    f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table.name} ({", ".join(columns)});'
+                ))
+
+        return findings
+
+    @staticmethod
+    def _drop_finding(kind: str, table: Table, candidate: _Candidate, covered_by: _Candidate) -> IndexFinding:
+        name = candidate.index.name
+        if '.' in table.name and '.' not in name:
+            name = f'{table.name.rsplit(".", 1)[0]}.{name}'
+        return IndexFinding(kind, table.name, candidate.index.columns, candidate.index.name,
+                            covered_by.index.name, f'DROP INDEX CONCURRENTLY IF EXISTS {name};')
+
+def _candidates(table: Table) -> List[_Candidate]:
+    """Explicit indexes plus the implicit ones behind PRIMARY KEY and UNIQUE constraints"""
+    short = table.name.rsplit('.', 1)[-1]
+    implicit = []
+    primary_key = table.primary_key()
+    if primary_key:
+        implicit.append(Index(f'{short}_pkey', primary_key, True))
+    for name, column in table.columns.items():
+        if 'UNIQUE' in column.constraints and (name,) != primary_key:
+            implicit.append(Index(f'{short}_{name}_key', (name,), True))
+    for constraint in table.constraints:
+        match = TABLE_UNIQUE_PATTERN.match(constraint.definition)
+        if match:
+            columns = tuple(unquote_identifier(column.strip()) for column in match.group(1).split(','))
+            implicit.append(Index(constraint.name or f'{short}_{"_".join(columns)}_key', columns, True))
+
+    indexes = [(index, True) for index in implicit] + [(index, False) for index in table.indexes]
+    return [
+        _Candidate(index, tuple(_key_column(column) for column in index.columns), is_implicit, position)
+        for position, (index, is_implicit) in enumerate(indexes)
+    ]
+
+def _foreign_key_columns(table: Table) -> List[Tuple[str, ...]]:
+    """Referencing column lists of the table's foreign keys, each once"""
+    keys = [(name,) for name, column in table.columns.items() if column.references]
+    for constraint in table.constraints:
+        match = TABLE_FOREIGN_KEY_PATTERN.search(constraint.definition)
+        if match:
+            keys.append(tuple(unquote_identifier(column.strip()) for column in match.group(1).split(',')))
+    return list(dict.fromkeys(keys))
+
+def _key_column(column: str) -> str:
+    """Comparable form of an index key: whitespace collapsed, quotes and a redundant ASC dropped"""
+    column = ' '.join(column.split())
+    if column.upper().endswith(' ASC'):
+        column = column[:-4]
+    return unquote_identifier(column) if PLAIN_IDENTIFIER_PATTERN.match(column) else column
+
+def _bare_column(key: str) -> str:
+    """Column named by an index key, ignoring its sort order"""
+    return key.rsplit(' ', 1)[0] if key.upper().endswith(' DESC') else key
+
+def _index_name(table: str, columns: Tuple[str, ...]) -> str:
+    return f'idx_{table.rsplit(".", 1)[-1]}_{"_".join(columns)}'[:MAX_IDENTIFIER_LENGTH]
+
+def build_report(schema: str, findings: List[IndexFinding]) -> Dict[str, Any]:
+    """JSON report with per-kind counts"""
+    counts = {kind: sum(1 for finding in findings if finding.kind == kind) for kind in FINDING_ORDER}
+    return {
+        'generated': datetime.now().isoformat(),
+        'schema': schema,
+        'summary': counts,
+        'findings': [asdict(finding) for finding in findings]
+    }
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(
+        prog='index_analysis.py',
+        description='Find duplicate, redundant and missing foreign-key indexes in a schema'
+    )
+    parser.add_argument('schema', help='Schema SQL file, or a postgresql:// URL (optional ?schema=NAME) to introspect')
+    parser.add_argument('--stats', metavar='FILE', default=None,
+                        help='Table statistics snapshot (see cost_estimator.py --export-query) to rank by table size')
+    parser.add_argument('--output', metavar='FILE', default=None, help='Write the findings as JSON to this file')
+    return parser.parse_args(argv)
+
+def main():
+    """Main execution function"""
+    args = parse_args(sys.argv[1:])
+
+    try:
+        estimator = CostEstimator.from_file(args.stats) if args.stats else None
+    except (OSError, ValueError, KeyError) as e:
+        print(f"❌ Cannot load table statistics from {args.stats}: {e}")
+        sys.exit(1)
+
+    try:
+        model = SchemaDNAAnalyzer().extract_schema_model(args.schema)
+    except (OSError, IntrospectionError) as e:
+        print(f"❌ Cannot read schema {args.schema}: {e}")
+        sys.exit(1)
+
+    findings = IndexAnalyzer(estimator).analyze(model)
+    if not findings:
+        print(f"✅ No index problems found in {len(model.tables)} tables.")
+    else:
+        print(f"🔍 {len(findings)} index findings in {len(model.tables)} tables:")
+        emoji = {'MISSING_FK_INDEX': '🐌', 'DUPLICATE': '👯', 'REDUNDANT': '✂️ '}
+        for finding in findings:
+            size = f' [{format_bytes(finding.table_bytes)}, {finding.rows:,} rows]' if finding.table_bytes is not None else ''
+            print(f"  {emoji[finding.kind]} {finding.kind}: {finding.describe()}{size}")
+            print(f"      {finding.suggestion}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(build_report(args.schema, findings), f, indent=2)
+        print(f"📋 Report saved: {args.output}")
+
+if __name__ == "__main__":
+    main()
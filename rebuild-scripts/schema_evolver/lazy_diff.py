@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+OncoVista Lazy Schema Diff
+Per-table fingerprints so only tables that changed are parsed into column detail
+"""
+
+import hashlib
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional, Set
+
+from schema_model import Function, NamedObject, Table
+
+class LazyTables(Mapping):
+    """Table name -> Table mapping that parses a table on first access.
+
+    keys() is the underlying dict view, so set operations on it iterate in
+    exactly the same order as those on a fully parsed tables dict.
+    """
+
+    def __init__(self, statements: Dict[str, str], parse: Callable[[str], Table]):
+        self._statements = statements
+        self._parse = parse
+        self._tables: Dict[str, Table] = {}
+
+    def __getitem__(self, name: str) -> Table:
+        table = self._tables.get(name)
+        if table is None:
+            if name not in self._statements:
+                raise KeyError(name)
+            table = self._tables[name] = self._parse(name)
+        return table
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._statements)
+
+    def __len__(self) -> int:
+        return len(self._statements)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._statements
+
+    def keys(self):
+        return self._statements.keys()
+
+    @property
+    def parsed(self) -> int:
+        """Number of tables parsed so far"""
+        return len(self._tables)
+
+@dataclass
+class LazySchema:
+    """Schema whose tables are fingerprinted up front and parsed on demand.
+
+    A table's fingerprint covers its CREATE TABLE statement and every
+    CREATE INDEX and CREATE TRIGGER statement on it, exactly as the lexer
+    emitted them (comments removed, surrounding whitespace trimmed). Equal
+    fingerprints mean equal input to the parser, so skipping those tables
+    cannot change the diff. Functions, triggers and types are few and
+    parsed eagerly.
+    """
+    table_statements: Dict[str, str] = field(default_factory=dict)
+    index_statements: Dict[str, List[str]] = field(default_factory=dict)
+    trigger_statements: Dict[str, List[str]] = field(default_factory=dict)
+    functions: List[Function] = field(default_factory=list)
+    triggers: List[NamedObject] = field(default_factory=list)
+    types: List[NamedObject] = field(default_factory=list)
+    tables: Optional[LazyTables] = None
+    _fingerprints: Dict[str, bytes] = field(default_factory=dict)
+
+    def fingerprint(self, name: str) -> bytes:
+        digest = self._fingerprints.get(name)
+        if digest is None:
+            hasher = hashlib.blake2b(digest_size=16)
+            hasher.update(self.table_statements[name].encode())
+            for statement in self.index_statements.get(name, ()):
+                hasher.update(b'\0I')
+                hasher.update(statement.encode())
+            for statement in self.trigger_statements.get(name, ()):
+                hasher.update(b'\0T')
+                hasher.update(statement.encode())
+            digest = self._fingerprints[name] = hasher.digest()
+        return digest
+
+def unchanged_tables(old: LazySchema, new: LazySchema) -> Set[str]:
+    """Tables present on both sides with identical fingerprints"""
+    return {
+        name for name in old.table_statements.keys() & new.table_statements.keys()
+        if old.fingerprint(name) == new.fingerprint(name)
+    }
@@ -4,15 +4,105 @@ OncoVista Schema Migration Generator
 Medical-grade precision schema evolution tool
 """
 
+import argparse
+import io
 import json
+import os
 import re
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from typing import Dict, List, Tuple, Any
-from dataclasses import dataclass
+from typing import Dict, List, Tuple, Any, Callable, Iterable, Iterator, Optional, Set
+from dataclasses import dataclass, replace
 from pathlib import Path
 
-@dataclass
+from archive_mode import (
+    DEFAULT_ARCHIVE_SCHEMA, DEFAULT_RETENTION_DAYS, ArchivePolicy, archive_changes, archive_policy,
+    is_archived_name, render_purge_script
+)
+from ddl_lexer import (
+    IDENTIFIER, read_parenthesized, split_statements, split_top_level, split_words,
+    stream_statements, unquote_identifier
+)
+from backfill import DEFAULT_BATCH_SIZE, DEFAULT_BATCH_SLEEP, BackfillGenerator, detect_backfills, mark_backfilled
+from catalog_introspection import IntrospectionError, introspect_database, is_database_url
+from cost_estimator import CostEstimator, requires_rewrite
+from dependency_graph import DependencyCycleError, DependencyGraph
+from dna_cache import SchemaDNACache
+from lazy_diff import LazySchema, LazyTables, unchanged_tables
+from online_migration import DEFAULT_LOCK_TIMEOUT, OnlineMigrationPlanner, is_volatile_default
+from rename_detection import DEFAULT_RENAME_THRESHOLD, RenameDetector, RenameOverrides
+from schema_profiler import NULL_PROFILER, PhaseProfiler, profiled
+from schema_model import (
+    DEFAULT_INDEX_METHOD, Column, Constraint, Function, Index, NamedObject, SchemaModel, Table, index_options,
+    intern_text
+)
+from schema_replay import replay_migrations
+from sql_emitter import (
+    BACKFILL_SUFFIX, DEFAULT_SCHEMA, DEFERRED_SUFFIX, PURGE_SUFFIX, ROLLBACK_SUFFIX, SQLEmitter, parse_size,
+    short_name, write_script
+)
+from type_system import (
+    CHANGE_CLASS_NOTES, CHANGE_CLASS_RISK, NO_CHANGE, REWRITE, canonical_default, classify_column_change,
+    classify_type_change, same_column, storage_type_sql
+)
+
+# Files at least this large are split across workers in parallel mode
+DEFAULT_SHARD_BYTES = 4 * 1024 * 1024
+# Shards per worker; more than one evens out uneven statement sizes
+SHARDS_PER_WORKER = 2
+
+# Bump whenever the shape or content of extracted schema DNA changes; it is
+# part of the cache key so stale cache entries are never served
+SCHEMA_DNA_VERSION = '5'
+
+# Statement heads recognised by the single-pass analyzer
+CREATE_OBJECT_PATTERN = re.compile(
+    r'CREATE\s+(?:OR\s+REPLACE\s+)?(?:(?:GLOBAL|LOCAL)\s+)?(?:(?:TEMP|TEMPORARY|UNLOGGED)\s+)?'
+    r'(?:(?P<unique>UNIQUE)\s+)?(?:CONSTRAINT\s+)?(?P<kind>TABLE|INDEX|FUNCTION|TRIGGER|TYPE)\b',
+    re.IGNORECASE
+)
+TABLE_HEAD_PATTERN = re.compile(rf'\s*(?:IF\s+NOT\s+EXISTS\s+)?({IDENTIFIER})\s*\(', re.IGNORECASE)
+INDEX_HEAD_PATTERN = re.compile(
+    rf'\s*(?:CONCURRENTLY\s+)?(?:IF\s+NOT\s+EXISTS\s+)?({IDENTIFIER})\s+ON\s+(?:ONLY\s+)?({IDENTIFIER})'
+    r'\s*(?:USING\s+(\w+)\s*)?\(',
+    re.IGNORECASE
+)
+TRIGGER_TABLE_PATTERN = re.compile(rf'\bON\s+(?:ONLY\s+)?({IDENTIFIER})', re.IGNORECASE)
+FUNCTION_HEAD_PATTERN = re.compile(rf'\s*({IDENTIFIER})\s*\(', re.IGNORECASE)
+NAMED_OBJECT_PATTERN = re.compile(rf'\s*(?:IF\s+NOT\s+EXISTS\s+)?({IDENTIFIER})', re.IGNORECASE)
+
+# Fixed ranks used to order changes that do not depend on each other
+OPERATION_ORDER = {
+    'RENAME_TABLE': 1,
+    'ADD_TABLE': 2,
+    'RENAME_COLUMN': 3,
+    'ADD_COLUMN': 4,
+    'MODIFY_COLUMN': 5,
+    'ADD_FUNCTION': 6,
+    'DROP_INDEX': 7,
+    'ADD_INDEX': 8,
+    'DROP_COLUMN': 9,
+    'ARCHIVE_COLUMN': 9,
+    'DROP_TABLE': 10,
+    'ARCHIVE_TABLE': 10
+}
+# Column changes that can share one multi-action ALTER TABLE statement
+COALESCIBLE_CHANGES = ('ADD_COLUMN', 'DROP_COLUMN', 'MODIFY_COLUMN')
+RISK_ORDER = {'LOW': 1, 'MEDIUM': 2, 'HIGH': 3, 'CRITICAL': 4}
+# Profiler phase charged with parsing each kind of statement
+PARSE_PHASES = {kind: f'parse.{kind.lower()}' for kind in ('TABLE', 'INDEX', 'FUNCTION', 'TRIGGER', 'TYPE')}
+FUNCTION_CALL_PATTERN = re.compile(r'([A-Za-z_][\w$.]*)\s*\(')
+
+# Words that end a column's type and start its constraint list
+COLUMN_KEYWORDS = {
+    'CONSTRAINT', 'NOT', 'NULL', 'DEFAULT', 'PRIMARY', 'UNIQUE', 'REFERENCES',
+    'CHECK', 'GENERATED', 'COLLATE'
+}
+# Words that open a table-level constraint rather than a column definition
+TABLE_CONSTRAINT_KEYWORDS = {'CONSTRAINT', 'PRIMARY', 'UNIQUE', 'CHECK', 'FOREIGN', 'EXCLUDE', 'LIKE'}
+
+@dataclass(slots=True)
 class SchemaChange:
     """Represents a single schema mutation"""
     change_type: str  # 'ADD_TABLE', 'DROP_TABLE', 'ADD_COLUMN', etc.
@@ -21,169 +111,615 @@ class SchemaChange:
     risk_level: str  # 'LOW', 'MEDIUM', 'HIGH', 'CRITICAL'
     rollback_sql: str
 
+@dataclass(slots=True)
+class CoalesceSummary:
+    """Column operations a script merged into multi-action ALTER TABLE statements"""
+    operations: int = 0
+    statements: int = 0
+    rewrites_saved: int = 0
+
+    @property
+    def locks_saved(self) -> int:
+        """ACCESS EXCLUSIVE acquisitions avoided: one per statement instead of one per operation"""
+        return self.operations - self.statements
+
+    def describe(self) -> str:
+        return (f'{self.operations} column operations in {self.statements} ALTER TABLE statements '
+                f'({self.locks_saved} lock acquisitions and {self.rewrites_saved} table rewrites saved)')
+
 class SchemaDNAAnalyzer:
     """Analyzes schema DNA for mutations"""
     
-    def __init__(self):
+    def __init__(self, streaming: bool = False, cache: Optional[SchemaDNACache] = None,
+                 profiler: Optional[PhaseProfiler] = None):
+        self.streaming = streaming
+        self.cache = cache
+        self.profiler = profiler or NULL_PROFILER
         self.critical_tables = [
             'patients', 'treatments', 'medications', 'protocols',
             'users', 'roles', 'permissions', 'audit_logs'
         ]
+    
+    def is_critical_table(self, table_name: str) -> bool:
+        """Check a possibly schema-qualified table name against the critical list"""
+        return table_name.rsplit('.', 1)[-1] in self.critical_tables
         
-    def extract_schema_dna(self, schema_file: str) -> Dict[str, Any]:
-        """Extract schema structure from SQL file"""
-        with open(schema_file, 'r') as f:
-            content = f.read()
+    def extract_schema_dna(self, schema_file: str, use_cache: bool = True) -> Dict[str, Any]:
+        """Extract schema structure from SQL file in the plain dict form"""
+        return self.extract_schema_model(schema_file, use_cache=use_cache).to_dict()
+    
+    def extract_schema_model(self, schema_file: str, use_cache: bool = True) -> SchemaModel:
+        """Extract the compact schema model from SQL file, consulting the DNA cache if configured"""
+        if is_database_url(schema_file):
+            with self.profiler.phase('introspect'):
+                return introspect_database(schema_file)
+        if self.cache is None or not use_cache:
+            return self._parse_schema_file(schema_file)
         
-        # Extract tables
-        table_pattern = r'CREATE TABLE\s+(\w+)\s*\((.*?)\);'
+        with self.profiler.phase('cache.load'):
+            key = self.cache.key_for(schema_file, SCHEMA_DNA_VERSION)
+            model = self.cache.load(key)
+        if model is None:
+            model = self._parse_schema_file(schema_file)
+            with self.profiler.phase('cache.store'):
+                self.cache.store(key, model)
+        return model
+    
+    @profiled('parse.pool')
+    def extract_schema_models(self, schema_files: List[str], workers: int, use_cache: bool = True,
+                              shard_bytes: int = DEFAULT_SHARD_BYTES) -> List[SchemaModel]:
+        """Extract several schema files concurrently in a process pool.
+        
+        Files at least shard_bytes large are split at top-level statement
+        boundaries and their shards parsed by separate workers; partial
+        results are merged in shard order, so the output is identical to
+        calling extract_schema_model on each file serially.
+        """
+        results: List[Optional[SchemaModel]] = [None] * len(schema_files)
+        keys: List[Optional[str]] = [None] * len(schema_files)
+        pending = []
+        
+        for i, schema_file in enumerate(schema_files):
+            if is_database_url(schema_file):
+                results[i] = introspect_database(schema_file)
+            elif self.cache is not None and use_cache:
+                keys[i] = self.cache.key_for(schema_file, SCHEMA_DNA_VERSION)
+                results[i] = self.cache.load(keys[i])
+            if results[i] is None:
+                pending.append(i)
+        
+        if pending:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = {}
+                for i in pending:
+                    if workers > 1 and os.path.getsize(schema_files[i]) >= shard_bytes:
+                        futures[i] = [
+                            executor.submit(_collect_statement_shard, shard)
+                            for shard in self._shard_statements(schema_files[i], workers)
+                        ]
+                    else:
+                        futures[i] = [executor.submit(_collect_schema_file, schema_files[i], self.streaming)]
+                
+                for i in pending:
+                    partials = [future.result() for future in futures[i]]
+                    results[i] = self.finalize_schema_dna(self.merge_schema_objects(partials))
+                    if keys[i] is not None:
+                        self.cache.store(keys[i], results[i])
+        
+        return results
+    
+    def _shard_statements(self, schema_file: str, workers: int) -> Iterator[List[str]]:
+        """Group the relevant statements of a file into shards of similar byte size"""
+        target = max(1, os.path.getsize(schema_file) // (workers * SHARDS_PER_WORKER))
+        shard = []
+        size = 0
+        
+        for statement in self._iter_statements(schema_file):
+            if not self._is_relevant_statement(statement):
+                continue
+            shard.append(statement)
+            size += len(statement)
+            if size >= target:
+                yield shard
+                shard = []
+                size = 0
+        
+        if shard:
+            yield shard
+    
+    def _parse_schema_file(self, schema_file: str) -> SchemaModel:
+        """Parse a SQL file into a schema model"""
+        return self.extract_schema_model_from_statements(self._iter_statements(schema_file))
+    
+    def _iter_statements(self, schema_file: str) -> Iterator[str]:
+        """Yield the top-level statements of a SQL file in the configured read mode"""
+        if self.streaming:
+            if self.profiler.enabled:
+                self.profiler.count('read', calls=1, bytes=os.path.getsize(schema_file))
+            return self.profiler.iterate('read', stream_statements(schema_file, keep=self._is_relevant_statement))
+        
+        with self.profiler.phase('read'):
+            with open(schema_file, 'r') as f:
+                content = f.read()
+        if self.profiler.enabled:
+            self.profiler.count('read', bytes=len(content))
+        # Splitting is lazy, so lexing time is charged to 'read' as statements are pulled
+        return self.profiler.iterate('read', split_statements(content))
+    
+    def _is_relevant_statement(self, head: str) -> bool:
+        """Check from its head whether a statement can contribute to the schema DNA"""
+        return head[:6].upper() == 'CREATE'
+    
+    def extract_schema_dna_from_statements(self, statements: Iterable[str]) -> Dict[str, Any]:
+        """Build schema DNA in the plain dict form from top-level statements"""
+        return self.extract_schema_model_from_statements(statements).to_dict()
+    
+    def extract_schema_model_from_statements(self, statements: Iterable[str]) -> SchemaModel:
+        """Build the schema model from top-level statements in a single sweep"""
+        partial = self.collect_schema_objects(statements)
+        with self.profiler.phase('finalize'):
+            return self.finalize_schema_dna(partial)
+    
+    @profiled('scan')
+    def scan_schema(self, statements: Iterable[str]) -> LazySchema:
+        """Index statements by table for a lazy diff, parsing only functions, triggers and types"""
+        schema = LazySchema()
+        
+        for statement in statements:
+            match = CREATE_OBJECT_PATTERN.match(statement)
+            if not match:
+                continue
+            
+            kind = match.group('kind').upper()
+            rest = statement[match.end():]
+            
+            if kind == 'TABLE':
+                head = TABLE_HEAD_PATTERN.match(rest)
+                if head:
+                    schema.table_statements[intern_text(unquote_identifier(head.group(1)))] = statement
+            elif kind == 'INDEX':
+                head = INDEX_HEAD_PATTERN.match(rest)
+                if head:
+                    schema.index_statements.setdefault(unquote_identifier(head.group(2)), []).append(statement)
+            elif kind == 'FUNCTION':
+                function = self._parse_function(rest)
+                if function:
+                    schema.functions.append(function)
+            elif kind == 'TRIGGER':
+                trigger = self._parse_named_object(rest)
+                if trigger:
+                    schema.triggers.append(trigger)
+                target = TRIGGER_TABLE_PATTERN.search(rest)
+                if target:
+                    schema.trigger_statements.setdefault(unquote_identifier(target.group(1)), []).append(statement)
+            elif kind == 'TYPE':
+                custom_type = self._parse_named_object(rest)
+                if custom_type:
+                    schema.types.append(custom_type)
+        
+        schema.tables = LazyTables(schema.table_statements, lambda name: self._parse_lazy_table(schema, name))
+        return schema
+    
+    def _parse_lazy_table(self, schema: LazySchema, table_name: str) -> Table:
+        """Parse one table of a lazy schema together with its indexes"""
+        partial = self.collect_schema_objects(
+            [schema.table_statements[table_name]] + schema.index_statements.get(table_name, [])
+        )
+        return self.finalize_schema_dna(partial).tables[table_name]
+    
+    @profiled('parse')
+    def collect_schema_objects(self, statements: Iterable[str]) -> Dict[str, Any]:
+        """Parse statements into partial schema DNA with indexes still keyed by table"""
         tables = {}
+        indexes = {}
+        functions = []
+        triggers = []
+        types = []
+        profiler = self.profiler
         
-        for match in re.finditer(table_pattern, content, re.DOTALL | re.IGNORECASE):
-            table_name = match.group(1)
-            columns_sql = match.group(2)
+        for statement in statements:
+            match = CREATE_OBJECT_PATTERN.match(statement)
+            if not match:
+                continue
             
-            # Parse columns
-            columns = self._parse_columns(columns_sql)
-            tables[table_name] = {
-                'columns': columns,
-                'constraints': self._parse_constraints(columns_sql),
-                'indexes': self._extract_indexes(content, table_name)
-            }
+            kind = match.group('kind').upper()
+            rest = statement[match.end():]
+            
+            with profiler.phase(PARSE_PHASES[kind], bytes=len(statement), statements=1):
+                if kind == 'TABLE':
+                    parsed = self._parse_table(rest)
+                    if parsed:
+                        tables[parsed[0]] = parsed[1]
+                elif kind == 'INDEX':
+                    parsed = self._parse_index(rest, unique=bool(match.group('unique')))
+                    if parsed:
+                        indexes.setdefault(parsed[0], []).append(parsed[1])
+                elif kind == 'FUNCTION':
+                    function = self._parse_function(rest)
+                    if function:
+                        functions.append(function)
+                elif kind == 'TRIGGER':
+                    trigger = self._parse_named_object(rest)
+                    if trigger:
+                        triggers.append(trigger)
+                elif kind == 'TYPE':
+                    custom_type = self._parse_named_object(rest)
+                    if custom_type:
+                        types.append(custom_type)
         
         return {
             'tables': tables,
-            'functions': self._extract_functions(content),
-            'triggers': self._extract_triggers(content),
-            'types': self._extract_types(content)
+            'indexes': indexes,
+            'functions': functions,
+            'triggers': triggers,
+            'types': types
         }
     
-    def _parse_columns(self, columns_sql: str) -> Dict[str, Dict]:
+    @staticmethod
+    def merge_schema_objects(partials: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Merge partial schema DNA from consecutive statement shards, in shard order"""
+        merged = {'tables': {}, 'indexes': {}, 'functions': [], 'triggers': [], 'types': []}
+        
+        for partial in partials:
+            merged['tables'].update(partial['tables'])
+            for table_name, table_indexes in partial['indexes'].items():
+                merged['indexes'].setdefault(table_name, []).extend(table_indexes)
+            for key in ('functions', 'triggers', 'types'):
+                merged[key].extend(partial[key])
+        
+        return merged
+    
+    @staticmethod
+    def finalize_schema_dna(partial: Dict[str, Any]) -> SchemaModel:
+        """Attach collected indexes to their tables and build the schema model"""
+        tables = partial['tables']
+        for table_name, table in tables.items():
+            table.indexes = tuple(partial['indexes'].get(table_name, ()))
+        
+        return SchemaModel(
+            tables=tables,
+            functions=partial['functions'],
+            triggers=partial['triggers'],
+            types=partial['types']
+        )
+    
+    def _parse_table(self, rest: str) -> Optional[Tuple[str, Table]]:
+        """Parse the remainder of a CREATE TABLE statement"""
+        match = TABLE_HEAD_PATTERN.match(rest)
+        if not match:
+            return None
+        
+        body, _ = read_parenthesized(rest, match.end() - 1)
+        table_name = intern_text(unquote_identifier(match.group(1)))
+        with self.profiler.phase('parse.columns'):
+            columns = self._parse_columns(body)
+        with self.profiler.phase('parse.constraints'):
+            constraints = tuple(self._parse_constraints(body))
+        return table_name, Table(name=table_name, columns=columns, constraints=constraints)
+    
+    def _parse_columns(self, columns_sql: str) -> Dict[str, Column]:
         """Parse column definitions"""
         columns = {}
-        lines = [line.strip() for line in columns_sql.split(',')]
         
-        for line in lines:
-            if not line or line.startswith('CONSTRAINT'):
+        for item in split_top_level(columns_sql):
+            words = split_words(item)
+            if len(words) < 2 or _leading_keyword(words[0]) in TABLE_CONSTRAINT_KEYWORDS:
                 continue
-                
-            parts = line.split()
-            if len(parts) >= 2:
-                col_name = parts[0].strip('"')
-                col_type = parts[1]
-                
-                columns[col_name] = {
-                    'type': col_type,
-                    'nullable': 'NOT NULL' not in line.upper(),
-                    'default': self._extract_default(line),
-                    'constraints': self._extract_column_constraints(line)
-                }
+            
+            type_end = 1
+            while type_end < len(words) and _leading_keyword(words[type_end]) not in COLUMN_KEYWORDS:
+                type_end += 1
+            
+            tail = words[type_end:]
+            col_name = intern_text(unquote_identifier(words[0]))
+            columns[col_name] = Column(
+                name=col_name,
+                type=intern_text(re.sub(r'\s+(?=[(\[])', '', ' '.join(words[1:type_end]))),
+                nullable=not _has_keyword_pair(tail, 'NOT', 'NULL'),
+                default=intern_text(self._extract_default(tail)),
+                constraints=self._extract_column_constraints(tail),
+                references=intern_text(self._extract_references(tail))
+            )
         
         return columns
     
-    def _parse_constraints(self, columns_sql: str) -> List[Dict]:
+    def _parse_constraints(self, columns_sql: str) -> List[Constraint]:
         """Parse table constraints"""
         constraints = []
-        constraint_pattern = r'CONSTRAINT\s+(\w+)\s+(.*?)(?=,|$)'
         
-        for match in re.finditer(constraint_pattern, columns_sql, re.IGNORECASE):
-            constraints.append({
-                'name': match.group(1),
-                'definition': match.group(2).strip()
-            })
+        for item in split_top_level(columns_sql):
+            words = split_words(item)
+            keyword = _leading_keyword(words[0])
+            if keyword == 'CONSTRAINT' and len(words) >= 3:
+                constraints.append(Constraint(
+                    name=unquote_identifier(words[1]),
+                    definition=' '.join(words[2:])
+                ))
+            elif keyword in TABLE_CONSTRAINT_KEYWORDS:
+                constraints.append(Constraint(name=None, definition=item))
         
         return constraints
     
-    def _extract_indexes(self, content: str, table_name: str) -> List[Dict]:
-        """Extract indexes for a table"""
-        index_pattern = rf'CREATE\s+(?:UNIQUE\s+)?INDEX\s+(\w+)\s+ON\s+{table_name}\s*\((.*?)\)'
-        indexes = []
+    def _parse_index(self, rest: str, unique: bool) -> Optional[Tuple[str, Index]]:
+        """Parse the remainder of a CREATE INDEX statement"""
+        match = INDEX_HEAD_PATTERN.match(rest)
+        if not match:
+            return None
         
-        for match in re.finditer(index_pattern, content, re.IGNORECASE):
-            indexes.append({
-                'name': match.group(1),
-                'columns': [col.strip() for col in match.group(2).split(',')],
-                'unique': 'UNIQUE' in match.group(0).upper()
-            })
-        
-        return indexes
+        columns_sql, end = read_parenthesized(rest, match.end() - 1)
+        include, predicate = index_options(rest[end:])
+        return unquote_identifier(match.group(2)), Index(
+            name=unquote_identifier(match.group(1)),
+            columns=tuple(intern_text(column) for column in split_top_level(columns_sql)),
+            unique=unique,
+            method=intern_text((match.group(3) or DEFAULT_INDEX_METHOD).lower()),
+            include=include,
+            predicate=predicate
+        )
     
-    def _extract_default(self, line: str) -> str:
-        """Extract default value from column definition"""
-        default_match = re.search(r'DEFAULT\s+([^,\s]+)', line, re.IGNORECASE)
-        return default_match.group(1) if default_match else None
+    def _extract_default(self, tail: List[str]) -> str:
+        """Extract default value from the words following a column type"""
+        for i, word in enumerate(tail):
+            if word.upper() != 'DEFAULT' or i + 1 >= len(tail):
+                continue
+            end = i + 2
+            while end < len(tail) and _leading_keyword(tail[end]) not in COLUMN_KEYWORDS:
+                end += 1
+            return ' '.join(tail[i + 1:end])
+        return None
     
-    def _extract_column_constraints(self, line: str) -> List[str]:
-        """Extract column-level constraints"""
+    def _extract_column_constraints(self, tail: List[str]) -> Tuple[str, ...]:
+        """Extract column-level constraints as interned keyword strings"""
         constraints = []
-        if 'PRIMARY KEY' in line.upper():
+        if _has_keyword_pair(tail, 'PRIMARY', 'KEY'):
             constraints.append('PRIMARY KEY')
-        if 'UNIQUE' in line.upper():
+        if any(_leading_keyword(word) == 'UNIQUE' for word in tail):
             constraints.append('UNIQUE')
-        if 'NOT NULL' in line.upper():
+        if _has_keyword_pair(tail, 'NOT', 'NULL'):
             constraints.append('NOT NULL')
-        return constraints
+        return tuple(constraints)
     
-    def _extract_functions(self, content: str) -> List[Dict]:
-        """Extract function definitions"""
-        func_pattern = r'CREATE\s+(?:OR\s+REPLACE\s+)?FUNCTION\s+(\w+)\((.*?)\)'
-        functions = []
-        
-        for match in re.finditer(func_pattern, content, re.IGNORECASE):
-            functions.append({
-                'name': match.group(1),
-                'parameters': match.group(2)
-            })
-        
-        return functions
+    def _extract_references(self, tail: List[str]) -> Optional[str]:
+        """Extract the table named by a column-level REFERENCES clause"""
+        for i, word in enumerate(tail[:-1]):
+            if _leading_keyword(word) == 'REFERENCES':
+                return unquote_identifier(tail[i + 1].split('(', 1)[0])
+        return None
     
-    def _extract_triggers(self, content: str) -> List[Dict]:
-        """Extract trigger definitions"""
-        trigger_pattern = r'CREATE\s+TRIGGER\s+(\w+)'
-        triggers = []
-        
-        for match in re.finditer(trigger_pattern, content, re.IGNORECASE):
-            triggers.append({'name': match.group(1)})
+    def _parse_function(self, rest: str) -> Optional[Function]:
+        """Parse the remainder of a CREATE FUNCTION statement"""
+        match = FUNCTION_HEAD_PATTERN.match(rest)
+        if not match:
+            return None
         
-        return triggers
+        parameters, _ = read_parenthesized(rest, match.end() - 1)
+        return Function(name=unquote_identifier(match.group(1)), parameters=parameters)
     
-    def _extract_types(self, content: str) -> List[Dict]:
-        """Extract custom type definitions"""
-        type_pattern = r'CREATE\s+TYPE\s+(\w+)'
-        types = []
-        
-        for match in re.finditer(type_pattern, content, re.IGNORECASE):
-            types.append({'name': match.group(1)})
-        
-        return types
+    def _parse_named_object(self, rest: str) -> Optional[NamedObject]:
+        """Parse the object name of a CREATE TRIGGER or CREATE TYPE statement"""
+        match = NAMED_OBJECT_PATTERN.match(rest)
+        return NamedObject(name=unquote_identifier(match.group(1))) if match else None
+
+def _collect_statement_shard(statements: List[str]) -> Dict[str, Any]:
+    """Process pool entry point: parse one shard of statements"""
+    return SchemaDNAAnalyzer().collect_schema_objects(statements)
+
+def _collect_schema_file(schema_file: str, streaming: bool) -> Dict[str, Any]:
+    """Process pool entry point: parse a whole schema file"""
+    analyzer = SchemaDNAAnalyzer(streaming=streaming)
+    return analyzer.collect_schema_objects(analyzer._iter_statements(schema_file))
+
+def _rename_index_columns(index: Index, renamed: Dict[str, str]) -> Index:
+    """The index as PostgreSQL keeps it after its columns are renamed"""
+    columns = tuple(renamed.get(column, column) for column in index.columns)
+    include = tuple(renamed.get(column, column) for column in index.include)
+    if columns == index.columns and include == index.include:
+        return index
+    return replace(index, columns=columns, include=include)
+
+def _alter_action(change: SchemaChange, sql: str) -> Optional[str]:
+    """Action part of a single ALTER TABLE statement on the change's table (e.g. 'ADD COLUMN notes TEXT')"""
+    prefix = f'ALTER TABLE {change.table_name} '
+    if (change.change_type not in COALESCIBLE_CHANGES or not sql.startswith(prefix)
+            or not sql.endswith(';') or sql.count(';') != 1):
+        return None
+    return sql[len(prefix):-1]
+
+def _group_sql(changes: List[SchemaChange], statements: List[str], group: List[int]) -> str:
+    """One statement as generated, or the multi-action ALTER TABLE for a coalesced group"""
+    if len(group) == 1:
+        return statements[group[0]]
+    actions = [_alter_action(changes[index], statements[index]) for index in group]
+    return f'ALTER TABLE {changes[group[0]].table_name}\n    ' + ',\n    '.join(actions) + ';'
+
+def _rewrites_table(change: SchemaChange, undo: bool = False) -> bool:
+    """Whether the change (or its rollback) forces a full table rewrite"""
+    if change.change_type == 'MODIFY_COLUMN':
+        old, new = change.details['old_def'], change.details['new_def']
+        if undo:
+            old, new = new, old
+        return requires_rewrite(old['type'], new['type'])
+    if change.change_type == ('DROP_COLUMN' if undo else 'ADD_COLUMN'):
+        default = change.details['definition']['default']
+        return bool(default) and is_volatile_default(default)
+    return False
+
+def _change_priority(change: SchemaChange) -> Tuple[int, int]:
+    """Fixed operation-type and risk rank used to order otherwise independent changes"""
+    return (OPERATION_ORDER.get(change.change_type, 999), RISK_ORDER.get(change.risk_level, 999))
+
+def _table_key(name: str) -> str:
+    """Normalize a table or function name so public-qualified and bare names match"""
+    return name[len(DEFAULT_SCHEMA) + 1:] if name.startswith(DEFAULT_SCHEMA + '.') else name
+
+def _change_definitions(change: SchemaChange) -> Tuple[List[Tuple[Any, List[Any]]], List[Tuple[Any, List[Any]]]]:
+    """Return the (table, columns) definitions a change creates and the ones it removes"""
+    details = change.details
+    if change.change_type == 'ADD_TABLE':
+        return [(details['table_def'], list(details['table_def']['columns'].values()))], []
+    if change.change_type in ('DROP_TABLE', 'ARCHIVE_TABLE'):
+        return [], [(details['table_def'], list(details['table_def']['columns'].values()))]
+    if change.change_type == 'ADD_COLUMN':
+        return [(None, [details['definition']])], []
+    if change.change_type in ('DROP_COLUMN', 'ARCHIVE_COLUMN'):
+        return [], [(None, [details['definition']])]
+    if change.change_type == 'MODIFY_COLUMN':
+        return [(None, [details['new_def']])], [(None, [details['old_def']])]
+    return [], []
+
+def _foreign_key_targets(table_def: Any, column_defs: List[Any]) -> List[str]:
+    """Normalized names of the tables referenced by a table or column definitions"""
+    if isinstance(table_def, Table):
+        targets = table_def.referenced_tables()
+    else:
+        targets = {column.get('references') for column in column_defs if column.get('references')}
+    return [_table_key(target) for target in targets]
+
+def _called_functions(column_defs: List[Any]) -> List[str]:
+    """Normalized names of functions called from column defaults"""
+    return [
+        _table_key(name)
+        for column in column_defs if column.get('default')
+        for name in FUNCTION_CALL_PATTERN.findall(column['default'])
+    ]
+
+def _without_archived_columns(table: Table) -> Table:
+    """The table without columns (and their indexes) renamed into the archive by an earlier migration"""
+    archived = {name for name in table.columns if is_archived_name(name)}
+    if not archived:
+        return table
+    return replace(
+        table,
+        columns={name: column for name, column in table.columns.items() if name not in archived},
+        indexes=tuple(index for index in table.indexes if not archived & set(index.columns + index.include))
+    )
+
+def _single_key_column(table: Table) -> Optional[Column]:
+    """The primary key column used to batch backfills, or None for missing or composite keys"""
+    key = table.primary_key()
+    return table.columns.get(key[0]) if len(key) == 1 else None
+
+def _leading_keyword(word: str) -> str:
+    """Return the upper-cased leading keyword of a word such as 'CHECK(...)'"""
+    match = re.match(r'[A-Za-z_]+', word)
+    return match.group(0).upper() if match else ''
+
+def _has_keyword_pair(words: List[str], first: str, second: str) -> bool:
+    """Check whether two keywords appear next to each other"""
+    return any(
+        words[i].upper() == first and words[i + 1].upper() == second
+        for i in range(len(words) - 1)
+    )
 
 class MigrationSurgeon:
     """Performs surgical migration operations"""
     
-    def __init__(self):
-        self.analyzer = SchemaDNAAnalyzer()
+    def __init__(self, streaming: bool = False, cache_dir: Optional[str] = None, workers: int = 1,
+                 stats_file: Optional[str] = None, lazy: bool = False, profiler: Optional[PhaseProfiler] = None,
+                 coalesce_alters: bool = True, rename_detector: Optional[RenameDetector] = None,
+                 archive_schema: str = DEFAULT_ARCHIVE_SCHEMA, cost_estimator: Optional[CostEstimator] = None):
+        self.profiler = profiler or NULL_PROFILER
+        self.coalesce_alters = coalesce_alters
+        self.rename_detector = rename_detector
+        self.archive_schema = archive_schema
+        self.analyzer = SchemaDNAAnalyzer(streaming=streaming, cache=SchemaDNACache(cache_dir), profiler=self.profiler)
+        self.workers = workers
+        self.lazy = lazy
+        self.cost_estimator = cost_estimator
+        if self.cost_estimator is None and stats_file:
+            self.cost_estimator = CostEstimator.from_file(stats_file)
         
-    def diagnose_changes(self, old_schema: str, new_schema: str) -> List[SchemaChange]:
+    def diagnose_changes(self, old_schema: str, new_schema: str, use_cache: bool = True) -> List[SchemaChange]:
         """Diagnose schema mutations between versions"""
-        old_dna = self.analyzer.extract_schema_dna(old_schema)
-        new_dna = self.analyzer.extract_schema_dna(new_schema)
+        if self.lazy and not (is_database_url(old_schema) or is_database_url(new_schema)):
+            return self.diagnose_changes_lazy(old_schema, new_schema)
+        if self.workers > 1:
+            old_dna, new_dna = self.analyzer.extract_schema_models(
+                [old_schema, new_schema], self.workers, use_cache=use_cache
+            )
+        else:
+            old_dna = self.analyzer.extract_schema_model(old_schema, use_cache=use_cache)
+            new_dna = self.analyzer.extract_schema_model(new_schema, use_cache=use_cache)
         
+        return self.compare_models(old_dna, new_dna)
+    
+    def diagnose_changes_lazy(self, old_schema: str, new_schema: str) -> List[SchemaChange]:
+        """Diagnose mutations parsing only tables whose fingerprints differ; same result as diagnose_changes"""
+        old_lazy = self.analyzer.scan_schema(self.analyzer._iter_statements(old_schema))
+        new_lazy = self.analyzer.scan_schema(self.analyzer._iter_statements(new_schema))
+        return self.compare_lazy(old_lazy, new_lazy)
+    
+    @profiled('diff')
+    def compare_lazy(self, old_lazy: LazySchema, new_lazy: LazySchema) -> List[SchemaChange]:
+        """Diagnose schema mutations between two scanned schemas"""
+        with self.profiler.phase('diff.fingerprint'):
+            unchanged = unchanged_tables(old_lazy, new_lazy)
+        changes = self._analyze_table_changes(old_lazy.tables, new_lazy.tables, unchanged)
+        changes.extend(self._analyze_function_changes(old_lazy.functions, new_lazy.functions))
+        return changes
+    
+    def diagnose_replayed(self, baseline_schema: str, migrations_dir: str, target_schema: str,
+                          state_dir: Optional[str] = None, use_cache: bool = True) -> Tuple[List[SchemaChange], Dict]:
+        """Diagnose mutations between baseline + replayed migrations and a target snapshot"""
+        with self.profiler.phase('replay'):
+            current, report = replay_migrations(
+                self.analyzer, baseline_schema, migrations_dir, state_dir, parser_version=SCHEMA_DNA_VERSION
+            )
+        target = self.analyzer.extract_schema_model(target_schema, use_cache=use_cache)
+        return self.compare_models(current, target), report
+    
+    @profiled('diff')
+    def compare_models(self, old_dna: SchemaModel, new_dna: SchemaModel) -> List[SchemaChange]:
+        """Diagnose schema mutations between two parsed schema models"""
         changes = []
         
         # Analyze table changes
-        changes.extend(self._analyze_table_changes(old_dna['tables'], new_dna['tables']))
+        changes.extend(self._analyze_table_changes(old_dna.tables, new_dna.tables))
         
         # Analyze function changes
-        changes.extend(self._analyze_function_changes(old_dna['functions'], new_dna['functions']))
+        changes.extend(self._analyze_function_changes(old_dna.functions, new_dna.functions))
         
         return changes
     
-    def _analyze_table_changes(self, old_tables: Dict, new_tables: Dict) -> List[SchemaChange]:
-        """Analyze changes in table structure"""
+    def clear_cache(self) -> int:
+        """Remove all cached schema DNA and return the number of entries deleted"""
+        return self.analyzer.cache.clear()
+    
+    @profiled('diff.tables')
+    def _analyze_table_changes(self, old_tables: Dict[str, Table], new_tables: Dict[str, Table],
+                               unchanged: Set[str] = frozenset()) -> List[SchemaChange]:
+        """Analyze changes in table structure, skipping tables known to be unchanged"""
         changes = []
+        # Archived tables (and the archive registry) are managed by the purge script, not by diffs
+        archived = {
+            name for name in old_tables.keys() | new_tables.keys() if is_archived_name(name, self.archive_schema)
+        }
+        added = new_tables.keys() - old_tables.keys() - archived
+        dropped = old_tables.keys() - new_tables.keys() - archived
         
-        # New tables
-        for table_name in new_tables.keys() - old_tables.keys():
+        # Renamed tables keep their data; whatever else changed is diffed under the new name
+        renames = []
+        if self.rename_detector and added and dropped:
+            renames = self.rename_detector.match_tables(
+                {name: old_tables[name] for name in dropped}, {name: new_tables[name] for name in added}
+            )
+        for match in renames:
+            changes.append(SchemaChange(
+                change_type='RENAME_TABLE',
+                table_name=match.new_name,
+                details={'old_name': match.old_name, 'new_name': match.new_name,
+                         'confidence': match.confidence, 'forced': match.forced},
+                risk_level='LOW',
+                rollback_sql=f'ALTER TABLE {match.new_name} RENAME TO {short_name(match.old_name)};'
+            ))
+            changes.extend(self._analyze_modified_table(
+                match.new_name, old_tables[match.old_name], new_tables[match.new_name]
+            ))
+        added -= {match.new_name for match in renames}
+        dropped -= {match.old_name for match in renames}
+        
+        # New tables, with their indexes
+        for table_name in added:
             changes.append(SchemaChange(
                 change_type='ADD_TABLE',
                 table_name=table_name,
@@ -191,30 +727,114 @@ class MigrationSurgeon:
                 risk_level='MEDIUM',
                 rollback_sql=f'DROP TABLE IF EXISTS {table_name};'
             ))
+            changes.extend(self._analyze_index_changes(table_name, (), new_tables[table_name].indexes))
         
-        # Dropped tables
-        for table_name in old_tables.keys() - new_tables.keys():
-            risk = 'CRITICAL' if table_name in self.analyzer.critical_tables else 'HIGH'
+        # Dropped tables; their indexes go with them and are restored by the rollback
+        for table_name in dropped:
+            risk = 'CRITICAL' if self.analyzer.is_critical_table(table_name) else 'HIGH'
+            old_table = old_tables[table_name]
             changes.append(SchemaChange(
                 change_type='DROP_TABLE',
                 table_name=table_name,
-                details={'table_def': old_tables[table_name]},
+                details={'table_def': old_table},
                 risk_level=risk,
-                rollback_sql=self._generate_create_table_sql(table_name, old_tables[table_name])
+                rollback_sql='\n'.join(
+                    [self._generate_create_table_sql(table_name, old_table)]
+                    + [self._generate_create_index_sql(table_name, index) for index in old_table.indexes]
+                )
             ))
         
         # Modified tables
         for table_name in old_tables.keys() & new_tables.keys():
-            table_changes = self._analyze_column_changes(
-                table_name, 
-                old_tables[table_name]['columns'],
-                new_tables[table_name]['columns']
-            )
-            changes.extend(table_changes)
+            if table_name in unchanged or table_name in archived:
+                continue
+            changes.extend(self._analyze_modified_table(table_name, old_tables[table_name], new_tables[table_name]))
+        
+        # Key columns whose type is rewritten: the online plan cannot swap them under referencing foreign keys
+        rewritten_keys = [change for change in changes if change.change_type == 'MODIFY_COLUMN'
+                          and change.details.get('keys') and change.details['change_class'] == REWRITE]
+        if rewritten_keys:
+            referencing: Dict[str, List[str]] = {}
+            for name in new_tables.keys():
+                for target in new_tables[name].referenced_tables():
+                    referencing.setdefault(_table_key(target), []).append(name)
+            for change in rewritten_keys:
+                change.details['referenced_by'] = tuple(sorted(referencing.get(_table_key(change.table_name), ())))
         
         return changes
     
-    def _analyze_column_changes(self, table_name: str, old_cols: Dict, new_cols: Dict) -> List[SchemaChange]:
+    def _analyze_modified_table(self, table_name: str, old_table: Table, new_table: Table) -> List[SchemaChange]:
+        """Column and index changes of a table present in both schemas"""
+        changes = []
+        old_table, new_table = _without_archived_columns(old_table), _without_archived_columns(new_table)
+        old_columns, old_indexes = old_table.columns, old_table.indexes
+        
+        # Renamed columns are compared (and their indexes matched) under the new name
+        renames = self.rename_detector.match_columns(table_name, old_table, new_table) if self.rename_detector else []
+        if renames:
+            renamed = {match.old_name: match.new_name for match in renames}
+            for match in renames:
+                changes.append(SchemaChange(
+                    change_type='RENAME_COLUMN',
+                    table_name=table_name,
+                    details={'old_column': match.old_name, 'column': match.new_name,
+                             'definition': new_table.columns[match.new_name],
+                             'confidence': match.confidence, 'forced': match.forced},
+                    risk_level='LOW',
+                    rollback_sql=f'ALTER TABLE {table_name} RENAME COLUMN {match.new_name} TO {match.old_name};'
+                ))
+            old_columns = {
+                renamed.get(name, name): replace(column, name=renamed[name]) if name in renamed else column
+                for name, column in old_columns.items()
+            }
+            old_indexes = tuple(_rename_index_columns(index, renamed) for index in old_indexes)
+        
+        changes.extend(self._analyze_column_changes(
+            table_name, 
+            old_columns,
+            new_table.columns,
+            new_table.indexes,
+            _single_key_column(old_table),
+            new_table.key_constraints()
+        ))
+        changes.extend(self._analyze_index_changes(table_name, old_indexes, new_table.indexes))
+        return changes
+    
+    def _analyze_index_changes(self, table_name: str, old_indexes: Tuple[Index, ...],
+                               new_indexes: Tuple[Index, ...]) -> List[SchemaChange]:
+        """Analyze index changes by name; a redefined index is dropped and created again"""
+        changes = []
+        old_by_name = {index.name: index for index in old_indexes}
+        new_by_name = {index.name: index for index in new_indexes}
+        
+        # Dropped or redefined indexes; losing a unique index loses a guarantee
+        for name, index in old_by_name.items():
+            if new_by_name.get(name) != index:
+                changes.append(SchemaChange(
+                    change_type='DROP_INDEX',
+                    table_name=table_name,
+                    details={'index': index},
+                    risk_level='HIGH' if index.unique else 'MEDIUM',
+                    rollback_sql=self._generate_create_index_sql(table_name, index)
+                ))
+        
+        # New or redefined indexes; a unique build fails on existing duplicates
+        for name, index in new_by_name.items():
+            if old_by_name.get(name) != index:
+                changes.append(SchemaChange(
+                    change_type='ADD_INDEX',
+                    table_name=table_name,
+                    details={'index': index},
+                    risk_level='MEDIUM' if index.unique else 'LOW',
+                    rollback_sql=self._generate_drop_index_sql(table_name, index)
+                ))
+        
+        return changes
+    
+    def _analyze_column_changes(self, table_name: str, old_cols: Dict[str, Column],
+                                new_cols: Dict[str, Column], indexes: Tuple[Index, ...] = (),
+                                primary_key: Optional[Column] = None,
+                                keys: Tuple[Tuple[str, str, Tuple[str, ...]], ...] = ()) -> List[SchemaChange]:
         """Analyze column-level changes"""
         changes = []
         
@@ -223,14 +843,14 @@ class MigrationSurgeon:
             changes.append(SchemaChange(
                 change_type='ADD_COLUMN',
                 table_name=table_name,
-                details={'column': col_name, 'definition': new_cols[col_name]},
+                details={'column': col_name, 'definition': new_cols[col_name], 'primary_key': primary_key},
                 risk_level='LOW',
                 rollback_sql=f'ALTER TABLE {table_name} DROP COLUMN {col_name};'
             ))
         
         # Dropped columns
         for col_name in old_cols.keys() - new_cols.keys():
-            risk = 'CRITICAL' if table_name in self.analyzer.critical_tables else 'MEDIUM'
+            risk = 'CRITICAL' if self.analyzer.is_critical_table(table_name) else 'MEDIUM'
             changes.append(SchemaChange(
                 change_type='DROP_COLUMN',
                 table_name=table_name,
@@ -239,28 +859,39 @@ class MigrationSurgeon:
                 rollback_sql=self._generate_add_column_sql(table_name, col_name, old_cols[col_name])
             ))
         
-        # Modified columns
+        # Modified columns; differences in spelling alone are not changes
         for col_name in old_cols.keys() & new_cols.keys():
-            if old_cols[col_name] != new_cols[col_name]:
+            if not same_column(old_cols[col_name], new_cols[col_name]):
+                # A difference no action expresses is not a change
+                if not self._generate_modify_column_sql(table_name, col_name, new_cols[col_name], old_cols[col_name]):
+                    continue
+                change_class = classify_column_change(old_cols[col_name], new_cols[col_name])
                 changes.append(SchemaChange(
                     change_type='MODIFY_COLUMN',
                     table_name=table_name,
                     details={
                         'column': col_name,
                         'old_def': old_cols[col_name],
-                        'new_def': new_cols[col_name]
+                        'new_def': new_cols[col_name],
+                        'indexes': tuple(index for index in indexes if col_name in index.columns),
+                        'keys': tuple(key for key in keys if col_name in key[2]),
+                        'primary_key': primary_key,
+                        'change_class': change_class
                     },
-                    risk_level='MEDIUM',
-                    rollback_sql=self._generate_modify_column_sql(table_name, col_name, old_cols[col_name])
+                    risk_level=CHANGE_CLASS_RISK[change_class],
+                    rollback_sql=self._generate_modify_column_sql(
+                        table_name, col_name, old_cols[col_name], new_cols[col_name]
+                    )
                 ))
         
         return changes
     
-    def _analyze_function_changes(self, old_funcs: List, new_funcs: List) -> List[SchemaChange]:
+    @profiled('diff.functions')
+    def _analyze_function_changes(self, old_funcs: List[Function], new_funcs: List[Function]) -> List[SchemaChange]:
         """Analyze function changes"""
         changes = []
-        old_func_names = {f['name'] for f in old_funcs}
-        new_func_names = {f['name'] for f in new_funcs}
+        old_func_names = {f.name for f in old_funcs}
+        new_func_names = {f.name for f in new_funcs}
         
         # New functions
         for func_name in new_func_names - old_func_names:
@@ -287,6 +918,9 @@ class MigrationSurgeon:
             if col_def['default']:
                 col_sql += f' DEFAULT {col_def["default"]}'
             
+            if col_def.get('references'):
+                col_sql += f' REFERENCES {col_def["references"]}'
+            
             columns_sql.append(col_sql)
         
         return f'CREATE TABLE {table_name} ({", ".join(columns_sql)});'
@@ -301,17 +935,89 @@ class MigrationSurgeon:
         if col_def['default']:
             col_sql += f' DEFAULT {col_def["default"]}'
         
+        if col_def.get('references'):
+            col_sql += f' REFERENCES {col_def["references"]}'
+        
         return f'ALTER TABLE {table_name} ADD COLUMN {col_sql};'
     
-    def _generate_modify_column_sql(self, table_name: str, col_name: str, col_def: Dict) -> str:
-        """Generate ALTER COLUMN SQL"""
-        return f'ALTER TABLE {table_name} ALTER COLUMN {col_name} TYPE {col_def["type"]};'
+    def _generate_modify_column_sql(self, table_name: str, col_name: str, col_def: Dict,
+                                    from_def: Optional[Dict] = None) -> str:
+        """Generate ALTER COLUMN SQL taking the column from from_def to col_def.
+        
+        Only what changed gets an action: no TYPE for a respelled type, and
+        SET/DROP DEFAULT, SET/DROP NOT NULL and column constraints in the same
+        statement. Constraints take PostgreSQL's default names; a new foreign
+        key is added NOT VALID and validated by a second statement that only
+        takes a SHARE UPDATE EXCLUSIVE lock. Without from_def the type alone
+        is set; when nothing changed the result is empty.
+        """
+        type_sql = f'ALTER COLUMN {col_name} TYPE {storage_type_sql(col_def["type"])}'
+        if from_def is None:
+            return f'ALTER TABLE {table_name} {type_sql};'
+        
+        actions = []
+        short = short_name(table_name)
+        names = {'PRIMARY KEY': f'{short}_pkey', 'UNIQUE': f'{short}_{col_name}_key'}
+        foreign_key = f'{short}_{col_name}_fkey'
+        # Constraints go before the type changes and come back after, so no index is rebuilt twice
+        for constraint in ('PRIMARY KEY', 'UNIQUE'):
+            if constraint in from_def['constraints'] and constraint not in col_def['constraints']:
+                actions.append(f'DROP CONSTRAINT IF EXISTS {names[constraint]}')
+        if from_def.get('references') and from_def.get('references') != col_def.get('references'):
+            actions.append(f'DROP CONSTRAINT IF EXISTS {foreign_key}')
+        if classify_type_change(from_def['type'], col_def['type']) != NO_CHANGE:
+            actions.append(type_sql)
+        old_default = canonical_default(from_def['default'], from_def['type'])
+        if old_default != canonical_default(col_def['default'], col_def['type']):
+            default_sql = f'SET DEFAULT {col_def["default"]}' if col_def['default'] else 'DROP DEFAULT'
+            actions.append(f'ALTER COLUMN {col_name} {default_sql}')
+        if from_def['nullable'] != col_def['nullable']:
+            actions.append(f'ALTER COLUMN {col_name} {"DROP" if col_def["nullable"] else "SET"} NOT NULL')
+        for constraint in ('PRIMARY KEY', 'UNIQUE'):
+            if constraint in col_def['constraints'] and constraint not in from_def['constraints']:
+                actions.append(f'ADD CONSTRAINT {names[constraint]} {constraint} ({col_name})')
+        
+        validate = None
+        if col_def.get('references') and from_def.get('references') != col_def.get('references'):
+            actions.append(f'ADD CONSTRAINT {foreign_key} FOREIGN KEY ({col_name}) '
+                           f'REFERENCES {col_def["references"]} NOT VALID')
+            validate = f'ALTER TABLE {table_name} VALIDATE CONSTRAINT {foreign_key};'
+        if not actions:
+            return ''
+        sql = f'ALTER TABLE {table_name} {", ".join(actions)};'
+        return f'{sql}\n{validate}' if validate else sql
+    
+    def _generate_create_index_sql(self, table_name: str, index: Index, concurrently: bool = False) -> str:
+        """Generate CREATE INDEX SQL, optionally as a retry-safe concurrent build"""
+        unique_sql = 'UNIQUE ' if index.unique else ''
+        mode_sql = 'CONCURRENTLY IF NOT EXISTS ' if concurrently else ''
+        using_sql = f' USING {index.method}' if index.method != DEFAULT_INDEX_METHOD else ''
+        sql = f'CREATE {unique_sql}INDEX {mode_sql}{index.name} ON {table_name}{using_sql} ({", ".join(index.columns)})'
+        if index.include:
+            sql += f' INCLUDE ({", ".join(index.include)})'
+        if index.predicate:
+            sql += f' WHERE {index.predicate}'
+        return sql + ';'
+    
+    def _generate_drop_index_sql(self, table_name: str, index: Index, concurrently: bool = False) -> str:
+        """Generate DROP INDEX SQL; the index lives in its table's schema"""
+        name = index.name
+        if '.' in table_name and '.' not in name:
+            name = f'{table_name.rsplit(".", 1)[0]}.{name}'
+        return f'DROP INDEX {"CONCURRENTLY " if concurrently else ""}IF EXISTS {name};'
     
     def generate_migration(self, changes: List[SchemaChange], migration_name: str) -> str:
         """Generate complete migration script"""
+        buffer = io.StringIO()
+        self.emit_migration(changes, migration_name, SQLEmitter(buffer))
+        return buffer.getvalue()
+    
+    @profiled('generate.migration')
+    def emit_migration(self, changes: List[SchemaChange], migration_name: str, emitter: SQLEmitter) -> CoalesceSummary:
+        """Stream the migration script to emitter, one block per statement; returns what was coalesced"""
         timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
         
-        migration_sql = f"""-- OncoVista Schema Migration: {migration_name}
+        header = f"""-- OncoVista Schema Migration: {migration_name}
 -- Generated: {datetime.now().isoformat()}
 -- Migration ID: {timestamp}_{migration_name}
 
@@ -323,101 +1029,480 @@ class MigrationSurgeon:
             risk_summary[change.risk_level] = risk_summary.get(change.risk_level, 0) + 1
         
         for risk, count in risk_summary.items():
-            migration_sql += f"\n--   {risk}: {count} changes"
+            header += f"\n--   {risk}: {count} changes"
+        
+        costs = self.cost_estimator.estimate_all(changes) if self.cost_estimator else None
+        if costs:
+            header += "\n-- 📊 Cost Estimate:"
+            for line in self.cost_estimator.summary_lines(costs, changes):
+                header += f"\n--   {line}"
+        
+        # Sort before writing anything so a dependency cycle leaves no partial output behind
+        with self.profiler.phase('sort', statements=len(changes)):
+            graph = self.build_dependency_graph(changes)
+            priority = lambda i: _change_priority(changes[i])
+            order = graph.topological_order(priority)
+            batch_of = {i: n for n, batch in enumerate(graph.batches(priority), 1) for i in batch}
+            # Only real dependencies limit coalescing; the per-table chain merely serializes lock holders
+            dependencies = self.build_dependency_graph(changes, serialize_tables=False)
+            predecessors: Dict[int, List[int]] = {i: [] for i in order}
+            for i in order:
+                for successor in dependencies.successors(i):
+                    predecessors[successor].append(i)
         
-        migration_sql += "\n\n-- Begin Transaction (Surgical Precision)\nBEGIN;\n\n"
+        statements = [self._generate_change_sql(change) for change in changes]
+        groups, summary = self._coalesce_alters(
+            changes, order, statements, predecessors.__getitem__, lambda i: _rewrites_table(changes[i])
+        )
+        if summary.locks_saved:
+            header += f"\n-- 🔗 Coalesced: {summary.describe()}"
         
-        # Sort changes by risk level and dependencies
-        sorted_changes = self._sort_changes_by_risk(changes)
+        emitter.start(header + "\n\n-- Begin Transaction (Surgical Precision)\nBEGIN;\n\n",
+                      "-- Commit Transaction (Patient Stable)\nCOMMIT;\n")
         
-        for i, change in enumerate(sorted_changes, 1):
-            migration_sql += f"-- Operation {i}: {change.change_type} on {change.table_name or 'GLOBAL'}\n"
-            migration_sql += f"-- Risk Level: {change.risk_level}\n"
-            migration_sql += self._generate_change_sql(change)
-            migration_sql += "\n\n"
+        # Archived objects are registered so the rollback and purge scripts can find them
+        policy = archive_policy(changes)
+        if policy:
+            emitter.block(f"-- Archive registry: {policy.registry}\n{policy.registry_sql()}\n\n", statements=2)
         
-        migration_sql += "-- Commit Transaction (Patient Stable)\nCOMMIT;\n"
+        # Batch numbers mark operations a runner may parallelize
+        number = 0
+        for group in groups:
+            lines = []
+            for index in group:
+                number += 1
+                change = changes[index]
+                lines.append(f"-- Operation {number}: {change.change_type} on {change.table_name or 'GLOBAL'} "
+                             f"(batch {batch_of[index]})")
+                lines.append(f"-- Risk Level: {change.risk_level}")
+                if 'change_class' in change.details:
+                    lines.append(f"-- Change Class: {CHANGE_CLASS_NOTES[change.details['change_class']]}")
+                if costs:
+                    lines.append(f"-- Cost: [{costs[index].level}] {costs[index].describe()}")
+            lines.append(_group_sql(changes, statements, group))
+            emitter.block("\n".join(lines) + "\n\n")
         
-        return migration_sql
+        emitter.finish()
+        return summary
+    
+    def generate_online_migration(self, changes: List[SchemaChange], migration_name: str,
+                                  lock_timeout: str = DEFAULT_LOCK_TIMEOUT,
+                                  backfill: Optional[BackfillGenerator] = None,
+                                  backfill_expressions: Optional[Dict[str, str]] = None) -> str:
+        """Generate a zero-downtime migration split into lock-annotated expand, online and contract phases"""
+        buffer = io.StringIO()
+        self.emit_online_migration(changes, migration_name, SQLEmitter(buffer), lock_timeout,
+                                   backfill, backfill_expressions)
+        return buffer.getvalue()
+    
+    @profiled('generate.online')
+    def emit_online_migration(self, changes: List[SchemaChange], migration_name: str, emitter: SQLEmitter,
+                              lock_timeout: str = DEFAULT_LOCK_TIMEOUT,
+                              backfill: Optional[BackfillGenerator] = None,
+                              backfill_expressions: Optional[Dict[str, str]] = None):
+        """Stream a zero-downtime migration to emitter, one block per phase"""
+        planner = OnlineMigrationPlanner(self, lock_timeout, backfill, backfill_expressions)
+        planner.emit(planner.plan(changes), migration_name, emitter)
+    
+    @profiled('generate.backfill')
+    def generate_backfill_script(self, changes: List[SchemaChange], migration_name: str,
+                                 backfill_expressions: Optional[Dict[str, str]] = None,
+                                 backfill: Optional[BackfillGenerator] = None) -> Optional[str]:
+        """Generate a resumable batched backfill script for new columns with derived values, if any"""
+        jobs = detect_backfills(self._sort_changes_by_risk(changes), backfill_expressions)
+        if not jobs:
+            return None
+        return (backfill or BackfillGenerator()).render_script(jobs, migration_name)
+    
+    @profiled('cost')
+    def split_by_cost(self, changes: List[SchemaChange],
+                      max_lock_seconds: float) -> Tuple[List[SchemaChange], List[SchemaChange]]:
+        """Split changes into those safe to deploy now and expensive ones (plus dependents) to defer"""
+        if not self.cost_estimator:
+            return list(changes), []
+        
+        graph = self.build_dependency_graph(changes, serialize_tables=False)
+        costs = self.cost_estimator.estimate_all(changes)
+        pending = [i for i, cost in enumerate(costs) if cost.lock_seconds > max_lock_seconds]
+        deferred = set(pending)
+        while pending:
+            for successor in graph.successors(pending.pop()):
+                if successor not in deferred:
+                    deferred.add(successor)
+                    pending.append(successor)
+        
+        return ([change for i, change in enumerate(changes) if i not in deferred],
+                [change for i, change in enumerate(changes) if i in deferred])
     
     def _sort_changes_by_risk(self, changes: List[SchemaChange]) -> List[SchemaChange]:
         """Sort changes by risk level and dependencies"""
-        risk_order = {'LOW': 1, 'MEDIUM': 2, 'HIGH': 3, 'CRITICAL': 4}
-        
-        # First, group by operation type for dependency ordering
-        operation_order = {
-            'ADD_TABLE': 1,
-            'ADD_COLUMN': 2,
-            'MODIFY_COLUMN': 3,
-            'ADD_FUNCTION': 4,
-            'DROP_COLUMN': 5,
-            'DROP_TABLE': 6
-        }
+        with self.profiler.phase('sort', statements=len(changes)):
+            graph = self.build_dependency_graph(changes)
+            return [changes[i] for i in graph.topological_order(lambda i: _change_priority(changes[i]))]
+    
+    @profiled('sort')
+    def plan_batches(self, changes: List[SchemaChange]) -> List[List[SchemaChange]]:
+        """Group changes into ordered batches whose members can run in parallel"""
+        graph = self.build_dependency_graph(changes)
+        return [
+            [changes[i] for i in batch]
+            for batch in graph.batches(lambda i: _change_priority(changes[i]))
+        ]
+    
+    def build_dependency_graph(self, changes: List[SchemaChange], serialize_tables: bool = True) -> DependencyGraph:
+        """Build a graph over change indices from foreign keys, functions and (optionally) shared tables"""
+        graph = DependencyGraph()
+        added_tables: Dict[str, int] = {}
+        dropped_tables: Dict[str, int] = {}
+        added_functions: Dict[str, int] = {}
+        by_table: Dict[str, List[int]] = {}
+        
+        for i, change in enumerate(changes):
+            graph.add_node(i)
+            table_key = _table_key(change.table_name) if change.table_name else None
+            if change.change_type in ('ADD_TABLE', 'RENAME_TABLE'):
+                added_tables[table_key] = i
+            elif change.change_type in ('DROP_TABLE', 'ARCHIVE_TABLE'):
+                dropped_tables[table_key] = i
+            elif change.change_type == 'ADD_FUNCTION':
+                added_functions[_table_key(change.details['function'])] = i
+            if table_key:
+                by_table.setdefault(table_key, []).append(i)
         
-        return sorted(changes, key=lambda x: (operation_order.get(x.change_type, 999), risk_order.get(x.risk_level, 999)))
+        # Operations on one table contend for its lock, so they run one after another
+        for indexes in by_table.values() if serialize_tables else ():
+            indexes.sort(key=lambda i: _change_priority(changes[i]))
+            for before, after in zip(indexes, indexes[1:]):
+                graph.add_edge(before, after)
+        
+        for i, change in enumerate(changes):
+            created, removed = _change_definitions(change)
+            # New foreign keys need their parent table to exist first
+            for table_def, column_defs in created:
+                for target in _foreign_key_targets(table_def, column_defs):
+                    if target in added_tables:
+                        graph.add_edge(added_tables[target], i)
+                for function in _called_functions(column_defs):
+                    if function in added_functions:
+                        graph.add_edge(added_functions[function], i)
+            # Dropped foreign keys must be gone before their parent table is dropped
+            for table_def, column_defs in removed:
+                for target in _foreign_key_targets(table_def, column_defs):
+                    if target in dropped_tables:
+                        graph.add_edge(i, dropped_tables[target])
+            # Table-bound objects (triggers) that call a new function run after it
+            function = change.details.get('function')
+            if change.table_name and function and _table_key(function) in added_functions:
+                graph.add_edge(added_functions[_table_key(function)], i)
+        
+        return graph
     
     def _generate_change_sql(self, change: SchemaChange) -> str:
         """Generate SQL for a specific change"""
         if change.change_type == 'ADD_TABLE':
             return self._generate_create_table_sql(change.table_name, change.details['table_def'])
         elif change.change_type == 'ADD_COLUMN':
+            definition = change.details['definition']
+            if change.details.get('backfill'):
+                # Existing rows are left NULL for the backfill script (see backfill.mark_backfilled)
+                sql = self._generate_add_column_sql(
+                    change.table_name, change.details['column'], replace(definition, nullable=True, default=None)
+                )
+                if definition['default']:
+                    sql += (f"\nALTER TABLE {change.table_name} ALTER COLUMN {change.details['column']} "
+                            f"SET DEFAULT {definition['default']};")
+                return sql
             return self._generate_add_column_sql(
                 change.table_name, 
                 change.details['column'], 
-                change.details['definition']
+                definition
             )
         elif change.change_type == 'DROP_TABLE':
             return f'DROP TABLE IF EXISTS {change.table_name};'
         elif change.change_type == 'DROP_COLUMN':
             return f'ALTER TABLE {change.table_name} DROP COLUMN {change.details["column"]};'
+        elif change.change_type in ('ARCHIVE_TABLE', 'ARCHIVE_COLUMN'):
+            return change.details['archive'].archive_sql()
+        elif change.change_type == 'ADD_INDEX':
+            return self._generate_create_index_sql(change.table_name, change.details['index'])
+        elif change.change_type == 'DROP_INDEX':
+            return self._generate_drop_index_sql(change.table_name, change.details['index'])
+        elif change.change_type == 'RENAME_TABLE':
+            return f'ALTER TABLE {change.details["old_name"]} RENAME TO {short_name(change.table_name)};'
+        elif change.change_type == 'RENAME_COLUMN':
+            return (f'ALTER TABLE {change.table_name} RENAME COLUMN {change.details["old_column"]} '
+                    f'TO {change.details["column"]};')
         elif change.change_type == 'MODIFY_COLUMN':
             return self._generate_modify_column_sql(
                 change.table_name,
                 change.details['column'],
-                change.details['new_def']
+                change.details['new_def'],
+                change.details['old_def']
             )
         else:
             return f'-- TODO: Implement {change.change_type} operation'
     
     def generate_rollback_script(self, changes: List[SchemaChange]) -> str:
         """Generate rollback script for emergency recovery"""
-        rollback_sql = f"""-- OncoVista Emergency Rollback Script
+        buffer = io.StringIO()
+        self.emit_rollback_script(changes, SQLEmitter(buffer))
+        return buffer.getvalue()
+    
+    @profiled('generate.rollback')
+    def emit_rollback_script(self, changes: List[SchemaChange], emitter: SQLEmitter) -> CoalesceSummary:
+        """Stream the rollback script to emitter, one block per statement; returns what was coalesced"""
+        # Undo in reverse dependency order so children go before their parents
+        with self.profiler.phase('sort', statements=len(changes)):
+            graph = self.build_dependency_graph(changes)
+            order = list(reversed(graph.topological_order(lambda i: _change_priority(changes[i]))))
+            dependencies = self.build_dependency_graph(changes, serialize_tables=False)
+        
+        statements = [change.rollback_sql for change in changes]
+        groups, summary = self._coalesce_alters(
+            changes, order, statements, dependencies.successors, lambda i: _rewrites_table(changes[i], undo=True)
+        )
+        coalesced = f"-- 🔗 Coalesced: {summary.describe()}\n" if summary.locks_saved else ''
+        
+        emitter.start(f"""-- OncoVista Emergency Rollback Script
 -- Generated: {datetime.now().isoformat()}
 -- 🚨 EMERGENCY USE ONLY - Reverts schema changes
-
+{coalesced}
 -- Begin Emergency Transaction
 BEGIN;
 
-"""
+""", "-- Commit Rollback (Patient Stabilized)\nCOMMIT;\n")
+        
+        for group in groups:
+            lines = [f"-- Rollback: {changes[index].change_type} on {changes[index].table_name}" for index in group]
+            lines.append(_group_sql(changes, statements, group))
+            emitter.block("\n".join(lines) + "\n\n")
         
-        # Reverse the order for rollback
-        for change in reversed(changes):
-            rollback_sql += f"-- Rollback: {change.change_type} on {change.table_name}\n"
-            rollback_sql += change.rollback_sql + "\n\n"
+        emitter.finish()
+        return summary
+    
+    def _coalesce_alters(self, changes: List[SchemaChange], order: List[int], statements: List[str],
+                         prerequisites: Callable[[int], Iterable[int]],
+                         rewrites: Callable[[int], bool]) -> Tuple[List[List[int]], CoalesceSummary]:
+        """Group operations, in order, into the statements that will run them.
+        
+        A column change joins its table's latest ALTER TABLE group when all
+        it depends on already runs at or before that group, so PostgreSQL
+        takes the table lock once and rewrites the table at most once for
+        the whole statement instead of once per operation.
+        """
+        groups: List[List[int]] = []
+        group_of: Dict[int, int] = {}
+        alter_groups: Dict[str, int] = {}
+        coalescible: Set[int] = set()
         
-        rollback_sql += "-- Commit Rollback (Patient Stabilized)\nCOMMIT;\n"
+        for index in order:
+            change = changes[index]
+            action = _alter_action(change, statements[index]) if self.coalesce_alters else None
+            target = alter_groups.get(change.table_name) if action is not None else None
+            if target is None or any(group_of[before] > target for before in prerequisites(index)):
+                target = len(groups)
+                groups.append([])
+                if action is not None:
+                    alter_groups[change.table_name] = target
+                    coalescible.add(target)
+            groups[target].append(index)
+            group_of[index] = target
         
-        return rollback_sql
+        summary = CoalesceSummary()
+        for number in coalescible:
+            summary.operations += len(groups[number])
+            summary.statements += 1
+            summary.rewrites_saved += max(0, sum(1 for index in groups[number] if rewrites(index)) - 1)
+        return groups, summary
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(
+        prog='migration_generator.py',
+        description='Generate migration and rollback scripts from two schema versions'
+    )
+    parser.add_argument('old_schema', help='Old schema SQL file, or a postgresql:// URL (optional ?schema=NAME) to introspect')
+    parser.add_argument('new_schema', help='New schema SQL file, or a postgresql:// URL (optional ?schema=NAME) to introspect')
+    parser.add_argument('migration_name', help='Name used for the generated migration files')
+    parser.add_argument('--stream', action='store_true',
+                        help='Read schema files statement by statement with bounded memory (for full pg_dump output)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Parse both schemas from scratch without reading or writing the schema DNA cache')
+    parser.add_argument('--clear-cache', action='store_true',
+                        help='Empty the schema DNA cache before analyzing')
+    parser.add_argument('--cache-dir', default=None,
+                        help='Schema DNA cache directory (default: $ONCOVISTA_SCHEMA_CACHE or ~/.cache/oncovista/schema_dna)')
+    parser.add_argument('--lazy', action='store_true',
+                        help='Fingerprint tables first and parse only those that differ (bypasses the DNA cache; '
+                             'best for large, mostly unchanged schemas)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Parse schemas in a pool of this many processes, sharding large files (default: 1)')
+    parser.add_argument('--online', action='store_true',
+                        help='Emit a zero-downtime plan: low-lock expand, non-transactional online and contract phases')
+    parser.add_argument('--lock-timeout', default=DEFAULT_LOCK_TIMEOUT,
+                        help=f'lock_timeout for the transactional phases of --online plans (default: {DEFAULT_LOCK_TIMEOUT})')
+    parser.add_argument('--backfill', action='append', default=[], metavar='TABLE.COLUMN=EXPR',
+                        help='Fill a new column from existing data with EXPR in resumable batches (repeatable)')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f'Rows per backfill batch (default: {DEFAULT_BATCH_SIZE})')
+    parser.add_argument('--batch-sleep', type=float, default=DEFAULT_BATCH_SLEEP,
+                        help=f'Seconds to pause between backfill batches (default: {DEFAULT_BATCH_SLEEP})')
+    parser.add_argument('--stats', metavar='FILE', default=None,
+                        help='Table statistics snapshot (JSON, see cost_estimator.py --export-query) for cost estimates')
+    parser.add_argument('--max-lock-seconds', type=float, default=None,
+                        help='With --stats, move operations estimated to hold locks longer than this (and their '
+                             'dependents) into a separate *_deferred migration')
+    parser.add_argument('--split-statements', type=int, default=None, metavar='N',
+                        help='Split the migration and rollback into numbered part files of at most N statements, '
+                             'each in its own transaction, with a .parts.json manifest')
+    parser.add_argument('--split-bytes', type=parse_size, default=None, metavar='SIZE',
+                        help='Split into part files of at most SIZE bytes (e.g. 512K, 8M); combines with '
+                             '--split-statements')
+    parser.add_argument('--replay-migrations', metavar='DIR', default=None,
+                        help='Treat old_schema as a baseline, replay the migrations in DIR on top of it '
+                             '(checkpointed per file) and diff the result against new_schema')
+    parser.add_argument('--detect-renames', action='store_true',
+                        help='Emit dropped tables and columns that match an added one as RENAME_TABLE/RENAME_COLUMN, '
+                             'keeping their data')
+    parser.add_argument('--rename-threshold', type=float, default=DEFAULT_RENAME_THRESHOLD,
+                        help=f'Minimum confidence (0-1) for a detected rename (default: {DEFAULT_RENAME_THRESHOLD})')
+    parser.add_argument('--rename', action='append', default=[], metavar='OLD=NEW',
+                        help='Force a rename of a table (OLD=NEW) or column (TABLE.OLD=NEW) whatever its score; '
+                             'implies --detect-renames (repeatable)')
+    parser.add_argument('--no-rename', action='append', default=[], metavar='NAME',
+                        help='Never treat this table (or TABLE.COLUMN) as renamed; implies --detect-renames (repeatable)')
+    parser.add_argument('--no-coalesce', action='store_true',
+                        help='Emit one ALTER TABLE per column operation instead of merging those on the same table')
+    parser.add_argument('--archive-drops', action='store_true',
+                        help='Rename dropped tables and columns into an archive instead of dropping them, so the '
+                             'rollback restores their data; a _PURGE script drops them after the retention window')
+    parser.add_argument('--archive-schema', default=DEFAULT_ARCHIVE_SCHEMA,
+                        help=f'Schema holding archived tables and the archive registry '
+                             f'(default: {DEFAULT_ARCHIVE_SCHEMA})')
+    parser.add_argument('--retention-days', type=int, default=DEFAULT_RETENTION_DAYS,
+                        help=f'Days archived objects are kept before the purge script may run '
+                             f'(default: {DEFAULT_RETENTION_DAYS})')
+    parser.add_argument('--profile', metavar='FILE', default=None,
+                        help='Record wall time, calls, bytes, statements and peak memory per phase and write '
+                             'them to FILE as JSON')
+    parser.add_argument('--profile-trace', metavar='FILE', default=None,
+                        help='Also write the phases as a Chrome trace (open in chrome://tracing or Perfetto)')
+    parser.add_argument('--profile-no-memory', action='store_true',
+                        help='Skip peak memory tracking while profiling, which otherwise slows parsing')
+    return parser.parse_args(argv)
+
+def parse_backfill_expressions(items: List[str]) -> Dict[str, str]:
+    """Parse repeated TABLE.COLUMN=EXPR options"""
+    expressions = {}
+    for item in items:
+        target, separator, expression = item.partition('=')
+        if not separator or '.' not in target or not expression.strip():
+            raise ValueError(f"invalid --backfill '{item}': expected TABLE.COLUMN=EXPR")
+        expressions[target.strip()] = expression.strip()
+    return expressions
 
 def main():
     """Main execution function"""
-    if len(sys.argv) != 4:
-        print("Usage: migration_generator.py <old_schema.sql> <new_schema.sql> <migration_name>")
+    args = parse_args(sys.argv[1:])
+    
+    try:
+        backfill = BackfillGenerator(args.batch_size, args.batch_sleep)
+        backfill_expressions = parse_backfill_expressions(args.backfill)
+        if args.split_statements is not None and args.split_statements < 1:
+            raise ValueError('--split-statements must be at least 1')
+        if args.split_bytes is not None and args.split_bytes < 1:
+            raise ValueError('--split-bytes must be at least 1 byte')
+        rename_detector = None
+        if args.detect_renames or args.rename or args.no_rename:
+            rename_detector = RenameDetector(args.rename_threshold, RenameOverrides.parse(args.rename, args.no_rename))
+        archive_policy = ArchivePolicy(args.archive_schema, args.retention_days) if args.archive_drops else None
+    except ValueError as e:
+        print(f"❌ {e}")
         sys.exit(1)
     
-    old_schema_file = sys.argv[1]
-    new_schema_file = sys.argv[2]
-    migration_name = sys.argv[3]
+    profiler = None
+    if args.profile or args.profile_trace:
+        profiler = PhaseProfiler(track_memory=not args.profile_no_memory)
+    
+    cost_estimator = None
+    if args.stats:
+        try:
+            cost_estimator = CostEstimator.from_file(args.stats)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"❌ Cannot load table statistics from {args.stats}: {e}")
+            sys.exit(1)
+    
+    surgeon = MigrationSurgeon(streaming=args.stream, cache_dir=args.cache_dir, workers=args.workers,
+                               lazy=args.lazy, profiler=profiler, coalesce_alters=not args.no_coalesce,
+                               rename_detector=rename_detector, archive_schema=args.archive_schema,
+                               cost_estimator=cost_estimator)
+    
+    if profiler is None:
+        generate(args, surgeon, backfill, backfill_expressions, archive_policy)
+        return
+    
+    # Written even when generation stops early, so slow failing runs can be profiled too
+    try:
+        with profiler:
+            generate(args, surgeon, backfill, backfill_expressions, archive_policy)
+    finally:
+        write_profile(profiler, args.profile, args.profile_trace)
+
+def write_profile(profiler: PhaseProfiler, json_file: Optional[str], trace_file: Optional[str]):
+    """Print the phase summary and write the requested profile files"""
+    print("\n⏱️  Phase profile:")
+    for line in profiler.summary_lines():
+        print(f"   {line}")
+    if json_file:
+        profiler.write_json(json_file)
+        print(f"📈 Profile saved: {json_file}")
+    if trace_file:
+        profiler.write_chrome_trace(trace_file)
+        print(f"📈 Chrome trace saved: {trace_file}")
+
+def _rename_note(change: SchemaChange) -> str:
+    """Old name and confidence of a detected rename, for review"""
+    if change.change_type not in ('RENAME_TABLE', 'RENAME_COLUMN'):
+        return ''
+    old = change.details.get('old_name') or change.details['old_column']
+    decision = 'forced' if change.details['forced'] else f"confidence {change.details['confidence']:.0%}"
+    return f" (from {old}, {decision})"
+
+def generate(args: argparse.Namespace, surgeon: MigrationSurgeon, backfill: BackfillGenerator,
+             backfill_expressions: Dict[str, str], archive_policy: Optional[ArchivePolicy] = None):
+    """Diagnose the schema changes and write the migration, backfill, rollback and purge scripts"""
+    old_schema_file = args.old_schema
+    new_schema_file = args.new_schema
+    migration_name = args.migration_name
     
-    surgeon = MigrationSurgeon()
+    if args.clear_cache:
+        print(f"🧹 Cleared {surgeon.clear_cache()} cached schema DNA entries")
     
     print("🔬 Analyzing schema DNA...")
-    changes = surgeon.diagnose_changes(old_schema_file, new_schema_file)
+    try:
+        if args.replay_migrations:
+            changes, report = surgeon.diagnose_replayed(
+                old_schema_file, args.replay_migrations, new_schema_file, use_cache=not args.no_cache
+            )
+            print(f"🔁 Replayed {len(report['replayed'])} migrations "
+                  f"({len(report['restored'])} restored from checkpoints)")
+        else:
+            changes = surgeon.diagnose_changes(old_schema_file, new_schema_file, use_cache=not args.no_cache)
+    except IntrospectionError as e:
+        print(f"❌ Cannot introspect database: {e}")
+        sys.exit(1)
     
     if not changes:
         print("✅ No schema mutations detected. Patient is stable.")
         return
     
+    # The timestamp doubles as the migration id archived objects are registered under
+    timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
+    if archive_policy:
+        changes = archive_changes(changes, archive_policy, timestamp)
+    if backfill_expressions and not args.online:
+        changes = mark_backfilled(changes, backfill_expressions)
+    
     print(f"🧬 Detected {len(changes)} schema mutations:")
     for change in changes:
         risk_emoji = {
@@ -426,30 +1511,85 @@ def main():
             'HIGH': '🟠',
             'CRITICAL': '🔴'
         }
-        print(f"  {risk_emoji.get(change.risk_level, '⚪')} {change.change_type} on {change.table_name} [{change.risk_level}]")
+        print(f"  {risk_emoji.get(change.risk_level, '⚪')} {change.change_type} on {change.table_name} [{change.risk_level}]"
+              + _rename_note(change))
     
-    print("\n💉 Generating migration script...")
-    migration_sql = surgeon.generate_migration(changes, migration_name)
+    deferred = []
+    if args.max_lock_seconds is not None:
+        migration_changes, deferred = surgeon.split_by_cost(changes, args.max_lock_seconds)
+    else:
+        migration_changes = changes
     
-    # Write migration file
-    timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-    migration_file = f"migrations/{timestamp}_{migration_name}.sql"
+    print("\n💉 Generating migration script...")
     Path("migrations").mkdir(exist_ok=True)
+    split = args.split_statements is not None or args.split_bytes is not None
     
-    with open(migration_file, 'w') as f:
-        f.write(migration_sql)
+    def save_script(emit, stem: str, suffix: str = '') -> str:
+        """Part files when splitting, otherwise one streamed file"""
+        path = write_script(Path('migrations') / f'{stem}{suffix}.sql', emit, suffix,
+                            args.split_statements, args.split_bytes)
+        if split:
+            with open(path) as f:
+                parts = json.load(f)['parts']
+            print(f"   📦 {len(parts)} parts, {sum(part['statements'] for part in parts)} statements "
+                  f"(manifest: {path})")
+        return path
+    
+    stem = f"{timestamp}_{migration_name}"
+    coalesced = []
+    try:
+        if args.online:
+            migration_file = save_script(lambda emitter: surgeon.emit_online_migration(
+                migration_changes, migration_name, emitter, args.lock_timeout, backfill, backfill_expressions
+            ), stem)
+        else:
+            migration_file = save_script(
+                lambda emitter: coalesced.append(surgeon.emit_migration(migration_changes, migration_name, emitter)),
+                stem
+            )
+        if deferred:
+            deferred_file = save_script(
+                lambda emitter: surgeon.emit_migration(deferred, f'{migration_name}{DEFERRED_SUFFIX}', emitter),
+                f"{stem}{DEFERRED_SUFFIX}"
+            )
+    except DependencyCycleError as e:
+        print(f"❌ Cannot order operations: {e}")
+        print("   Break the cycle by adding one foreign key in a follow-up migration.")
+        sys.exit(1)
     
     print(f"✅ Migration script saved: {migration_file}")
+    if coalesced and coalesced[0].locks_saved:
+        print(f"🔗 Coalesced {coalesced[0].describe()}")
     
-    # Generate rollback script
-    print("\n🩹 Generating rollback script...")
-    rollback_sql = surgeon.generate_rollback_script(changes)
-    rollback_file = f"migrations/{timestamp}_{migration_name}_ROLLBACK.sql"
+    if deferred:
+        print(f"⏳ {len(deferred)} expensive operations deferred to {deferred_file} "
+              f"(estimated locks over {args.max_lock_seconds}s; schedule for a maintenance window)")
     
-    with open(rollback_file, 'w') as f:
-        f.write(rollback_sql)
+    if not args.online:
+        backfill_sql = surgeon.generate_backfill_script(changes, migration_name, backfill_expressions, backfill)
+        if backfill_sql:
+            backfill_file = f"migrations/{stem}{BACKFILL_SUFFIX}.sql"
+            with open(backfill_file, 'w') as f:
+                f.write(backfill_sql)
+            print(f"🐢 Backfill script saved: {backfill_file} (run after the migration; resumable)")
+    
+    # Generate rollback script; the suffix stays last so replay skips every part
+    print("\n🩹 Generating rollback script...")
+    rollback_file = save_script(
+        lambda emitter: coalesced.append(surgeon.emit_rollback_script(changes, emitter)), stem, ROLLBACK_SUFFIX
+    )
     
     print(f"✅ Rollback script saved: {rollback_file}")
+    if coalesced[-1].locks_saved:
+        print(f"🔗 Coalesced {coalesced[-1].describe()}")
+    
+    purge_sql = render_purge_script(changes, migration_name)
+    if purge_sql:
+        purge_file = f"migrations/{stem}{PURGE_SUFFIX}.sql"
+        with open(purge_file, 'w') as f:
+            f.write(purge_sql)
+        print(f"🗄️  Purge script saved: {purge_file} "
+              f"(run after {archive_policy.retention_days} days; refuses to run earlier)")
     
     # Risk assessment
     critical_changes = [c for c in changes if c.risk_level == 'CRITICAL']
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+OncoVista Migration Squash
+Collapses a chain of migrations into one verified minimal migration and its rollback
+"""
+
+import argparse
+import os
+import sys
+from dataclasses import dataclass, field, replace
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Iterable, List, Optional, Set, Tuple
+
+from catalog_introspection import IntrospectionError
+from ddl_lexer import split_statements
+from dependency_graph import DependencyCycleError
+from migration_generator import MigrationSurgeon, SchemaChange
+from schema_model import Function, SchemaModel, Table
+from schema_replay import SchemaReplayer, list_migration_files
+from sql_emitter import ROLLBACK_SUFFIX, write_script
+
+# Change types the squasher can apply, undo and re-derive
+SQUASHABLE_CHANGES = {
+    'ADD_TABLE', 'DROP_TABLE', 'ADD_COLUMN', 'DROP_COLUMN', 'MODIFY_COLUMN', 'ADD_INDEX', 'DROP_INDEX', 'ADD_FUNCTION'
+}
+DEFAULT_SQUASH_NAME = 'squashed'
+
+@dataclass
+class SquashResult:
+    """Net changes of a migration chain and the outcome of verifying them"""
+    changes: List[SchemaChange]
+    original_operations: int
+    migrations: int
+    mismatches: List[str] = field(default_factory=list)
+
+    @property
+    def verified(self) -> bool:
+        return not self.mismatches
+
+class MigrationSquasher:
+    """Reduces an ordered chain of change lists to the minimal equivalent change set.
+
+    Every object the chain touches gets a pre-image, read from the first
+    change that touches it (a DROP_COLUMN carries the column's old
+    definition, an ADD_TABLE means the table did not exist, and a dropped
+    table's full starting definition is recovered by undoing the changes
+    before the drop). The chain is applied to the pre-image and the result
+    diffed against it with the surgeon's own analysis, so an add followed
+    by a drop cancels out and successive modifications merge into one.
+
+    A table that is dropped and created again comes out as column-level
+    changes: the schema DNA is the same, but unlike the original chain
+    the squashed migration keeps the table's rows.
+    """
+
+    def __init__(self, surgeon: Optional[MigrationSurgeon] = None):
+        self.surgeon = surgeon or MigrationSurgeon()
+
+    def squash(self, change_lists: Iterable[List[SchemaChange]]) -> SquashResult:
+        """Squash change lists given in apply order and verify the result"""
+        change_lists = list(change_lists)
+        changes = [change for changes in change_lists for change in changes]
+        pre = infer_pre_image(changes)
+        post = apply_changes(copy_model(pre), changes)
+
+        net = self.surgeon._analyze_table_changes(pre.tables, post.tables)
+        net.extend(self.surgeon._analyze_function_changes(pre.functions, post.functions))
+
+        # Pre-images only know the columns the chain touched, so keep the primary key the chain recorded
+        primary_keys = {
+            change.table_name: change.details['primary_key']
+            for change in changes if change.details.get('primary_key') is not None
+        }
+        for change in net:
+            if 'primary_key' in change.details and change.details['primary_key'] is None:
+                change.details['primary_key'] = primary_keys.get(change.table_name)
+
+        result = SquashResult(net, len(changes), len(change_lists))
+        result.mismatches = compare_dna(post, apply_changes(copy_model(pre), net))
+        return result
+
+    def squash_files(self, migration_files: List[str], baseline: Optional[str] = None) -> SquashResult:
+        """Squash migration files replayed on top of baseline (an empty schema if omitted).
+
+        Each file becomes the change list between the schema states before
+        and after replaying it. Besides the usual check, the net changes
+        applied to the baseline must give the same tables as replaying
+        every file.
+        """
+        analyzer = self.surgeon.analyzer
+        start = analyzer.extract_schema_model(baseline) if baseline else SchemaModel()
+        replayer = SchemaReplayer(analyzer)
+
+        state = copy_model(start)
+        change_lists = []
+        for path in migration_files:
+            # Replay mutates tables in place, so earlier states (and their changes) keep their own copies
+            previous, state = state, copy_model(state)
+            with open(path) as f:
+                replayer.apply_statements(state, split_statements(f.read()))
+            change_lists.append(self.surgeon.compare_models(previous, state))
+
+        result = self.squash(change_lists)
+        squashed = apply_changes(copy_model(start), result.changes)
+        result.mismatches.extend(
+            f'replayed migrations: {mismatch}'
+            for mismatch in compare_dna(state, squashed, include_functions=False)
+        )
+        return result
+
+def infer_pre_image(changes: List[SchemaChange]) -> SchemaModel:
+    """The part of the starting schema that the changes touch"""
+    pre = SchemaModel()
+    complete: Set[str] = set()
+    seen: Set[Tuple[Any, ...]] = set()
+
+    for position, change in enumerate(changes):
+        kind, table_name, details = change.change_type, change.table_name, change.details
+        if kind not in SQUASHABLE_CHANGES:
+            raise ValueError(f'cannot squash {kind} changes')
+        if kind == 'ADD_FUNCTION' or table_name in complete:
+            continue
+
+        if kind in ('ADD_TABLE', 'DROP_TABLE'):
+            complete.add(table_name)
+            if kind == 'DROP_TABLE':
+                # Undo everything the chain did to the table before dropping it
+                table = copy_table(details['table_def'])
+                pre.tables[table_name] = table
+                earlier = [c for c in changes[:position] if c.table_name == table_name]
+                apply_changes(pre, reversed(earlier), reverse=True)
+            continue
+
+        table = pre.tables.setdefault(table_name, Table(name=table_name, columns={}))
+        if kind.endswith('_INDEX'):
+            key = ('index', table_name, details['index'].name)
+            if key not in seen and kind == 'DROP_INDEX':
+                table.indexes += (details['index'],)
+        else:
+            key = ('column', table_name, details['column'])
+            if key not in seen and kind != 'ADD_COLUMN':
+                table.columns[details['column']] = details['definition' if kind == 'DROP_COLUMN' else 'old_def']
+        seen.add(key)
+
+    return pre
+
+def apply_changes(model: SchemaModel, changes: Iterable[SchemaChange], reverse: bool = False) -> SchemaModel:
+    """Apply (or undo) changes to a model in place and return it"""
+    for change in changes:
+        apply_change(model, change, reverse)
+    return model
+
+def apply_change(model: SchemaModel, change: SchemaChange, reverse: bool = False):
+    """Apply one change to the model's tables and functions, or undo it"""
+    kind, table_name, details = change.change_type, change.table_name, change.details
+    if kind not in SQUASHABLE_CHANGES:
+        raise ValueError(f'cannot squash {kind} changes')
+
+    if kind == 'ADD_FUNCTION':
+        name = details['function']
+        if reverse:
+            model.functions = [function for function in model.functions if function.name != name]
+        elif all(function.name != name for function in model.functions):
+            model.functions.append(Function(name=name, parameters=''))
+        return
+
+    if kind in ('ADD_TABLE', 'DROP_TABLE'):
+        if (kind == 'ADD_TABLE') != reverse:
+            table = copy_table(details['table_def'])
+            if kind == 'ADD_TABLE':
+                # A new table's indexes arrive as their own ADD_INDEX changes
+                table.indexes = ()
+            model.tables[table_name] = table
+        else:
+            model.tables.pop(table_name, None)
+        return
+
+    table = model.tables.get(table_name)
+    if table is None:
+        return
+    if kind == 'MODIFY_COLUMN':
+        table.columns[details['column']] = details['old_def' if reverse else 'new_def']
+    elif kind in ('ADD_COLUMN', 'DROP_COLUMN'):
+        if (kind == 'ADD_COLUMN') != reverse:
+            table.columns[details['column']] = details['definition']
+        else:
+            table.columns.pop(details['column'], None)
+    else:
+        index = details['index']
+        remaining = tuple(existing for existing in table.indexes if existing.name != index.name)
+        table.indexes = remaining + (index,) if (kind == 'ADD_INDEX') != reverse else remaining
+
+def copy_table(table: Table) -> Table:
+    return replace(table, columns=dict(table.columns))
+
+def copy_model(model: SchemaModel) -> SchemaModel:
+    """Copy whose tables can be changed without touching the original"""
+    return SchemaModel(
+        tables={name: copy_table(table) for name, table in model.tables.items()},
+        functions=list(model.functions),
+        triggers=list(model.triggers),
+        types=list(model.types)
+    )
+
+def compare_dna(expected: SchemaModel, actual: SchemaModel, include_functions: bool = True) -> List[str]:
+    """Differences in tables, columns, constraints, indexes and (optionally) function names"""
+    mismatches = []
+    for name in sorted(expected.tables.keys() | actual.tables.keys()):
+        want, got = expected.tables.get(name), actual.tables.get(name)
+        if want is None or got is None:
+            mismatches.append(f'table {name} {"should not exist" if want is None else "is missing"}')
+            continue
+        for column in sorted(want.columns.keys() | got.columns.keys()):
+            if want.columns.get(column) != got.columns.get(column):
+                mismatches.append(f'column {name}.{column} differs')
+        if set(want.constraints) != set(got.constraints):
+            mismatches.append(f'constraints of {name} differ')
+        if set(want.indexes) != set(got.indexes):
+            mismatches.append(f'indexes of {name} differ')
+    if include_functions:
+        names = lambda model: {function.name for function in model.functions}
+        for function in sorted(names(expected) ^ names(actual)):
+            mismatches.append(f'function {function} differs')
+    return mismatches
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(
+        prog='migration_squash.py',
+        description='Collapse a chain of migrations into one minimal, verified migration and its rollback'
+    )
+    parser.add_argument('migrations', nargs='+',
+                        help='A migrations directory (files in name order, rollbacks skipped) or files in apply order')
+    parser.add_argument('--baseline', default=None,
+                        help='Schema the migrations apply to (SQL file or postgresql:// URL; default: empty schema)')
+    parser.add_argument('--name', default=DEFAULT_SQUASH_NAME,
+                        help=f'Name of the squashed migration (default: {DEFAULT_SQUASH_NAME})')
+    parser.add_argument('--output-dir', default='migrations_squashed',
+                        help='Directory for the squashed migration and rollback (default: migrations_squashed)')
+    return parser.parse_args(argv)
+
+def main():
+    """Main execution function"""
+    args = parse_args(sys.argv[1:])
+
+    files = []
+    for source in args.migrations:
+        if os.path.isdir(source):
+            files.extend(str(path) for path in list_migration_files(source))
+        else:
+            files.append(source)
+    if not files:
+        print("❌ No migration files found.")
+        sys.exit(1)
+
+    print(f"🗜️  Squashing {len(files)} migrations...")
+    try:
+        result = MigrationSquasher().squash_files(files, args.baseline)
+    except (OSError, IntrospectionError) as e:
+        print(f"❌ Cannot read migrations: {e}")
+        sys.exit(1)
+
+    if not result.verified:
+        print("❌ Verification failed: the squashed migration does not reproduce the final schema DNA")
+        for mismatch in result.mismatches:
+            print(f"   {mismatch}")
+        sys.exit(1)
+    print(f"🧬 {result.original_operations} operations squashed to {len(result.changes)} "
+          f"(verified: same final schema DNA)")
+
+    if not result.changes:
+        print("✅ The migrations cancel out. Nothing to write.")
+        return
+
+    surgeon = MigrationSurgeon()
+    directory = Path(args.output_dir)
+    directory.mkdir(parents=True, exist_ok=True)
+    stem = f"{datetime.now().strftime('%Y%m%d%H%M%S')}_{args.name}"
+    try:
+        migration_file = write_script(
+            directory / f'{stem}.sql', lambda emitter: surgeon.emit_migration(result.changes, args.name, emitter)
+        )
+        rollback_file = write_script(
+            directory / f'{stem}{ROLLBACK_SUFFIX}.sql',
+            lambda emitter: surgeon.emit_rollback_script(result.changes, emitter)
+        )
+    except DependencyCycleError as e:
+        print(f"❌ Cannot order operations: {e}")
+        sys.exit(1)
+
+    print(f"✅ Squashed migration saved: {migration_file}")
+    print(f"✅ Rollback script saved: {rollback_file}")
+
+if __name__ == "__main__":
+    main()
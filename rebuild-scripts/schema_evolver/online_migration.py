@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+"""
+OncoVista Online Migration Planner
+Lock-aware expand/backfill/contract plans for zero-downtime deploys
+"""
+
+import io
+import re
+from dataclasses import dataclass, field, replace
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from archive_mode import archive_policy
+from backfill import BackfillGenerator, BackfillJob, lookup_expression
+from schema_model import Index
+from sql_emitter import SQLEmitter, short_name
+from type_system import NO_CHANGE, REWRITE, canonical_default, classify_type_change, storage_type_sql
+
+# PostgreSQL table lock levels taken by the generated statements
+ACCESS_EXCLUSIVE = 'ACCESS EXCLUSIVE'
+SHARE_ROW_EXCLUSIVE = 'SHARE ROW EXCLUSIVE'
+SHARE_UPDATE_EXCLUSIVE = 'SHARE UPDATE EXCLUSIVE'
+ROW_EXCLUSIVE = 'ROW EXCLUSIVE'
+NO_TABLE_LOCK = 'no table lock'
+
+DEFAULT_LOCK_TIMEOUT = '5s'
+SHADOW_SUFFIX = '__new'
+
+# Stable calls evaluated once per statement, so a default using only these fills existing rows without a
+# rewrite; a default calling anything else is treated as volatile and evaluated per row
+NON_VOLATILE_CALLS = {
+    'NOW', 'CURRENT_TIMESTAMP', 'CURRENT_DATE', 'CURRENT_TIME', 'LOCALTIMESTAMP', 'LOCALTIME',
+    'TRANSACTION_TIMESTAMP', 'STATEMENT_TIMESTAMP'
+}
+CALL_PATTERN = re.compile(r'([A-Za-z_][\w$.]*)\s*\(')
+
+@dataclass
+class OnlineStep:
+    """One statement with the lock it takes"""
+    sql: str
+    lock: str
+    target: str
+    note: str = ''
+
+@dataclass
+class MigrationPhase:
+    """A group of steps run either in one transaction or statement by statement"""
+    name: str
+    transactional: bool
+    description: str
+    steps: List[OnlineStep] = field(default_factory=list)
+
+class OnlineMigrationPlanner:
+    """Rewrites schema changes into low-lock expand, online and contract phases.
+
+    Expand runs in one short transaction and only takes brief catalog-level
+    locks. The online phase runs outside any transaction block: concurrent
+    index builds, row backfills and constraint validation, none of which
+    block reads or writes. Contract runs in a final short transaction that
+    flips NOT NULL, swaps shadow columns and drops objects.
+    """
+
+    def __init__(self, surgeon, lock_timeout: str = DEFAULT_LOCK_TIMEOUT,
+                 backfill: Optional[BackfillGenerator] = None, expressions: Optional[Dict[str, str]] = None):
+        self.surgeon = surgeon
+        self.lock_timeout = lock_timeout
+        self.backfill = backfill or BackfillGenerator()
+        self.expressions = expressions or {}
+        self.backfills: List[BackfillJob] = []
+
+    def plan(self, changes: List[Any]) -> List[MigrationPhase]:
+        """Plan phases for changes in dependency order"""
+        self.expand = MigrationPhase('expand', True, 'brief catalog locks only')
+        self.online = MigrationPhase('online', False, 'run outside a transaction block; reads and writes continue')
+        self.contract = MigrationPhase('contract', True, 'brief catalog locks only')
+        self.backfills = []
+
+        for change in self.surgeon._sort_changes_by_risk(changes):
+            planner = getattr(self, f'_plan_{change.change_type.lower()}', None)
+            if planner:
+                planner(change)
+            else:
+                self.expand.steps.append(OnlineStep(
+                    self.surgeon._generate_change_sql(change), ACCESS_EXCLUSIVE, change.table_name or 'GLOBAL'
+                ))
+
+        policy = archive_policy(changes)
+        if policy:
+            self.contract.steps.insert(0, OnlineStep(
+                policy.registry_sql(), NO_TABLE_LOCK, policy.registry, 'where rollback and purge find archived objects'
+            ))
+        if self.backfills:
+            self.online.steps.insert(0, OnlineStep(
+                self.backfill.checkpoint_table_sql(), NO_TABLE_LOCK, self.backfill.checkpoint_table,
+                'backfill progress for resuming interrupted runs'
+            ))
+        return [phase for phase in (self.expand, self.online, self.contract) if phase.steps]
+
+    def render(self, phases: List[MigrationPhase], migration_name: str) -> str:
+        """Render planned phases as an annotated SQL script"""
+        buffer = io.StringIO()
+        self.emit(phases, migration_name, SQLEmitter(buffer))
+        return buffer.getvalue()
+
+    def emit(self, phases: List[MigrationPhase], migration_name: str, emitter: SQLEmitter):
+        """Stream planned phases to emitter; a phase is never split, so parts keep whole transactions"""
+        timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
+        emitter.start(f"-- OncoVista Online Schema Migration: {migration_name}\n"
+                      f"-- Generated: {datetime.now().isoformat()}\n"
+                      f"-- Migration ID: {timestamp}_{migration_name}\n\n"
+                      f"-- 🫀 Zero-downtime plan: {len(phases)} phases, run in order\n")
+
+        for number, phase in enumerate(phases, 1):
+            mode = 'transactional' if phase.transactional else 'non-transactional'
+            sql = f"\n-- Phase {number}: {phase.name} ({mode}; {phase.description})\n"
+            if phase.transactional:
+                sql += f"BEGIN;\nSET LOCAL lock_timeout = '{self.lock_timeout}';\n\n"
+            for step in phase.steps:
+                sql += f"-- 🔒 Lock: {step.lock} on {step.target}"
+                sql += f" ({step.note})\n" if step.note else "\n"
+                sql += step.sql + "\n\n"
+            if phase.transactional:
+                sql += "COMMIT;\n"
+            emitter.block(sql, statements=len(phase.steps))
+
+        emitter.finish()
+
+    def _plan_add_table(self, change):
+        """New tables are invisible to running queries, so one CREATE is enough"""
+        self.expand.steps.append(OnlineStep(
+            self.surgeon._generate_create_table_sql(change.table_name, change.details['table_def']),
+            ACCESS_EXCLUSIVE, change.table_name, 'new table, no contention'
+        ))
+
+    def _plan_add_column(self, change):
+        """Add nullable, backfill derived values or volatile defaults, then enforce NOT NULL and foreign keys"""
+        table, column, definition = change.table_name, change.details['column'], change.details['definition']
+        default = definition['default']
+        expression = lookup_expression(self.expressions, table, column)
+        fast_default = default and not expression and not is_volatile_default(default)
+
+        sql = f'ALTER TABLE {table} ADD COLUMN {column} {definition["type"]}'
+        if fast_default:
+            sql += f' DEFAULT {default}'
+        note = 'catalog-only, no rewrite'
+        if not definition['nullable'] and not default and not expression:
+            note += '; ⚠️  NOT NULL without a default: backfill existing rows before validation'
+        self.expand.steps.append(OnlineStep(sql + ';', ACCESS_EXCLUSIVE, table, note))
+
+        if default and not fast_default:
+            self.expand.steps.append(OnlineStep(
+                f'ALTER TABLE {table} ALTER COLUMN {column} SET DEFAULT {default};',
+                ACCESS_EXCLUSIVE, table, 'catalog-only; applies to new rows'
+            ))
+        if expression or (default and not fast_default):
+            self._backfill(change, column, expression or default)
+        if not definition['nullable']:
+            self._enforce_not_null(table, column)
+        if definition.get('references'):
+            self._add_foreign_key(table, column, definition['references'])
+
+    def _plan_modify_column(self, change):
+        """Shadow-swap rewriting type changes, build added key indexes concurrently, keep the rest catalog-only"""
+        table, column = change.table_name, change.details['column']
+        old, new = change.details['old_def'], change.details['new_def']
+
+        type_change = classify_type_change(old['type'], new['type'])
+        referenced_by = change.details.get('referenced_by', ())
+        if type_change == REWRITE and not referenced_by:
+            self._swap_shadow_column(change, new)
+            return
+        if type_change != NO_CHANGE:
+            note = 'catalog-only, no rewrite or index rebuild'
+            if type_change == REWRITE:
+                # Dropping the old key column would take the foreign keys of these tables with it
+                note = (f'⚠️  full rewrite under lock: no shadow swap for a key referenced by '
+                        f'{", ".join(referenced_by)}')
+            self.expand.steps.append(OnlineStep(
+                f'ALTER TABLE {table} ALTER COLUMN {column} TYPE {storage_type_sql(new["type"])};',
+                ACCESS_EXCLUSIVE, table, note
+            ))
+
+        if canonical_default(old['default'], old['type']) != canonical_default(new['default'], new['type']):
+            action = f'SET DEFAULT {new["default"]}' if new['default'] else 'DROP DEFAULT'
+            self.expand.steps.append(OnlineStep(
+                f'ALTER TABLE {table} ALTER COLUMN {column} {action};', ACCESS_EXCLUSIVE, table, 'catalog-only'
+            ))
+        if old['nullable'] and not new['nullable']:
+            self._enforce_not_null(table, column)
+        elif new['nullable'] and not old['nullable']:
+            self.contract.steps.append(OnlineStep(
+                f'ALTER TABLE {table} ALTER COLUMN {column} DROP NOT NULL;', ACCESS_EXCLUSIVE, table, 'catalog-only'
+            ))
+        if old.get('references') != new.get('references'):
+            if old.get('references'):
+                self.contract.steps.append(OnlineStep(
+                    f'ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {_constraint_name(table, column, "fkey")};',
+                    ACCESS_EXCLUSIVE, table, 'catalog-only'
+                ))
+            if new.get('references'):
+                self._add_foreign_key(table, column, new['references'])
+        self._change_keys(table, column, old, new)
+
+    def _plan_add_function(self, change):
+        self.expand.steps.append(OnlineStep(
+            self.surgeon._generate_change_sql(change), NO_TABLE_LOCK, change.details['function']
+        ))
+
+    def _plan_add_index(self, change):
+        self.online.steps.append(OnlineStep(
+            self.surgeon._generate_create_index_sql(change.table_name, change.details['index'], concurrently=True),
+            SHARE_UPDATE_EXCLUSIVE, change.table_name, 'concurrent build, writes continue'
+        ))
+
+    def _plan_drop_index(self, change):
+        self.online.steps.append(OnlineStep(
+            self.surgeon._generate_drop_index_sql(change.table_name, change.details['index'], concurrently=True),
+            SHARE_UPDATE_EXCLUSIVE, change.table_name, 'waits for running queries, blocks none'
+        ))
+
+    def _plan_drop_column(self, change):
+        self.contract.steps.append(OnlineStep(
+            self.surgeon._generate_change_sql(change), ACCESS_EXCLUSIVE, change.table_name,
+            'catalog-only, space reclaimed by later rewrites'
+        ))
+
+    def _plan_drop_table(self, change):
+        self.contract.steps.append(OnlineStep(
+            self.surgeon._generate_change_sql(change), ACCESS_EXCLUSIVE, change.table_name, 'brief'
+        ))
+
+    def _plan_archive_column(self, change):
+        self.contract.steps.append(OnlineStep(
+            self.surgeon._generate_change_sql(change), ACCESS_EXCLUSIVE, change.table_name,
+            'catalog-only rename, restorable until purged'
+        ))
+
+    def _plan_archive_table(self, change):
+        self.contract.steps.append(OnlineStep(
+            self.surgeon._generate_change_sql(change), ACCESS_EXCLUSIVE, change.table_name,
+            'catalog-only rename, restorable until purged'
+        ))
+
+    def _backfill(self, change, column: str, expression: str, source: Optional[str] = None):
+        """Fill existing rows in committed batches outside the DDL transaction"""
+        job = BackfillJob.for_change(change, column, expression, source)
+        self.backfills.append(job)
+        self.online.steps.append(OnlineStep(
+            self.backfill.render_block(job), ROW_EXCLUSIVE, change.table_name,
+            f'row locks on {self.backfill.batch_size} rows at a time; resumable'
+        ))
+
+    def _enforce_not_null(self, table: str, column: str):
+        """NOT VALID check, online validation, then a scan-free SET NOT NULL (PostgreSQL 12+)"""
+        self._finish_not_null(table, column, self._validate_not_null(table, column))
+
+    def _validate_not_null(self, table: str, column: str) -> str:
+        """Add a NOT VALID IS NOT NULL check and validate it online; returns the check name"""
+        check = _constraint_name(table, column, 'not_null')
+        self.expand.steps.append(OnlineStep(
+            f'ALTER TABLE {table} ADD CONSTRAINT {check} CHECK ({column} IS NOT NULL) NOT VALID;',
+            ACCESS_EXCLUSIVE, table, 'catalog-only, existing rows not scanned'
+        ))
+        self.online.steps.append(OnlineStep(
+            f'ALTER TABLE {table} VALIDATE CONSTRAINT {check};',
+            SHARE_UPDATE_EXCLUSIVE, table, 'scans without blocking reads or writes'
+        ))
+        return check
+
+    def _finish_not_null(self, table: str, column: str, check: str):
+        self.contract.steps.append(OnlineStep(
+            f'ALTER TABLE {table} ALTER COLUMN {column} SET NOT NULL;',
+            ACCESS_EXCLUSIVE, table, 'no scan, proven by the validated check'
+        ))
+        self.contract.steps.append(OnlineStep(
+            f'ALTER TABLE {table} DROP CONSTRAINT {check};', ACCESS_EXCLUSIVE, table, 'catalog-only'
+        ))
+
+    def _change_keys(self, table: str, column: str, old: Dict[str, Any], new: Dict[str, Any]):
+        """Build added PRIMARY KEY and UNIQUE indexes concurrently and attach them; drop removed keys"""
+        names = {'PRIMARY KEY': f'{short_name(table)}_pkey', 'UNIQUE': _constraint_name(table, column, 'key')}
+        for kind, name in names.items():
+            if kind in old['constraints'] and kind not in new['constraints']:
+                self.contract.steps.append(OnlineStep(
+                    f'ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {name};', ACCESS_EXCLUSIVE, table,
+                    'catalog-only, drops the key index'
+                ))
+            elif kind in new['constraints'] and kind not in old['constraints']:
+                if kind == 'PRIMARY KEY' and old['nullable'] and new['nullable']:
+                    # Attaching the key would SET NOT NULL with a full scan; the validated check proves it instead
+                    self._enforce_not_null(table, column)
+                index = Index(name, (column,), unique=True)
+                self.online.steps.append(OnlineStep(
+                    self.surgeon._generate_create_index_sql(table, index, concurrently=True),
+                    SHARE_UPDATE_EXCLUSIVE, table, f'concurrent build of the {kind} index, writes continue'
+                ))
+                self.contract.steps.append(OnlineStep(
+                    f'ALTER TABLE {table} ADD CONSTRAINT {name} {kind} USING INDEX {name};', ACCESS_EXCLUSIVE, table,
+                    'catalog-only, the index is already built'
+                ))
+
+    def _add_foreign_key(self, table: str, column: str, parent: str):
+        """NOT VALID foreign key followed by online validation"""
+        fkey = _constraint_name(table, column, 'fkey')
+        self.expand.steps.append(OnlineStep(
+            f'ALTER TABLE {table} ADD CONSTRAINT {fkey} FOREIGN KEY ({column}) REFERENCES {parent} NOT VALID;',
+            SHARE_ROW_EXCLUSIVE, f'{table}, {parent}', 'catalog-only, existing rows not checked'
+        ))
+        self.online.steps.append(OnlineStep(
+            f'ALTER TABLE {table} VALIDATE CONSTRAINT {fkey};',
+            SHARE_UPDATE_EXCLUSIVE, table, f'ROW SHARE on {parent}; reads and writes continue'
+        ))
+
+    def _swap_shadow_column(self, change, new_def):
+        """Change a column type without a table rewrite under ACCESS EXCLUSIVE.
+
+        Dropping the old column drops its PRIMARY KEY and UNIQUE constraints,
+        so unique indexes are built concurrently on the shadow column and
+        attached as the same constraints once it is renamed. Keys referenced
+        by foreign keys are never swapped (see _plan_modify_column).
+        """
+        table, column, indexes = change.table_name, change.details['column'], change.details.get('indexes', ())
+        keys = change.details.get('keys', ())
+        shadow = f'{column}{SHADOW_SUFFIX}'
+        new_type = new_def['type']
+        sync = _constraint_name(table, column, 'sync')
+
+        self.expand.steps.append(OnlineStep(
+            f'ALTER TABLE {table} ADD COLUMN {shadow} {new_type};', ACCESS_EXCLUSIVE, table, 'catalog-only, no rewrite'
+        ))
+        self.expand.steps.append(OnlineStep(
+            f'CREATE OR REPLACE FUNCTION {sync}() RETURNS TRIGGER AS $$\n'
+            f'BEGIN\n  NEW.{shadow} := NEW.{column}::{new_type};\n  RETURN NEW;\nEND;\n$$ LANGUAGE plpgsql;',
+            NO_TABLE_LOCK, sync
+        ))
+        self.expand.steps.append(OnlineStep(
+            f'CREATE TRIGGER {sync} BEFORE INSERT OR UPDATE ON {table} FOR EACH ROW EXECUTE FUNCTION {sync}();',
+            SHARE_ROW_EXCLUSIVE, table, 'keeps the shadow column current for new writes'
+        ))
+        self._backfill(change, shadow, f'{column}::{new_type}', source=column)
+        for index in indexes:
+            shadow_index = replace(
+                index,
+                name=f'{index.name}{SHADOW_SUFFIX}',
+                columns=tuple(shadow if name == column else name for name in index.columns),
+                include=tuple(shadow if name == column else name for name in index.include),
+                predicate=re.sub(rf'\b{re.escape(column)}\b', shadow, index.predicate) if index.predicate else None
+            )
+            self.online.steps.append(OnlineStep(
+                self.surgeon._generate_create_index_sql(table, shadow_index, concurrently=True),
+                SHARE_UPDATE_EXCLUSIVE, table, 'concurrent build, writes continue'
+            ))
+        key_indexes = []
+        for kind, name, columns in keys:
+            key_columns = tuple(shadow if part == column else part for part in columns)
+            key_index = Index(f'{name}{SHADOW_SUFFIX}', key_columns, unique=True)
+            key_indexes.append((kind, name, key_index.name))
+            self.online.steps.append(OnlineStep(
+                self.surgeon._generate_create_index_sql(table, key_index, concurrently=True),
+                SHARE_UPDATE_EXCLUSIVE, table, f'concurrent build of the {kind} index, writes continue'
+            ))
+        # A primary key needs NOT NULL, which the validated check proves without a scan
+        primary = any(kind == 'PRIMARY KEY' for kind, _, _ in keys)
+        check = None if new_def['nullable'] and not primary else self._validate_not_null(table, shadow)
+        if new_def.get('references'):
+            self._add_foreign_key(table, shadow, new_def['references'])
+
+        swap = [
+            (f'DROP TRIGGER {sync} ON {table};', 'catalog-only'),
+            (f'DROP FUNCTION {sync}();', ''),
+            (f'ALTER TABLE {table} DROP COLUMN {column};', f'catalog-only; drops indexes and keys on {column}'),
+            (f'ALTER TABLE {table} RENAME COLUMN {shadow} TO {column};', 'catalog-only'),
+        ]
+        swap += [(f'ALTER INDEX {index.name}{SHADOW_SUFFIX} RENAME TO {index.name};', 'catalog-only')
+                 for index in indexes]
+        if new_def['default']:
+            swap.append((f'ALTER TABLE {table} ALTER COLUMN {column} SET DEFAULT {new_def["default"]};', 'catalog-only'))
+        for sql, note in swap:
+            self.contract.steps.append(OnlineStep(sql, ACCESS_EXCLUSIVE, table, note))
+        if check:
+            # The validated check follows the column through the rename
+            self._finish_not_null(table, column, check)
+        for kind, name, index in key_indexes:
+            self.contract.steps.append(OnlineStep(
+                f'ALTER TABLE {table} ADD CONSTRAINT {name} {kind} USING INDEX {index};',
+                ACCESS_EXCLUSIVE, table, 'catalog-only, the index is already built and renamed to the constraint'
+            ))
+
+def is_volatile_default(expression: str) -> bool:
+    """Whether a default must be evaluated per row, forcing a rewrite when added with the column"""
+    return any(name.rsplit('.', 1)[-1].upper() not in NON_VOLATILE_CALLS for name in CALL_PATTERN.findall(expression))
+
+def _constraint_name(table: str, column: str, suffix: str) -> str:
+    """PostgreSQL-style generated name, e.g. patients_email_not_null"""
+    return f'{table.rsplit(".", 1)[-1]}_{column}_{suffix}'
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+OncoVista Rename Detection
+Matches dropped tables and columns to added ones so renames are not emitted as drop-and-recreate
+"""
+
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from difflib import SequenceMatcher
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from schema_model import Column, Table
+from sql_emitter import schema_name, short_name
+from type_system import canonical_default, canonical_type
+
+DEFAULT_RENAME_THRESHOLD = 0.8
+# Column definitions shared by more tables than this (an "id SERIAL PRIMARY KEY", say) say
+# nothing about which table is which, so they are not used to find candidate pairs
+MAX_CANDIDATE_POSTINGS = 64
+
+# Table score: shared columns, columns at the same position, constraints and indexes, name
+TABLE_WEIGHTS = {'columns': 0.6, 'position': 0.2, 'structure': 0.1, 'name': 0.1}
+# Column score once the types match; a different type is never a rename. Same-typed columns agree on
+# most other attributes, so the name carries enough weight that the threshold needs a similar one
+COLUMN_WEIGHTS = {
+    'type': 0.25, 'nullable': 0.05, 'default': 0.05, 'constraints': 0.05, 'references': 0.05, 'position': 0.15,
+    'name': 0.4
+}
+# Columns with less similar names (that are not abbreviations of each other) are only a rename
+# when an index carried over to the new name, so ssn -> phone is never a candidate
+MIN_COLUMN_NAME_SIMILARITY = 0.5
+# Name similarity credited to a pair that shares such an index
+EVIDENCE_NAME_SIMILARITY = 0.75
+
+@dataclass
+class RenameMatch:
+    """A dropped table or column paired with the added one it became"""
+    kind: str  # 'TABLE' or 'COLUMN'
+    table: str  # the new table name (for tables, the renamed table itself)
+    old_name: str
+    new_name: str
+    confidence: float
+    forced: bool = False
+
+@dataclass
+class RenameOverrides:
+    """Reviewer decisions that take precedence over scoring.
+
+    forced maps an old table name, or TABLE.COLUMN, to its new name; a
+    rejected name is always treated as dropped. Tables match with or
+    without their schema prefix.
+    """
+    forced: Dict[str, str] = field(default_factory=dict)
+    rejected: Set[str] = field(default_factory=set)
+
+    @classmethod
+    def parse(cls, renames: Iterable[str], rejections: Iterable[str] = ()) -> 'RenameOverrides':
+        """Build overrides from OLD=NEW and NAME command line values"""
+        forced = {}
+        for item in renames:
+            old, separator, new = item.partition('=')
+            if not separator or not old.strip() or not new.strip():
+                raise ValueError(f"invalid --rename '{item}': expected OLD=NEW")
+            forced[old.strip()] = new.strip()
+        return cls(forced, {name.strip() for name in rejections})
+
+    def forced_name(self, table: str, column: Optional[str] = None) -> Optional[str]:
+        for key in _keys(table, column):
+            if key in self.forced:
+                return self.forced[key]
+        return None
+
+    def is_rejected(self, table: str, column: Optional[str] = None) -> bool:
+        return any(key in self.rejected for key in _keys(table, column))
+
+class RenameDetector:
+    """Scores dropped objects against added ones and keeps confident one-to-one matches.
+
+    Table candidates come from an inverted index over exact column
+    definitions (name, type, nullability, default, constraints and
+    foreign key), so each dropped table is only scored against added
+    tables sharing a distinctive column or all of its columns, which
+    keeps thousands of tables far from quadratic. Columns are compared
+    within a table pair, must keep their type and need a similar name
+    (or abbreviation) or an index that moved with them. Pairs are then taken
+    greedily by score; a dropped or added object whose best score is
+    tied is ambiguous and left as a drop and an add.
+    """
+
+    def __init__(self, threshold: float = DEFAULT_RENAME_THRESHOLD, overrides: Optional[RenameOverrides] = None):
+        self.threshold = threshold
+        self.overrides = overrides or RenameOverrides()
+
+    def match_tables(self, dropped: Dict[str, Table], added: Dict[str, Table]) -> List[RenameMatch]:
+        """Renamed tables among dropped and added ones"""
+        matches, dropped, added = self._forced_matches('TABLE', None, dropped, added, self._table_score)
+        dropped = {name: table for name, table in dropped.items() if not self.overrides.is_rejected(name)}
+
+        postings: Dict[Column, List[str]] = defaultdict(list)
+        identical: Dict[Tuple[Column, ...], List[str]] = defaultdict(list)
+        for name, table in added.items():
+            for column in set(table.columns.values()):
+                postings[column].append(name)
+            identical[tuple(table.columns.values())].append(name)
+
+        scored = []
+        for old_name, table in dropped.items():
+            candidates = set()
+            for column in set(table.columns.values()):
+                names = postings.get(column, ())
+                if len(names) <= MAX_CANDIDATE_POSTINGS:
+                    candidates.update(names)
+            # Tables made only of common columns can still match an identical one
+            candidates.update(identical.get(tuple(table.columns.values()), ())[:MAX_CANDIDATE_POSTINGS])
+            for new_name in candidates:
+                if schema_name(old_name) == schema_name(new_name):
+                    scored.append((self._table_score(table, added[new_name], old_name, new_name), old_name, new_name))
+
+        matches.extend(RenameMatch('TABLE', new, old, new, score) for score, old, new in self._assign(scored))
+        return matches
+
+    def match_columns(self, table_name: str, old_table: Table, new_table: Table) -> List[RenameMatch]:
+        """Renamed columns between two versions of one table"""
+        dropped = {name: column for name, column in old_table.columns.items() if name not in new_table.columns}
+        added = {name: column for name, column in new_table.columns.items() if name not in old_table.columns}
+        if not dropped or not added:
+            return []
+        old_positions = {name: position for position, name in enumerate(old_table.columns)}
+        new_positions = {name: position for position, name in enumerate(new_table.columns)}
+        new_indexes = {index.name: index.columns for index in new_table.indexes}
+        shared_indexes = [(index.columns, new_indexes[index.name]) for index in old_table.indexes
+                          if len(new_indexes.get(index.name, ())) == len(index.columns)]
+
+        def score(old: Column, new: Column, old_name: str, new_name: str) -> float:
+            # The same index kept with the column in the same key position. A foreign key to the same
+            # table is not enough: created_by and approved_by both point at users
+            evidence = any(old_name in old_columns and new_columns[old_columns.index(old_name)] == new_name
+                           for old_columns, new_columns in shared_indexes)
+            return _column_score(old, new, old_positions[old_name], new_positions[new_name], evidence)
+
+        matches, dropped, added = self._forced_matches('COLUMN', table_name, dropped, added, score)
+        scored = [
+            (score(old, new, old_name, new_name), old_name, new_name)
+            for old_name, old in dropped.items() if not self.overrides.is_rejected(table_name, old_name)
+            for new_name, new in added.items()
+        ]
+        matches.extend(
+            RenameMatch('COLUMN', table_name, old, new, confidence) for confidence, old, new in self._assign(scored)
+        )
+        return matches
+
+    def _forced_matches(self, kind: str, table_name: Optional[str], dropped: Dict, added: Dict,
+                        score) -> Tuple[List[RenameMatch], Dict, Dict]:
+        """Matches the overrides force, and what is left to score"""
+        matches = []
+        dropped, added = dict(dropped), dict(added)
+        for old_name in list(dropped):
+            target = self.overrides.forced_name(table_name or old_name, old_name if table_name else None)
+            if target is None:
+                continue
+            if table_name:
+                target = target.rsplit('.', 1)[-1]
+            new_name = next((name for name in added if name == target or short_name(name) == target), None)
+            if new_name is None:
+                continue
+            confidence = round(score(dropped.pop(old_name), added.pop(new_name), old_name, new_name), 3)
+            matches.append(RenameMatch(kind, table_name or new_name, old_name, new_name, confidence, forced=True))
+        return matches, dropped, added
+
+    def _assign(self, scored: List[Tuple[float, str, str]]) -> List[Tuple[float, str, str]]:
+        """Greedy one-to-one assignment of pairs at or above the threshold, best first"""
+        scored = sorted((entry for entry in scored if entry[0] >= self.threshold), key=lambda e: (-e[0], e[1], e[2]))
+        best_old: Dict[str, List[float]] = defaultdict(list)
+        best_new: Dict[str, List[float]] = defaultdict(list)
+        for score, old, new in scored:
+            best_old[old].append(score)
+            best_new[new].append(score)
+        ambiguous = {name for name, scores in best_old.items() if len(scores) > 1 and scores[0] == scores[1]}
+        ambiguous |= {name for name, scores in best_new.items() if len(scores) > 1 and scores[0] == scores[1]}
+
+        used: Set[str] = set()
+        chosen = []
+        for score, old, new in scored:
+            if old in ambiguous or new in ambiguous or ('old', old) in used or ('new', new) in used:
+                continue
+            used.update((('old', old), ('new', new)))
+            chosen.append((round(score, 3), old, new))
+        return chosen
+
+    @staticmethod
+    def _table_score(old: Table, new: Table, old_name: str, new_name: str) -> float:
+        # Dice overlap, half on exact columns and half on definitions whatever their name (a column may
+        # be renamed along with its table), plus alignment over the shorter table, so a column added on
+        # rename costs little
+        exact = _dice(Counter(old.columns.values()), Counter(new.columns.values()))
+        old_signatures = [_signature(column) for column in old.columns.values()]
+        new_signatures = [_signature(column) for column in new.columns.values()]
+        renamed = _dice(Counter(old_signatures), Counter(new_signatures))
+        shortest = min(len(old_signatures), len(new_signatures))
+        aligned = sum(1 for a, b in zip(old_signatures, new_signatures) if a == b)
+        return (TABLE_WEIGHTS['columns'] * (exact + renamed) / 2
+                + TABLE_WEIGHTS['position'] * (aligned / shortest if shortest else 0.0)
+                + TABLE_WEIGHTS['structure'] * _structure_similarity(old, new)
+                + TABLE_WEIGHTS['name'] * _name_similarity(short_name(old_name), short_name(new_name)))
+
+def _column_score(old: Column, new: Column, old_position: int, new_position: int, evidence: bool = False) -> float:
+    old_signature, new_signature = _signature(old), _signature(new)
+    if old_signature[0] != new_signature[0]:
+        return 0.0
+    name = _column_name_similarity(old.name, new.name)
+    if evidence:
+        name = max(name, EVIDENCE_NAME_SIMILARITY)
+    elif name < MIN_COLUMN_NAME_SIMILARITY:
+        return 0.0
+    return (COLUMN_WEIGHTS['type']
+            + COLUMN_WEIGHTS['nullable'] * (old.nullable == new.nullable)
+            + COLUMN_WEIGHTS['default'] * (old_signature[2] == new_signature[2])
+            + COLUMN_WEIGHTS['constraints'] * (old.constraints == new.constraints)
+            + COLUMN_WEIGHTS['references'] * (old.references == new.references)
+            + COLUMN_WEIGHTS['position'] / (1 + abs(old_position - new_position))
+            + COLUMN_WEIGHTS['name'] * name)
+
+def _column_name_similarity(old: str, new: str) -> float:
+    """Name similarity, counting an abbreviation by initials (mrn, medical_record_number) as a match"""
+    if _initials(old) == new.lower() or _initials(new) == old.lower():
+        return 1.0
+    return _name_similarity(old, new)
+
+def _initials(name: str) -> Optional[str]:
+    words = [word for word in name.lower().split('_') if word]
+    return ''.join(word[0] for word in words) if len(words) > 1 else None
+
+def _signature(column: Column) -> Tuple:
+    """Everything that defines a column except its name, types and defaults in canonical spelling"""
+    return (canonical_type(column.type), column.nullable, canonical_default(column.default, column.type),
+            column.constraints, column.references)
+
+def _dice(old: Counter, new: Counter) -> float:
+    total = sum(old.values()) + sum(new.values())
+    return 2 * sum((old & new).values()) / total if total else 0.0
+
+def _structure_similarity(old: Table, new: Table) -> float:
+    """Overlap of constraints and index definitions (index names often follow the table name)"""
+    old_items = {constraint.definition for constraint in old.constraints} | {index.definition() for index in old.indexes}
+    new_items = {constraint.definition for constraint in new.constraints} | {index.definition() for index in new.indexes}
+    if not old_items and not new_items:
+        return 1.0
+    return len(old_items & new_items) / len(old_items | new_items)
+
+def _name_similarity(old: str, new: str) -> float:
+    return SequenceMatcher(None, old.lower(), new.lower()).ratio()
+
+def _keys(table: str, column: Optional[str]) -> List[str]:
+    names = [table, short_name(table)]
+    return [f'{name}.{column}' for name in names] if column else names
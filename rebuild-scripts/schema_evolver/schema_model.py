@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+OncoVista Schema Model
+Compact slotted representation of parsed schema DNA
+"""
+
+import re
+import sys
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from ddl_lexer import IDENTIFIER, read_parenthesized, split_top_level, unquote_identifier
+
+PRIMARY_KEY_PATTERN = re.compile(r'PRIMARY\s+KEY\s*\(([^)]*)\)', re.IGNORECASE)
+UNIQUE_PATTERN = re.compile(r'UNIQUE\s*\(([^)]*)\)', re.IGNORECASE)
+FOREIGN_KEY_PATTERN = re.compile(rf'FOREIGN\s+KEY\s*\([^)]*\)\s*REFERENCES\s+({IDENTIFIER})', re.IGNORECASE)
+INDEX_INCLUDE_PATTERN = re.compile(r'\s*INCLUDE\s*\(', re.IGNORECASE)
+INDEX_WHERE_PATTERN = re.compile(r'\bWHERE\b', re.IGNORECASE)
+DEFAULT_INDEX_METHOD = 'btree'
+
+def intern_text(value: Optional[str]) -> Optional[str]:
+    """Intern a repeated identifier or keyword so equal values share one object"""
+    return sys.intern(value) if value is not None else None
+
+class _FieldAccess:
+    """Read-only mapping-style access for code written against the dict form"""
+
+    __slots__ = ()
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key, default)
+
+@dataclass(frozen=True, slots=True)
+class Column(_FieldAccess):
+    """A table column; names, types and defaults are interned"""
+    name: str
+    type: str
+    nullable: bool
+    default: Optional[str]
+    constraints: Tuple[str, ...]
+    references: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'type': self.type,
+            'nullable': self.nullable,
+            'default': self.default,
+            'constraints': list(self.constraints),
+            'references': self.references
+        }
+
+@dataclass(frozen=True, slots=True)
+class Constraint(_FieldAccess):
+    """A table-level constraint; unnamed constraints have name None"""
+    name: Optional[str]
+    definition: str
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'name': self.name, 'definition': self.definition}
+
+@dataclass(frozen=True, slots=True)
+class Index(_FieldAccess):
+    """An index on a table; predicate is set for partial indexes"""
+    name: str
+    columns: Tuple[str, ...]
+    unique: bool
+    method: str = DEFAULT_INDEX_METHOD
+    include: Tuple[str, ...] = ()
+    predicate: Optional[str] = None
+
+    def definition(self) -> Tuple[Any, ...]:
+        """Everything but the name: equal definitions index the same rows the same way"""
+        return self.columns, self.unique, self.method, self.include, self.predicate
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain btree indexes keep the original three keys; the rest are added only when set"""
+        data = {'name': self.name, 'columns': list(self.columns), 'unique': self.unique}
+        if self.method != DEFAULT_INDEX_METHOD:
+            data['method'] = self.method
+        if self.include:
+            data['include'] = list(self.include)
+        if self.predicate:
+            data['predicate'] = self.predicate
+        return data
+
+def index_options(tail: str) -> Tuple[Tuple[str, ...], Optional[str]]:
+    """INCLUDE columns and partial-index predicate from the text after an index's key columns"""
+    include = ()
+    match = INDEX_INCLUDE_PATTERN.match(tail)
+    if match:
+        body, end = read_parenthesized(tail, match.end() - 1)
+        include = tuple(intern_text(column) for column in split_top_level(body))
+        tail = tail[end:]
+    match = INDEX_WHERE_PATTERN.search(tail)
+    return include, normalize_predicate(tail[match.end():]) if match else None
+
+def normalize_predicate(predicate: str) -> str:
+    """Collapse whitespace and redundant outer parentheses, so DDL and pg_get_indexdef() forms compare equal"""
+    predicate = ' '.join(predicate.split()).rstrip(';').strip()
+    while predicate.startswith('('):
+        inner, end = read_parenthesized(predicate, 0)
+        if end != len(predicate):
+            break
+        predicate = inner.strip()
+    return predicate
+
+@dataclass(frozen=True, slots=True)
+class Function(_FieldAccess):
+    """A function signature"""
+    name: str
+    parameters: str
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'name': self.name, 'parameters': self.parameters}
+
+@dataclass(frozen=True, slots=True)
+class NamedObject(_FieldAccess):
+    """A schema object tracked by name only (triggers, types)"""
+    name: str
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'name': self.name}
+
+@dataclass(slots=True)
+class Table(_FieldAccess):
+    """A table with its columns in definition order"""
+    name: str
+    columns: Dict[str, Column]
+    constraints: Tuple[Constraint, ...] = ()
+    indexes: Tuple[Index, ...] = ()
+
+    def primary_key(self) -> Tuple[str, ...]:
+        """Primary key column names from a column or table-level PRIMARY KEY"""
+        columns = tuple(name for name, column in self.columns.items() if 'PRIMARY KEY' in column.constraints)
+        if columns:
+            return columns
+        for constraint in self.constraints:
+            match = PRIMARY_KEY_PATTERN.match(constraint.definition)
+            if match:
+                return tuple(unquote_identifier(name.strip()) for name in match.group(1).split(','))
+        return ()
+
+    def key_constraints(self) -> Tuple[Tuple[str, str, Tuple[str, ...]], ...]:
+        """PRIMARY KEY and UNIQUE constraints as (kind, name, columns); unnamed ones get PostgreSQL's names"""
+        short = self.name.rsplit('.', 1)[-1]
+        keys = []
+        for name, column in self.columns.items():
+            if 'PRIMARY KEY' in column.constraints:
+                keys.append(('PRIMARY KEY', f'{short}_pkey', (name,)))
+            if 'UNIQUE' in column.constraints:
+                keys.append(('UNIQUE', f'{short}_{name}_key', (name,)))
+        for constraint in self.constraints:
+            match = PRIMARY_KEY_PATTERN.match(constraint.definition) or UNIQUE_PATTERN.match(constraint.definition)
+            if match:
+                columns = tuple(unquote_identifier(name.strip()) for name in match.group(1).split(','))
+                if match.re is PRIMARY_KEY_PATTERN:
+                    keys.append(('PRIMARY KEY', constraint.name or f'{short}_pkey', columns))
+                else:
+                    keys.append(('UNIQUE', constraint.name or f'{short}_{"_".join(columns)}_key', columns))
+        return tuple(keys)
+
+    def referenced_tables(self) -> Set[str]:
+        """Names of tables this table points at through column or table-level foreign keys"""
+        targets = {column.references for column in self.columns.values() if column.references}
+        for constraint in self.constraints:
+            match = FOREIGN_KEY_PATTERN.search(constraint.definition)
+            if match:
+                targets.add(unquote_identifier(match.group(1)))
+        return targets
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'columns': {name: column.to_dict() for name, column in self.columns.items()},
+            'constraints': [constraint.to_dict() for constraint in self.constraints],
+            'indexes': [index.to_dict() for index in self.indexes]
+        }
+
+@dataclass(slots=True)
+class SchemaModel(_FieldAccess):
+    """Parsed schema DNA: tables by name plus functions, triggers and types in file order"""
+    tables: Dict[str, Table] = field(default_factory=dict)
+    functions: List[Function] = field(default_factory=list)
+    triggers: List[NamedObject] = field(default_factory=list)
+    types: List[NamedObject] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the plain dict form produced by earlier versions of the analyzer"""
+        return {
+            'tables': {name: table.to_dict() for name, table in self.tables.items()},
+            'functions': [function.to_dict() for function in self.functions],
+            'triggers': [trigger.to_dict() for trigger in self.triggers],
+            'types': [custom_type.to_dict() for custom_type in self.types]
+        }
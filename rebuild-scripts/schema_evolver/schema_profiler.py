@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+OncoVista Schema Profiler
+Per-phase wall time, call counts, input size and peak memory for the schema evolver
+"""
+
+import functools
+import json
+import os
+import platform
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, TypeVar
+
+# Chrome trace events kept per run; later phases are still aggregated
+DEFAULT_MAX_EVENTS = 100000
+
+T = TypeVar('T')
+
+@dataclass(slots=True)
+class PhaseStats:
+    """Aggregated measurements for one named phase"""
+    name: str
+    calls: int = 0
+    seconds: float = 0.0
+    self_seconds: float = 0.0
+    bytes: int = 0
+    statements: int = 0
+    peak_bytes: Optional[int] = None
+
+@dataclass(slots=True)
+class _Frame:
+    stats: PhaseStats
+    started: float
+    child_seconds: float = 0.0
+    base_memory: int = 0
+    peak_memory: int = 0
+
+class PhaseProfiler:
+    """Records nested phases of a run.
+
+    seconds is inclusive wall time, self_seconds excludes nested phases.
+    peak_bytes is the highest traced allocation above the phase's starting
+    point, measured with tracemalloc while the profiler is started (it
+    slows parsing noticeably, so pass track_memory=False for timings
+    only). Phases that are iterated rather than entered, such as lexing
+    statements on demand, are aggregated but not added to the trace.
+    Not thread-safe: profile one run per profiler.
+    """
+
+    enabled = True
+
+    def __init__(self, track_memory: bool = True, max_events: int = DEFAULT_MAX_EVENTS):
+        self.track_memory = track_memory
+        self.max_events = max_events
+        self.phases: Dict[str, PhaseStats] = {}
+        self.events: List[Dict[str, Any]] = []
+        self.dropped_events = 0
+        self._stack: List[_Frame] = []
+        self._origin = time.perf_counter()
+        self._owns_tracemalloc = False
+
+    def start(self):
+        """Begin memory tracing, if enabled"""
+        if self.track_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._owns_tracemalloc = True
+
+    def stop(self):
+        if self._owns_tracemalloc:
+            tracemalloc.stop()
+            self._owns_tracemalloc = False
+
+    def __enter__(self) -> 'PhaseProfiler':
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    @contextmanager
+    def phase(self, name: str, bytes: int = 0, statements: int = 0) -> Iterator[None]:
+        """Time a block as one call of the named phase"""
+        frame = self._enter(name)
+        try:
+            yield
+        finally:
+            self._exit(frame, bytes, statements)
+
+    def count(self, name: str, calls: int = 0, bytes: int = 0, statements: int = 0):
+        """Add counters to a phase without timing anything"""
+        stats = self._stats(name)
+        stats.calls += calls
+        stats.bytes += bytes
+        stats.statements += statements
+
+    def iterate(self, name: str, items: Iterable[T]) -> Iterator[T]:
+        """Yield items, charging the time spent producing each one to the named phase"""
+        stats = self._stats(name)
+        iterator = iter(items)
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self._charge(stats, time.perf_counter() - started)
+                return
+            self._charge(stats, time.perf_counter() - started)
+            stats.statements += 1
+            yield item
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-ready report, phases in the order they first ran"""
+        return {
+            'generated': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'total_seconds': round(time.perf_counter() - self._origin, 6),
+            'memory_tracked': self.track_memory,
+            'phases': [asdict(stats) for stats in self.phases.values()],
+            'dropped_events': self.dropped_events
+        }
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        """Trace Event Format document for chrome://tracing or Perfetto"""
+        pid = os.getpid()
+        metadata = {'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': 0, 'args': {'name': 'schema_evolver'}}
+        return {
+            'traceEvents': [metadata] + self.events,
+            'displayTimeUnit': 'ms',
+            'otherData': {'dropped_events': self.dropped_events}
+        }
+
+    def write_json(self, path: str):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def write_chrome_trace(self, path: str):
+        with open(path, 'w') as f:
+            json.dump(self.to_chrome_trace(), f)
+
+    def summary_lines(self) -> List[str]:
+        """Aligned table of phases, slowest (by self time) first"""
+        lines = [f"{'phase':<22} {'calls':>8} {'total ms':>10} {'self ms':>10} {'statements':>10} "
+                 f"{'bytes':>12} {'peak KiB':>10}"]
+        for stats in sorted(self.phases.values(), key=lambda stats: -stats.self_seconds):
+            peak = f'{stats.peak_bytes / 1024:.0f}' if stats.peak_bytes is not None else '-'
+            lines.append(f'{stats.name:<22} {stats.calls:>8} {stats.seconds * 1000:>10.1f} '
+                         f'{stats.self_seconds * 1000:>10.1f} {stats.statements:>10} {stats.bytes:>12} {peak:>10}')
+        return lines
+
+    def _stats(self, name: str) -> PhaseStats:
+        stats = self.phases.get(name)
+        if stats is None:
+            stats = self.phases[name] = PhaseStats(name)
+        return stats
+
+    def _charge(self, stats: PhaseStats, elapsed: float):
+        stats.seconds += elapsed
+        stats.self_seconds += elapsed
+        if self._stack:
+            self._stack[-1].child_seconds += elapsed
+
+    def _enter(self, name: str) -> _Frame:
+        frame = _Frame(self._stats(name), time.perf_counter())
+        if tracemalloc.is_tracing():
+            # Fold the peak so far into the enclosing phases before resetting it for this one
+            current, peak = tracemalloc.get_traced_memory()
+            for outer in self._stack:
+                outer.peak_memory = max(outer.peak_memory, peak)
+            tracemalloc.reset_peak()
+            frame.base_memory = frame.peak_memory = current
+        self._stack.append(frame)
+        return frame
+
+    def _exit(self, frame: _Frame, bytes: int, statements: int):
+        ended = time.perf_counter()
+        elapsed = ended - frame.started
+        self._stack.pop()
+        stats = frame.stats
+        stats.calls += 1
+        stats.seconds += elapsed
+        stats.self_seconds += elapsed - frame.child_seconds
+        stats.bytes += bytes
+        stats.statements += statements
+        if self._stack:
+            self._stack[-1].child_seconds += elapsed
+
+        args = {}
+        if tracemalloc.is_tracing():
+            frame.peak_memory = max(frame.peak_memory, tracemalloc.get_traced_memory()[1])
+            if self._stack:
+                self._stack[-1].peak_memory = max(self._stack[-1].peak_memory, frame.peak_memory)
+            tracemalloc.reset_peak()
+            peak = frame.peak_memory - frame.base_memory
+            stats.peak_bytes = max(stats.peak_bytes or 0, peak)
+            args['peak_bytes'] = peak
+
+        if len(self.events) >= self.max_events:
+            self.dropped_events += 1
+            return
+        if bytes:
+            args['bytes'] = bytes
+        if statements:
+            args['statements'] = statements
+        self.events.append({
+            'name': stats.name,
+            'cat': stats.name.split('.', 1)[0],
+            'ph': 'X',
+            'ts': round((frame.started - self._origin) * 1e6, 3),
+            'dur': round(elapsed * 1e6, 3),
+            'pid': os.getpid(),
+            'tid': threading.get_native_id(),
+            'args': args
+        })
+
+class NullProfiler:
+    """Profiler stand-in that records nothing, so instrumented code costs next to nothing"""
+
+    enabled = False
+    _context = nullcontext()
+
+    def phase(self, name: str, bytes: int = 0, statements: int = 0):
+        return self._context
+
+    def count(self, name: str, calls: int = 0, bytes: int = 0, statements: int = 0):
+        pass
+
+    def iterate(self, name: str, items: Iterable[T]) -> Iterable[T]:
+        return items
+
+NULL_PROFILER = NullProfiler()
+
+def profiled(name: str) -> Callable:
+    """Method decorator timing each call as a phase of self.profiler"""
+    def decorate(method: Callable) -> Callable:
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.profiler.phase(name):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorate
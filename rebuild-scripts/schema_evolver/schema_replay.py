@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""
+OncoVista Schema Replay
+Incremental schema state built by replaying a migrations directory
+"""
+
+import json
+import os
+import re
+from dataclasses import replace
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ddl_lexer import (
+    IDENTIFIER, read_parenthesized, split_statements, split_top_level, split_words, unquote_identifier
+)
+from dna_cache import content_hash, dump_signed, load_signed, signing_key
+from schema_model import Constraint, SchemaModel, Table, intern_text
+from sql_emitter import DEFAULT_SCHEMA, is_forward_script, is_part_file, script_stem, short_name
+
+DROP_PATTERN = re.compile(
+    r'DROP\s+(TABLE|INDEX|FUNCTION|TRIGGER|TYPE)\s+(?:CONCURRENTLY\s+)?(?:IF\s+EXISTS\s+)?(.*)$',
+    re.IGNORECASE | re.DOTALL
+)
+ALTER_TABLE_PATTERN = re.compile(
+    rf'ALTER\s+TABLE\s+(?:IF\s+EXISTS\s+)?(?:ONLY\s+)?({IDENTIFIER})\s+(.*)$',
+    re.IGNORECASE | re.DOTALL
+)
+ALTER_INDEX_RENAME_PATTERN = re.compile(
+    rf'ALTER\s+INDEX\s+(?:IF\s+EXISTS\s+)?({IDENTIFIER})\s+RENAME\s+TO\s+({IDENTIFIER})\s*$',
+    re.IGNORECASE
+)
+IF_NOT_EXISTS_PATTERN = re.compile(r'CREATE\s+(?:\w+\s+)*?TABLE\s+IF\s+NOT\s+EXISTS\b', re.IGNORECASE)
+# Column references in index keys and constraint expressions; string literals and function names never match
+COLUMN_REFERENCE_PATTERN = re.compile(r"'(?:[^']|'')*'|\"([^\"]+)\"|([A-Za-z_][\w$]*)(?!\s*\()")
+STATE_MANIFEST = 'manifest.json'
+
+class SchemaReplayer:
+    """Applies CREATE/ALTER/DROP statements to an in-memory schema model"""
+
+    def __init__(self, analyzer):
+        self.analyzer = analyzer
+        self.applied = 0
+        self.skipped = 0
+
+    def apply_statements(self, model: SchemaModel, statements: Iterable[str]) -> SchemaModel:
+        """Apply statements in order, mutating and returning the model"""
+        for statement in statements:
+            if self.apply_statement(model, statement):
+                self.applied += 1
+            else:
+                self.skipped += 1
+        return model
+
+    def apply_statement(self, model: SchemaModel, statement: str) -> bool:
+        """Apply one statement; returns False for statements that do not change the schema model"""
+        head = statement[:6].upper()
+        if head == 'CREATE':
+            return self._apply_create(model, statement)
+        if head.startswith('DROP'):
+            return self._apply_drop(model, statement)
+        if head == 'ALTER ':
+            return self._apply_alter(model, statement)
+        return False
+
+    def _apply_create(self, model: SchemaModel, statement: str) -> bool:
+        """Merge a CREATE statement's objects into the model"""
+        partial = self.analyzer.collect_schema_objects([statement])
+        if not any(partial[key] for key in partial):
+            return False
+
+        changed = False
+        for name, table in partial['tables'].items():
+            existing = resolve_table(model, name)
+            if existing and IF_NOT_EXISTS_PATTERN.match(statement):
+                continue
+            changed = True
+            if existing:
+                del model.tables[existing]
+            model.tables[name] = table
+        for name, indexes in partial['indexes'].items():
+            table_name = resolve_table(model, name)
+            if table_name:
+                table = model.tables[table_name]
+                known = {index.name for index in table.indexes}
+                added = tuple(index for index in indexes if index.name not in known)
+                table.indexes += added
+                changed = changed or bool(added)
+        for key in ('functions', 'triggers', 'types'):
+            if not partial[key]:
+                continue
+            current = getattr(model, key)
+            names = {item.name for item in partial[key]}
+            setattr(model, key, [item for item in current if item.name not in names] + partial[key])
+            changed = True
+        return changed
+
+    def _apply_drop(self, model: SchemaModel, statement: str) -> bool:
+        """Remove dropped tables, indexes, functions, triggers or types"""
+        match = DROP_PATTERN.match(statement)
+        if not match:
+            return False
+
+        kind = match.group(1).upper()
+        targets = re.sub(r'\s+(?:CASCADE|RESTRICT)\s*$', '', match.group(2), flags=re.IGNORECASE)
+
+        if kind == 'TRIGGER':
+            names = [unquote_identifier(split_words(targets)[0])]
+        else:
+            names = [unquote_identifier(re.sub(r'\s*\(.*$', '', item, flags=re.DOTALL))
+                     for item in split_top_level(targets)]
+
+        for name in names:
+            if kind == 'TABLE':
+                table_name = resolve_table(model, name)
+                if table_name:
+                    del model.tables[table_name]
+            elif kind == 'INDEX':
+                short = short_name(name)
+                for table in model.tables.values():
+                    table.indexes = tuple(index for index in table.indexes if short_name(index.name) != short)
+            else:
+                key = {'FUNCTION': 'functions', 'TRIGGER': 'triggers', 'TYPE': 'types'}[kind]
+                short = short_name(name)
+                setattr(model, key, [item for item in getattr(model, key) if short_name(item.name) != short])
+        return True
+
+    def _apply_alter(self, model: SchemaModel, statement: str) -> bool:
+        """Apply ALTER TABLE actions and ALTER INDEX renames"""
+        match = ALTER_INDEX_RENAME_PATTERN.match(statement)
+        if match:
+            old_name, new_name = (short_name(unquote_identifier(group)) for group in match.groups())
+            for table in model.tables.values():
+                table.indexes = tuple(
+                    replace(index, name=new_name) if short_name(index.name) == old_name else index
+                    for index in table.indexes
+                )
+            return True
+
+        match = ALTER_TABLE_PATTERN.match(statement)
+        if not match:
+            return False
+
+        table_name = resolve_table(model, unquote_identifier(match.group(1)))
+        if not table_name:
+            return False
+
+        changed = False
+        for action in split_top_level(match.group(2)):
+            table_name, applied = self._apply_table_action(model, table_name, action)
+            changed = changed or applied
+        return changed
+
+    def _apply_table_action(self, model: SchemaModel, table_name: str, action: str) -> Tuple[str, bool]:
+        """Apply one ALTER TABLE action; returns the (possibly renamed) table name"""
+        table = model.tables[table_name]
+        words = split_words(action)
+        upper = [word.upper() for word in words]
+
+        if upper[:2] == ['RENAME', 'TO']:
+            new_name = intern_text(unquote_identifier(words[2]))
+            if '.' in table_name and '.' not in new_name:
+                new_name = intern_text(f"{table_name.rsplit('.', 1)[0]}.{new_name}")
+            model.tables = {
+                (new_name if name == table_name else name): (replace(t, name=new_name) if name == table_name else t)
+                for name, t in model.tables.items()
+            }
+            return new_name, True
+
+        if upper[:2] == ['SET', 'SCHEMA'] and len(words) == 3:
+            schema = unquote_identifier(words[2])
+            short = short_name(table_name)
+            new_name = intern_text(short if schema == DEFAULT_SCHEMA else f'{schema}.{short}')
+            model.tables = {
+                (new_name if name == table_name else name): (replace(t, name=new_name) if name == table_name else t)
+                for name, t in model.tables.items()
+            }
+            return new_name, True
+
+        if upper[0] == 'RENAME':
+            rest = words[2:] if upper[1] == 'COLUMN' else words[1:]
+            if len(rest) == 3 and rest[1].upper() == 'TO':
+                old, new = unquote_identifier(rest[0]), intern_text(unquote_identifier(rest[2]))
+                table.columns = {
+                    (new if name == old else name): (replace(column, name=new) if name == old else column)
+                    for name, column in table.columns.items()
+                }
+                table.indexes = tuple(
+                    replace(index, columns=tuple(new if column == old else column for column in index.columns))
+                    for index in table.indexes
+                )
+                return table_name, True
+            return table_name, False
+
+        if upper[0] == 'ADD':
+            rest = words[1:]
+            if rest and rest[0].upper() == 'CONSTRAINT':
+                table.constraints += (Constraint(name=unquote_identifier(rest[1]), definition=' '.join(rest[2:])),)
+                return table_name, True
+            if rest and rest[0].upper() in ('PRIMARY', 'UNIQUE', 'CHECK', 'FOREIGN', 'EXCLUDE'):
+                table.constraints += (Constraint(name=None, definition=' '.join(rest)),)
+                return table_name, True
+            if rest and rest[0].upper() == 'COLUMN':
+                rest = rest[1:]
+            if len(rest) > 3 and [word.upper() for word in rest[:3]] == ['IF', 'NOT', 'EXISTS']:
+                rest = rest[3:]
+                if unquote_identifier(rest[0]) in table.columns:
+                    return table_name, False
+            table.columns.update(self.analyzer._parse_columns(' '.join(rest)))
+            return table_name, True
+
+        if upper[0] == 'DROP':
+            rest = words[1:]
+            if rest and rest[0].upper() == 'CONSTRAINT':
+                rest = rest[3:] if [word.upper() for word in rest[1:3]] == ['IF', 'EXISTS'] else rest[1:]
+                name = unquote_identifier(rest[0])
+                table.constraints = tuple(c for c in table.constraints if c.name != name)
+                return table_name, True
+            if rest and rest[0].upper() == 'COLUMN':
+                rest = rest[1:]
+            if len(rest) > 2 and [word.upper() for word in rest[:2]] == ['IF', 'EXISTS']:
+                rest = rest[2:]
+            column = unquote_identifier(rest[0])
+            if table.columns.pop(column, None) is None:
+                return table_name, False
+            _drop_column_dependents(table, column)
+            return table_name, True
+
+        if upper[0] == 'ALTER':
+            rest = words[2:] if upper[1] == 'COLUMN' else words[1:]
+            column = table.columns.get(unquote_identifier(rest[0]))
+            if column is None:
+                return table_name, False
+            table.columns[column.name] = self._alter_column(column, rest[1:])
+            return table_name, True
+
+        return table_name, False
+
+    def _alter_column(self, column, words: List[str]):
+        """Apply an ALTER COLUMN sub-action to a column"""
+        upper = [word.upper() for word in words]
+
+        if upper[:1] == ['TYPE'] or upper[:3] == ['SET', 'DATA', 'TYPE']:
+            type_words = words[1:] if upper[0] == 'TYPE' else words[3:]
+            end = next((i for i, word in enumerate(type_words) if word.upper() in ('USING', 'COLLATE')), len(type_words))
+            return replace(column, type=intern_text(re.sub(r'\s+(?=[(\[])', '', ' '.join(type_words[:end]))))
+        if upper == ['SET', 'NOT', 'NULL']:
+            constraints = column.constraints if 'NOT NULL' in column.constraints else column.constraints + ('NOT NULL',)
+            return replace(column, nullable=False, constraints=constraints)
+        if upper == ['DROP', 'NOT', 'NULL']:
+            return replace(column, nullable=True, constraints=tuple(c for c in column.constraints if c != 'NOT NULL'))
+        if upper[:2] == ['SET', 'DEFAULT']:
+            return replace(column, default=intern_text(' '.join(words[2:])))
+        if upper == ['DROP', 'DEFAULT']:
+            return replace(column, default=None)
+        return column
+
+class ReplayState:
+    """Per-migration checkpoints of a replayed schema model.
+
+    The manifest records the baseline hash and, for every replayed migration
+    file, its content hash and checkpoint file. Replay resumes from the
+    longest prefix of the migrations directory that still matches the
+    manifest, so only new or edited files are parsed. Checkpoints are
+    signed with a key private to the state directory; one that cannot be
+    read or verified is ignored and its migrations are replayed again.
+    """
+
+    def __init__(self, state_dir: str):
+        self.state_dir = Path(state_dir)
+
+    def load_manifest(self) -> Dict:
+        try:
+            with open(self.state_dir / STATE_MANIFEST) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save_manifest(self, manifest: Dict):
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.state_dir / f'{STATE_MANIFEST}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self.state_dir / STATE_MANIFEST)
+
+    def load_checkpoint(self, filename: str) -> Optional[SchemaModel]:
+        try:
+            key = signing_key(self.state_dir)
+            if key is None:
+                return None
+            with open(self.state_dir / filename, 'rb') as f:
+                return load_signed(f.read(), key, filename)
+        except Exception:
+            return None
+
+    def save_checkpoint(self, filename: str, model: SchemaModel):
+        key = signing_key(self.state_dir, create=True)
+        if key is None:
+            return
+        with open(self.state_dir / filename, 'wb') as f:
+            f.write(dump_signed(model, key, filename))
+
+def _drop_column_dependents(table: Table, column: str):
+    """Drop the indexes and table constraints PostgreSQL removes together with column"""
+    table.indexes = tuple(
+        index for index in table.indexes
+        if not any(_mentions_column(text, column) for text in (*index.columns, *index.include, index.predicate or ''))
+    )
+    table.constraints = tuple(
+        constraint for constraint in table.constraints
+        if not _mentions_column(_constraint_columns(constraint.definition), column)
+    )
+
+def _constraint_columns(definition: str) -> str:
+    """The column list or expression of a table constraint, without its REFERENCES target"""
+    start = definition.find('(')
+    return read_parenthesized(definition, start)[0] if start >= 0 else ''
+
+def _mentions_column(text: str, column: str) -> bool:
+    """Whether SQL text refers to column"""
+    return any(quoted == column or bare.lower() == column.lower()
+               for quoted, bare in COLUMN_REFERENCE_PATTERN.findall(text) if quoted or bare)
+
+def list_migration_files(migrations_dir: str) -> List[Path]:
+    """Forward migration files in apply order.
+
+    Rollback, backfill, purge and deferred scripts are excluded, and so
+    are the parts of a migration whose whole file is present as well.
+    """
+    paths = [path for path in Path(migrations_dir).glob('*.sql') if is_forward_script(path)]
+    whole = {path.stem for path in paths if not is_part_file(path)}
+    return sorted(path for path in paths if not (is_part_file(path) and script_stem(path) in whole))
+
+def replay_migrations(analyzer, baseline_file: str, migrations_dir: str, state_dir: Optional[str] = None,
+                      parser_version: str = '') -> Tuple[SchemaModel, Dict]:
+    """Return the schema state after replaying migrations_dir on top of baseline_file.
+
+    Checkpoints are written under state_dir (default: <migrations_dir>/.schema_state)
+    and reused on later runs. The returned report lists which migrations were
+    restored from checkpoints and which were replayed.
+    """
+    state = ReplayState(state_dir or os.path.join(migrations_dir, '.schema_state'))
+    baseline_hash = content_hash(baseline_file, parser_version)
+    manifest = state.load_manifest()
+    if manifest.get('baseline') != baseline_hash:
+        manifest = {'baseline': baseline_hash, 'migrations': []}
+
+    migrations = list_migration_files(migrations_dir)
+    hashes = [content_hash(str(path), parser_version) for path in migrations]
+
+    model = None
+    resume_at = 0
+    recorded = manifest['migrations']
+    while resume_at < min(len(recorded), len(migrations)) and \
+            recorded[resume_at]['file'] == migrations[resume_at].name and \
+            recorded[resume_at]['hash'] == hashes[resume_at]:
+        resume_at += 1
+
+    while resume_at > 0 and model is None:
+        model = state.load_checkpoint(recorded[resume_at - 1]['checkpoint'])
+        if model is None:
+            resume_at -= 1
+    if model is None:
+        model = analyzer.extract_schema_model(baseline_file)
+
+    replayer = SchemaReplayer(analyzer)
+    recorded = recorded[:resume_at]
+    for index in range(resume_at, len(migrations)):
+        with open(migrations[index]) as f:
+            replayer.apply_statements(model, split_statements(f.read()))
+        checkpoint = f'{index:05d}_{hashes[index][:16]}.pickle'
+        state.save_checkpoint(checkpoint, model)
+        recorded.append({'file': migrations[index].name, 'hash': hashes[index], 'checkpoint': checkpoint})
+
+    manifest['migrations'] = recorded
+    state.save_manifest(manifest)
+
+    return model, {
+        'restored': [path.name for path in migrations[:resume_at]],
+        'replayed': [path.name for path in migrations[resume_at:]],
+        'statements_applied': replayer.applied,
+        'statements_skipped': replayer.skipped
+    }
+
+def resolve_table(model: SchemaModel, name: str) -> Optional[str]:
+    """Find a table by exact name, falling back to the default schema qualification"""
+    if name in model.tables:
+        return name
+    if '.' in name:
+        schema, short = name.rsplit('.', 1)
+        return short if schema == DEFAULT_SCHEMA and short in model.tables else None
+    qualified = f'{DEFAULT_SCHEMA}.{name}'
+    return qualified if qualified in model.tables else None
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+OncoVista Schema Watch
+Resident mode that re-diffs two schema files on save and serves results over a local socket
+"""
+
+import argparse
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import replace
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from dependency_graph import DependencyCycleError
+from ddl_lexer import split_statements
+from migration_generator import MigrationSurgeon, SchemaDNAAnalyzer
+from schema_model import SchemaModel
+
+DEFAULT_INTERVAL = 0.2
+DEFAULT_MIGRATION_NAME = 'draft'
+
+class IncrementalSchemaFile:
+    """A schema file kept parsed in memory, re-parsing only statements that changed.
+
+    Each statement's parse result is cached by its exact text, so after
+    an edit only new or modified statements go through the parser; the
+    rest of the refresh is re-lexing the file and merging cached results
+    in statement order, which gives the same model as a full parse.
+    """
+
+    def __init__(self, path: str, analyzer: Optional[SchemaDNAAnalyzer] = None):
+        self.path = path
+        self.analyzer = analyzer or SchemaDNAAnalyzer()
+        self.model = SchemaModel()
+        self.reparsed = 0
+        self._signature: Optional[Tuple[int, int]] = None
+        self._partials: Dict[str, Dict[str, Any]] = {}
+
+    def refresh(self) -> bool:
+        """Re-read the file if it changed on disk; returns whether the model was rebuilt"""
+        stat = os.stat(self.path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if signature == self._signature:
+            return False
+        self._signature = signature
+
+        with open(self.path, 'r') as f:
+            content = f.read()
+        self.update(content)
+        return True
+
+    def update(self, content: str):
+        """Rebuild the model from new file content"""
+        partials = {}
+        ordered = []
+        self.reparsed = 0
+        for statement in split_statements(content):
+            partial = partials.get(statement) or self._partials.get(statement)
+            if partial is None:
+                partial = self.analyzer.collect_schema_objects([statement])
+                self.reparsed += 1
+            partials[statement] = partial
+            ordered.append(partial)
+        self._partials = partials
+
+        merged = self.analyzer.merge_schema_objects(ordered)
+        # finalize attaches indexes in place, so give it tables not shared with the cache
+        merged['tables'] = {name: replace(table) for name, table in merged['tables'].items()}
+        self.model = self.analyzer.finalize_schema_dna(merged)
+
+class SchemaWatcher:
+    """Keeps an old/new schema pair parsed and rebuilds the diff report when either file changes"""
+
+    def __init__(self, old_schema: str, new_schema: str, migration_name: str = DEFAULT_MIGRATION_NAME,
+                 surgeon: Optional[MigrationSurgeon] = None):
+        self.surgeon = surgeon or MigrationSurgeon()
+        self.files = [IncrementalSchemaFile(path, self.surgeon.analyzer) for path in (old_schema, new_schema)]
+        self.migration_name = migration_name
+        self.report: Optional[Dict[str, Any]] = None
+        self.version = 0
+        self._last_error: Optional[str] = None
+        self._listeners: List[Callable[[Dict[str, Any]], None]] = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, listener: Callable[[Dict[str, Any]], None]):
+        with self._lock:
+            self._listeners.append(listener)
+
+    def unsubscribe(self, listener: Callable[[Dict[str, Any]], None]):
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def refresh(self) -> Optional[Dict[str, Any]]:
+        """Re-diff if a file changed; returns the new report or None"""
+        started = time.perf_counter()
+        try:
+            changed = [schema_file.refresh() for schema_file in self.files]
+        except OSError as e:
+            # Editors often replace files on save; report once and try again on the next poll
+            error = f'{type(e).__name__}: {e}'
+            if error != self._last_error:
+                self._last_error = error
+                self._publish({'version': self.version, 'error': error})
+            return None
+        self._last_error = None
+        if not any(changed):
+            return None
+
+        old, new = (schema_file.model for schema_file in self.files)
+        changes = self.surgeon.compare_models(old, new)
+        report = {
+            'version': self.version + 1,
+            'generated': datetime.now().isoformat(),
+            'old_schema': self.files[0].path,
+            'new_schema': self.files[1].path,
+            'reparsed_statements': sum(schema_file.reparsed for schema_file, hit in zip(self.files, changed) if hit),
+            'changes': [
+                {'type': change.change_type, 'table': change.table_name, 'risk': change.risk_level}
+                for change in changes
+            ],
+            'risk_summary': dict(Counter(change.risk_level for change in changes)),
+            'migration': None,
+            'error': None
+        }
+        try:
+            report['migration'] = self.surgeon.generate_migration(changes, self.migration_name) if changes else None
+        except DependencyCycleError as e:
+            report['error'] = str(e)
+        report['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 1)
+
+        self.version += 1
+        self._publish(report)
+        return report
+
+    def _publish(self, report: Dict[str, Any]):
+        with self._lock:
+            self.report = report
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener(report)
+
+class _ReportHandler(socketserver.StreamRequestHandler):
+    """Newline-delimited JSON protocol.
+
+    Commands, one per line: "report" answers with the latest report,
+    "subscribe" streams every new report until the client disconnects,
+    "ping" answers {"ok": true}.
+    """
+
+    def handle(self):
+        watcher = self.server.watcher
+        for line in self.rfile:
+            command = line.decode('utf-8', 'replace').strip().lower()
+            if command == 'report':
+                self._send(watcher.report or {'version': 0})
+            elif command == 'ping':
+                self._send({'ok': True})
+            elif command == 'subscribe':
+                self._stream(watcher)
+                return
+            elif command:
+                self._send({'error': f'unknown command: {command}'})
+
+    def _stream(self, watcher: SchemaWatcher):
+        updates = []
+        ready = threading.Condition()
+
+        def listener(report):
+            with ready:
+                updates.append(report)
+                ready.notify()
+
+        watcher.subscribe(listener)
+        try:
+            if watcher.report:
+                self._send(watcher.report)
+            while not self.server.stopping:
+                with ready:
+                    ready.wait_for(lambda: updates or self.server.stopping, timeout=1.0)
+                    pending, updates[:] = list(updates), []
+                for report in pending:
+                    self._send(report)
+        except OSError:
+            pass
+        finally:
+            watcher.unsubscribe(listener)
+
+    def _send(self, payload: Dict[str, Any]):
+        self.wfile.write(json.dumps(payload).encode() + b'\n')
+        self.wfile.flush()
+
+class _UnixReportServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+class _TCPReportServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+class ReportServer:
+    """Serves a watcher's reports on a Unix socket, or on 127.0.0.1:port"""
+
+    def __init__(self, watcher: SchemaWatcher, socket_path: Optional[str] = None, port: Optional[int] = None):
+        if socket_path:
+            if os.path.exists(socket_path):
+                os.unlink(socket_path)
+            server_class = _UnixReportServer
+            address = socket_path
+        else:
+            server_class = _TCPReportServer
+            address = ('127.0.0.1', port or 0)
+        self.server = server_class(address, _ReportHandler)
+        self.server.watcher = watcher
+        self.server.stopping = False
+        self.socket_path = socket_path
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def address(self) -> Any:
+        return self.server.server_address
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self.server.stopping = True
+        self.server.shutdown()
+        self.server.server_close()
+        if self.socket_path and os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+def print_report(report: Dict[str, Any]):
+    """One-screen summary of a report"""
+    if report.get('error') and 'changes' not in report:
+        print(f"⚠️  {report['error']}")
+        return
+    stamp = datetime.now().strftime('%H:%M:%S')
+    risks = ', '.join(f'{risk}: {count}' for risk, count in report['risk_summary'].items()) or 'stable'
+    print(f"[{stamp}] 🧬 {len(report['changes'])} mutations ({risks}) — "
+          f"{report['reparsed_statements']} statements re-parsed in {report['elapsed_ms']} ms")
+    for change in report['changes']:
+        print(f"    {change['type']} on {change['table'] or 'GLOBAL'} [{change['risk']}]")
+    if report['error']:
+        print(f"    ❌ {report['error']}")
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(
+        prog='schema_watch.py',
+        description='Keep two schema files parsed in memory and re-diff them whenever either is saved'
+    )
+    parser.add_argument('old_schema', help='Old schema SQL file')
+    parser.add_argument('new_schema', help='New schema SQL file (the one being edited)')
+    parser.add_argument('--name', default=DEFAULT_MIGRATION_NAME,
+                        help=f'Name used in the draft migration (default: {DEFAULT_MIGRATION_NAME})')
+    parser.add_argument('--socket', default=None, metavar='PATH',
+                        help='Serve reports as newline-delimited JSON on this Unix socket')
+    parser.add_argument('--port', type=int, default=None,
+                        help='Serve reports on 127.0.0.1:PORT instead of a Unix socket')
+    parser.add_argument('--interval', type=float, default=DEFAULT_INTERVAL,
+                        help=f'Seconds between file checks (default: {DEFAULT_INTERVAL})')
+    parser.add_argument('--migration', action='store_true',
+                        help='Also print the draft migration SQL after each change')
+    return parser.parse_args(argv)
+
+def main():
+    """Main execution function"""
+    args = parse_args(sys.argv[1:])
+    watcher = SchemaWatcher(args.old_schema, args.new_schema, args.name)
+    watcher.subscribe(print_report)
+    if args.migration:
+        watcher.subscribe(lambda report: report.get('migration') and print(report['migration']))
+
+    server = None
+    if args.socket or args.port is not None:
+        if args.socket and not hasattr(socket, 'AF_UNIX'):
+            print("❌ Unix sockets are not available on this platform; use --port")
+            sys.exit(1)
+        server = ReportServer(watcher, args.socket, args.port)
+        server.start()
+        print(f"🔌 Serving reports on {server.address} (commands: report, subscribe, ping)")
+
+    print(f"👀 Watching {args.old_schema} and {args.new_schema} (Ctrl+C to stop)")
+    try:
+        while True:
+            watcher.refresh()
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        print("\n🛑 Watch stopped.")
+    finally:
+        if server:
+            server.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+OncoVista SQL Emitter
+Streams generated scripts to a text sink, optionally split into numbered part files
+"""
+
+import json
+import re
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, TextIO, Union
+
+SIZE_PATTERN = re.compile(r'^\s*(\d+)\s*([KMG]?)i?B?\s*$', re.IGNORECASE)
+SIZE_UNITS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+DEFAULT_SCHEMA = 'public'
+
+# Scripts written next to a forward migration <stem>.sql as <stem><suffix>.sql; replaying them would
+# apply a rollback, purge or backfill (or a deferred migration not yet run) as if it were the migration
+ROLLBACK_SUFFIX = '_ROLLBACK'
+BACKFILL_SUFFIX = '_BACKFILL'
+PURGE_SUFFIX = '_PURGE'
+DEFERRED_SUFFIX = '_deferred'
+NON_FORWARD_SUFFIXES = (ROLLBACK_SUFFIX, BACKFILL_SUFFIX, PURGE_SUFFIX, DEFERRED_SUFFIX)
+# Part files are <stem>_partNNNN<suffix>.sql
+PART_PATTERN = re.compile(r'_part\d{4,}')
+
+class SQLEmitter:
+    """Writes a script as a prologue, a sequence of blocks and an epilogue.
+
+    A block is the smallest unit that may start a new part: one operation
+    with its comments, or a whole phase. Text goes to the sink as soon as
+    it is produced, so nothing accumulates in memory.
+    """
+
+    def __init__(self, sink: TextIO):
+        self.sink = sink
+        self.statements = 0
+        self.blocks = 0
+        self.epilogue = ''
+
+    def start(self, prologue: str, epilogue: str = ''):
+        """Write the prologue and remember the epilogue that closes the script"""
+        self.epilogue = epilogue
+        self.sink.write(prologue)
+
+    def block(self, text: str, statements: int = 1):
+        self.sink.write(text)
+        self.statements += statements
+        self.blocks += 1
+
+    def finish(self):
+        self.sink.write(self.epilogue)
+
+class PartFileEmitter(SQLEmitter):
+    """Splits a script into numbered part files, each repeating the prologue and epilogue.
+
+    Parts are named <stem>_partNNNN<suffix>.sql so they sort in apply order
+    and a manifest <stem><suffix>.parts.json lists them with their
+    statement counts and sizes. Since every part carries the transaction
+    wrapper, a runner can apply and checkpoint parts one at a time. A block
+    larger than max_bytes gets a part of its own.
+    """
+
+    def __init__(self, directory: str, stem: str, suffix: str = '', max_statements: Optional[int] = None,
+                 max_bytes: Optional[int] = None, encoding: str = 'utf-8'):
+        if max_statements is not None and max_statements < 1:
+            raise ValueError('max_statements must be at least 1')
+        if max_bytes is not None and max_bytes < 1:
+            raise ValueError('max_bytes must be at least 1')
+        super().__init__(sink=None)
+        self.directory = Path(directory)
+        self.stem = stem
+        self.suffix = suffix
+        self.max_statements = max_statements
+        self.max_bytes = max_bytes
+        self.encoding = encoding
+        self.parts: List[Dict] = []
+        self.prologue = ''
+
+    @property
+    def paths(self) -> List[Path]:
+        return [self.directory / part['file'] for part in self.parts]
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.directory / f'{self.stem}{self.suffix}.parts.json'
+
+    def start(self, prologue: str, epilogue: str = ''):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.prologue = prologue
+        self.epilogue = epilogue
+
+    def block(self, text: str, statements: int = 1):
+        size = len(text.encode(self.encoding))
+        if self.sink is None or self._is_full(size, statements):
+            self._open_part()
+        self._write(text)
+        self.parts[-1]['statements'] += statements
+        self.statements += statements
+        self.blocks += 1
+
+    def finish(self):
+        if self.sink is None:
+            self._open_part()
+        self._close_part()
+        with open(self.manifest_path, 'w') as f:
+            json.dump({'stem': self.stem, 'parts': self.parts}, f, indent=2)
+
+    def _is_full(self, size: int, statements: int) -> bool:
+        part = self.parts[-1]
+        if not part['statements']:
+            return False
+        if self.max_statements is not None and part['statements'] + statements > self.max_statements:
+            return True
+        epilogue_size = len(self.epilogue.encode(self.encoding))
+        return self.max_bytes is not None and part['bytes'] + size + epilogue_size > self.max_bytes
+
+    def _open_part(self):
+        if self.sink is not None:
+            self._close_part()
+        number = len(self.parts) + 1
+        name = part_file_name(self.stem, number, self.suffix)
+        self.sink = open(self.directory / name, 'w', encoding=self.encoding)
+        self.parts.append({'file': name, 'statements': 0, 'bytes': 0})
+        self._write(f'-- 📦 Part {number} of {self.stem}{self.suffix}\n')
+        self._write(self.prologue)
+
+    def _close_part(self):
+        self._write(self.epilogue)
+        self.sink.close()
+
+    def _write(self, text: str):
+        self.sink.write(text)
+        self.parts[-1]['bytes'] += len(text.encode(self.encoding))
+
+def part_file_name(stem: str, number: int, suffix: str = '') -> str:
+    return f'{stem}_part{number:04d}{suffix}.sql'
+
+def script_stem(path: Union[str, Path]) -> str:
+    """The name of the whole script a file holds, without any part marker"""
+    return PART_PATTERN.sub('', Path(path).stem, count=1)
+
+def is_part_file(path: Union[str, Path]) -> bool:
+    return PART_PATTERN.search(Path(path).stem) is not None
+
+def is_forward_script(path: Union[str, Path]) -> bool:
+    """Whether a generated file is (part of) a forward migration rather than a script written next to one"""
+    return not script_stem(path).upper().endswith(tuple(suffix.upper() for suffix in NON_FORWARD_SUFFIXES))
+
+def write_script(path: Union[str, Path], emit: Callable[[SQLEmitter], None], suffix: str = '',
+                 max_statements: Optional[int] = None, max_bytes: Optional[int] = None) -> str:
+    """Stream one script to path, leaving nothing behind on failure.
+
+    path names the whole script as <stem><suffix>.sql. With max_statements
+    or max_bytes the script is split into part files next to it instead,
+    and the path of their manifest is returned.
+    """
+    path = Path(path)
+    if max_statements is None and max_bytes is None:
+        try:
+            with open(path, 'w') as f:
+                emit(SQLEmitter(f))
+        except Exception:
+            path.unlink(missing_ok=True)
+            raise
+        return str(path)
+
+    emitter = PartFileEmitter(path.parent, path.stem[:len(path.stem) - len(suffix)], suffix, max_statements, max_bytes)
+    try:
+        emit(emitter)
+    except Exception:
+        if emitter.sink is not None:
+            emitter.sink.close()
+        for part in emitter.paths:
+            part.unlink(missing_ok=True)
+        raise
+    return str(emitter.manifest_path)
+
+def short_name(name: str) -> str:
+    """Object name without its schema, as RENAME TO expects"""
+    return name.rsplit('.', 1)[-1]
+
+def schema_name(name: str) -> str:
+    """Schema an object name lives in, public when unqualified"""
+    return name.rsplit('.', 1)[0] if '.' in name else DEFAULT_SCHEMA
+
+def schema_prefix(name: str) -> str:
+    """The schema qualification of a name including its dot, or nothing when unqualified"""
+    return name.rsplit('.', 1)[0] + '.' if '.' in name else ''
+
+def quote_literal(value: str) -> str:
+    """Quote text as a standard SQL string literal"""
+    return "'" + value.replace("'", "''") + "'"
+
+def parse_size(text: str) -> int:
+    """Parse a byte size such as 4096, 512K or 8MiB"""
+    match = SIZE_PATTERN.match(text)
+    if not match:
+        raise ValueError(f"invalid size '{text}': expected a number with an optional K, M or G suffix")
+    return int(match.group(1)) * SIZE_UNITS[match.group(2).upper()]
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+OncoVista Synthetic Schema Generator
+Realistic random schemas and controlled mutations for benchmarks
+"""
+
+import random
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+COLUMN_TYPES = [
+    ('UUID', 'uuid_generate_v4()'),
+    ('TEXT', "'unknown'"),
+    ('VARCHAR(255)', None),
+    ('VARCHAR(50)', "'active'"),
+    ('INTEGER', '0'),
+    ('BIGINT', None),
+    ('NUMERIC(10, 2)', '0.00'),
+    ('BOOLEAN', 'false'),
+    ('DATE', None),
+    ('TIMESTAMPTZ', 'NOW()'),
+    ('JSONB', "'{}'::jsonb"),
+    ('TEXT[]', None),
+]
+TABLE_STEMS = [
+    'patients', 'treatments', 'medications', 'protocols', 'diagnoses', 'appointments',
+    'lab_results', 'clinical_notes', 'admissions', 'symptoms', 'dosages', 'referrals'
+]
+
+@dataclass
+class SyntheticSchemaConfig:
+    """Shape of a generated schema"""
+    tables: int = 100
+    columns_per_table: int = 12
+    indexes_per_table: int = 2
+    functions: int = 10
+    triggers: int = 10
+    types: int = 5
+    foreign_key_rate: float = 0.3
+    seed: int = 0
+
+@dataclass
+class MutationRates:
+    """Per-object probabilities of each change between the old and new schema"""
+    add_table: float = 0.02
+    drop_table: float = 0.01
+    add_column: float = 0.05
+    drop_column: float = 0.02
+    modify_column: float = 0.03
+    add_index: float = 0.02
+    drop_index: float = 0.02
+    add_function: float = 0.05
+
+@dataclass
+class ColumnSpec:
+    """A generated column"""
+    name: str
+    type: str
+    nullable: bool = True
+    default: Optional[str] = None
+    references: Optional[str] = None
+    primary_key: bool = False
+
+    def render(self) -> str:
+        sql = f'{self.name} {self.type}'
+        if self.default:
+            sql += f' DEFAULT {self.default}'
+        if self.primary_key:
+            sql += ' PRIMARY KEY'
+        if not self.nullable:
+            sql += ' NOT NULL'
+        if self.references:
+            sql += f' REFERENCES {self.references}(id) ON DELETE CASCADE'
+        return sql
+
+@dataclass
+class TableSpec:
+    """A generated table with its indexes and optional trigger"""
+    name: str
+    columns: List[ColumnSpec]
+    indexes: List[Tuple[str, List[str], bool]] = field(default_factory=list)
+    trigger: Optional[str] = None
+
+@dataclass
+class SchemaSpec:
+    """A generated schema before rendering to SQL"""
+    tables: Dict[str, TableSpec] = field(default_factory=dict)
+    functions: List[str] = field(default_factory=list)
+    types: List[Tuple[str, List[str]]] = field(default_factory=list)
+
+class SyntheticSchemaGenerator:
+    """Generates deterministic, realistic schemas and mutated successors"""
+
+    def __init__(self, config: Optional[SyntheticSchemaConfig] = None):
+        self.config = config or SyntheticSchemaConfig()
+        self.rng = random.Random(self.config.seed)
+        self._serial = 0
+
+    def build(self) -> SchemaSpec:
+        """Build a schema spec according to the configuration"""
+        spec = SchemaSpec()
+
+        for i in range(self.config.types):
+            spec.types.append((f'status_kind_{i}', ['draft', 'active', 'closed']))
+        for i in range(self.config.functions):
+            spec.functions.append(f'touch_row_{i}')
+        for _ in range(self.config.tables):
+            table = self._new_table(list(spec.tables))
+            spec.tables[table.name] = table
+
+        table_names = list(spec.tables)
+        for i in range(min(self.config.triggers, len(table_names))):
+            spec.tables[table_names[i]].trigger = spec.functions[i % len(spec.functions)] if spec.functions else None
+
+        return spec
+
+    def mutate(self, spec: SchemaSpec, rates: Optional[MutationRates] = None) -> SchemaSpec:
+        """Return a copy of spec with random changes applied at the given rates"""
+        rates = rates or MutationRates()
+        rng = self.rng
+        mutated = SchemaSpec(functions=list(spec.functions), types=list(spec.types))
+
+        for name, table in spec.tables.items():
+            if rng.random() < rates.drop_table:
+                continue
+
+            columns = []
+            for column in table.columns:
+                if not column.primary_key and rng.random() < rates.drop_column:
+                    continue
+                if not column.primary_key and rng.random() < rates.modify_column:
+                    column = ColumnSpec(column.name, self._pick_type()[0], not column.nullable, column.default)
+                columns.append(column)
+            if rng.random() < rates.add_column:
+                columns.append(self._new_column(None))
+
+            column_names = {column.name for column in columns}
+            indexes = [
+                index for index in table.indexes
+                if set(index[1]) <= column_names and rng.random() >= rates.drop_index
+            ]
+            if rng.random() < rates.add_index and len(columns) > 1:
+                indexes.append(self._new_index(name, columns))
+
+            mutated.tables[name] = TableSpec(name, columns, indexes, table.trigger)
+
+        for _ in range(self._count(len(spec.tables), rates.add_table)):
+            table = self._new_table(list(mutated.tables))
+            mutated.tables[table.name] = table
+        for _ in range(self._count(len(spec.functions), rates.add_function)):
+            mutated.functions.append(f'touch_row_{self._next_serial()}')
+
+        return mutated
+
+    def generate_pair(self, rates: Optional[MutationRates] = None) -> Tuple[str, str]:
+        """Generate old and new schema SQL"""
+        old = self.build()
+        return render_schema(old), render_schema(self.mutate(old, rates))
+
+    def _new_table(self, existing: List[str]) -> TableSpec:
+        """Create a table whose foreign keys point at already generated tables"""
+        name = f'{self.rng.choice(TABLE_STEMS)}_{self._next_serial()}'
+        columns = [ColumnSpec('id', 'UUID', False, 'uuid_generate_v4()', primary_key=True)]
+        while len(columns) < self.config.columns_per_table:
+            columns.append(self._new_column(existing))
+
+        indexes = [self._new_index(name, columns) for _ in range(self.config.indexes_per_table)]
+        return TableSpec(name, columns, indexes)
+
+    def _new_column(self, existing: Optional[List[str]]) -> ColumnSpec:
+        """Create a column, sometimes a foreign key to an existing table"""
+        serial = self._next_serial()
+        if existing and self.rng.random() < self.config.foreign_key_rate:
+            target = self.rng.choice(existing)
+            return ColumnSpec(f'{target.rsplit("_", 1)[0]}_ref_{serial}', 'UUID', references=target)
+
+        col_type, default = self._pick_type()
+        return ColumnSpec(
+            f'field_{serial}',
+            col_type,
+            nullable=self.rng.random() < 0.7,
+            default=default if self.rng.random() < 0.5 else None
+        )
+
+    def _new_index(self, table_name: str, columns: List[ColumnSpec]) -> Tuple[str, List[str], bool]:
+        """Create a one- or two-column index on non-key columns"""
+        candidates = [column.name for column in columns if not column.primary_key]
+        width = min(len(candidates), self.rng.choice((1, 1, 2)))
+        chosen = self.rng.sample(candidates, width)
+        return f'idx_{table_name}_{self._next_serial()}', chosen, self.rng.random() < 0.1
+
+    def _pick_type(self) -> Tuple[str, Optional[str]]:
+        return self.rng.choice(COLUMN_TYPES)
+
+    def _count(self, population: int, rate: float) -> int:
+        """Draw how many of population objects a rate applies to"""
+        return sum(1 for _ in range(population) if self.rng.random() < rate)
+
+    def _next_serial(self) -> int:
+        self._serial += 1
+        return self._serial
+
+def render_schema(spec: SchemaSpec) -> str:
+    """Render a schema spec as pg_dump-style SQL"""
+    parts: List[str] = ['-- Synthetic OncoVista schema\n']
+
+    for type_name, labels in spec.types:
+        parts.append(f"CREATE TYPE {type_name} AS ENUM ({', '.join(repr(label) for label in labels)});\n")
+
+    for function in spec.functions:
+        parts.append(
+            f'CREATE OR REPLACE FUNCTION {function}()\nRETURNS TRIGGER AS $$\n'
+            f"BEGIN\n  NEW.updated_at = NOW(); -- keep audit columns fresh\n  RETURN NEW;\nEND;\n$$ LANGUAGE plpgsql;\n"
+        )
+
+    for table in spec.tables.values():
+        body = ',\n'.join(f'  {column.render()}' for column in table.columns)
+        parts.append(f'\n/* {table.name} */\nCREATE TABLE public.{table.name} (\n{body}\n);\n')
+        for index_name, columns, unique in table.indexes:
+            unique_sql = 'UNIQUE ' if unique else ''
+            parts.append(f"CREATE {unique_sql}INDEX {index_name} ON public.{table.name} ({', '.join(columns)});\n")
+        if table.trigger:
+            parts.append(
+                f'CREATE TRIGGER {table.name}_touch BEFORE UPDATE ON public.{table.name} '
+                f'FOR EACH ROW EXECUTE FUNCTION {table.trigger}();\n'
+            )
+
+    return ''.join(parts)
+
+def generate_schema_sql(table_count: int, columns_per_table: int = 12, indexes_per_table: int = 2,
+                        seed: int = 0) -> str:
+    """Generate a single synthetic schema with the given number of tables"""
+    config = SyntheticSchemaConfig(
+        tables=table_count,
+        columns_per_table=columns_per_table,
+        indexes_per_table=indexes_per_table,
+        functions=max(1, table_count // 10),
+        triggers=table_count // 2,
+        types=max(1, table_count // 20),
+        seed=seed
+    )
+    return render_schema(SyntheticSchemaGenerator(config).build())
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+OncoVista Archive Mode Test Suite
+Validate archiving renames, O(1) restores, the deferred purge script and diffs that ignore the archive
+"""
+
+import unittest
+import sys
+import os
+
+# Add the schema_evolver directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'schema_evolver'))
+
+from archive_mode import (
+    MAX_IDENTIFIER_LENGTH, ArchivePolicy, archive_changes, archived_name, is_archived_name, render_purge_script
+)
+from cost_estimator import CostEstimator, TableStats
+from ddl_lexer import split_statements
+from migration_generator import MigrationSurgeon
+from online_migration import OnlineMigrationPlanner
+from schema_replay import SchemaReplayer
+
+MIGRATION_ID = '20261017120000'
+
+OLD_SCHEMA = """
+CREATE TABLE doctors (id SERIAL PRIMARY KEY, name TEXT);
+CREATE TABLE patients (id SERIAL PRIMARY KEY, mrn TEXT NOT NULL, doctor_id INT REFERENCES doctors, notes TEXT);
+CREATE TABLE referrals (id SERIAL PRIMARY KEY, patient_id INT NOT NULL,
+    CONSTRAINT referrals_patient FOREIGN KEY (patient_id) REFERENCES patients(id));
+"""
+NEW_SCHEMA = "CREATE TABLE patients (id SERIAL PRIMARY KEY, notes TEXT);"
+
+class TestArchiveChanges(unittest.TestCase):
+    """Test the SQL of archived tables and columns"""
+
+    def setUp(self):
+        self.surgeon = MigrationSurgeon()
+        analyzer = self.surgeon.analyzer
+        self.old = analyzer.extract_schema_model_from_statements(split_statements(OLD_SCHEMA))
+        self.new = analyzer.extract_schema_model_from_statements(split_statements(NEW_SCHEMA))
+        self.changes = archive_changes(self.surgeon.compare_models(self.old, self.new), ArchivePolicy(), MIGRATION_ID)
+        self.by_name = {change.details['archive'].original_name: change for change in self.changes}
+
+    def test_drops_become_archives(self):
+        self.assertEqual(sorted(self.by_name), ['doctors', 'patients.doctor_id', 'patients.mrn', 'referrals'])
+        self.assertEqual({change.change_type for change in self.changes}, {'ARCHIVE_TABLE', 'ARCHIVE_COLUMN'})
+        # patients is critical, so its columns stay HIGH rather than CRITICAL
+        self.assertEqual(self.by_name['patients.mrn'].risk_level, 'HIGH')
+        self.assertEqual(self.by_name['doctors'].risk_level, 'MEDIUM')
+
+    def test_table_archive_and_restore(self):
+        referrals = self.by_name['referrals']
+        archived = f'referrals__archived_{MIGRATION_ID}'
+        sql = self.surgeon._generate_change_sql(referrals)
+        self.assertEqual(sql.splitlines()[:3], [
+            'ALTER TABLE referrals DROP CONSTRAINT IF EXISTS referrals_patient;',
+            f'ALTER TABLE referrals RENAME TO {archived};',
+            f'ALTER TABLE {archived} SET SCHEMA oncovista_archive;'
+        ])
+        self.assertIn(f"'oncovista_archive.{archived}', NOW() + INTERVAL '30 days');", sql)
+        self.assertNotIn('DROP TABLE', sql)
+
+        self.assertEqual(referrals.rollback_sql.splitlines(), [
+            f'ALTER TABLE oncovista_archive.{archived} SET SCHEMA public;',
+            f'ALTER TABLE public.{archived} RENAME TO referrals;',
+            'ALTER TABLE referrals ADD CONSTRAINT referrals_patient FOREIGN KEY (patient_id) REFERENCES patients(id) '
+            'NOT VALID;',
+            f"DELETE FROM oncovista_archive.archived_objects WHERE migration_id = '{MIGRATION_ID}' "
+            f"AND original_name = 'referrals';"
+        ])
+
+    def test_column_archive_and_restore(self):
+        mrn, doctor = self.by_name['patients.mrn'], self.by_name['patients.doctor_id']
+        sql = self.surgeon._generate_change_sql(mrn)
+        self.assertIn(f'ALTER TABLE patients RENAME COLUMN mrn TO mrn__archived_{MIGRATION_ID};', sql)
+        self.assertIn(f'ALTER TABLE patients ALTER COLUMN mrn__archived_{MIGRATION_ID} DROP NOT NULL;', sql)
+        self.assertIn('CHECK (mrn IS NOT NULL) NOT VALID', mrn.rollback_sql)
+        self.assertNotIn('SET NOT NULL', mrn.rollback_sql)
+
+        self.assertIn('DROP CONSTRAINT IF EXISTS patients_doctor_id_fkey;', self.surgeon._generate_change_sql(doctor))
+        self.assertIn('ADD CONSTRAINT patients_doctor_id_fkey FOREIGN KEY (doctor_id) REFERENCES doctors NOT VALID',
+                      doctor.rollback_sql)
+
+    def test_migration_order_and_registry(self):
+        migration = self.surgeon.generate_migration(self.changes, 'archive')
+        self.assertEqual(migration.count('CREATE TABLE IF NOT EXISTS oncovista_archive.archived_objects'), 1)
+        self.assertLess(migration.index('CREATE SCHEMA IF NOT EXISTS'), migration.index('-- Operation 1'))
+        # Foreign keys out of the archived columns go before the table they point at is archived
+        self.assertLess(migration.index('RENAME COLUMN doctor_id'), migration.index('ALTER TABLE doctors RENAME'))
+
+        rollback = self.surgeon.generate_rollback_script(self.changes)
+        self.assertLess(rollback.index('RENAME TO doctors'), rollback.index('REFERENCES doctors NOT VALID'))
+        self.assertNotIn('CREATE TABLE', rollback)
+
+    def test_purge_script(self):
+        purge = render_purge_script(self.changes, 'archive')
+        self.assertIn("migration_id = '20261017120000' AND purge_after > NOW()) THEN", purge)
+        self.assertIn('RAISE EXCEPTION', purge)
+        self.assertIn(f'DROP TABLE IF EXISTS oncovista_archive.doctors__archived_{MIGRATION_ID};', purge)
+        self.assertIn(f'ALTER TABLE IF EXISTS patients DROP COLUMN IF EXISTS mrn__archived_{MIGRATION_ID};', purge)
+        self.assertTrue(purge.rstrip().endswith('COMMIT;'))
+        self.assertIsNone(render_purge_script(self.surgeon.compare_models(self.old, self.new), 'plain'))
+
+    def test_cost_and_online_plan(self):
+        estimator = CostEstimator({'doctors': TableStats('doctors', rows=5000, table_bytes=10 ** 9)})
+        cost = estimator.estimate(self.by_name['doctors'])
+        self.assertEqual((cost.lock_seconds, cost.io_bytes, cost.rewrite), (0.0, 0, False))
+
+        phases = OnlineMigrationPlanner(self.surgeon).plan(self.changes)
+        contract = phases[-1]
+        self.assertEqual(contract.name, 'contract')
+        self.assertTrue(contract.steps[0].sql.startswith('CREATE SCHEMA IF NOT EXISTS oncovista_archive;'))
+        self.assertEqual(len(contract.steps), 5)
+
+class TestArchivedNames(unittest.TestCase):
+    """Test identifier limits and archive recognition"""
+
+    def test_long_names_stay_distinct(self):
+        first, second = 'a' * 60 + '_first', 'a' * 60 + '_second'
+        names = {archived_name(first, MIGRATION_ID), archived_name(second, MIGRATION_ID)}
+        self.assertEqual(len(names), 2)
+        self.assertTrue(all(len(name) <= MAX_IDENTIFIER_LENGTH for name in names))
+        self.assertTrue(all(name.endswith(f'__archived_{MIGRATION_ID}') for name in names))
+
+    def test_recognition(self):
+        self.assertTrue(is_archived_name('oncovista_archive.archived_objects'))
+        self.assertTrue(is_archived_name(f'mrn__archived_{MIGRATION_ID}'))
+        self.assertFalse(is_archived_name('public.patients'))
+        self.assertTrue(is_archived_name('vault.patients', schema='vault'))
+        with self.assertRaises(ValueError):
+            ArchivePolicy(retention_days=-1)
+
+class TestDiffIgnoresArchive(unittest.TestCase):
+    """Test that archived objects are not diffed again after the migration ran"""
+
+    def test_replayed_migration_has_no_changes(self):
+        surgeon = MigrationSurgeon()
+        analyzer = surgeon.analyzer
+        old = analyzer.extract_schema_model_from_statements(split_statements(OLD_SCHEMA))
+        new = analyzer.extract_schema_model_from_statements(split_statements(NEW_SCHEMA))
+        changes = archive_changes(surgeon.compare_models(old, new), ArchivePolicy(), MIGRATION_ID)
+
+        replayed = analyzer.extract_schema_model_from_statements(split_statements(OLD_SCHEMA))
+        SchemaReplayer(analyzer).apply_statements(
+            replayed, split_statements(surgeon.generate_migration(changes, 'archive'))
+        )
+        self.assertIn(f'oncovista_archive.doctors__archived_{MIGRATION_ID}', replayed.tables)
+        self.assertIn(f'mrn__archived_{MIGRATION_ID}', replayed.tables['patients'].columns)
+        self.assertEqual(surgeon.compare_models(replayed, new), [])
+
+        # Restoring brings the originals back under their own names
+        SchemaReplayer(analyzer).apply_statements(
+            replayed, split_statements(surgeon.generate_rollback_script(changes))
+        )
+        self.assertEqual(sorted(replayed.tables), ['doctors', 'oncovista_archive.archived_objects', 'patients',
+                                                   'referrals'])
+        self.assertIn('mrn', replayed.tables['patients'].columns)
+
+if __name__ == '__main__':
+    unittest.main()
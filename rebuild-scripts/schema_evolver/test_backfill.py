@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+OncoVista Backfill Generator Test Suite
+Validate chunked, resumable backfill scripts
+"""
+
+import sqlite3
+import unittest
+import sys
+import os
+
+# Add the schema_evolver directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'schema_evolver'))
+
+from backfill import BackfillGenerator, BackfillJob, detect_backfills, mark_backfilled
+from ddl_lexer import split_statements
+from migration_generator import MigrationSurgeon, parse_backfill_expressions
+from online_migration import OnlineMigrationPlanner
+
+OLD_SCHEMA = """
+CREATE TABLE public.patients (id SERIAL PRIMARY KEY, first_name TEXT, last_name TEXT);
+CREATE TABLE public.audit_events (event TEXT, at TIMESTAMPTZ);
+"""
+NEW_SCHEMA = """
+CREATE TABLE public.patients (id SERIAL PRIMARY KEY, first_name TEXT, last_name TEXT, full_name TEXT,
+                              external_id UUID DEFAULT gen_random_uuid());
+CREATE TABLE public.audit_events (event TEXT, at TIMESTAMPTZ, source TEXT);
+"""
+
+class TestBackfillGenerator(unittest.TestCase):
+    """Test rendering of batched backfill blocks"""
+
+    def setUp(self):
+        self.generator = BackfillGenerator(batch_size=250, sleep_seconds=0.5)
+
+    def test_keyset_batches_and_checkpoints(self):
+        """Keyed tables are walked in key ranges with progress committed per batch"""
+        block = self.generator.render_block(BackfillJob('public.patients', 'full_name', "first_name || ' '", 'id', 'SERIAL'))
+        self.assertIn('v_last_key INTEGER;', block)
+        self.assertIn('ORDER BY id LIMIT 250', block)
+        self.assertIn('AND id <= v_batch_end AND full_name IS NULL;', block)
+        self.assertIn('SET last_key = v_batch_end::TEXT', block)
+        self.assertIn('PERFORM pg_sleep(0.5);', block)
+        self.assertIn("VALUES ('public.patients.full_name=first_name || '' ''', 'public.patients', 'full_name')", block)
+        self.assertIn('completed_at IS NOT NULL) THEN\n        RETURN;', block)
+        self.assertEqual(block.count('COMMIT;'), 3)
+
+    def test_tables_without_key_use_ctid(self):
+        """Keyless tables batch by ctid over rows that still need a value"""
+        block = self.generator.render_block(BackfillJob('audit_events', 'source', "'legacy'"))
+        self.assertIn('SELECT ctid FROM audit_events WHERE source IS NULL LIMIT 250', block)
+        self.assertIn('EXIT WHEN v_updated = 0;', block)
+
+    def test_invalid_batch_size(self):
+        with self.assertRaises(ValueError):
+            BackfillGenerator(batch_size=0)
+
+class TestBackfillDetection(unittest.TestCase):
+    """Test automatic backfill planning in both migration modes"""
+
+    def setUp(self):
+        self.surgeon = MigrationSurgeon()
+        analyzer = self.surgeon.analyzer
+        old = analyzer.extract_schema_model_from_statements(split_statements(OLD_SCHEMA))
+        new = analyzer.extract_schema_model_from_statements(split_statements(NEW_SCHEMA))
+        self.changes = self.surgeon.compare_models(old, new)
+        self.expressions = parse_backfill_expressions([
+            "patients.full_name=first_name || ' ' || last_name",
+            "public.audit_events.source='legacy'"
+        ])
+
+    def test_standard_mode_uses_expressions_only(self):
+        """Only columns with a derived expression get a standalone backfill"""
+        jobs = detect_backfills(self.changes, self.expressions)
+        self.assertEqual(sorted((job.table, job.column, job.key_column) for job in jobs), [
+            ('public.audit_events', 'source', None), ('public.patients', 'full_name', 'id')
+        ])
+        self.assertIsNone(self.surgeon.generate_backfill_script(self.changes, 'noop'))
+        script = self.surgeon.generate_backfill_script(self.changes, 'names', self.expressions)
+        self.assertIn('CREATE TABLE IF NOT EXISTS schema_evolver_backfill_progress', script)
+
+    def test_online_mode_detects_volatile_defaults(self):
+        """Online plans backfill volatile defaults and derived values in batches"""
+        planner = OnlineMigrationPlanner(self.surgeon, expressions=self.expressions)
+        phases = {phase.name: phase for phase in planner.plan(self.changes)}
+        self.assertEqual(sorted(job.column for job in planner.backfills), ['external_id', 'full_name', 'source'])
+        online = [step.sql for step in phases['online'].steps]
+        self.assertTrue(online[0].startswith('CREATE TABLE IF NOT EXISTS schema_evolver_backfill_progress'))
+        self.assertEqual(sum('DO $backfill$' in sql for sql in online), 3)
+        expand = '\n'.join(step.sql for step in phases['expand'].steps)
+        self.assertIn('ADD COLUMN full_name TEXT;', expand)
+
+    def test_standard_mode_backfill_reaches_existing_rows(self):
+        """A column with a default is added without it, so the backfill condition still matches old rows"""
+        old = self.surgeon.analyzer.extract_schema_model_from_statements(split_statements(
+            "CREATE TABLE visits (id INT PRIMARY KEY, ward TEXT);"))
+        new = self.surgeon.analyzer.extract_schema_model_from_statements(split_statements(
+            "CREATE TABLE visits (id INT PRIMARY KEY, ward TEXT, unit TEXT NOT NULL DEFAULT 'general');"))
+        expressions = parse_backfill_expressions(["visits.unit=upper(ward)"])
+        changes = mark_backfilled(self.surgeon.compare_models(old, new), expressions)
+
+        sql = self.surgeon._generate_change_sql(changes[0])
+        self.assertEqual(sql.splitlines(), ['ALTER TABLE visits ADD COLUMN unit TEXT;',
+                                            "ALTER TABLE visits ALTER COLUMN unit SET DEFAULT 'general';"])
+        script = self.surgeon.generate_backfill_script(changes, 'units', expressions)
+        self.assertTrue(script.rstrip().endswith('ALTER TABLE visits ALTER COLUMN unit SET NOT NULL;'))
+
+        # Run the added column and one batch of the backfill over existing rows
+        job = detect_backfills(changes, expressions)[0]
+        database = sqlite3.connect(':memory:')
+        database.execute('CREATE TABLE visits (id INT PRIMARY KEY, ward TEXT)')
+        database.executemany('INSERT INTO visits VALUES (?, ?)', [(1, 'onc'), (2, 'icu')])
+        database.execute(sql.splitlines()[0])
+        updated = database.execute(f'UPDATE visits SET unit = {job.expression} WHERE {job.condition}').rowcount
+        self.assertEqual(updated, 2)
+        self.assertEqual(database.execute('SELECT unit FROM visits ORDER BY id').fetchall(), [('ONC',), ('ICU',)])
+
+    def test_invalid_expression_option(self):
+        with self.assertRaises(ValueError):
+            parse_backfill_expressions(['full_name'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+OncoVista Batch Tenant Diff Test Suite
+Validate manifest loading and pooled multi-tenant diffs
+"""
+
+import json
+import shutil
+import tempfile
+import unittest
+import sys
+import os
+
+# Add the schema_evolver directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'schema_evolver'))
+
+from batch_diff import BatchDiffRunner, load_manifest
+
+CANONICAL = """
+CREATE TABLE patients (id SERIAL PRIMARY KEY, name TEXT, mrn TEXT);
+CREATE TABLE visits (id SERIAL PRIMARY KEY, patient_id INTEGER);
+"""
+TENANTS = {
+    'st_marys': CANONICAL,
+    'general': "CREATE TABLE patients (id SERIAL PRIMARY KEY, name TEXT);",
+    'cancer_centre': "CREATE TABLE patients (id SERIAL PRIMARY KEY, name TEXT, mrn TEXT, fax TEXT);"
+}
+
+class TestBatchDiff(unittest.TestCase):
+    """Test batch diffs of tenant schemas against a canonical schema"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.write('canonical.sql', CANONICAL)
+        for name, sql in TENANTS.items():
+            self.write(f'tenants/{name}.sql', sql)
+        self.manifest = self.write('manifest.json', json.dumps({
+            'canonical': 'canonical.sql',
+            'tenants': [{'name': name, 'schema': f'tenants/{name}.sql'} for name in TENANTS]
+        }))
+        self.output_dir = os.path.join(self.directory, 'out')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+    def run_batch(self, workers):
+        runner = BatchDiffRunner(self.output_dir, workers=workers, use_cache=False)
+        return runner.run(load_manifest(self.manifest))
+
+    def test_manifest_resolves_paths(self):
+        """Tenant entries pair each schema with the canonical file next to the manifest"""
+        tenants = load_manifest(self.manifest)
+        self.assertEqual([tenant.name for tenant in tenants], list(TENANTS))
+        self.assertEqual(tenants[0].new_schema, os.path.join(self.directory, 'canonical.sql'))
+        self.assertEqual(tenants[1].old_schema, os.path.join(self.directory, 'tenants/general.sql'))
+
+    def test_manifest_rejects_bad_entries(self):
+        """Unsafe names, duplicates and incomplete pairs are rejected"""
+        for tenants in ([{'name': '../x', 'schema': 'a.sql'}],
+                        [{'name': 'a', 'schema': 'a.sql'}, {'name': 'a', 'schema': 'b.sql'}],
+                        [{'name': 'a', 'old': 'a.sql'}],
+                        []):
+            path = self.write('bad.json', json.dumps({'tenants': tenants}))
+            with self.assertRaises(ValueError):
+                load_manifest(path)
+
+    def test_report_per_tenant(self):
+        """Each tenant gets its change set and script paths; in-sync tenants get no files"""
+        report = self.run_batch(workers=1)
+        results = {result['tenant']: result for result in report['tenants']}
+        self.assertEqual(results['st_marys']['changes'], [])
+        self.assertIsNone(results['st_marys']['migration'])
+        self.assertEqual({(c['type'], c['table']) for c in results['general']['changes']},
+                         {('ADD_COLUMN', 'patients'), ('ADD_TABLE', 'visits')})
+        self.assertEqual(sorted(c['type'] for c in results['cancer_centre']['changes']), ['ADD_TABLE', 'DROP_COLUMN'])
+        for name in ('general', 'cancer_centre'):
+            self.assertTrue(os.path.exists(results[name]['migration']))
+            self.assertTrue(results[name]['rollback'].endswith('_ROLLBACK.sql'))
+            self.assertEqual(os.path.dirname(results[name]['migration']), os.path.join(self.output_dir, name))
+        self.assertEqual(report['summary']['drifted'], 2)
+        self.assertEqual(report['summary']['changes'], 4)
+
+    def test_canonical_parsed_once(self):
+        """The schema shared by every pair is parsed in the parent and handed to workers"""
+        report = self.run_batch(workers=1)
+        self.assertEqual(report['summary']['shared_schemas'], [os.path.join(self.directory, 'canonical.sql')])
+
+    def test_pool_matches_serial(self):
+        """Diffing in a process pool gives the same change sets as one process"""
+        serial = self.run_batch(workers=1)
+        pooled = self.run_batch(workers=2)
+        strip = lambda report: [(r['tenant'], r['changes'], r['error']) for r in report['tenants']]
+        self.assertEqual(strip(pooled), strip(serial))
+
+    def test_missing_tenant_schema_is_reported(self):
+        """A missing tenant file fails that tenant only"""
+        self.write('manifest.json', json.dumps({
+            'canonical': 'canonical.sql',
+            'tenants': [{'name': 'general', 'schema': 'tenants/general.sql'},
+                        {'name': 'lost', 'schema': 'tenants/lost.sql'}]
+        }))
+        report = self.run_batch(workers=1)
+        self.assertIn('FileNotFoundError', report['tenants'][1]['error'])
+        self.assertIsNone(report['tenants'][0]['error'])
+        self.assertEqual(report['summary']['failed'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
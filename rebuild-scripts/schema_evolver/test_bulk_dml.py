@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+OncoVista Bulk DML Test Suite
+Validate batching of row-by-row statements, COPY rendering and the order kept around dependencies
+"""
+
+import unittest
+import sys
+import os
+
+# Add the schema_evolver directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'schema_evolver'))
+
+from bulk_dml import BulkDMLCompiler, BulkDMLError, parse_dml, parse_update
+from ddl_lexer import split_statements, split_top_level
+from migration_generator import SchemaDNAAnalyzer
+
+SCHEMA = """
+CREATE TABLE doctors (id INT PRIMARY KEY, name TEXT);
+CREATE TABLE patients (id INT PRIMARY KEY, doctor_id INT REFERENCES doctors(id), status VARCHAR(20), score NUMERIC);
+CREATE TABLE drugs (id INT PRIMARY KEY, name TEXT, active BOOLEAN);
+"""
+
+def compile_sql(sql, schema=None, **options):
+    model = SchemaDNAAnalyzer().extract_schema_model_from_statements(split_statements(schema)) if schema else None
+    compiler = BulkDMLCompiler(model=model, **options)
+    return ''.join(compiler.compile(split_statements(sql))), compiler.report
+
+def statements(output):
+    return list(split_statements(output))
+
+class TestInsertBatching(unittest.TestCase):
+    """Test multi-row INSERT and COPY output"""
+
+    def test_consecutive_inserts_merge_and_split_by_batch_size(self):
+        sql = ''.join(f"INSERT INTO drugs (id, name) VALUES ({n}, 'drug {n}');\n" for n in range(5))
+        output, report = compile_sql(sql, batch_rows=2)
+        self.assertEqual(len(statements(output)), 3)
+        self.assertIn("INSERT INTO drugs (id, name) VALUES\n    (0, 'drug 0'),\n    (1, 'drug 1');", output)
+        self.assertEqual((report.statements_in, report.statements_out, report.batches, report.rows), (5, 3, 3, 5))
+        self.assertGreater(report.reduction, 0)
+
+    def test_copy_escaping(self):
+        sql = ("INSERT INTO drugs VALUES (1, 'it''s\ta\\\\b', TRUE);\n"
+               "INSERT INTO drugs VALUES (2, NULL, false);")
+        output, report = compile_sql(sql, copy=True)
+        self.assertEqual(output, 'COPY drugs FROM STDIN;\n1\tit\'s\\ta\\\\\\\\b\tt\n2\t\\N\tf\n\\.\n\n')
+        self.assertEqual(report.copy_blocks, 1)
+
+    def test_values_fallback(self):
+        sql = ("INSERT INTO drugs (id, name) VALUES (1, 'a'::text) ON CONFLICT (id) DO NOTHING;\n"
+               "INSERT INTO drugs (id, name) VALUES (2, DEFAULT) ON CONFLICT (id) DO NOTHING;\n"
+               "INSERT INTO drugs (id, name) VALUES (3, 'c');")
+        output, report = compile_sql(sql, copy=True)
+        self.assertIn("    (2, DEFAULT)\nON CONFLICT (id) DO NOTHING;", output)
+        self.assertIn('COPY drugs (id, name) FROM STDIN;\n3\tc\n', output)
+        self.assertEqual((report.batches, report.copy_blocks), (2, 1))
+
+    def test_unbatchable_statements(self):
+        self.assertIsNone(parse_dml("INSERT INTO drugs SELECT * FROM old_drugs"))
+        self.assertIsNone(parse_dml("INSERT INTO drugs VALUES (1, (SELECT name FROM old_drugs LIMIT 1), TRUE)"))
+        self.assertIsNone(parse_dml("INSERT INTO drugs VALUES (1, E'a\\'b', TRUE)"))
+        self.assertIsNone(parse_dml("INSERT INTO drugs VALUES (1, 'a') ON CONFLICT (id) DO UPDATE SET name = 'a'"))
+        insert = parse_dml("INSERT INTO drugs (id, tags) VALUES (1, ARRAY['a', 'b'])")
+        self.assertEqual(insert.rows, [('1', "ARRAY['a', 'b']")])
+        self.assertEqual(split_top_level("ARRAY['a', 'b'], x"), ["ARRAY['a', 'b']", 'x'])
+
+        with self.assertRaises(BulkDMLError):
+            compile_sql('COPY drugs FROM STDIN')
+        with self.assertRaises(ValueError):
+            BulkDMLCompiler(batch_rows=0)
+
+class TestDependencyOrder(unittest.TestCase):
+    """Test that batching never moves a statement across one it depends on"""
+
+    def test_barriers_flush_pending_batches(self):
+        sql = ("INSERT INTO drugs VALUES (1, 'a', TRUE);\n"
+               "DELETE FROM drugs WHERE id = 1;\n"
+               "INSERT INTO drugs VALUES (1, 'b', TRUE);")
+        output, report = compile_sql(sql)
+        self.assertEqual([statement.split()[0] for statement in statements(output)], ['INSERT', 'DELETE', 'INSERT'])
+        self.assertEqual(report.batches, 2)
+
+    def test_unknown_tables_only_merge_consecutive_statements(self):
+        sql = ("INSERT INTO doctors VALUES (1, 'a');\n"
+               "INSERT INTO patients (id, doctor_id) VALUES (10, 1);\n"
+               "INSERT INTO drugs VALUES (1, 'x', TRUE);\n"
+               "INSERT INTO doctors VALUES (2, 'b');\n"
+               "INSERT INTO patients (id, doctor_id) VALUES (20, 2);\n"
+               "INSERT INTO drugs VALUES (2, 'y', TRUE);")
+        unknown, _ = compile_sql(sql)
+        self.assertEqual(len(statements(unknown)), 6)
+
+        # With the schema, drugs is independent and merges; patients must stay behind its doctors
+        known, _ = compile_sql(sql, SCHEMA)
+        order = [(statement.split()[2], statement.count('\n    (')) for statement in statements(known)]
+        self.assertEqual(order, [('doctors', 1), ('patients', 1), ('drugs', 2), ('doctors', 1), ('patients', 1)])
+
+    def test_tables_created_by_the_script_are_known(self):
+        sql = (SCHEMA + "INSERT INTO drugs VALUES (1, 'x', TRUE);\n"
+                        "INSERT INTO doctors VALUES (1, 'a');\n"
+                        "INSERT INTO drugs VALUES (2, 'y', TRUE);")
+        output, report = compile_sql(sql)
+        self.assertEqual(report.batches, 2)
+        self.assertLess(output.index('CREATE TABLE drugs'), output.index('INSERT INTO drugs'))
+
+class TestUpdateBatching(unittest.TestCase):
+    """Test keyed UPDATEs rewritten to UPDATE ... FROM (VALUES ...)"""
+
+    def test_updates_join_on_typed_values(self):
+        sql = ("UPDATE patients SET status = 'active', score = 1.5 WHERE id = 1;\n"
+               "UPDATE patients SET status = 'closed', score = NULL WHERE id = 2;")
+        output, report = compile_sql(sql, SCHEMA)
+        self.assertEqual(output, (
+            "UPDATE patients AS t SET status = v.new_status, score = v.new_score\n"
+            "FROM (VALUES\n"
+            "    ('active'::VARCHAR(20), 1.5::NUMERIC, 1::INT),\n"
+            "    ('closed', NULL, 2)\n"
+            ") AS v (new_status, new_score, key_id)\n"
+            "WHERE t.id = v.key_id;\n\n"
+        ))
+        self.assertEqual((report.statements_out, report.batched_statements), (1, 2))
+
+    def test_repeated_keys_and_unknown_types_are_not_merged(self):
+        sql = ("UPDATE patients SET status = 'a' WHERE id = 1;\n"
+               "UPDATE patients SET status = 'b' WHERE id = '1';\n"
+               "UPDATE patients SET status = 'c' WHERE id = 2;")
+        output, report = compile_sql(sql, SCHEMA)
+        self.assertEqual([statement.count('\n    (') for statement in statements(output)], [0, 2])
+        self.assertLess(output.index("'a'"), output.index("'b'"))
+
+        # Without column types the VALUES list could not be typed, so each UPDATE is kept as written
+        output, report = compile_sql(sql)
+        self.assertEqual((report.batches, report.statements_out), (0, 3))
+
+    def test_unbatchable_updates(self):
+        self.assertIsNone(parse_update("UPDATE patients SET id = 2 WHERE id = 1"))
+        self.assertIsNone(parse_update("UPDATE patients SET status = 'a' WHERE id = 1 AND id = 2"))
+        self.assertIsNone(parse_update("UPDATE patients SET score = score + 1 WHERE id = 1"))
+        self.assertIsNone(parse_update("UPDATE patients SET status = 'a' WHERE id > 1"))
+        update = parse_update("UPDATE patients SET status = 'a AND b' WHERE id = 1 AND doctor_id = 2")
+        self.assertEqual(update.conditions, (('id', '1'), ('doctor_id', '2')))
+
+if __name__ == '__main__':
+    unittest.main()
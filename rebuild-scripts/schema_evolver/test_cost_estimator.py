@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+OncoVista Migration Cost Estimator Test Suite
+Validate statistics-driven cost estimates and deferral of expensive operations
+"""
+
+import unittest
+import sys
+import os
+import json
+import tempfile
+
+# Add the schema_evolver directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'schema_evolver'))
+
+from cost_estimator import CostEstimator, load_table_stats, requires_rewrite
+from ddl_lexer import split_statements
+from migration_generator import MigrationSurgeon
+
+OLD_SCHEMA = """
+CREATE TABLE public.patients (id SERIAL PRIMARY KEY, mrn VARCHAR(20), age INT, notes TEXT);
+CREATE TABLE public.visits (id SERIAL PRIMARY KEY, patient_id INT, notes TEXT);
+CREATE TABLE public.clinics (id SERIAL PRIMARY KEY);
+"""
+NEW_SCHEMA = """
+CREATE TABLE public.patients (id SERIAL PRIMARY KEY, mrn VARCHAR(40), age BIGINT);
+CREATE TABLE public.visits (id SERIAL PRIMARY KEY, patient_id INT, notes TEXT NOT NULL);
+CREATE TABLE public.referrals (id SERIAL PRIMARY KEY, visit_id INT REFERENCES public.visits(id));
+"""
+STATS = {
+    'captured_at': '2026-10-01T00:00:00Z',
+    'tables': [
+        {'table': 'public.patients', 'rows': 50000000, 'table_bytes': 20 * 2**30, 'index_bytes': 4 * 2**30},
+        {'table': 'public.visits', 'rows': 1000, 'table_bytes': 2**20, 'index_bytes': 2**19},
+        {'table': 'public.clinics', 'rows': 12, 'table_bytes': 8192, 'index_bytes': 16384}
+    ]
+}
+
+class TestCostEstimator(unittest.TestCase):
+    """Test per-operation estimates"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.stats_file = os.path.join(self.tmp.name, 'stats.json')
+        with open(self.stats_file, 'w') as f:
+            json.dump(STATS, f)
+        self.surgeon = MigrationSurgeon(cache_dir=os.path.join(self.tmp.name, 'cache'), stats_file=self.stats_file)
+        analyzer = self.surgeon.analyzer
+        old = analyzer.extract_schema_model_from_statements(split_statements(OLD_SCHEMA))
+        new = analyzer.extract_schema_model_from_statements(split_statements(NEW_SCHEMA))
+        self.changes = self.surgeon.compare_models(old, new)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _cost(self, change_type, table, column=None):
+        change = next(c for c in self.changes if c.change_type == change_type and c.table_name == table
+                      and (column is None or c.details.get('column') == column))
+        return self.surgeon.cost_estimator.estimate(change)
+
+    def test_load_snapshot(self):
+        """Snapshots load as a wrapped object or a bare list"""
+        stats, captured_at = load_table_stats(self.stats_file)
+        self.assertEqual((stats['public.patients'].rows, captured_at), (50000000, '2026-10-01T00:00:00Z'))
+        with open(self.stats_file, 'w') as f:
+            json.dump(STATS['tables'], f)
+        self.assertIsNone(load_table_stats(self.stats_file)[1])
+        self.assertEqual(CostEstimator.from_file(self.stats_file).table_stats('visits').rows, 1000)
+
+    def test_rewrites_scale_with_table_size(self):
+        """Type rewrites on big tables are critical; catalog-only changes are cheap"""
+        rewrite = self._cost('MODIFY_COLUMN', 'public.patients', 'age')
+        self.assertTrue(rewrite.rewrite)
+        self.assertEqual(rewrite.level, 'CRITICAL')
+        self.assertEqual(rewrite.io_bytes, 44 * 2**30)
+        widen = self._cost('MODIFY_COLUMN', 'public.patients', 'mrn')
+        self.assertFalse(widen.rewrite)
+        self.assertEqual(widen.lock_seconds, 0)
+        self.assertEqual(self._cost('DROP_COLUMN', 'public.patients').lock_seconds, 0)
+
+    def test_not_null_scans_and_missing_stats(self):
+        """SET NOT NULL scans the table; unknown tables are assumed empty and flagged"""
+        scan = self._cost('MODIFY_COLUMN', 'public.visits', 'notes')
+        self.assertTrue(scan.scan)
+        self.assertEqual(scan.io_bytes, 2**20)
+        self.assertEqual(self._cost('DROP_TABLE', 'public.clinics').rows, 12)
+        self.assertEqual(self._cost('ADD_TABLE', 'public.referrals').notes, ['new table'])
+
+    def test_requires_rewrite(self):
+        self.assertFalse(requires_rewrite('VARCHAR(20)', 'varchar(40)'))
+        self.assertFalse(requires_rewrite('VARCHAR(20)', 'TEXT'))
+        self.assertTrue(requires_rewrite('VARCHAR(40)', 'VARCHAR(20)'))
+        self.assertTrue(requires_rewrite('INT', 'BIGINT'))
+
+    def test_migration_header_and_operation_costs(self):
+        """Estimates appear next to the risk summary and on each operation"""
+        sql = self.surgeon.generate_migration(self.changes, 'costed')
+        header = sql.split('BEGIN;')[0]
+        self.assertIn('-- 📊 Cost Estimate:', header)
+        self.assertIn('(stats captured 2026-10-01T00:00:00Z)', header)
+        self.assertIn('[CRITICAL] MODIFY_COLUMN on public.patients: rewrite', header)
+        self.assertEqual(sql.count('-- Cost: '), len(self.changes))
+
+    def test_split_defers_expensive_operations(self):
+        """Operations over the lock budget are deferred; same-table neighbours are not dragged along"""
+        now, deferred = self.surgeon.split_by_cost(self.changes, max_lock_seconds=5)
+        self.assertEqual([(c.change_type, c.details.get('column')) for c in deferred], [('MODIFY_COLUMN', 'age')])
+        self.assertEqual(len(now) + len(deferred), len(self.changes))
+        self.assertEqual(MigrationSurgeon(cache_dir=self.tmp.name).split_by_cost(self.changes, 5)[1], [])
+
+if __name__ == '__main__':
+    unittest.main()
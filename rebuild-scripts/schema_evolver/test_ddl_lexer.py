@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+OncoVista DDL Lexer Test Suite
+Validate statement splitting and single-pass schema DNA extraction
+"""
+
+import unittest
+import sys
+import os
+import tempfile
+
+# Add the schema_evolver directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'schema_evolver'))
+
+from ddl_lexer import (
+    StatementSplitter, read_parenthesized, split_statements, split_top_level, stream_statements,
+    unquote_identifier
+)
+from migration_generator import SchemaDNAAnalyzer
+
+SAMPLE_SCHEMA = """
+-- Patients; with a semicolon in a comment
+CREATE TABLE public.patients (
+  id UUID DEFAULT uuid_generate_v4() PRIMARY KEY,
+  "full name" TEXT NOT NULL,
+  balance NUMERIC(10, 2) DEFAULT 0.00,
+  status TEXT DEFAULT 'it''s; fine' CHECK (status IN ('a', 'b')),
+  CONSTRAINT patients_balance_check CHECK (balance >= 0),
+  UNIQUE (id, status)
+);
+
+/* block /* nested */ comment; */
+CREATE UNIQUE INDEX idx_patients_status ON public.patients USING btree (status, id);
+
+CREATE OR REPLACE FUNCTION touch(p NUMERIC(10,2), q TEXT)
+RETURNS TRIGGER AS $body$
+BEGIN
+  CREATE TABLE not_a_table (x INT);
+  RETURN NEW;
+END;
+$body$ LANGUAGE plpgsql;
+
+CREATE TRIGGER touch_patients BEFORE UPDATE ON public.patients FOR EACH ROW EXECUTE FUNCTION touch();
+CREATE TYPE visit_kind AS ENUM ('opd', 'ipd');
+"""
+
+class TestStatementSplitter(unittest.TestCase):
+    """Test statement splitting"""
+
+    def test_split_handles_quotes_comments_and_dollar_bodies(self):
+        """Semicolons inside literals, comments and bodies do not split"""
+        statements = list(split_statements(SAMPLE_SCHEMA))
+        self.assertEqual(len(statements), 5)
+        self.assertTrue(statements[0].startswith('CREATE TABLE public.patients'))
+        self.assertIn("'it''s; fine'", statements[0])
+        self.assertTrue(statements[1].startswith('CREATE UNIQUE INDEX'))
+        self.assertIn('CREATE TABLE not_a_table', statements[2])
+
+    def test_feed_in_arbitrary_line_chunks(self):
+        """Statements spanning feeds are reassembled"""
+        splitter = StatementSplitter()
+        statements = []
+        for chunk in ["SELECT 'a", "b;c' ", "FROM t", "; SELECT $$x;", "$$", "; SELECT 1"]:
+            statements.extend(splitter.feed(chunk))
+        statements.extend(splitter.close())
+        self.assertEqual(statements, ["SELECT 'ab;c' FROM t", 'SELECT $$x;$$', 'SELECT 1'])
+
+    def test_escape_string(self):
+        """Backslash-escaped quotes in E'' literals do not close the literal"""
+        statements = list(split_statements("SELECT E'a\\';b'; SELECT 2;"))
+        self.assertEqual(statements, ["SELECT E'a\\';b'", 'SELECT 2'])
+
+    def test_top_level_helpers(self):
+        """Nested parentheses and quoted identifiers are respected"""
+        self.assertEqual(split_top_level("a NUMERIC(10,2), b TEXT DEFAULT ','"), ['a NUMERIC(10,2)', "b TEXT DEFAULT ','"])
+        self.assertEqual(read_parenthesized('f(a, (b)) rest', 1), ('a, (b)', 9))
+        self.assertEqual(unquote_identifier('"public" . "My.Table"'), 'public.My.Table')
+
+class TestSinglePassAnalyzer(unittest.TestCase):
+    """Test schema DNA extraction from a single statement sweep"""
+
+    def setUp(self):
+        self.dna = SchemaDNAAnalyzer().extract_schema_dna_from_statements(split_statements(SAMPLE_SCHEMA))
+
+    def test_tables_and_columns(self):
+        """Columns are parsed with full types, defaults and constraints"""
+        self.assertEqual(list(self.dna['tables']), ['public.patients'])
+        columns = self.dna['tables']['public.patients']['columns']
+        self.assertEqual(list(columns), ['id', 'full name', 'balance', 'status'])
+        self.assertEqual(columns['balance']['type'], 'NUMERIC(10, 2)')
+        self.assertEqual(columns['balance']['default'], '0.00')
+        self.assertEqual(columns['status']['default'], "'it''s; fine'")
+        self.assertEqual(columns['id']['constraints'], ['PRIMARY KEY'])
+        self.assertFalse(columns['full name']['nullable'])
+
+    def test_table_constraints(self):
+        """Named and unnamed table constraints are collected"""
+        constraints = self.dna['tables']['public.patients']['constraints']
+        self.assertEqual(constraints[0], {'name': 'patients_balance_check', 'definition': 'CHECK (balance >= 0)'})
+        self.assertEqual(constraints[1], {'name': None, 'definition': 'UNIQUE (id, status)'})
+
+    def test_indexes_functions_triggers_types(self):
+        """Other objects are collected in the same sweep"""
+        self.assertEqual(self.dna['tables']['public.patients']['indexes'], [
+            {'name': 'idx_patients_status', 'columns': ['status', 'id'], 'unique': True}
+        ])
+        self.assertEqual(self.dna['functions'], [{'name': 'touch', 'parameters': 'p NUMERIC(10,2), q TEXT'}])
+        self.assertEqual(self.dna['triggers'], [{'name': 'touch_patients'}])
+        self.assertEqual(self.dna['types'], [{'name': 'visit_kind'}])
+
+class TestStreamingParse(unittest.TestCase):
+    """Test streaming statement reads of pg_dump-style files"""
+
+    DUMP = SAMPLE_SCHEMA + """
+COPY public.patients (id, "full name", balance, status) FROM stdin;
+1\tAlice; CREATE TABLE fake (x INT);\t1.00\ta
+2\tBob's\t2.00\tb
+\\.
+INSERT INTO public.patients VALUES ('3', 'Carol', 3.00, 'a');
+CREATE TABLE audit_logs (id SERIAL PRIMARY KEY);
+"""
+
+    def setUp(self):
+        handle = tempfile.NamedTemporaryFile('w', suffix='.sql', delete=False)
+        handle.write(self.DUMP)
+        handle.close()
+        self.path = handle.name
+
+    def tearDown(self):
+        os.unlink(self.path)
+
+    def test_copy_data_is_skipped(self):
+        """Rows of a COPY block never reach the statement stream"""
+        statements = list(stream_statements(self.path))
+        self.assertEqual(len(statements), 8)
+        self.assertTrue(statements[5].startswith('COPY public.patients'))
+        self.assertTrue(statements[6].startswith('INSERT INTO'))
+        self.assertFalse(any('fake' in statement for statement in statements))
+
+    def test_keep_filter_discards_statements(self):
+        """Rejected statements are not buffered or emitted"""
+        statements = list(stream_statements(self.path, keep=lambda head: head.upper().startswith('CREATE TABLE')))
+        self.assertEqual(len(statements), 3)
+        self.assertTrue(statements[1].startswith('COPY'))
+
+    def test_streaming_matches_in_memory_analysis(self):
+        """Streaming and in-memory modes build the same schema DNA"""
+        streamed = SchemaDNAAnalyzer(streaming=True).extract_schema_dna(self.path)
+        loaded = SchemaDNAAnalyzer().extract_schema_dna(self.path)
+        self.assertEqual(streamed, loaded)
+        self.assertEqual(list(streamed['tables']), ['public.patients', 'audit_logs'])
+
+class TestParallelParse(unittest.TestCase):
+    """Test process-pool parsing and statement sharding"""
+
+    def setUp(self):
+        from synthetic_schema import generate_schema_sql
+        self.tmp = tempfile.TemporaryDirectory()
+        self.paths = []
+        for name, size in (('old.sql', 40), ('new.sql', 45)):
+            path = os.path.join(self.tmp.name, name)
+            with open(path, 'w') as f:
+                f.write(generate_schema_sql(size))
+            self.paths.append(path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_sharded_parse_matches_serial(self):
+        """Sharded parsing merges to exactly the serial schema DNA"""
+        analyzer = SchemaDNAAnalyzer()
+        serial = [analyzer.extract_schema_model(path) for path in self.paths]
+        parallel = analyzer.extract_schema_models(self.paths, workers=2, shard_bytes=1)
+        self.assertEqual(parallel, serial)
+        self.assertEqual(list(parallel[1]['tables']), list(serial[1]['tables']))
+
+    def test_shards_split_on_statement_boundaries(self):
+        """Every relevant statement lands in exactly one shard"""
+        analyzer = SchemaDNAAnalyzer()
+        shards = list(analyzer._shard_statements(self.paths[0], workers=4))
+        self.assertGreater(len(shards), 1)
+        self.assertEqual([s for shard in shards for s in shard], list(split_statements(open(self.paths[0]).read())))
+
+    def test_merge_keeps_last_definition_in_first_position(self):
+        """Redefined tables keep serial dict order and the later definition"""
+        statements = ['CREATE TABLE a (x INT)', 'CREATE TABLE b (y INT)', 'CREATE TABLE a (z INT)',
+                      'CREATE INDEX ia ON a (z)']
+        analyzer = SchemaDNAAnalyzer()
+        partials = [analyzer.collect_schema_objects(statements[:2]), analyzer.collect_schema_objects(statements[2:])]
+        merged = analyzer.finalize_schema_dna(analyzer.merge_schema_objects(partials))
+        self.assertEqual(merged, analyzer.extract_schema_model_from_statements(statements))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+OncoVista Dependency Graph Test Suite
+Validate dependency-aware ordering and batching of schema changes
+"""
+
+import io
+import unittest
+import sys
+import os
+
+# Add the schema_evolver directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'schema_evolver'))
+
+from ddl_lexer import split_statements
+from dependency_graph import DependencyCycleError, DependencyGraph
+from migration_generator import MigrationSurgeon
+from schema_model import SchemaModel
+from sql_emitter import SQLEmitter
+from synthetic_schema import generate_schema_sql
+
+SCHEMA = """
+CREATE FUNCTION next_mrn() RETURNS TEXT AS $$ SELECT 'MRN' $$ LANGUAGE sql;
+CREATE TABLE public.visits (id UUID PRIMARY KEY, patient_id UUID REFERENCES public.patients(id));
+CREATE TABLE public.prescriptions (id UUID PRIMARY KEY, visit_id UUID, FOREIGN KEY (visit_id) REFERENCES visits (id));
+CREATE TABLE public.patients (id UUID PRIMARY KEY, mrn TEXT DEFAULT next_mrn());
+"""
+
+class TestDependencyGraph(unittest.TestCase):
+    """Test the generic graph algorithms"""
+
+    def test_topological_order_respects_edges_and_priority(self):
+        """Ready nodes come out by priority, but never before their predecessors"""
+        graph = DependencyGraph()
+        for node in 'abcd':
+            graph.add_node(node)
+        graph.add_edge('d', 'a')
+        order = graph.topological_order(priority=lambda node: node)
+        self.assertEqual(order, ['b', 'c', 'd', 'a'])
+
+    def test_batches_group_independent_nodes(self):
+        """Each batch only depends on earlier batches"""
+        graph = DependencyGraph()
+        graph.add_edge('parent', 'child')
+        graph.add_edge('parent', 'sibling')
+        graph.add_edge('child', 'grandchild')
+        graph.add_node('loner')
+        self.assertEqual(graph.batches(), [['parent', 'loner'], ['child', 'sibling'], ['grandchild']])
+
+    def test_cycles_are_reported(self):
+        """A cycle raises with the offending path"""
+        graph = DependencyGraph()
+        graph.add_edge('a', 'b')
+        graph.add_edge('b', 'c')
+        graph.add_edge('c', 'a')
+        graph.add_edge('a', 'a')
+        with self.assertRaises(DependencyCycleError) as raised:
+            graph.topological_order()
+        self.assertEqual(raised.exception.cycle, ['a', 'b', 'c', 'a'])
+
+    def test_large_chain_has_no_recursion_limit(self):
+        """Long dependency chains sort and check for cycles iteratively"""
+        graph = DependencyGraph()
+        for i in range(20000):
+            graph.add_edge(i, i + 1)
+        self.assertIsNone(graph.find_cycle())
+        self.assertEqual(graph.topological_order()[-1], 20000)
+        self.assertEqual(len(graph.batches()), 20001)
+
+class TestChangeOrdering(unittest.TestCase):
+    """Test dependency ordering in MigrationSurgeon"""
+
+    def setUp(self):
+        self.surgeon = MigrationSurgeon()
+        self.model = self.surgeon.analyzer.extract_schema_model_from_statements(split_statements(SCHEMA))
+
+    def _position(self, changes, change_type, name):
+        return next(i for i, c in enumerate(changes)
+                    if c.change_type == change_type and (c.table_name or c.details.get('function')) == name)
+
+    def test_parents_are_created_first(self):
+        """Referenced tables and functions used in defaults precede their dependents"""
+        ordered = self.surgeon._sort_changes_by_risk(self.surgeon.compare_models(SchemaModel(), self.model))
+        patients = self._position(ordered, 'ADD_TABLE', 'public.patients')
+        self.assertLess(self._position(ordered, 'ADD_FUNCTION', 'next_mrn'), patients)
+        self.assertLess(patients, self._position(ordered, 'ADD_TABLE', 'public.visits'))
+        self.assertLess(self._position(ordered, 'ADD_TABLE', 'public.visits'),
+                        self._position(ordered, 'ADD_TABLE', 'public.prescriptions'))
+
+    def test_children_are_dropped_first(self):
+        """Tables are dropped only after the tables referencing them"""
+        ordered = self.surgeon._sort_changes_by_risk(self.surgeon.compare_models(self.model, SchemaModel()))
+        self.assertEqual([c.table_name for c in ordered],
+                         ['public.prescriptions', 'public.visits', 'public.patients'])
+        rollback = self.surgeon.generate_rollback_script(ordered)
+        self.assertLess(rollback.index('CREATE TABLE public.patients'), rollback.index('CREATE TABLE public.visits'))
+
+    def test_batches_cover_every_change_once(self):
+        """Batches partition the plan and respect foreign keys on a generated schema"""
+        model = self.surgeon.analyzer.extract_schema_model_from_statements(split_statements(generate_schema_sql(200)))
+        changes = self.surgeon.compare_models(SchemaModel(), model)
+        batches = self.surgeon.plan_batches(changes)
+        self.assertEqual(sorted(id(c) for batch in batches for c in batch), sorted(id(c) for c in changes))
+
+        batch_of = {c.table_name: n for n, batch in enumerate(batches) for c in batch if c.table_name}
+        references = 0
+        for name, table in model.tables.items():
+            for target in table.referenced_tables():
+                self.assertLess(batch_of[f'public.{target}'], batch_of[name])
+                references += 1
+        self.assertGreater(references, 0)
+
+    def test_mutual_references_raise(self):
+        """Tables referencing each other cannot be created in one pass"""
+        model = self.surgeon.analyzer.extract_schema_model_from_statements(split_statements(
+            'CREATE TABLE a (id INT, b_id INT REFERENCES b(id)); CREATE TABLE b (id INT, a_id INT REFERENCES a(id));'
+        ))
+        with self.assertRaises(DependencyCycleError):
+            self.surgeon.generate_migration(self.surgeon.compare_models(SchemaModel(), model), 'cycle')
+
+class TestAlterCoalescing(unittest.TestCase):
+    """Test merging column changes into multi-action ALTER TABLE statements"""
+
+    def setUp(self):
+        self.surgeon = MigrationSurgeon()
+
+    def _changes(self, old_sql, new_sql):
+        analyzer = self.surgeon.analyzer
+        old = analyzer.extract_schema_model_from_statements(split_statements(old_sql))
+        new = analyzer.extract_schema_model_from_statements(split_statements(new_sql))
+        return self.surgeon.compare_models(old, new)
+
+    def _migration(self, changes):
+        buffer = io.StringIO()
+        summary = self.surgeon.emit_migration(changes, 'coalesce', SQLEmitter(buffer))
+        return buffer.getvalue(), summary
+
+    def _rollback(self, changes):
+        buffer = io.StringIO()
+        summary = self.surgeon.emit_rollback_script(changes, SQLEmitter(buffer))
+        return buffer.getvalue(), summary
+
+    def test_table_changes_share_one_statement(self):
+        """Adds, drops and type changes on one table take its lock once, in migration and rollback"""
+        changes = self._changes(
+            "CREATE TABLE patients (id SERIAL PRIMARY KEY, mrn VARCHAR(20), notes TEXT, age INT);",
+            "CREATE TABLE patients (id SERIAL PRIMARY KEY, mrn TEXT, age BIGINT, email TEXT, "
+            "token UUID DEFAULT gen_random_uuid()); CREATE INDEX idx_patients_email ON patients (email);"
+        )
+        migration, summary = self._migration(changes)
+        self.assertEqual(migration.count('ALTER TABLE patients'), 1)
+        for action in ('ADD COLUMN email TEXT', 'DROP COLUMN notes', 'ALTER COLUMN age TYPE BIGINT'):
+            self.assertIn(action, migration)
+        self.assertLess(migration.index('ALTER TABLE patients'), migration.index('CREATE INDEX idx_patients_email'))
+        self.assertEqual((summary.operations, summary.statements), (5, 1))
+        self.assertEqual((summary.locks_saved, summary.rewrites_saved), (4, 1))
+        self.assertIn('-- 🔗 Coalesced: 5 column operations in 1 ALTER TABLE statements', migration)
+        self.assertEqual(migration.count('-- Operation '), len(changes))
+
+        rollback, summary = self._rollback(changes)
+        self.assertEqual(rollback.count('ALTER TABLE patients'), 1)
+        self.assertIn('ADD COLUMN notes TEXT', rollback)
+        self.assertEqual((summary.locks_saved, summary.rewrites_saved), (4, 1))
+
+    def test_dependencies_split_statements(self):
+        """A column whose new default calls a new function waits for it in a second ALTER TABLE"""
+        changes = self._changes(
+            "CREATE TABLE patients (id SERIAL PRIMARY KEY, mrn TEXT);",
+            "CREATE TABLE patients (id SERIAL PRIMARY KEY, mrn TEXT DEFAULT next_mrn(), nickname TEXT);"
+            "CREATE FUNCTION next_mrn() RETURNS TEXT AS $$ SELECT 'MRN' $$ LANGUAGE sql;"
+        )
+        migration, summary = self._migration(changes)
+        self.assertEqual(migration.count('ALTER TABLE patients'), 2)
+        self.assertLess(migration.index('ADD COLUMN nickname'), migration.index('ADD_FUNCTION'))
+        self.assertLess(migration.index('ADD_FUNCTION'), migration.index('ALTER COLUMN mrn'))
+        self.assertEqual((summary.operations, summary.statements), (2, 2))
+
+    def test_coalescing_can_be_disabled(self):
+        """Without coalescing every operation keeps its own statement"""
+        changes = self._changes(
+            "CREATE TABLE patients (id SERIAL PRIMARY KEY);",
+            "CREATE TABLE patients (id SERIAL PRIMARY KEY, email TEXT, phone TEXT);"
+        )
+        self.surgeon.coalesce_alters = False
+        migration, summary = self._migration(changes)
+        self.assertEqual(migration.count('ALTER TABLE patients ADD COLUMN'), 2)
+        self.assertEqual(summary.locks_saved, 0)
+        self.assertNotIn('Coalesced', migration)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+OncoVista Schema DNA Cache Test Suite
+Validate content-addressed caching and eviction of parsed schemas
+"""
+
+import unittest
+import sys
+import os
+import pickle
+import tempfile
+import time
+from unittest.mock import patch
+
+# Add the schema_evolver directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'schema_evolver'))
+
+from dna_cache import SIGNING_KEY_FILE, SchemaDNACache
+from migration_generator import MigrationSurgeon, SchemaDNAAnalyzer
+
+OLD_SCHEMA = "CREATE TABLE patients (id SERIAL PRIMARY KEY, name TEXT NOT NULL);\n"
+NEW_SCHEMA = "CREATE TABLE patients (id SERIAL PRIMARY KEY, name TEXT NOT NULL, email TEXT);\n"
+
+class TestSchemaDNACache(unittest.TestCase):
+    """Test cache keys, hits and eviction"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = SchemaDNACache(os.path.join(self.tmp.name, 'cache'))
+        self.schema = self._write('old.sql', OLD_SCHEMA)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _write(self, name, content):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+    def test_key_depends_on_content_and_version(self):
+        """Identical content shares a key; content or version changes do not"""
+        copy = self._write('copy.sql', OLD_SCHEMA)
+        changed = self._write('new.sql', NEW_SCHEMA)
+        self.assertEqual(self.cache.key_for(self.schema, '1'), self.cache.key_for(copy, '1'))
+        self.assertNotEqual(self.cache.key_for(self.schema, '1'), self.cache.key_for(changed, '1'))
+        self.assertNotEqual(self.cache.key_for(self.schema, '1'), self.cache.key_for(self.schema, '2'))
+
+    def test_store_and_load(self):
+        """Stored DNA round-trips and counts hits and misses"""
+        key = self.cache.key_for(self.schema, '1')
+        self.assertIsNone(self.cache.load(key))
+        self.cache.store(key, {'tables': {'patients': {}}})
+        self.assertEqual(self.cache.load(key), {'tables': {'patients': {}}})
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_unsigned_and_corrupt_entries_are_misses(self):
+        """Only entries signed with the cache's own private key are unpickled"""
+        key = self.cache.key_for(self.schema, '1')
+        self.cache.store(key, {'tables': {}})
+        path = self.cache._path(key)
+        with open(path, 'rb') as f:
+            signed = f.read()
+
+        for data in (pickle.dumps({'tables': {'planted': {}}}), signed[:-1], b'', signed[:8]):
+            with open(path, 'wb') as f:
+                f.write(data)
+            self.assertIsNone(self.cache.load(key))
+
+        # A signed entry is bound to its key, and the key file must not be writable by others
+        with open(self.cache._path('other'), 'wb') as f:
+            f.write(signed)
+        self.assertIsNone(self.cache.load('other'))
+        with open(path, 'wb') as f:
+            f.write(signed)
+        self.assertEqual(self.cache.load(key), {'tables': {}})
+        os.chmod(os.path.join(self.cache.cache_dir, SIGNING_KEY_FILE), 0o666)
+        self.assertIsNone(self.cache.load(key))
+
+    def test_age_eviction(self):
+        """Entries older than max_age_seconds are evicted"""
+        key = self.cache.key_for(self.schema, '1')
+        self.cache.store(key, {'tables': {}})
+        old = time.time() - 3600
+        os.utime(self.cache._path(key), (old, old))
+        self.cache.max_age_seconds = 60
+        self.assertEqual(self.cache.evict(), 1)
+        self.assertIsNone(self.cache.load(key))
+
+    def test_size_eviction_drops_least_recently_used(self):
+        """The oldest entries go first once the size budget is exceeded"""
+        for i in range(3):
+            self.cache.store(f'key{i}', {'payload': 'x' * 1000})
+            stamp = time.time() - 100 + i
+            os.utime(self.cache._path(f'key{i}'), (stamp, stamp))
+        self.cache.max_bytes = 2500
+        self.assertEqual(self.cache.evict(), 1)
+        self.assertIsNone(self.cache.load('key0'))
+        self.assertIsNotNone(self.cache.load('key2'))
+
+    def test_clear(self):
+        """Clearing removes every entry"""
+        self.cache.store('a', {})
+        self.cache.store('b', {})
+        self.assertEqual(self.cache.clear(), 2)
+        self.assertEqual(self.cache.clear(), 0)
+
+class TestCachedDiagnosis(unittest.TestCase):
+    """Test transparent cache use in MigrationSurgeon"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.old = os.path.join(self.tmp.name, 'old.sql')
+        self.new = os.path.join(self.tmp.name, 'new.sql')
+        for path, content in ((self.old, OLD_SCHEMA), (self.new, NEW_SCHEMA)):
+            with open(path, 'w') as f:
+                f.write(content)
+        self.surgeon = MigrationSurgeon(cache_dir=os.path.join(self.tmp.name, 'cache'))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_second_diagnosis_is_served_from_cache(self):
+        """Re-running a diff does not re-parse either schema"""
+        first = self.surgeon.diagnose_changes(self.old, self.new)
+        with patch.object(SchemaDNAAnalyzer, '_parse_schema_file') as parse:
+            second = self.surgeon.diagnose_changes(self.old, self.new)
+            parse.assert_not_called()
+        self.assertEqual(first, second)
+
+    def test_bypass_and_clear(self):
+        """use_cache=False always parses and clear_cache empties the cache"""
+        self.surgeon.diagnose_changes(self.old, self.new)
+        with patch.object(SchemaDNAAnalyzer, '_parse_schema_file', wraps=self.surgeon.analyzer._parse_schema_file) as parse:
+            self.surgeon.diagnose_changes(self.old, self.new, use_cache=False)
+            self.assertEqual(parse.call_count, 2)
+        self.assertEqual(self.surgeon.clear_cache(), 2)
+
+if __name__ == '__main__':
+    unittest.main()
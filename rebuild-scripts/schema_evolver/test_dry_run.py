@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+OncoVista Migration Dry Run Test Suite
+Validate seeding plans, statement timing, lock tracking and report comparison against a fake connection
+"""
+
+import json
+import unittest
+import sys
+import os
+
+# Add the schema_evolver directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'schema_evolver'))
+
+from ddl_lexer import split_statements
+from dry_run import (
+    HELD_LOCKS_SQL, DryRunHarness, compare_reports, parse_table_rows, plan_seed, value_expression
+)
+from migration_generator import MigrationSurgeon
+
+OLD_SCHEMA = """
+CREATE TABLE visits (id SERIAL PRIMARY KEY, patient_id INTEGER NOT NULL REFERENCES patients, note TEXT);
+CREATE TABLE patients (id SERIAL PRIMARY KEY, mrn VARCHAR(20) NOT NULL UNIQUE, created_at TIMESTAMP DEFAULT now(),
+    weight NUMERIC(5,2), location POINT);
+CREATE TABLE scans (id UUID PRIMARY KEY, patient_mrn VARCHAR(20), region POINT NOT NULL);
+"""
+
+NEW_SCHEMA = (OLD_SCHEMA.replace('note TEXT', 'note TEXT, seen_at DATE')
+              .replace('weight NUMERIC(5,2)', 'weight NUMERIC(7,2)'))
+
+class FakeCursor:
+    """Executes nothing; serves the held locks and fails statements on request"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.rows = []
+
+    def execute(self, sql, params=None):
+        if sql == HELD_LOCKS_SQL:
+            self.rows = sorted(self.connection.held)
+            return
+        self.connection.executed.append(sql)
+        if any(fragment in sql for fragment in self.connection.failing):
+            raise RuntimeError('ERROR:  relation "patients" is locked\nDETAIL: fake')
+        words = sql.split()
+        if words[0] in ('COMMIT', 'ROLLBACK'):
+            self.connection.held.clear()
+        elif words[0] == 'ALTER':
+            self.connection.held.add((f'public.{words[2]}', 'AccessExclusiveLock'))
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+class FakeConnection:
+    """Records executed statements and the relation locks the session would hold"""
+
+    def __init__(self, failing=()):
+        self.executed = []
+        self.held = set()
+        self.failing = failing
+
+    def cursor(self):
+        return FakeCursor(self)
+
+class TestSeedPlan(unittest.TestCase):
+    """Test synthetic row planning"""
+
+    def setUp(self):
+        analyzer = MigrationSurgeon().analyzer
+        self.model = analyzer.extract_schema_model_from_statements(split_statements(OLD_SCHEMA))
+
+    def test_parents_first_and_keys_line_up(self):
+        plan = plan_seed(self.model, rows=100, table_rows={'visits': 250})
+        self.assertEqual([table for table, _, _ in plan.statements], ['patients', 'visits'])
+        patients, visits = plan.statements[0][1], plan.statements[1][1]
+
+        # Defaults are kept, unsupported nullable types left NULL
+        self.assertTrue(patients.startswith('INSERT INTO patients (id, mrn, weight) SELECT'))
+        self.assertIn('generate_series(1, 100)', patients)
+        self.assertIn('(g % 1000)::numeric(5,2)', patients)
+        # Each visit points at an existing patient
+        self.assertIn('((g - 1) % 100 + 1)::integer', visits)
+        self.assertIn('generate_series(1, 250)', visits)
+        self.assertEqual(plan.statements[1][2], 250)
+
+        self.assertEqual(list(plan.skipped), ['scans'])
+        self.assertIn('region', plan.skipped['scans'])
+
+    def test_missing_parent(self):
+        model = MigrationSurgeon().analyzer.extract_schema_model_from_statements(split_statements(
+            "CREATE TABLE notes (id INT PRIMARY KEY, author_id INT REFERENCES auth.users, body TEXT);"
+            "CREATE TABLE audits (id INT PRIMARY KEY, user_id INT NOT NULL REFERENCES auth.users);"
+        ))
+        plan = plan_seed(model, rows=10)
+        self.assertEqual([table for table, _, _ in plan.statements], ['notes'])
+        self.assertNotIn('author_id', plan.statements[0][1])
+        self.assertIn('user_id', plan.skipped['audits'])
+
+    def test_value_expressions(self):
+        self.assertEqual(value_expression('SERIAL', 'g'), 'g::integer')
+        self.assertEqual(value_expression('character varying(8)', 'g'), "left(g::text || '-' || md5(g::text), 8)")
+        self.assertEqual(value_expression('timestamp with time zone', 'g'), "now() - g * interval '1 second'")
+        self.assertEqual(value_expression('TEXT[]', 'g'), 'ARRAY[]::text[]')
+        self.assertIsNone(value_expression('treatment_status', 'g'))
+
+    def test_table_rows_option(self):
+        self.assertEqual(parse_table_rows(['visits=5', 'public.scans = 0']), {'visits': 5, 'public.scans': 0})
+        with self.assertRaises(ValueError):
+            parse_table_rows(['visits'])
+
+class TestDryRunHarness(unittest.TestCase):
+    """Test statement-by-statement execution"""
+
+    def setUp(self):
+        self.surgeon = MigrationSurgeon()
+        analyzer = self.surgeon.analyzer
+        self.old = analyzer.extract_schema_model_from_statements(split_statements(OLD_SCHEMA))
+        new = analyzer.extract_schema_model_from_statements(split_statements(NEW_SCHEMA))
+        self.changes = self.surgeon.compare_models(self.old, new)
+
+    def test_full_run(self):
+        connection = FakeConnection(failing=['POINT NOT NULL'])
+        report = DryRunHarness(connection).run(
+            split_statements(OLD_SCHEMA), self.old, self.surgeon.generate_migration(self.changes, 'dry'),
+            self.surgeon.generate_rollback_script(self.changes), rows=50
+        )
+        json.dumps(report)
+
+        self.assertEqual(report['load']['statements'], 3)
+        self.assertEqual([error['sql'][:18] for error in report['load']['errors']], ['CREATE TABLE scans'])
+        self.assertEqual(report['seed']['rows'], 100)
+        self.assertIn('ANALYZE', connection.executed)
+
+        migration = report['phases']['migration']
+        self.assertFalse(migration['failed'])
+        self.assertEqual([statement['sql'].split()[0] for statement in migration['statements']],
+                         ['BEGIN', 'ALTER', 'ALTER', 'COMMIT'])
+        alter = next(statement for statement in migration['statements'] if 'TABLE patients' in statement['sql'])
+        self.assertEqual(alter['locks'], [{'relation': 'public.patients', 'mode': 'AccessExclusiveLock'}])
+        # The lock is held until COMMIT, longer than the statement that took it
+        holds = {hold['relation']: hold for hold in migration['lock_holds']}
+        self.assertEqual(sorted(holds), ['public.patients', 'public.visits'])
+        self.assertEqual(holds['public.patients']['acquired_by'], alter['index'])
+        self.assertGreaterEqual(holds['public.patients']['seconds'], alter['seconds'])
+        self.assertIn('rollback', report['phases'])
+
+    def test_failure_rolls_back_and_stops(self):
+        connection = FakeConnection(failing=['ADD COLUMN seen_at'])
+        harness = DryRunHarness(connection)
+        result = harness.run_script(self.surgeon.generate_migration(self.changes, 'dry'))
+
+        self.assertTrue(result['failed'])
+        failed = result['statements'][-1]
+        self.assertEqual(failed['error'], 'ERROR:  relation "patients" is locked')
+        self.assertEqual(connection.executed[-1], 'ROLLBACK')
+        self.assertNotIn('COMMIT', connection.executed)
+        self.assertEqual(connection.held, set())
+
+class TestReportComparison(unittest.TestCase):
+    """Test regression detection between dry-run reports"""
+
+    def _report(self, alter_seconds, hold_seconds, error=None):
+        statements = [
+            {'index': 1, 'sql': 'BEGIN', 'seconds': 0.0001, 'lock_wait_seconds': 0.0, 'locks': [], 'error': None},
+            {'index': 2, 'sql': 'ALTER TABLE patients ALTER COLUMN weight TYPE NUMERIC(7,2)',
+             'seconds': alter_seconds, 'lock_wait_seconds': 0.0, 'locks': [], 'error': error},
+            {'index': 3, 'sql': 'COMMIT', 'seconds': 0.0002, 'lock_wait_seconds': 0.0, 'locks': [], 'error': None}
+        ]
+        return {'rows': 1000, 'table_rows': {}, 'phases': {'migration': {
+            'seconds': alter_seconds + 0.001, 'lock_wait_seconds': 0.0, 'failed': error is not None,
+            'statements': statements,
+            'lock_holds': [{'relation': 'public.patients', 'mode': 'AccessExclusiveLock', 'seconds': hold_seconds,
+                            'acquired_by': 2}]
+        }}}
+
+    def test_slower_statement_and_lock_hold(self):
+        regressions = compare_reports(self._report(0.5, 0.6), self._report(0.2, 0.25))
+        self.assertEqual(len(regressions), 3)
+        self.assertTrue(regressions[0].startswith('migration: '))
+        self.assertIn('statement 2 (ALTER TABLE patients', regressions[1])
+        self.assertIn('AccessExclusiveLock on public.patients held 250.0 ms -> 600.0 ms', regressions[2])
+
+    def test_within_tolerance_and_noise(self):
+        self.assertEqual(compare_reports(self._report(0.22, 0.26), self._report(0.2, 0.25)), [])
+        self.assertEqual(compare_reports(self._report(0.003, 0.004), self._report(0.001, 0.001)), [])
+
+    def test_new_failure_and_scale_mismatch(self):
+        regressions = compare_reports(self._report(0.2, 0.25, error='ERROR: boom'), self._report(0.2, 0.25))
+        self.assertEqual(regressions, ['migration: statement 2 now fails: ERROR: boom'])
+        other = self._report(0.2, 0.25)
+        other['rows'] = 10
+        with self.assertRaises(ValueError):
+            compare_reports(self._report(0.2, 0.25), other)
+
+if __name__ == '__main__':
+    unittest.main()
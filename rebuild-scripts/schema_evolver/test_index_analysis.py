@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+OncoVista Index Analysis Test Suite
+Validate index diffing and duplicate, redundant and missing foreign-key index findings
+"""
+
+import unittest
+import sys
+import os
+
+# Add the schema_evolver directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'schema_evolver'))
+
+from cost_estimator import CostEstimator, TableStats
+from ddl_lexer import split_statements
+from index_analysis import IndexAnalyzer
+from migration_generator import MigrationSurgeon
+from online_migration import OnlineMigrationPlanner
+
+OLD_SCHEMA = """
+CREATE TABLE patients (id SERIAL PRIMARY KEY, mrn TEXT, name TEXT, deleted_at TIMESTAMP);
+CREATE INDEX idx_patients_name ON patients (name);
+CREATE UNIQUE INDEX idx_patients_mrn ON patients (mrn);
+CREATE INDEX idx_patients_active ON patients (name) WHERE deleted_at IS NULL;
+"""
+
+NEW_SCHEMA = """
+CREATE TABLE patients (id SERIAL PRIMARY KEY, mrn TEXT, name TEXT, deleted_at TIMESTAMP);
+CREATE INDEX idx_patients_name ON patients (name, mrn);
+CREATE INDEX idx_patients_active ON patients (name) WHERE (deleted_at IS NULL);
+CREATE INDEX idx_patients_lookup ON patients USING hash (mrn) WHERE deleted_at IS NOT NULL;
+CREATE TABLE visits (id SERIAL PRIMARY KEY, patient_id INTEGER REFERENCES patients(id));
+CREATE INDEX idx_visits_patient ON visits (patient_id) INCLUDE (id);
+"""
+
+ANALYZED_SCHEMA = """
+CREATE TABLE patients (id SERIAL PRIMARY KEY, email TEXT UNIQUE, name TEXT, clinic_id INTEGER);
+CREATE INDEX idx_patients_id ON patients (id);
+CREATE INDEX idx_patients_name ON patients (name);
+CREATE INDEX idx_patients_name_clinic ON patients ("name", clinic_id);
+CREATE INDEX idx_patients_recent ON patients (name) WHERE clinic_id IS NOT NULL;
+CREATE TABLE treatments (id SERIAL PRIMARY KEY, patient_id INTEGER REFERENCES patients(id), protocol TEXT,
+  cycle INTEGER, CONSTRAINT treatments_protocol_fkey FOREIGN KEY (protocol, cycle) REFERENCES protocols(name, cycle));
+CREATE INDEX idx_treatments_cycle ON treatments (cycle, protocol DESC);
+CREATE TABLE notes (id SERIAL PRIMARY KEY, patient_id INTEGER REFERENCES patients(id));
+"""
+
+class TestIndexDiff(unittest.TestCase):
+    """Test ADD_INDEX and DROP_INDEX changes"""
+
+    def setUp(self):
+        self.surgeon = MigrationSurgeon()
+        model = self.surgeon.analyzer.extract_schema_model_from_statements
+        self.changes = self.surgeon.compare_models(
+            model(split_statements(OLD_SCHEMA)), model(split_statements(NEW_SCHEMA))
+        )
+
+    def index_changes(self):
+        return [(c.change_type, c.table_name, c.details['index'].name, c.risk_level)
+                for c in self.changes if c.change_type.endswith('_INDEX')]
+
+    def test_index_changes(self):
+        """Redefined, dropped, new and new-table indexes are diffed; equivalent predicates are not"""
+        self.assertEqual(sorted(self.index_changes()), [
+            ('ADD_INDEX', 'patients', 'idx_patients_lookup', 'LOW'),
+            ('ADD_INDEX', 'patients', 'idx_patients_name', 'LOW'),
+            ('ADD_INDEX', 'visits', 'idx_visits_patient', 'LOW'),
+            ('DROP_INDEX', 'patients', 'idx_patients_mrn', 'HIGH'),
+            ('DROP_INDEX', 'patients', 'idx_patients_name', 'MEDIUM'),
+        ])
+
+    def test_migration_sql(self):
+        """Indexes are dropped before being recreated and built after their table"""
+        sql = self.surgeon.generate_migration(self.changes, 'indexes')
+        self.assertIn('CREATE INDEX idx_patients_lookup ON patients USING hash (mrn) WHERE deleted_at IS NOT NULL;', sql)
+        self.assertIn('CREATE INDEX idx_visits_patient ON visits (patient_id) INCLUDE (id);', sql)
+        self.assertLess(sql.index('DROP INDEX IF EXISTS idx_patients_name;'),
+                        sql.index('CREATE INDEX idx_patients_name ON patients (name, mrn);'))
+        self.assertLess(sql.index('CREATE TABLE visits'), sql.index('CREATE INDEX idx_visits_patient'))
+
+    def test_rollback_sql(self):
+        """Rollback drops new indexes and restores dropped ones with their definition"""
+        rollback = self.surgeon.generate_rollback_script(self.changes)
+        self.assertIn('DROP INDEX IF EXISTS idx_patients_lookup;', rollback)
+        self.assertIn('CREATE UNIQUE INDEX idx_patients_mrn ON patients (mrn);', rollback)
+        self.assertLess(rollback.index('DROP INDEX IF EXISTS idx_patients_name;'),
+                        rollback.index('CREATE INDEX idx_patients_name ON patients (name);'))
+
+    def test_online_plan(self):
+        """Online plans build and drop indexes concurrently, schema-qualifying drops"""
+        planner = OnlineMigrationPlanner(self.surgeon)
+        sql = planner.render(planner.plan(self.changes), 'indexes')
+        self.assertIn('CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_patients_lookup ON patients USING hash (mrn) '
+                      'WHERE deleted_at IS NOT NULL;', sql)
+        self.assertIn('DROP INDEX CONCURRENTLY IF EXISTS idx_patients_mrn;', sql)
+        index = next(c for c in self.changes if c.change_type == 'DROP_INDEX').details['index']
+        self.assertEqual(self.surgeon._generate_drop_index_sql('clinical.patients', index),
+                         f'DROP INDEX IF EXISTS clinical.{index.name};')
+
+class TestIndexAnalyzer(unittest.TestCase):
+    """Test index findings"""
+
+    def setUp(self):
+        analyzer = MigrationSurgeon().analyzer
+        self.model = analyzer.extract_schema_model_from_statements(split_statements(ANALYZED_SCHEMA))
+
+    def test_findings(self):
+        """Duplicates, prefixes and unindexed foreign keys are flagged; partial and reordered indexes are not"""
+        findings = IndexAnalyzer().analyze(self.model)
+        self.assertEqual([(f.kind, f.table, f.index or f.columns) for f in findings], [
+            ('MISSING_FK_INDEX', 'treatments', ('patient_id',)),
+            ('MISSING_FK_INDEX', 'notes', ('patient_id',)),
+            ('DUPLICATE', 'patients', 'idx_patients_id'),
+            ('REDUNDANT', 'patients', 'idx_patients_name'),
+        ])
+        duplicate = findings[2]
+        self.assertEqual(duplicate.covered_by, 'patients_pkey')
+        self.assertEqual(duplicate.suggestion, 'DROP INDEX CONCURRENTLY IF EXISTS idx_patients_id;')
+        self.assertEqual(findings[3].covered_by, 'idx_patients_name_clinic')
+        self.assertEqual(findings[0].suggestion,
+                         'CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_treatments_patient_id ON treatments (patient_id);')
+
+    def test_ranked_by_table_size(self):
+        """With statistics, findings on the largest tables come first"""
+        estimator = CostEstimator({
+            'notes': TableStats('notes', rows=10 ** 7, table_bytes=10 ** 9),
+            'patients': TableStats('patients', rows=10 ** 5, table_bytes=10 ** 7),
+        })
+        findings = IndexAnalyzer(estimator).analyze(self.model)
+        self.assertEqual([f.table for f in findings], ['notes', 'patients', 'patients', 'treatments'])
+        self.assertEqual(findings[0].rows, 10 ** 7)
+        self.assertIsNone(findings[-1].table_bytes)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+OncoVista Lazy Schema Diff Test Suite
+Validate that fingerprint-first diffs match full diffs while parsing less
+"""
+
+import unittest
+import sys
+import os
+
+# Add the schema_evolver directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'schema_evolver'))
+
+from ddl_lexer import split_statements
+from lazy_diff import unchanged_tables
+from migration_generator import MigrationSurgeon
+from synthetic_schema import MutationRates, SyntheticSchemaConfig, SyntheticSchemaGenerator
+
+OLD_SCHEMA = """
+CREATE TABLE patients (id SERIAL PRIMARY KEY, name TEXT);
+CREATE TABLE visits (id SERIAL PRIMARY KEY, patient_id INTEGER REFERENCES patients(id), notes TEXT);
+CREATE TABLE labs (id SERIAL PRIMARY KEY, code TEXT);
+CREATE INDEX idx_labs_code ON labs (code);
+CREATE TRIGGER labs_audit AFTER INSERT ON labs FOR EACH ROW EXECUTE FUNCTION audit();
+"""
+
+class TestLazyDiff(unittest.TestCase):
+    """Test the fingerprint-first diff"""
+
+    def setUp(self):
+        self.surgeon = MigrationSurgeon()
+        self.analyzer = self.surgeon.analyzer
+
+    def diff_both(self, old_sql, new_sql):
+        old_full = self.analyzer.extract_schema_model_from_statements(split_statements(old_sql))
+        new_full = self.analyzer.extract_schema_model_from_statements(split_statements(new_sql))
+        old_lazy = self.analyzer.scan_schema(split_statements(old_sql))
+        new_lazy = self.analyzer.scan_schema(split_statements(new_sql))
+        full = self.surgeon.compare_models(old_full, new_full)
+        lazy = self.surgeon.compare_lazy(old_lazy, new_lazy)
+        return full, lazy, old_lazy, new_lazy
+
+    def test_matches_full_diff_on_synthetic_schemas(self):
+        """Lazy and full diffs produce the same change list, in the same order"""
+        for seed in range(3):
+            generator = SyntheticSchemaGenerator(SyntheticSchemaConfig(tables=150, triggers=40, seed=seed))
+            old_sql, new_sql = generator.generate_pair(MutationRates())
+            full, lazy, _, _ = self.diff_both(old_sql, new_sql)
+            self.assertTrue(full)
+            self.assertEqual(lazy, full)
+
+    def test_only_changed_tables_are_parsed(self):
+        """Tables with equal fingerprints on both sides are never parsed"""
+        new_sql = OLD_SCHEMA.replace('notes TEXT', 'notes TEXT, seen_at TIMESTAMPTZ')
+        full, lazy, old_lazy, new_lazy = self.diff_both(OLD_SCHEMA, new_sql)
+        self.assertEqual(lazy, full)
+        self.assertEqual([(c.change_type, c.table_name) for c in lazy], [('ADD_COLUMN', 'visits')])
+        self.assertEqual(unchanged_tables(old_lazy, new_lazy), {'patients', 'labs'})
+        self.assertEqual((old_lazy.tables.parsed, new_lazy.tables.parsed), (1, 1))
+
+    def test_comments_between_statements_do_not_change_fingerprints(self):
+        """The lexer drops comments and surrounding whitespace before fingerprinting"""
+        new_sql = '-- Core tables\n\n' + OLD_SCHEMA.replace(';\nCREATE TABLE visits', ';\n/* visits */\n  CREATE TABLE visits')
+        _, lazy, old_lazy, new_lazy = self.diff_both(OLD_SCHEMA, new_sql)
+        self.assertEqual(lazy, [])
+        self.assertEqual(unchanged_tables(old_lazy, new_lazy), {'patients', 'visits', 'labs'})
+
+    def test_index_and_trigger_statements_are_fingerprinted(self):
+        """Changing a table's index or trigger marks the table for parsing"""
+        for new_sql in (OLD_SCHEMA.replace('ON labs (code)', 'ON labs (lower(code))'),
+                        OLD_SCHEMA.replace('AFTER INSERT ON labs', 'AFTER UPDATE ON labs')):
+            full, lazy, old_lazy, new_lazy = self.diff_both(OLD_SCHEMA, new_sql)
+            self.assertEqual(lazy, full)
+            self.assertNotIn('labs', unchanged_tables(old_lazy, new_lazy))
+
+    def test_parsed_tables_carry_indexes(self):
+        """Tables parsed on demand include their indexes, as in the full model"""
+        lazy = self.analyzer.scan_schema(split_statements(OLD_SCHEMA))
+        full = self.analyzer.extract_schema_model_from_statements(split_statements(OLD_SCHEMA))
+        self.assertEqual(lazy.tables['labs'], full.tables['labs'])
+        self.assertEqual(list(lazy.tables), list(full.tables))
+        self.assertEqual([t.name for t in lazy.triggers], [t.name for t in full.triggers])
+
+    def test_added_and_dropped_tables(self):
+        """Tables on one side only are parsed and reported like the full diff"""
+        new_sql = OLD_SCHEMA.replace('CREATE TABLE labs (id SERIAL PRIMARY KEY, code TEXT);',
+                                     'CREATE TABLE lab_results (id SERIAL PRIMARY KEY, value NUMERIC);')
+        full, lazy, _, _ = self.diff_both(OLD_SCHEMA, new_sql)
+        self.assertEqual(lazy, full)
+        self.assertEqual(sorted(c.change_type for c in lazy), ['ADD_TABLE', 'DROP_TABLE'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+OncoVista Migration Squash Test Suite
+Validate that squashed migration chains are minimal and reproduce the same schema DNA
+"""
+
+import unittest
+import sys
+import os
+import tempfile
+
+# Add the schema_evolver directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'schema_evolver'))
+
+from ddl_lexer import split_statements
+from migration_generator import MigrationSurgeon
+from migration_squash import MigrationSquasher, apply_changes, copy_model, compare_dna
+
+BASELINE = """
+CREATE TABLE patients (id SERIAL PRIMARY KEY, mrn TEXT, name TEXT, notes TEXT);
+CREATE INDEX idx_patients_name ON patients (name);
+CREATE TABLE visits (id SERIAL PRIMARY KEY, patient_id INTEGER REFERENCES patients, note TEXT);
+"""
+
+MIGRATIONS = [
+    # Scratch table and column that a later migration takes back out
+    """
+    CREATE TABLE scratch (id SERIAL PRIMARY KEY, payload TEXT);
+    ALTER TABLE patients ADD COLUMN tmp_flag BOOLEAN;
+    ALTER TABLE patients ALTER COLUMN mrn TYPE VARCHAR(20);
+    """,
+    """
+    ALTER TABLE patients ALTER COLUMN mrn TYPE VARCHAR(40);
+    CREATE INDEX idx_patients_mrn ON patients (mrn);
+    DROP INDEX idx_patients_name;
+    DROP TABLE visits;
+    """,
+    """
+    DROP TABLE scratch;
+    ALTER TABLE patients DROP COLUMN tmp_flag;
+    ALTER TABLE patients ALTER COLUMN mrn TYPE TEXT;
+    CREATE INDEX idx_patients_name ON patients (name);
+    ALTER TABLE patients ADD COLUMN diagnosis TEXT;
+    ALTER TABLE patients DROP COLUMN notes;
+    """
+]
+
+class TestMigrationSquash(unittest.TestCase):
+    """Squash migration chains"""
+
+    def setUp(self):
+        self.surgeon = MigrationSurgeon()
+        self.squasher = MigrationSquasher(self.surgeon)
+
+    def _model(self, sql):
+        return self.surgeon.analyzer.extract_schema_model_from_statements(split_statements(sql))
+
+    def _chain(self, *schemas):
+        models = [self._model(sql) for sql in schemas]
+        return [self.surgeon.compare_models(old, new) for old, new in zip(models, models[1:])]
+
+    def test_squash_cancels_and_merges(self):
+        chain = self._chain(
+            "CREATE TABLE patients (id SERIAL PRIMARY KEY, mrn TEXT, notes TEXT);",
+            "CREATE TABLE patients (id SERIAL PRIMARY KEY, mrn VARCHAR(20), notes TEXT, tmp INT);"
+            "CREATE TABLE scratch (id INT);",
+            "CREATE TABLE patients (id SERIAL PRIMARY KEY, mrn VARCHAR(40), notes TEXT, tmp INT);",
+            "CREATE TABLE patients (id SERIAL PRIMARY KEY, mrn VARCHAR(40), diagnosis TEXT);"
+        )
+        result = self.squasher.squash(chain)
+
+        self.assertTrue(result.verified, result.mismatches)
+        self.assertEqual(result.migrations, 3)
+        summary = sorted((change.change_type, change.details.get('column')) for change in result.changes)
+        self.assertEqual(summary, [('ADD_COLUMN', 'diagnosis'), ('DROP_COLUMN', 'notes'), ('MODIFY_COLUMN', 'mrn')])
+
+        modify = next(change for change in result.changes if change.change_type == 'MODIFY_COLUMN')
+        self.assertEqual(modify.details['old_def'].type, 'TEXT')
+        self.assertEqual(modify.details['new_def'].type, 'VARCHAR(40)')
+        self.assertIsNotNone(modify.details['primary_key'])
+        self.assertLess(len(result.changes), result.original_operations)
+
+    def test_round_trip_cancels_entirely(self):
+        schema = "CREATE TABLE patients (id SERIAL PRIMARY KEY, mrn TEXT);"
+        chain = self._chain(
+            schema,
+            schema + "CREATE TABLE scratch (id INT); CREATE INDEX idx_scratch ON scratch (id);",
+            schema
+        )
+        result = self.squasher.squash(chain)
+        self.assertTrue(result.verified)
+        self.assertEqual(result.changes, [])
+        self.assertEqual(result.original_operations, 3)
+
+    def test_dropped_table_rollback_has_starting_definition(self):
+        chain = self._chain(
+            "CREATE TABLE visits (id SERIAL PRIMARY KEY, note TEXT); CREATE INDEX idx_visits_note ON visits (note);",
+            "CREATE TABLE visits (id SERIAL PRIMARY KEY, note TEXT, seen_at TIMESTAMP);",
+            ""
+        )
+        result = self.squasher.squash(chain)
+        self.assertTrue(result.verified)
+        self.assertEqual([change.change_type for change in result.changes], ['DROP_TABLE'])
+
+        table = result.changes[0].details['table_def']
+        self.assertEqual(list(table.columns), ['id', 'note'])
+        self.assertEqual([index.name for index in table.indexes], ['idx_visits_note'])
+        self.assertIn('CREATE INDEX idx_visits_note', result.changes[0].rollback_sql)
+
+    def test_squash_files_matches_replay(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            baseline = os.path.join(tmp, 'baseline.sql')
+            with open(baseline, 'w') as f:
+                f.write(BASELINE)
+            files = []
+            for number, sql in enumerate(MIGRATIONS, 1):
+                files.append(os.path.join(tmp, f'00{number}_step.sql'))
+                with open(files[-1], 'w') as f:
+                    f.write(sql)
+
+            result = self.squasher.squash_files(files, baseline)
+
+        self.assertTrue(result.verified, result.mismatches)
+        self.assertEqual(result.migrations, 3)
+        summary = sorted((change.change_type, change.table_name) for change in result.changes)
+        self.assertEqual(summary, [
+            ('ADD_COLUMN', 'patients'), ('ADD_INDEX', 'patients'), ('DROP_COLUMN', 'patients'),
+            ('DROP_TABLE', 'visits')
+        ])
+
+        # The squashed migration and its rollback are generated like any other
+        migration = self.surgeon.generate_migration(result.changes, 'squashed')
+        self.assertIn('DROP TABLE', migration)
+        self.assertNotIn('scratch', migration)
+        self.assertIn('CREATE TABLE visits', self.surgeon.generate_rollback_script(result.changes))
+
+    def test_verification_reports_mismatch(self):
+        old = self._model("CREATE TABLE patients (id SERIAL PRIMARY KEY, mrn TEXT);")
+        new = self._model("CREATE TABLE patients (id SERIAL PRIMARY KEY, mrn TEXT, name TEXT);")
+        changes = self.surgeon.compare_models(old, new)
+
+        self.assertEqual(compare_dna(new, apply_changes(copy_model(old), changes)), [])
+        self.assertEqual(compare_dna(new, old), ['column patients.name differs'])
+        # Applying to a copy leaves the original model alone
+        self.assertNotIn('name', old.tables['patients'].columns)
+
+    def test_unsupported_change_type(self):
+        chain = self._chain("CREATE TABLE patients (id INT);", "CREATE TABLE patients (id INT, mrn TEXT);")
+        chain[0][0].change_type = 'RENAME_COLUMN'
+        with self.assertRaises(ValueError):
+            self.squasher.squash(chain)
+
+if __name__ == '__main__':
+    unittest.main()
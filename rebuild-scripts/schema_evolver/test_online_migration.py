@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+OncoVista Online Migration Test Suite
+Validate lock-aware zero-downtime migration plans
+"""
+
+import unittest
+import sys
+import os
+
+# Add the schema_evolver directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'schema_evolver'))
+
+from ddl_lexer import split_statements
+from migration_generator import MigrationSurgeon
+from online_migration import ACCESS_EXCLUSIVE, SHARE_UPDATE_EXCLUSIVE, OnlineMigrationPlanner, is_volatile_default
+
+OLD_SCHEMA = """
+CREATE TABLE public.patients (id UUID PRIMARY KEY, mrn VARCHAR(20), status TEXT, visits INT);
+CREATE INDEX idx_patients_mrn ON public.patients (mrn);
+CREATE INDEX idx_patients_visits ON public.patients (visits);
+CREATE TABLE public.clinics (id UUID PRIMARY KEY);
+"""
+NEW_SCHEMA = """
+CREATE TABLE public.patients (
+    id UUID PRIMARY KEY,
+    mrn VARCHAR(40),
+    status TEXT NOT NULL,
+    token UUID DEFAULT gen_random_uuid(),
+    registered_at TIMESTAMPTZ DEFAULT NOW(),
+    clinic_id UUID REFERENCES public.clinics(id),
+    visits BIGINT
+);
+CREATE INDEX idx_patients_mrn ON public.patients (mrn);
+CREATE INDEX idx_patients_visits ON public.patients (visits);
+CREATE TABLE public.clinics (id UUID PRIMARY KEY);
+"""
+
+class TestOnlineMigrationPlanner(unittest.TestCase):
+    """Test phase assignment and lock annotations"""
+
+    def setUp(self):
+        self.surgeon = MigrationSurgeon()
+        analyzer = self.surgeon.analyzer
+        old = analyzer.extract_schema_model_from_statements(split_statements(OLD_SCHEMA))
+        new = analyzer.extract_schema_model_from_statements(split_statements(NEW_SCHEMA))
+        self.changes = self.surgeon.compare_models(old, new)
+        phases = OnlineMigrationPlanner(self.surgeon).plan(self.changes)
+        self.phases = {phase.name: phase for phase in phases}
+        self.sql = {name: '\n'.join(step.sql for step in phase.steps) for name, phase in self.phases.items()}
+
+    def test_phases_and_transactions(self):
+        """Expand and contract are transactional; the online phase is not"""
+        self.assertEqual(list(self.phases), ['expand', 'online', 'contract'])
+        self.assertEqual([phase.transactional for phase in self.phases.values()], [True, False, True])
+
+    def test_volatile_default_is_backfilled(self):
+        """Volatile defaults are set separately and backfilled outside the DDL transaction"""
+        self.assertIn('ADD COLUMN token UUID;', self.sql['expand'])
+        self.assertIn('ALTER COLUMN token SET DEFAULT gen_random_uuid();', self.sql['expand'])
+        self.assertIn('UPDATE public.patients SET token = gen_random_uuid()\n', self.sql['online'])
+        self.assertIn('ADD COLUMN registered_at TIMESTAMPTZ DEFAULT NOW();', self.sql['expand'])
+
+    def test_not_null_uses_validated_check(self):
+        """SET NOT NULL follows a NOT VALID check validated online"""
+        self.assertIn('CHECK (status IS NOT NULL) NOT VALID', self.sql['expand'])
+        self.assertIn('VALIDATE CONSTRAINT patients_status_not_null', self.sql['online'])
+        self.assertIn('ALTER COLUMN status SET NOT NULL', self.sql['contract'])
+
+    def test_foreign_key_not_valid_then_validate(self):
+        """Foreign keys are added NOT VALID and validated online"""
+        self.assertIn('FOREIGN KEY (clinic_id) REFERENCES public.clinics NOT VALID', self.sql['expand'])
+        self.assertIn('VALIDATE CONSTRAINT patients_clinic_id_fkey', self.sql['online'])
+        self.assertNotIn('REFERENCES', [s for s in self.sql['expand'].splitlines() if 'ADD COLUMN clinic_id' in s][0])
+
+    def test_type_change_uses_shadow_column(self):
+        """Rewriting type changes never emit ALTER COLUMN ... TYPE and rebuild indexes concurrently"""
+        everything = '\n'.join(self.sql.values())
+        self.assertNotIn(' TYPE BIGINT', everything)
+        self.assertIn('ADD COLUMN visits__new BIGINT', self.sql['expand'])
+        self.assertIn('CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_patients_visits__new ON public.patients '
+                      '(visits__new)', self.sql['online'])
+        self.assertIn('RENAME COLUMN visits__new TO visits', self.sql['contract'])
+        self.assertIn('ALTER INDEX idx_patients_visits__new RENAME TO idx_patients_visits', self.sql['contract'])
+
+    def test_metadata_only_type_change_stays_in_place(self):
+        """Widening a varchar only updates the catalog, so no shadow column is built"""
+        self.assertIn('ALTER TABLE public.patients ALTER COLUMN mrn TYPE VARCHAR(40);', self.sql['expand'])
+        everything = '\n'.join(self.sql.values())
+        self.assertNotIn('mrn__new', everything)
+        self.assertNotIn('idx_patients_mrn', everything)
+
+    def test_every_step_is_annotated(self):
+        """Each rendered statement carries its lock level; no online step takes ACCESS EXCLUSIVE"""
+        self.assertTrue(all(step.lock for phase in self.phases.values() for step in phase.steps))
+        self.assertNotIn(ACCESS_EXCLUSIVE, {step.lock for step in self.phases['online'].steps})
+        self.assertIn(SHARE_UPDATE_EXCLUSIVE, {step.lock for step in self.phases['online'].steps})
+
+        script = self.surgeon.generate_online_migration(self.changes, 'patients_online', lock_timeout='2s')
+        self.assertEqual(script.count('BEGIN;'), 2)
+        self.assertIn("SET LOCAL lock_timeout = '2s';", script)
+        self.assertEqual(script.count('-- 🔒 Lock:'), sum(len(p.steps) for p in self.phases.values()))
+
+    def test_volatile_detection(self):
+        """Only calls outside the stable timestamp functions count as volatile"""
+        self.assertFalse(is_volatile_default("'active'"))
+        self.assertFalse(is_volatile_default("'{}'::jsonb"))
+        self.assertFalse(is_volatile_default('NOW()'))
+        self.assertTrue(is_volatile_default('uuid_generate_v4()'))
+        self.assertTrue(is_volatile_default("nextval('patients_id_seq'::regclass)"))
+
+class TestKeyColumnSwap(unittest.TestCase):
+    """Test that shadow swaps keep primary keys and leave referenced keys alone"""
+
+    def _plan(self, old_sql, new_sql):
+        surgeon = MigrationSurgeon()
+        analyzer = surgeon.analyzer
+        old = analyzer.extract_schema_model_from_statements(split_statements(old_sql))
+        new = analyzer.extract_schema_model_from_statements(split_statements(new_sql))
+        phases = OnlineMigrationPlanner(surgeon).plan(surgeon.compare_models(old, new))
+        return {phase.name: [step.sql for step in phase.steps] for phase in phases}
+
+    def test_primary_key_is_reattached(self):
+        sql = self._plan("CREATE TABLE treatments (id INTEGER PRIMARY KEY, code TEXT UNIQUE);",
+                         "CREATE TABLE treatments (id BIGINT PRIMARY KEY, code TEXT UNIQUE);")
+        self.assertIn('CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS treatments_pkey__new ON treatments (id__new);',
+                      sql['online'])
+        contract = sql['contract']
+        self.assertLess(contract.index('ALTER TABLE treatments DROP COLUMN id;'),
+                        contract.index('ALTER TABLE treatments ALTER COLUMN id SET NOT NULL;'))
+        self.assertEqual(contract[-1], 'ALTER TABLE treatments ADD CONSTRAINT treatments_pkey PRIMARY KEY '
+                                       'USING INDEX treatments_pkey__new;')
+
+    def test_referenced_key_is_not_swapped(self):
+        sql = self._plan(
+            "CREATE TABLE treatments (id INTEGER PRIMARY KEY);"
+            "CREATE TABLE doses (id INTEGER PRIMARY KEY, treatment_id INTEGER REFERENCES treatments(id));",
+            "CREATE TABLE treatments (id BIGINT PRIMARY KEY);"
+            "CREATE TABLE doses (id INTEGER PRIMARY KEY, treatment_id INTEGER REFERENCES treatments(id));"
+        )
+        self.assertEqual(sql['expand'], ['ALTER TABLE treatments ALTER COLUMN id TYPE BIGINT;'])
+        self.assertNotIn('contract', sql)
+
+class TestKeyConstraintChanges(unittest.TestCase):
+    """Test UNIQUE and PRIMARY KEY changes on a column whose type stays the same"""
+
+    _plan = TestKeyColumnSwap._plan
+
+    def test_added_key_is_built_concurrently_and_attached(self):
+        sql = self._plan("CREATE TABLE patients (id INTEGER, email VARCHAR(100));",
+                         "CREATE TABLE patients (id INTEGER PRIMARY KEY, email VARCHAR(100) UNIQUE);")
+        self.assertEqual(sorted(sql['online']), [
+            'ALTER TABLE patients VALIDATE CONSTRAINT patients_id_not_null;',
+            'CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS patients_email_key ON patients (email);',
+            'CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS patients_pkey ON patients (id);'
+        ])
+        contract = sql['contract']
+        self.assertIn('ALTER TABLE patients ADD CONSTRAINT patients_email_key UNIQUE USING INDEX patients_email_key;',
+                      contract)
+        self.assertLess(contract.index('ALTER TABLE patients ALTER COLUMN id SET NOT NULL;'),
+                        contract.index('ALTER TABLE patients ADD CONSTRAINT patients_pkey PRIMARY KEY '
+                                       'USING INDEX patients_pkey;'))
+
+    def test_removed_key_is_dropped_in_contract(self):
+        sql = self._plan("CREATE TABLE patients (id INTEGER PRIMARY KEY, email VARCHAR(100) UNIQUE);",
+                         "CREATE TABLE patients (id INTEGER PRIMARY KEY, email VARCHAR(100));")
+        self.assertEqual(sql, {'contract': ['ALTER TABLE patients DROP CONSTRAINT IF EXISTS patients_email_key;']})
+
+if __name__ == '__main__':
+    unittest.main()
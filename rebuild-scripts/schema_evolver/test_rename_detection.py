@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+OncoVista Rename Detection Test Suite
+Validate that renamed tables and columns are detected, scored and overridable
+"""
+
+import re
+import time
+import unittest
+import sys
+import os
+
+# Add the schema_evolver directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'schema_evolver'))
+
+from ddl_lexer import split_statements
+from migration_generator import MigrationSurgeon
+from rename_detection import RenameDetector, RenameOverrides
+from schema_replay import SchemaReplayer
+from synthetic_schema import generate_schema_sql
+
+OLD_SCHEMA = """
+CREATE TABLE public.patients (id SERIAL PRIMARY KEY, mrn VARCHAR(20) NOT NULL UNIQUE, full_name TEXT, notes TEXT);
+CREATE INDEX idx_patients_mrn ON public.patients (mrn);
+CREATE TABLE public.visit_log (id SERIAL PRIMARY KEY, patient_id INTEGER REFERENCES public.patients,
+    seen_at TIMESTAMP NOT NULL DEFAULT now(), summary TEXT);
+"""
+
+NEW_SCHEMA = """
+CREATE TABLE public.patients (id SERIAL PRIMARY KEY, medical_record_number VARCHAR(20) NOT NULL UNIQUE,
+    full_name TEXT, notes TEXT);
+CREATE INDEX idx_patients_mrn ON public.patients (medical_record_number);
+CREATE TABLE public.encounters (id SERIAL PRIMARY KEY, patient_id INTEGER REFERENCES public.patients,
+    seen_at TIMESTAMP NOT NULL DEFAULT now(), summary TEXT, ward TEXT);
+"""
+
+class TestRenameDetection(unittest.TestCase):
+    """Test rename detection in the surgeon"""
+
+    def setUp(self):
+        self.surgeon = MigrationSurgeon(rename_detector=RenameDetector())
+
+    def _models(self, old_sql=OLD_SCHEMA, new_sql=NEW_SCHEMA):
+        analyzer = self.surgeon.analyzer
+        return (analyzer.extract_schema_model_from_statements(split_statements(old_sql)),
+                analyzer.extract_schema_model_from_statements(split_statements(new_sql)))
+
+    def _summary(self, changes):
+        return sorted((change.change_type, change.table_name, change.details.get('column')) for change in changes)
+
+    def test_renames_replace_drop_and_add(self):
+        """A renamed table and column keep their data; only real changes remain"""
+        changes = self.surgeon.compare_models(*self._models())
+        self.assertEqual(self._summary(changes), [
+            ('ADD_COLUMN', 'public.encounters', 'ward'),
+            ('RENAME_COLUMN', 'public.patients', 'medical_record_number'),
+            ('RENAME_TABLE', 'public.encounters', None)
+        ])
+        table = next(change for change in changes if change.change_type == 'RENAME_TABLE')
+        self.assertEqual(table.details['old_name'], 'public.visit_log')
+        self.assertGreaterEqual(table.details['confidence'], 0.8)
+        self.assertFalse(table.details['forced'])
+
+        migration = self.surgeon.generate_migration(changes, 'renames')
+        self.assertIn('ALTER TABLE public.visit_log RENAME TO encounters;', migration)
+        self.assertIn('ALTER TABLE public.patients RENAME COLUMN mrn TO medical_record_number;', migration)
+        self.assertLess(migration.index('RENAME TO encounters'), migration.index('ADD COLUMN ward'))
+        self.assertNotIn('DROP', migration)
+        rollback = self.surgeon.generate_rollback_script(changes)
+        self.assertIn('ALTER TABLE public.encounters RENAME TO visit_log;', rollback)
+        self.assertIn('RENAME COLUMN medical_record_number TO mrn;', rollback)
+
+    def test_migration_replays_to_new_schema(self):
+        """Replaying the generated renames over the old schema gives the new tables"""
+        old, new = self._models()
+        migration = self.surgeon.generate_migration(self.surgeon.compare_models(old, new), 'renames')
+        SchemaReplayer(self.surgeon.analyzer).apply_statements(old, split_statements(migration))
+        self.assertEqual(sorted(old.tables), sorted(new.tables))
+        self.assertEqual(list(old.tables['public.patients'].columns), list(new.tables['public.patients'].columns))
+
+    def test_changed_type_is_not_a_rename(self):
+        """A column whose type changed stays a drop and an add"""
+        old, new = self._models(
+            "CREATE TABLE patients (id INT, mrn TEXT, age INT);",
+            "CREATE TABLE patients (id INT, mrn TEXT, years BIGINT);"
+        )
+        self.assertEqual(self._summary(self.surgeon.compare_models(old, new)), [
+            ('ADD_COLUMN', 'patients', 'years'), ('DROP_COLUMN', 'patients', 'age')
+        ])
+
+    def test_unrelated_names_of_the_same_type_are_not_renames(self):
+        """Matching types and attributes alone never turn a dropped column into an added one"""
+        old, new = self._models(
+            "CREATE TABLE patients (id INT PRIMARY KEY, ssn VARCHAR(11), notes TEXT);",
+            "CREATE TABLE patients (id INT PRIMARY KEY, phone VARCHAR(11), notes TEXT);"
+        )
+        self.assertEqual(self._summary(self.surgeon.compare_models(old, new)), [
+            ('ADD_COLUMN', 'patients', 'phone'), ('DROP_COLUMN', 'patients', 'ssn')
+        ])
+
+        # An index that kept its name and moved to the new column is evidence enough
+        old, new = self._models(
+            "CREATE TABLE patients (id INT PRIMARY KEY, ssn VARCHAR(11), notes TEXT);"
+            "CREATE INDEX idx_patients_lookup ON patients (ssn);",
+            "CREATE TABLE patients (id INT PRIMARY KEY, phone VARCHAR(11), notes TEXT);"
+            "CREATE INDEX idx_patients_lookup ON patients (phone);"
+        )
+        self.assertIn(('RENAME_COLUMN', 'patients', 'phone'), self._summary(self.surgeon.compare_models(old, new)))
+
+    def test_ambiguous_matches_are_left_alone(self):
+        """Two equally good targets make a rename ambiguous"""
+        old, new = self._models(
+            "CREATE TABLE patients (id INT, ab TEXT);",
+            "CREATE TABLE patients (ac TEXT, id INT, ad TEXT);"
+        )
+        changes = self.surgeon.compare_models(old, new)
+        self.assertNotIn('RENAME_COLUMN', [change.change_type for change in changes])
+
+    def test_overrides(self):
+        """Forced renames win regardless of score; rejected names are never renamed"""
+        old, new = self._models(
+            OLD_SCHEMA.replace('notes TEXT', 'notes TEXT, remarks TEXT'),
+            NEW_SCHEMA.replace('notes TEXT', 'comments TEXT, remarks_v2 TEXT')
+        )
+        overrides = RenameOverrides.parse(['patients.notes=remarks_v2', 'visit_log=public.encounters'],
+                                          ['public.patients.mrn'])
+        self.surgeon.rename_detector = RenameDetector(threshold=0.99, overrides=overrides)
+        changes = self.surgeon.compare_models(old, new)
+
+        renames = {(change.details.get('old_name') or change.details['old_column']): change for change in changes
+                   if change.change_type.startswith('RENAME')}
+        self.assertEqual(sorted(renames), ['notes', 'public.visit_log'])
+        self.assertEqual(renames['notes'].details['column'], 'remarks_v2')
+        self.assertTrue(all(change.details['forced'] for change in renames.values()))
+        self.assertIn(('DROP_COLUMN', 'public.patients', 'mrn'), self._summary(changes))
+        self.assertIn(('DROP_COLUMN', 'public.patients', 'remarks'), self._summary(changes))
+
+        with self.assertRaises(ValueError):
+            RenameOverrides.parse(['patients'])
+
+    def test_scales_to_thousands_of_tables(self):
+        """Every table of a large schema renamed at once is matched without pairwise scoring"""
+        old_sql = generate_schema_sql(1000, seed=7)
+        new_sql = re.sub(r'CREATE TABLE public\.(\w+)', r'CREATE TABLE public.\1_v2', old_sql)
+        old, new = self._models(old_sql, new_sql)
+
+        started = time.perf_counter()
+        matches = RenameDetector().match_tables(old.tables, new.tables)
+        elapsed = time.perf_counter() - started
+        self.assertEqual(len(matches), len(old.tables))
+        self.assertTrue(all(match.new_name == f'{match.old_name}_v2' for match in matches))
+        self.assertLess(elapsed, 10.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+OncoVista Schema Model Test Suite
+Validate the slotted schema model and its dict compatibility layer
+"""
+
+import unittest
+import sys
+import os
+import pickle
+
+# Add the schema_evolver directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'schema_evolver'))
+
+from ddl_lexer import split_statements
+from migration_generator import MigrationSurgeon, SchemaDNAAnalyzer
+from schema_model import Column
+
+SCHEMA = """
+CREATE TABLE patients (id SERIAL PRIMARY KEY, name VARCHAR(255) NOT NULL, notes TEXT DEFAULT 'n/a');
+CREATE TABLE treatments (id SERIAL PRIMARY KEY, patient_id INTEGER REFERENCES patients(id), notes TEXT);
+CREATE INDEX idx_treatments_patient ON treatments (patient_id);
+"""
+
+class TestSchemaModel(unittest.TestCase):
+    """Test slotted model objects"""
+
+    def setUp(self):
+        self.model = SchemaDNAAnalyzer().extract_schema_model_from_statements(split_statements(SCHEMA))
+
+    def test_objects_are_slotted_and_hashable(self):
+        """Columns and indexes carry no instance dict and can be hashed"""
+        column = self.model.tables['patients'].columns['name']
+        self.assertFalse(hasattr(column, '__dict__'))
+        self.assertFalse(hasattr(self.model.tables['patients'], '__dict__'))
+        self.assertEqual(len({column, Column('name', 'VARCHAR(255)', False, None, ('NOT NULL',))}), 1)
+        self.assertIsInstance(hash(self.model.tables['treatments'].indexes[0]), int)
+
+    def test_repeated_strings_are_interned(self):
+        """Equal types and column names share one string object"""
+        patients = self.model.tables['patients'].columns
+        treatments = self.model.tables['treatments'].columns
+        self.assertIs(patients['notes'].type, treatments['notes'].type)
+        self.assertIs(next(iter(patients)), next(iter(treatments)))
+
+    def test_dict_compatibility(self):
+        """Subscript access and to_dict() reproduce the plain dict form"""
+        table = self.model['tables']['treatments']
+        self.assertEqual(table['columns']['patient_id']['type'], 'INTEGER')
+        self.assertEqual(table['indexes'][0]['columns'], ('patient_id',))
+        self.assertEqual(self.model.to_dict()['tables']['treatments']['indexes'],
+                         [{'name': 'idx_treatments_patient', 'columns': ['patient_id'], 'unique': False}])
+        with self.assertRaises(KeyError):
+            table['missing']
+
+    def test_pickle_round_trip(self):
+        """Models survive the cache and process-pool serialization"""
+        self.assertEqual(pickle.loads(pickle.dumps(self.model)), self.model)
+
+    def test_sql_generation_accepts_model_and_dict_definitions(self):
+        """Generators work with slotted objects and legacy dicts alike"""
+        surgeon = MigrationSurgeon()
+        column = self.model.tables['patients'].columns['notes']
+        expected = "ALTER TABLE patients ADD COLUMN notes TEXT DEFAULT 'n/a';"
+        self.assertEqual(surgeon._generate_add_column_sql('patients', 'notes', column), expected)
+        self.assertEqual(surgeon._generate_add_column_sql('patients', 'notes', column.to_dict()), expected)
+        self.assertIn('CREATE TABLE patients', surgeon._generate_create_table_sql('patients', self.model.tables['patients']))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+OncoVista Schema Profiler Test Suite
+Validate per-phase measurements and their JSON and Chrome trace exports
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+import sys
+
+# Add the schema_evolver directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'schema_evolver'))
+
+from migration_generator import MigrationSurgeon
+from schema_profiler import NULL_PROFILER, PhaseProfiler
+
+OLD_SCHEMA = """
+CREATE TABLE patients (id SERIAL PRIMARY KEY, name TEXT);
+CREATE INDEX idx_patients_name ON patients (name);
+"""
+
+NEW_SCHEMA = """
+CREATE TABLE patients (id SERIAL PRIMARY KEY, name TEXT, mrn TEXT);
+CREATE INDEX idx_patients_name ON patients (name);
+CREATE TABLE visits (id SERIAL PRIMARY KEY, patient_id INTEGER REFERENCES patients(id));
+CREATE FUNCTION touch() RETURNS trigger AS $$ BEGIN RETURN NEW; END; $$ LANGUAGE plpgsql;
+"""
+
+class TestPhaseProfiler(unittest.TestCase):
+    """Test the profiler on its own"""
+
+    def test_nested_phases(self):
+        """Inclusive time covers nested phases, self time excludes them"""
+        profiler = PhaseProfiler(track_memory=False)
+        with profiler.phase('outer', bytes=10):
+            for _ in range(2):
+                with profiler.phase('inner', statements=1):
+                    time.sleep(0.01)
+
+        outer, inner = profiler.phases['outer'], profiler.phases['inner']
+        self.assertEqual((outer.calls, outer.bytes), (1, 10))
+        self.assertEqual((inner.calls, inner.statements), (2, 2))
+        self.assertGreaterEqual(inner.seconds, 0.02)
+        self.assertAlmostEqual(outer.self_seconds, outer.seconds - inner.seconds, places=6)
+        self.assertIsNone(outer.peak_bytes)
+
+    def test_peak_memory(self):
+        """Peak memory is attributed to the phase that allocated it and its parents"""
+        with PhaseProfiler() as profiler:
+            with profiler.phase('outer'):
+                with profiler.phase('allocate'):
+                    block = bytearray(4 * 1024 * 1024)
+                del block
+                with profiler.phase('small'):
+                    pass
+
+        self.assertGreaterEqual(profiler.phases['allocate'].peak_bytes, 4 * 1024 * 1024)
+        self.assertGreaterEqual(profiler.phases['outer'].peak_bytes, 4 * 1024 * 1024)
+        self.assertLess(profiler.phases['small'].peak_bytes, 1024 * 1024)
+
+    def test_iterate_charges_producer(self):
+        """Time spent producing items is charged to the iterated phase, not the consumer"""
+        def slow_items():
+            for item in range(3):
+                time.sleep(0.01)
+                yield item
+
+        profiler = PhaseProfiler(track_memory=False)
+        with profiler.phase('consume'):
+            self.assertEqual(list(profiler.iterate('produce', slow_items())), [0, 1, 2])
+
+        produce, consume = profiler.phases['produce'], profiler.phases['consume']
+        self.assertEqual(produce.statements, 3)
+        self.assertGreaterEqual(produce.seconds, 0.03)
+        self.assertLess(consume.self_seconds, produce.seconds)
+
+    def test_exports(self):
+        """JSON lists phases in first-run order; the trace holds complete events"""
+        profiler = PhaseProfiler(track_memory=False, max_events=2)
+        for _ in range(3):
+            with profiler.phase('parse.table', bytes=5, statements=1):
+                pass
+
+        report = profiler.to_dict()
+        self.assertEqual(report['phases'][0]['name'], 'parse.table')
+        self.assertEqual(report['phases'][0]['calls'], 3)
+        self.assertEqual(report['dropped_events'], 1)
+
+        trace = profiler.to_chrome_trace()
+        events = [event for event in trace['traceEvents'] if event['ph'] == 'X']
+        self.assertEqual(len(events), 2)
+        self.assertEqual(events[0]['cat'], 'parse')
+        self.assertEqual(events[0]['args'], {'bytes': 5, 'statements': 1})
+        self.assertLessEqual(events[0]['ts'] + events[0]['dur'], events[1]['ts'])
+
+    def test_null_profiler(self):
+        """The default profiler passes items through and records nothing"""
+        items = [1, 2]
+        self.assertIs(NULL_PROFILER.iterate('read', items), items)
+        with NULL_PROFILER.phase('parse', bytes=1):
+            pass
+        self.assertFalse(NULL_PROFILER.enabled)
+
+class TestProfiledSurgeon(unittest.TestCase):
+    """Test the instrumented analyzer and surgeon"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.old_path = os.path.join(self.directory, 'old.sql')
+        self.new_path = os.path.join(self.directory, 'new.sql')
+        for path, content in ((self.old_path, OLD_SCHEMA), (self.new_path, NEW_SCHEMA)):
+            with open(path, 'w') as f:
+                f.write(content)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_phases_recorded(self):
+        """A diagnose and generate run reports every phase with its input counts"""
+        profiler = PhaseProfiler()
+        surgeon = MigrationSurgeon(cache_dir=os.path.join(self.directory, 'cache'), profiler=profiler)
+        with profiler:
+            changes = surgeon.diagnose_changes(self.old_path, self.new_path, use_cache=False)
+            surgeon.generate_migration(changes, 'profiled')
+            surgeon.generate_rollback_script(changes)
+
+        phases = profiler.phases
+        for name in ('read', 'parse', 'parse.table', 'parse.columns', 'parse.index', 'finalize',
+                     'diff', 'diff.tables', 'sort', 'generate.migration', 'generate.rollback'):
+            self.assertIn(name, phases)
+        self.assertEqual(phases['read'].bytes, len(OLD_SCHEMA) + len(NEW_SCHEMA))
+        self.assertEqual(phases['read'].statements, 6)
+        self.assertEqual(phases['parse.table'].statements, 3)
+        self.assertEqual(phases['parse.function'].statements, 1)
+        self.assertEqual(phases['parse'].calls, 2)
+        self.assertIsNotNone(phases['parse'].peak_bytes)
+
+    def test_profiling_does_not_change_results(self):
+        """Profiled and unprofiled runs find the same changes, lazily or not"""
+        plain = MigrationSurgeon(cache_dir=os.path.join(self.directory, 'cache'))
+        profiled = MigrationSurgeon(cache_dir=os.path.join(self.directory, 'cache'),
+                                    profiler=PhaseProfiler(track_memory=False), lazy=True)
+        expected = plain.diagnose_changes(self.old_path, self.new_path, use_cache=False)
+        self.assertEqual(
+            [(c.change_type, c.table_name) for c in profiled.diagnose_changes(self.old_path, self.new_path)],
+            [(c.change_type, c.table_name) for c in expected]
+        )
+        self.assertIn('scan', profiled.profiler.phases)
+        self.assertIn('diff.fingerprint', profiled.profiler.phases)
+
+        output = os.path.join(self.directory, 'profile.json')
+        profiled.profiler.write_json(output)
+        with open(output) as f:
+            self.assertFalse(json.load(f)['memory_tracked'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+OncoVista Schema Replay Test Suite
+Validate incremental schema state replayed from a migrations directory
+"""
+
+import unittest
+import sys
+import os
+import tempfile
+
+# Add the schema_evolver directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'schema_evolver'))
+
+from ddl_lexer import split_statements
+from migration_generator import MigrationSurgeon, SchemaDNAAnalyzer
+from schema_replay import SchemaReplayer, list_migration_files, replay_migrations
+
+BASELINE = """
+CREATE TABLE public.patients (id UUID PRIMARY KEY, name TEXT NOT NULL, mrn VARCHAR(20));
+CREATE TABLE public.notes (id UUID PRIMARY KEY, body TEXT);
+CREATE INDEX idx_patients_mrn ON public.patients (mrn);
+"""
+MIGRATION_1 = """
+BEGIN;
+ALTER TABLE public.patients ADD COLUMN email TEXT, ALTER COLUMN mrn TYPE VARCHAR(40) USING mrn::varchar(40);
+ALTER TABLE patients ALTER COLUMN email SET NOT NULL;
+CREATE TABLE IF NOT EXISTS public.notes (id INT);
+DROP TABLE IF EXISTS public.notes CASCADE;
+COMMIT;
+"""
+MIGRATION_2 = """
+ALTER TABLE public.patients RENAME COLUMN mrn TO medical_record_number;
+ALTER INDEX idx_patients_mrn RENAME TO idx_patients_medical_record_number;
+CREATE TABLE public.visits (id UUID PRIMARY KEY, patient_id UUID REFERENCES public.patients(id));
+"""
+TARGET = """
+CREATE TABLE public.patients (id UUID PRIMARY KEY, name TEXT NOT NULL, medical_record_number VARCHAR(40), email TEXT NOT NULL);
+CREATE INDEX idx_patients_medical_record_number ON public.patients (medical_record_number);
+CREATE TABLE public.visits (id UUID PRIMARY KEY, patient_id UUID REFERENCES public.patients(id));
+"""
+
+class TestSchemaReplayer(unittest.TestCase):
+    """Test statement application on the in-memory model"""
+
+    def setUp(self):
+        self.analyzer = SchemaDNAAnalyzer()
+        self.model = self.analyzer.extract_schema_model_from_statements(split_statements(BASELINE))
+        self.replayer = SchemaReplayer(self.analyzer)
+
+    def test_alter_actions(self):
+        """ADD/ALTER COLUMN actions update the table in place"""
+        self.replayer.apply_statements(self.model, split_statements(MIGRATION_1))
+        columns = self.model.tables['public.patients'].columns
+        self.assertEqual(columns['mrn'].type, 'VARCHAR(40)')
+        self.assertFalse(columns['email'].nullable)
+        self.assertNotIn('public.notes', self.model.tables)
+        self.assertEqual(self.replayer.skipped, 3)  # BEGIN, COMMIT and the no-op CREATE IF NOT EXISTS
+
+    def test_renames_follow_through_indexes(self):
+        """Column and index renames keep index definitions consistent"""
+        self.replayer.apply_statements(self.model, split_statements(MIGRATION_2))
+        index = self.model.tables['public.patients'].indexes[0]
+        self.assertEqual((index.name, index.columns), ('idx_patients_medical_record_number', ('medical_record_number',)))
+
+    def test_table_rename_and_constraints(self):
+        """Table renames keep schema qualification and constraints can be added and dropped"""
+        statements = [
+            'ALTER TABLE public.notes RENAME TO clinical_notes',
+            'ALTER TABLE clinical_notes ADD CONSTRAINT body_present CHECK (body IS NOT NULL)',
+            'ALTER TABLE clinical_notes ADD CONSTRAINT id_set CHECK (id IS NOT NULL)',
+            'ALTER TABLE public.clinical_notes DROP COLUMN IF EXISTS body',
+        ]
+        self.replayer.apply_statements(self.model, statements)
+        table = self.model.tables['public.clinical_notes']
+        self.assertEqual(table.name, 'public.clinical_notes')
+        self.assertEqual([constraint.name for constraint in table.constraints], ['id_set'])
+        self.assertEqual(list(table.columns), ['id'])
+
+    def test_dropped_column_takes_its_indexes_and_constraints(self):
+        """Indexes and table constraints on a dropped column go with it, as in PostgreSQL"""
+        model = self.analyzer.extract_schema_model_from_statements(split_statements("""
+            CREATE TABLE visits (id INT PRIMARY KEY, code TEXT, note TEXT, ward INT,
+                CONSTRAINT visits_code_ward_key UNIQUE (code, ward), CONSTRAINT code_set CHECK ("code" <> ''),
+                CONSTRAINT note_set CHECK (note <> 'code'), FOREIGN KEY (ward) REFERENCES wards (code));
+            CREATE INDEX idx_visits_code ON visits (code);
+            CREATE INDEX idx_visits_lower_code ON visits (lower(code));
+            CREATE INDEX idx_visits_note ON visits (note) INCLUDE (code);
+            CREATE INDEX idx_visits_open ON visits (ward) WHERE code IS NULL;
+            CREATE INDEX idx_visits_ward ON visits (ward);
+        """))
+        self.replayer.apply_statements(model, ['ALTER TABLE visits DROP COLUMN code'])
+        table = model.tables['visits']
+        self.assertEqual([index.name for index in table.indexes], ['idx_visits_ward'])
+        self.assertEqual([constraint.name for constraint in table.constraints], ['note_set', None])
+
+        target = self.analyzer.extract_schema_model_from_statements(split_statements("""
+            CREATE TABLE visits (id INT PRIMARY KEY, note TEXT, ward INT,
+                CONSTRAINT note_set CHECK (note <> 'code'), FOREIGN KEY (ward) REFERENCES wards (code));
+            CREATE INDEX idx_visits_ward ON visits (ward);
+        """))
+        self.assertEqual(MigrationSurgeon().compare_models(model, target), [])
+
+class TestReplayMigrations(unittest.TestCase):
+    """Test checkpointed replay and diffing against a target"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.baseline = self._write('baseline.sql', BASELINE)
+        self.target = self._write('target.sql', TARGET)
+        self.migrations = os.path.join(self.tmp.name, 'migrations')
+        os.mkdir(self.migrations)
+        self._write('migrations/001_patient_contact.sql', MIGRATION_1)
+        self._write('migrations/001_patient_contact_ROLLBACK.sql', 'DROP TABLE public.patients;')
+        self._write('migrations/002_visits.sql', MIGRATION_2)
+        self.analyzer = SchemaDNAAnalyzer()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _write(self, name, content):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+    def test_checkpoints_skip_already_replayed_files(self):
+        """Only new or edited migrations are replayed on later runs"""
+        first, report = replay_migrations(self.analyzer, self.baseline, self.migrations)
+        self.assertEqual(report['replayed'], ['001_patient_contact.sql', '002_visits.sql'])
+
+        second, report = replay_migrations(self.analyzer, self.baseline, self.migrations)
+        self.assertEqual((report['restored'], report['replayed']), (['001_patient_contact.sql', '002_visits.sql'], []))
+        self.assertEqual(second, first)
+
+        self._write('migrations/003_drop_visits.sql', 'DROP TABLE public.visits;')
+        third, report = replay_migrations(self.analyzer, self.baseline, self.migrations)
+        self.assertEqual(report['replayed'], ['003_drop_visits.sql'])
+        self.assertNotIn('public.visits', third.tables)
+
+        self._write('migrations/002_visits.sql', MIGRATION_2 + 'DROP TABLE public.patients;')
+        _, report = replay_migrations(self.analyzer, self.baseline, self.migrations)
+        self.assertEqual(report['replayed'], ['002_visits.sql', '003_drop_visits.sql'])
+
+    def test_generated_side_scripts_are_not_replayed(self):
+        """Rollback, backfill, purge and deferred scripts and parts of whole files are skipped"""
+        for name in ['001_patient_contact_ROLLBACK.sql', '001_patient_contact_BACKFILL.sql',
+                     '001_patient_contact_PURGE.sql', '001_patient_contact_deferred.sql',
+                     '001_patient_contact_deferred_part0001.sql', '001_patient_contact_part0001_ROLLBACK.sql',
+                     '001_patient_contact_part0001.sql', '004_split_part0001.sql', '004_split_part0002.sql']:
+            self._write(f'migrations/{name}', 'DROP TABLE public.patients;')
+        self.assertEqual([path.name for path in list_migration_files(self.migrations)], [
+            '001_patient_contact.sql', '002_visits.sql', '004_split_part0001.sql', '004_split_part0002.sql'
+        ])
+
+    def test_replayed_state_diffs_against_target(self):
+        """The replayed state is compared with MigrationSurgeon's diff logic"""
+        surgeon = MigrationSurgeon(cache_dir=os.path.join(self.tmp.name, 'cache'))
+        changes, _ = surgeon.diagnose_replayed(self.baseline, self.migrations, self.target)
+        self.assertEqual(changes, [])
+
+        self._write('target.sql', TARGET + 'CREATE TABLE public.labs (id UUID PRIMARY KEY);')
+        changes, report = surgeon.diagnose_replayed(self.baseline, self.migrations, self.target)
+        self.assertEqual([(c.change_type, c.table_name) for c in changes], [('ADD_TABLE', 'public.labs')])
+        self.assertEqual(report['replayed'], [])
+
+if __name__ == '__main__':
+    unittest.main()
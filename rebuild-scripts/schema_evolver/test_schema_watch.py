@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+OncoVista Schema Watch Test Suite
+Validate incremental re-parsing, re-diffing and the report socket
+"""
+
+import json
+import shutil
+import socket
+import tempfile
+import time
+import unittest
+import sys
+import os
+
+# Add the schema_evolver directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'schema_evolver'))
+
+from ddl_lexer import split_statements
+from migration_generator import SchemaDNAAnalyzer
+from schema_watch import IncrementalSchemaFile, ReportServer, SchemaWatcher
+
+OLD_SCHEMA = """
+CREATE TABLE patients (id SERIAL PRIMARY KEY, name TEXT);
+CREATE TABLE labs (id SERIAL PRIMARY KEY, code TEXT);
+CREATE INDEX idx_labs_code ON labs (code);
+"""
+
+class WatchTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.old_path = self.write('old.sql', OLD_SCHEMA)
+        self.new_path = self.write('new.sql', OLD_SCHEMA)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        existed = os.path.exists(path)
+        with open(path, 'w') as f:
+            f.write(content)
+        if existed:
+            # Make the edit visible even on filesystems with coarse timestamps
+            stat = os.stat(path)
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        return path
+
+class TestIncrementalSchemaFile(WatchTestCase):
+    """Test statement-level re-parsing"""
+
+    def test_only_changed_statements_are_reparsed(self):
+        """An edit re-parses one statement and yields the same model as a full parse"""
+        schema_file = IncrementalSchemaFile(self.new_path)
+        self.assertTrue(schema_file.refresh())
+        self.assertEqual(schema_file.reparsed, 3)
+        self.assertFalse(schema_file.refresh())
+
+        edited = OLD_SCHEMA.replace('name TEXT', 'name TEXT, mrn TEXT')
+        self.write('new.sql', edited)
+        self.assertTrue(schema_file.refresh())
+        self.assertEqual(schema_file.reparsed, 1)
+        full = SchemaDNAAnalyzer().extract_schema_model_from_statements(split_statements(edited))
+        self.assertEqual(schema_file.model, full)
+
+    def test_previous_models_are_not_mutated(self):
+        """Rebuilding after an index change leaves earlier models untouched"""
+        schema_file = IncrementalSchemaFile(self.new_path)
+        schema_file.refresh()
+        before = schema_file.model
+        self.write('new.sql', OLD_SCHEMA.replace('CREATE INDEX idx_labs_code ON labs (code);', ''))
+        schema_file.refresh()
+        self.assertEqual(len(before.tables['labs'].indexes), 1)
+        self.assertEqual(schema_file.model.tables['labs'].indexes, ())
+
+class TestSchemaWatcher(WatchTestCase):
+    """Test re-diffing on file changes"""
+
+    def test_report_after_edit(self):
+        """Saving the new schema produces a report with changes, risks and a draft migration"""
+        watcher = SchemaWatcher(self.old_path, self.new_path, 'draft')
+        first = watcher.refresh()
+        self.assertEqual(first['changes'], [])
+        self.assertIsNone(first['migration'])
+        self.assertIsNone(watcher.refresh())
+
+        self.write('new.sql', OLD_SCHEMA + 'CREATE TABLE visits (id SERIAL PRIMARY KEY);\n')
+        report = watcher.refresh()
+        self.assertEqual(report['version'], 2)
+        self.assertEqual(report['changes'], [{'type': 'ADD_TABLE', 'table': 'visits', 'risk': 'MEDIUM'}])
+        self.assertEqual(report['risk_summary'], {'MEDIUM': 1})
+        self.assertEqual(report['reparsed_statements'], 1)
+        self.assertIn('CREATE TABLE visits', report['migration'])
+
+    def test_missing_file_is_reported_once(self):
+        """A file that disappears mid-save is reported and retried"""
+        watcher = SchemaWatcher(self.old_path, self.new_path)
+        watcher.refresh()
+        reports = []
+        watcher.subscribe(reports.append)
+        os.unlink(self.new_path)
+        self.assertIsNone(watcher.refresh())
+        self.assertIsNone(watcher.refresh())
+        self.assertEqual(len(reports), 1)
+        self.assertIn('FileNotFoundError', reports[0]['error'])
+        self.write('new.sql', OLD_SCHEMA.replace('code TEXT', 'code TEXT, unit TEXT'))
+        self.assertEqual(watcher.refresh()['changes'][0]['type'], 'ADD_COLUMN')
+
+@unittest.skipUnless(hasattr(socket, 'AF_UNIX'), 'Unix sockets not available')
+class TestReportServer(WatchTestCase):
+    """Test the newline-delimited JSON socket protocol"""
+
+    def setUp(self):
+        super().setUp()
+        self.watcher = SchemaWatcher(self.old_path, self.new_path)
+        self.watcher.refresh()
+        self.server = ReportServer(self.watcher, socket_path=os.path.join(self.directory, 'watch.sock'))
+        self.server.start()
+
+    def tearDown(self):
+        self.server.stop()
+        super().tearDown()
+
+    def connect(self):
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        client.settimeout(5)
+        client.connect(self.server.address)
+        return client, client.makefile('r')
+
+    def test_report_and_ping(self):
+        """report returns the latest report and ping answers"""
+        client, reader = self.connect()
+        with client:
+            client.sendall(b'ping\nreport\nbogus\n')
+            self.assertEqual(json.loads(reader.readline()), {'ok': True})
+            self.assertEqual(json.loads(reader.readline())['version'], 1)
+            self.assertIn('unknown command', json.loads(reader.readline())['error'])
+
+    def test_subscribe_streams_updates(self):
+        """Subscribers get the current report, then each new one"""
+        client, reader = self.connect()
+        with client:
+            client.sendall(b'subscribe\n')
+            self.assertEqual(json.loads(reader.readline())['version'], 1)
+            deadline = time.time() + 5
+            while not self.watcher._listeners and time.time() < deadline:
+                time.sleep(0.01)
+            self.write('new.sql', OLD_SCHEMA.replace('name TEXT', 'name TEXT, mrn TEXT'))
+            self.watcher.refresh()
+            update = json.loads(reader.readline())
+            self.assertEqual(update['version'], 2)
+            self.assertEqual(update['changes'][0]['type'], 'ADD_COLUMN')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+OncoVista SQL Emitter Test Suite
+Validate streamed output and splitting into part files
+"""
+
+import io
+import json
+import re
+import shutil
+import tempfile
+import unittest
+import sys
+import os
+
+# Add the schema_evolver directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'schema_evolver'))
+
+from ddl_lexer import split_statements
+from migration_generator import MigrationSurgeon
+from sql_emitter import PartFileEmitter, SQLEmitter, parse_size, quote_literal, schema_name, short_name, write_script
+
+OLD_SCHEMA = """
+CREATE TABLE public.patients (id SERIAL PRIMARY KEY, name TEXT);
+"""
+NEW_SCHEMA = """
+CREATE TABLE public.patients (id SERIAL PRIMARY KEY, name TEXT, mrn TEXT, dob DATE, sex TEXT);
+CREATE TABLE public.visits (id SERIAL PRIMARY KEY, patient_id INTEGER REFERENCES public.patients);
+CREATE TABLE public.labs (id SERIAL PRIMARY KEY, code TEXT);
+"""
+
+def without_timestamps(sql):
+    return re.sub(r'(-- Generated: |-- Migration ID: )\S+', r'\1X', sql)
+
+class TestSQLEmitter(unittest.TestCase):
+    """Test streaming and part-file splitting"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        # One block per operation, so statement counts line up with the changes
+        self.surgeon = MigrationSurgeon(coalesce_alters=False)
+        analyzer = self.surgeon.analyzer
+        old = analyzer.extract_schema_model_from_statements(split_statements(OLD_SCHEMA))
+        new = analyzer.extract_schema_model_from_statements(split_statements(NEW_SCHEMA))
+        self.changes = self.surgeon.compare_models(old, new)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def read_parts(self, emitter):
+        return [path.read_text() for path in emitter.paths]
+
+    def test_streamed_output_matches_generated(self):
+        """Emitting into a sink writes exactly what generate_migration returns"""
+        buffer = io.StringIO()
+        emitter = SQLEmitter(buffer)
+        self.surgeon.emit_migration(self.changes, 'add_visits', emitter)
+        generated = self.surgeon.generate_migration(self.changes, 'add_visits')
+        self.assertEqual(without_timestamps(buffer.getvalue()), without_timestamps(generated))
+        self.assertEqual(emitter.statements, len(self.changes))
+        self.assertTrue(buffer.getvalue().endswith('COMMIT;\n'))
+
+    def test_split_by_statement_count(self):
+        """Each part holds at most N operations inside its own transaction"""
+        emitter = PartFileEmitter(self.directory, '20250101_add_visits', max_statements=2)
+        self.surgeon.emit_migration(self.changes, 'add_visits', emitter)
+        parts = self.read_parts(emitter)
+        self.assertEqual(len(parts), 3)
+        for part in parts:
+            self.assertIn('BEGIN;', part)
+            self.assertTrue(part.endswith('COMMIT;\n'))
+            self.assertLessEqual(part.count('-- Operation '), 2)
+        self.assertEqual(sum(part.count('-- Operation ') for part in parts), len(self.changes))
+        self.assertEqual([path.name for path in emitter.paths],
+                         [f'20250101_add_visits_part000{n}.sql' for n in (1, 2, 3)])
+
+    def test_operations_keep_order_across_parts(self):
+        """Concatenated parts list operations in the same order as one script"""
+        emitter = PartFileEmitter(self.directory, 'm', max_statements=1)
+        self.surgeon.emit_migration(self.changes, 'm', emitter)
+        numbers = [int(n) for part in self.read_parts(emitter) for n in re.findall(r'-- Operation (\d+):', part)]
+        self.assertEqual(numbers, list(range(1, len(self.changes) + 1)))
+
+    def test_split_by_bytes(self):
+        """Parts stay under the byte limit unless a single block is larger"""
+        emitter = PartFileEmitter(self.directory, 'm', max_bytes=600)
+        self.surgeon.emit_migration(self.changes, 'm', emitter)
+        self.assertGreater(len(emitter.parts), 1)
+        for part, path in zip(emitter.parts, emitter.paths):
+            self.assertEqual(part['bytes'], path.stat().st_size)
+            if part['statements'] > 1:
+                self.assertLessEqual(part['bytes'], 600)
+
+    def test_oversized_block_gets_own_part(self):
+        """A block larger than max_bytes is written alone rather than dropped"""
+        emitter = PartFileEmitter(self.directory, 'm', max_bytes=64)
+        emitter.start('BEGIN;\n', 'COMMIT;\n')
+        emitter.block('SELECT 1;\n')
+        emitter.block('-- ' + 'x' * 200 + '\nSELECT 2;\n')
+        emitter.block('SELECT 3;\n')
+        emitter.finish()
+        self.assertEqual([part['statements'] for part in emitter.parts], [1, 1, 1])
+        self.assertIn('x' * 200, self.read_parts(emitter)[1])
+
+    def test_manifest_lists_parts(self):
+        """The manifest records every part with its statement count and size"""
+        emitter = PartFileEmitter(self.directory, 'm', suffix='_ROLLBACK', max_statements=3)
+        self.surgeon.emit_rollback_script(self.changes, emitter)
+        with open(emitter.manifest_path) as f:
+            manifest = json.load(f)
+        self.assertEqual(emitter.manifest_path.name, 'm_ROLLBACK.parts.json')
+        self.assertEqual([part['file'] for part in manifest['parts']], [path.name for path in emitter.paths])
+        self.assertEqual(sum(part['statements'] for part in manifest['parts']), len(self.changes))
+        self.assertTrue(all(path.stem.endswith('_ROLLBACK') for path in emitter.paths))
+
+    def test_empty_script_writes_one_part(self):
+        """Finishing without blocks still produces a valid, empty transaction"""
+        emitter = PartFileEmitter(self.directory, 'm', max_statements=5)
+        emitter.start('BEGIN;\n', 'COMMIT;\n')
+        emitter.finish()
+        self.assertEqual(self.read_parts(emitter)[0].splitlines()[1:], ['BEGIN;', 'COMMIT;'])
+
+    def test_online_phases_are_not_split(self):
+        """Online plans split between phases, never inside a transaction"""
+        emitter = PartFileEmitter(self.directory, 'm', max_statements=1)
+        self.surgeon.emit_online_migration(self.changes, 'm', emitter)
+        for part in self.read_parts(emitter):
+            self.assertEqual(part.count('BEGIN;'), part.count('COMMIT;'))
+
+    def test_parse_size(self):
+        """Sizes accept plain bytes and binary K/M/G suffixes"""
+        self.assertEqual(parse_size('4096'), 4096)
+        self.assertEqual(parse_size('512K'), 512 * 1024)
+        self.assertEqual(parse_size('8MiB'), 8 * 1024 ** 2)
+        self.assertEqual(parse_size('1g'), 1024 ** 3)
+        with self.assertRaises(ValueError):
+            parse_size('lots')
+
+    def test_write_script_removes_partial_file(self):
+        """A script whose generation fails leaves no file behind"""
+        path = os.path.join(self.directory, 'm.sql')
+        self.assertEqual(write_script(path, lambda emitter: self.surgeon.emit_migration(self.changes, 'm', emitter)),
+                         path)
+        with open(path) as f:
+            self.assertEqual(without_timestamps(f.read()),
+                             without_timestamps(self.surgeon.generate_migration(self.changes, 'm')))
+
+        def fail(emitter):
+            emitter.block('SELECT 1;\n')
+            raise RuntimeError('generation failed')
+        with self.assertRaises(RuntimeError):
+            write_script(path, fail)
+        self.assertFalse(os.path.exists(path))
+
+    def test_write_script_splits_into_parts(self):
+        """With a limit the script goes to part files and the manifest path is returned"""
+        path = os.path.join(self.directory, 'm_ROLLBACK.sql')
+        manifest = write_script(path, lambda emitter: self.surgeon.emit_rollback_script(self.changes, emitter),
+                                '_ROLLBACK', max_statements=2)
+        self.assertEqual(manifest, os.path.join(self.directory, 'm_ROLLBACK.parts.json'))
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(sorted(name for name in os.listdir(self.directory) if name.endswith('.sql')),
+                         ['m_part0001_ROLLBACK.sql', 'm_part0002_ROLLBACK.sql', 'm_part0003_ROLLBACK.sql'])
+
+        def fail(emitter):
+            self.surgeon.emit_migration(self.changes, 'n', emitter)
+            raise RuntimeError('generation failed')
+        with self.assertRaises(RuntimeError):
+            write_script(os.path.join(self.directory, 'n.sql'), fail, max_statements=1)
+        self.assertFalse([name for name in os.listdir(self.directory) if name.startswith('n_')])
+
+    def test_name_helpers(self):
+        """Names split into schema and object; literals double embedded quotes"""
+        self.assertEqual((schema_name('audit.patients'), short_name('audit.patients')), ('audit', 'patients'))
+        self.assertEqual((schema_name('patients'), short_name('patients')), ('public', 'patients'))
+        self.assertEqual(quote_literal("O'Brien"), "'O''Brien'")
+
+    def test_rejects_invalid_limits(self):
+        """Limits below one are rejected"""
+        with self.assertRaises(ValueError):
+            PartFileEmitter(self.directory, 'm', max_statements=0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+OncoVista Synthetic Schema Test Suite
+Validate the benchmark schema generator and baseline regression checks
+"""
+
+import unittest
+import sys
+import os
+
+# Add the schema_evolver directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'schema_evolver'))
+
+from benchmark_schema_evolver import compare_to_baseline
+from ddl_lexer import split_statements
+from migration_generator import SchemaDNAAnalyzer
+from synthetic_schema import MutationRates, SyntheticSchemaConfig, SyntheticSchemaGenerator
+
+class TestSyntheticSchemaGenerator(unittest.TestCase):
+    """Test generated schemas and mutations"""
+
+    CONFIG = SyntheticSchemaConfig(tables=30, columns_per_table=8, indexes_per_table=2,
+                                   functions=4, triggers=6, types=3, seed=7)
+
+    def _parse(self, sql):
+        return SchemaDNAAnalyzer().extract_schema_model_from_statements(split_statements(sql))
+
+    def test_generation_is_deterministic(self):
+        """The same seed produces the same schema pair"""
+        first = SyntheticSchemaGenerator(self.CONFIG).generate_pair()
+        second = SyntheticSchemaGenerator(self.CONFIG).generate_pair()
+        self.assertEqual(first, second)
+
+    def test_generated_schema_matches_config(self):
+        """The parser finds every configured object"""
+        model = self._parse(SyntheticSchemaGenerator(self.CONFIG).generate_pair()[0])
+        self.assertEqual(len(model.tables), 30)
+        self.assertTrue(all(len(table.columns) == 8 for table in model.tables.values()))
+        self.assertEqual(sum(len(table.indexes) for table in model.tables.values()), 60)
+        self.assertEqual((len(model.functions), len(model.triggers), len(model.types)), (4, 6, 3))
+
+    def test_zero_mutation_rates_keep_schema(self):
+        """With all rates at zero the new side equals the old side"""
+        rates = MutationRates(**{name: 0.0 for name in vars(MutationRates())})
+        old_sql, new_sql = SyntheticSchemaGenerator(self.CONFIG).generate_pair(rates)
+        self.assertEqual(old_sql, new_sql)
+
+    def test_full_drop_rate_removes_every_table(self):
+        """Rates control the amount of change"""
+        rates = MutationRates(drop_table=1.0, add_table=0.0)
+        new_sql = SyntheticSchemaGenerator(self.CONFIG).generate_pair(rates)[1]
+        self.assertEqual(self._parse(new_sql).tables, {})
+
+class TestBaselineComparison(unittest.TestCase):
+    """Test regression detection against stored results"""
+
+    def _results(self, seconds, peak_bytes):
+        return {'results': [{'size': 100, 'phase': 'diagnose_changes', 'seconds': seconds, 'peak_bytes': peak_bytes}]}
+
+    def test_within_tolerance_passes(self):
+        self.assertEqual(compare_to_baseline(self._results(0.11, 10 << 20), self._results(0.1, 10 << 20)), [])
+
+    def test_slowdown_and_memory_growth_fail(self):
+        regressions = compare_to_baseline(self._results(0.2, 20 << 20), self._results(0.1, 10 << 20))
+        self.assertEqual(len(regressions), 2)
+
+    def test_noise_floor_is_ignored(self):
+        self.assertEqual(compare_to_baseline(self._results(0.003, 2048), self._results(0.001, 1024)), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+OncoVista Type System Test Suite
+Validate canonical type and default spellings and the classification of column changes
+"""
+
+import unittest
+import sys
+import os
+
+# Add the schema_evolver directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'schema_evolver'))
+
+from ddl_lexer import split_statements
+from migration_generator import MigrationSurgeon
+from schema_model import Column
+from type_system import (
+    METADATA_ONLY, NO_CHANGE, REWRITE, VALIDATION_SCAN, canonical_default, canonical_type, classify_column_change,
+    classify_type_change, same_column
+)
+
+class TestCanonicalSpelling(unittest.TestCase):
+    """Test type and default canonicalization"""
+
+    def test_type_aliases(self):
+        cases = {
+            'VARCHAR(255)': 'character varying(255)',
+            'int4': 'integer',
+            'DECIMAL(10)': 'numeric(10,0)',
+            'numeric(10, 2)': 'numeric(10,2)',
+            'float(10)': 'real',
+            'TIMESTAMPTZ': 'timestamp with time zone',
+            'timestamp(3)': 'timestamp(3) without time zone',
+            'char': 'character(1)',
+            'text ARRAY': 'text[]',
+            'INT[][]': 'integer[]',
+            'pg_catalog.int8': 'bigint',
+            '"Status"': '"Status"'
+        }
+        for written, canonical in cases.items():
+            self.assertEqual(canonical_type(written), canonical, written)
+
+    def test_defaults(self):
+        self.assertEqual(canonical_default("'active'::character varying", 'VARCHAR(20)'), "'active'")
+        self.assertEqual(canonical_default('CURRENT_TIMESTAMP'), canonical_default('NOW()'))
+        self.assertEqual(canonical_default("('{}'::TEXT[])", 'text[]'), "'{}'")
+        self.assertEqual(canonical_default("'MiXed'"), "'MiXed'")
+        self.assertEqual(canonical_default("'{}'::jsonb", 'TEXT'), "'{}'::jsonb")
+
+    def test_catalog_and_file_columns_agree(self):
+        catalog = Column('id', 'integer', False, "nextval('patients_id_seq'::regclass)", ('PRIMARY KEY',))
+        file = Column('id', 'SERIAL', False, None, ('PRIMARY KEY',))
+        self.assertTrue(same_column(catalog, file))
+        self.assertFalse(same_column(file, Column('id', 'INTEGER', False, None, ('PRIMARY KEY',))))
+
+class TestChangeClassification(unittest.TestCase):
+    """Test rewrite-free versus rewriting changes"""
+
+    def test_type_changes(self):
+        cases = [
+            ('VARCHAR(20)', 'character varying(20)', NO_CHANGE),
+            ('VARCHAR(20)', 'VARCHAR(40)', METADATA_ONLY),
+            ('VARCHAR(20)', 'VARCHAR', METADATA_ONLY),
+            ('VARCHAR(20)', 'TEXT', METADATA_ONLY),
+            ('NUMERIC(5,2)', 'NUMERIC(9,2)', METADATA_ONLY),
+            ('TIMESTAMP(0)', 'TIMESTAMP', METADATA_ONLY),
+            ('CIDR', 'INET', METADATA_ONLY),
+            ('VARCHAR(40)', 'VARCHAR(20)', REWRITE),
+            ('TEXT', 'VARCHAR(20)', REWRITE),
+            ('NUMERIC(5,2)', 'NUMERIC(9,3)', REWRITE),
+            ('INT', 'BIGINT', REWRITE),
+            ('CHAR(3)', 'CHAR(5)', REWRITE),
+            ('TIMESTAMP', 'TIMESTAMPTZ', REWRITE),
+            ('VARCHAR(20)[]', 'TEXT[]', REWRITE)
+        ]
+        for old, new, expected in cases:
+            self.assertEqual(classify_type_change(old, new), expected, f'{old} -> {new}')
+
+    def test_column_changes(self):
+        column = Column('mrn', 'VARCHAR(20)', True, None, ())
+        self.assertEqual(classify_column_change(column, Column('mrn', 'TEXT', True, "'n/a'", ())), METADATA_ONLY)
+        self.assertEqual(classify_column_change(column, Column('mrn', 'TEXT', False, None, ())), VALIDATION_SCAN)
+        self.assertEqual(classify_column_change(column, Column('mrn', 'VARCHAR(20)', True, None, ('UNIQUE',))),
+                         VALIDATION_SCAN)
+        self.assertEqual(classify_column_change(column, Column('mrn', 'INT', False, None, ())), REWRITE)
+
+class TestGeneratedMigration(unittest.TestCase):
+    """Test that the classification drives the diff, risk and SQL"""
+
+    OLD = ("CREATE TABLE patients (id SERIAL PRIMARY KEY, mrn VARCHAR(20), status VARCHAR(10) DEFAULT 'new', "
+           "age INT, notes TEXT, seen_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP);")
+    NEW = ("CREATE TABLE patients (id serial PRIMARY KEY, mrn character varying(40), "
+           "status character varying(10) DEFAULT 'new'::character varying, age BIGINT, notes text NOT NULL, "
+           "seen_at timestamp with time zone DEFAULT now());")
+
+    def setUp(self):
+        self.surgeon = MigrationSurgeon(coalesce_alters=False)
+        analyzer = self.surgeon.analyzer
+        old = analyzer.extract_schema_model_from_statements(split_statements(self.OLD))
+        new = analyzer.extract_schema_model_from_statements(split_statements(self.NEW))
+        self.changes = {change.details['column']: change for change in self.surgeon.compare_models(old, new)}
+
+    def test_spelling_differences_are_not_changes(self):
+        self.assertEqual(sorted(self.changes), ['age', 'mrn', 'notes'])
+
+    def test_risk_and_sql_follow_the_class(self):
+        summary = {name: (change.details['change_class'], change.risk_level) for name, change in self.changes.items()}
+        self.assertEqual(summary, {
+            'mrn': (METADATA_ONLY, 'LOW'), 'notes': (VALIDATION_SCAN, 'MEDIUM'), 'age': (REWRITE, 'HIGH')
+        })
+
+        migration = self.surgeon.generate_migration(list(self.changes.values()), 'types')
+        self.assertIn('ALTER TABLE patients ALTER COLUMN mrn TYPE character varying(40);', migration)
+        self.assertIn('ALTER TABLE patients ALTER COLUMN age TYPE BIGINT;', migration)
+        # Only the constraint changed, so no TYPE action
+        self.assertIn('ALTER TABLE patients ALTER COLUMN notes SET NOT NULL;', migration)
+        self.assertIn('-- Change Class: full table and index rewrite', migration)
+        self.assertIn('-- Change Class: metadata only (no rewrite, no scan)', migration)
+
+        rollback = self.surgeon.generate_rollback_script(list(self.changes.values()))
+        self.assertIn('ALTER TABLE patients ALTER COLUMN notes DROP NOT NULL;', rollback)
+        self.assertIn('ALTER TABLE patients ALTER COLUMN mrn TYPE VARCHAR(20);', rollback)
+
+    def test_defaults_and_serial_types(self):
+        old = Column('code', 'SERIAL', True, None, ())
+        new = Column('code', 'SERIAL', True, "'x'", ())
+        sql = self.surgeon._generate_modify_column_sql('patients', 'code', new, old)
+        self.assertEqual(sql, "ALTER TABLE patients ALTER COLUMN code SET DEFAULT 'x';")
+        # Serial pseudo-types are not valid in ALTER COLUMN ... TYPE
+        wider = Column('code', 'BIGSERIAL', True, None, ())
+        sql = self.surgeon._generate_modify_column_sql('patients', 'code', wider, old)
+        self.assertEqual(sql, 'ALTER TABLE patients ALTER COLUMN code TYPE BIGINT;')
+
+    def test_constraint_only_changes(self):
+        old = Column('mrn', 'TEXT', True, None, ())
+        unique = Column('mrn', 'TEXT', True, None, ('UNIQUE',))
+        self.assertEqual(self.surgeon._generate_modify_column_sql('public.patients', 'mrn', unique, old),
+                         'ALTER TABLE public.patients ADD CONSTRAINT patients_mrn_key UNIQUE (mrn);')
+        self.assertEqual(self.surgeon._generate_modify_column_sql('public.patients', 'mrn', old, unique),
+                         'ALTER TABLE public.patients DROP CONSTRAINT IF EXISTS patients_mrn_key;')
+
+        plain = Column('doctor_id', 'INTEGER', True, None, ())
+        linked = Column('doctor_id', 'INTEGER', True, None, (), 'doctors')
+        self.assertEqual(self.surgeon._generate_modify_column_sql('visits', 'doctor_id', linked, plain).splitlines(), [
+            'ALTER TABLE visits ADD CONSTRAINT visits_doctor_id_fkey FOREIGN KEY (doctor_id) REFERENCES doctors '
+            'NOT VALID;',
+            'ALTER TABLE visits VALIDATE CONSTRAINT visits_doctor_id_fkey;'
+        ])
+        self.assertEqual(self.surgeon._generate_modify_column_sql('visits', 'doctor_id', plain, linked),
+                         'ALTER TABLE visits DROP CONSTRAINT IF EXISTS visits_doctor_id_fkey;')
+        self.assertEqual(self.surgeon._generate_modify_column_sql('visits', 'doctor_id', plain, plain), '')
+
+        analyzer = self.surgeon.analyzer
+        old_model = analyzer.extract_schema_model_from_statements(split_statements(
+            "CREATE TABLE patients (id INT PRIMARY KEY, mrn TEXT);"))
+        new_model = analyzer.extract_schema_model_from_statements(split_statements(
+            "CREATE TABLE patients (id INT PRIMARY KEY, mrn TEXT UNIQUE);"))
+        changes = self.surgeon.compare_models(old_model, new_model)
+        self.assertNotIn('TYPE', self.surgeon.generate_migration(changes, 'unique'))
+        self.assertIn('ALTER TABLE patients DROP CONSTRAINT IF EXISTS patients_mrn_key;',
+                      self.surgeon.generate_rollback_script(changes))
+
+if __name__ == '__main__':
+    unittest.main()
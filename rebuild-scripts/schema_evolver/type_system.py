@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+OncoVista Type System
+Canonical PostgreSQL type and default spellings, and what a column type change costs
+"""
+
+import re
+from dataclasses import dataclass, replace
+from functools import lru_cache
+from typing import Any, List, Optional, Tuple
+
+from schema_model import Column
+
+# Classes of column change, cheapest first
+NO_CHANGE = 'NONE'
+METADATA_ONLY = 'METADATA_ONLY'
+VALIDATION_SCAN = 'VALIDATION_SCAN'
+REWRITE = 'REWRITE'
+CHANGE_CLASS_NOTES = {
+    METADATA_ONLY: 'metadata only (no rewrite, no scan)',
+    VALIDATION_SCAN: 'validation scan of existing rows (no rewrite)',
+    REWRITE: 'full table and index rewrite'
+}
+CHANGE_CLASS_RISK = {NO_CHANGE: 'LOW', METADATA_ONLY: 'LOW', VALIDATION_SCAN: 'MEDIUM', REWRITE: 'HIGH'}
+
+# Alternative spellings, in the format_type names the catalog reports
+TYPE_ALIASES = {
+    'int': 'integer', 'int4': 'integer', 'int2': 'smallint', 'int8': 'bigint',
+    'serial4': 'serial', 'serial2': 'smallserial', 'serial8': 'bigserial',
+    'decimal': 'numeric', 'float4': 'real', 'float8': 'double precision', 'bool': 'boolean',
+    'varchar': 'character varying', 'char': 'character', 'bpchar': 'character', 'varbit': 'bit varying',
+    'timestamptz': 'timestamp with time zone', 'timetz': 'time with time zone'
+}
+SERIAL_TYPES = {'smallserial': 'smallint', 'serial': 'integer', 'bigserial': 'bigint'}
+# Types whose modifier only limits the values: raising or removing it changes no stored bytes
+WIDENABLE_TYPES = {
+    'character varying', 'bit varying', 'numeric', 'timestamp without time zone', 'timestamp with time zone',
+    'time without time zone', 'time with time zone', 'interval'
+}
+# Binary-coercible pairs of different types (the old values are valid as they are)
+BINARY_COERCIBLE = {('character varying', 'text'), ('cidr', 'inet')}
+STRING_TYPES = {'text', 'character varying', 'character'}
+EQUIVALENT_DEFAULTS = {'current_timestamp': 'now()', 'transaction_timestamp()': 'now()'}
+
+ARRAY_SUFFIX = re.compile(r'(?:\s*\[\s*\d*\s*\]|\s+array(?:\s*\[\s*\d*\s*\])?)$', re.IGNORECASE)
+TYPE_PATTERN = re.compile(r'^(.*?)\s*(?:\(([^()]*)\))?(\s+with(?:out)?\s+time\s+zone)?$', re.IGNORECASE)
+QUOTED_PATTERN = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"")
+LITERAL_CAST_PATTERN = re.compile(
+    r"('(?:[^']|'')*')::([a-z_][\w.]*(?: varying| precision| with(?:out)? time zone)?"
+    r"(?:\(\d+(?:, ?\d+)?\))?(?: with(?:out)? time zone)?(?:\[\])*)"
+)
+SERIAL_DEFAULT_PATTERN = re.compile(r"^nextval\('[^']+'(?:::regclass)?\)$")
+
+@dataclass(frozen=True, slots=True)
+class TypeSpec:
+    """A parsed column type: canonical base name, modifiers and whether it is an array"""
+    name: str
+    modifiers: Tuple[str, ...] = ()
+    array: bool = False
+
+    @property
+    def canonical(self) -> str:
+        modifiers = f'({",".join(self.modifiers)})' if self.modifiers else ''
+        if self.name.startswith(('timestamp ', 'time ')):
+            # format_type puts the precision before the time zone clause
+            head, _, zone = self.name.partition(' ')
+            text = f'{head}{modifiers} {zone}'
+        else:
+            text = f'{self.name}{modifiers}'
+        return text + ('[]' if self.array else '')
+
+@lru_cache(maxsize=4096)
+def parse_type(type_text: str) -> TypeSpec:
+    """Parse a type as written in DDL or reported by the catalog"""
+    text = ' '.join(type_text.split())
+    array = False
+    # PostgreSQL ignores declared array dimensions and sizes
+    while ARRAY_SUFFIX.search(text):
+        text = text[:ARRAY_SUFFIX.search(text).start()]
+        array = True
+
+    name, modifiers, zone = TYPE_PATTERN.match(text).groups()
+    if '"' not in name:
+        name = name.lower()
+    if name.startswith('pg_catalog.'):
+        name = name[len('pg_catalog.'):]
+    modifiers = tuple(part.strip() for part in modifiers.split(',')) if modifiers else ()
+    zone = ' '.join(zone.lower().split()) if zone else None
+
+    name = TYPE_ALIASES.get(name, name)
+    if name in ('timestamp with time zone', 'time with time zone'):
+        name, zone = name.split(' ', 1)[0], 'with time zone'
+    if name in ('timestamp', 'time'):
+        name = f'{name} {zone or "without time zone"}'
+    elif name == 'float':
+        name = 'real' if modifiers and modifiers[0].isdigit() and int(modifiers[0]) <= 24 else 'double precision'
+        modifiers = ()
+    elif name == 'numeric' and len(modifiers) == 1:
+        modifiers += ('0',)
+    elif name in ('character', 'bit') and not modifiers:
+        modifiers = ('1',)
+    return TypeSpec(name, modifiers, array)
+
+def canonical_type(type_text: str) -> str:
+    """One spelling per type: VARCHAR(255), varchar(255) and character varying(255) agree"""
+    return parse_type(type_text).canonical
+
+@lru_cache(maxsize=4096)
+def canonical_default(expression: Optional[str], type_text: Optional[str] = None) -> Optional[str]:
+    """One spelling per default expression.
+
+    Case and whitespace outside quotes, redundant outer parentheses, the
+    casts the catalog adds to literals of the column's own (or a string)
+    type and synonyms such as CURRENT_TIMESTAMP for now() are ignored.
+    """
+    if expression is None:
+        return None
+    pieces, position = [], 0
+    for match in QUOTED_PATTERN.finditer(expression):
+        pieces.append(expression[position:match.start()].lower())
+        pieces.append(match.group())
+        position = match.end()
+    pieces.append(expression[position:].lower())
+    text = ' '.join(''.join(pieces).split())
+
+    while text.startswith('(') and text.endswith(')') and _balanced(text[1:-1]):
+        text = text[1:-1].strip()
+
+    column_type = canonical_type(type_text) if type_text else None
+
+    def strip_cast(match: re.Match) -> str:
+        cast = parse_type(match.group(2))
+        if cast.canonical == column_type or cast.name in STRING_TYPES or cast.name == 'regclass':
+            return match.group(1)
+        return match.group()
+
+    text = LITERAL_CAST_PATTERN.sub(strip_cast, text)
+    return EQUIVALENT_DEFAULTS.get(text, text)
+
+def canonical_column(column: Column) -> Column:
+    """The column with canonical type and default; a sequence default on an integer reads as serial"""
+    spec = parse_type(column.type)
+    default = canonical_default(column.default, column.type)
+    name = spec.name
+    if default and SERIAL_DEFAULT_PATTERN.match(default) and not spec.array:
+        serial = next((serial for serial, base in SERIAL_TYPES.items() if base == name), None)
+        if serial:
+            name, default = serial, None
+    return replace(column, type=replace(spec, name=name).canonical, default=default)
+
+def same_column(old: Column, new: Column) -> bool:
+    """Whether two definitions differ only in spelling"""
+    return old == new or canonical_column(old) == canonical_column(new)
+
+def classify_type_change(old_type: str, new_type: str) -> str:
+    """NONE for a respelling, METADATA_ONLY for binary-coercible changes, otherwise REWRITE.
+
+    Raising or removing a length, precision or bit limit and varchar to
+    text (or cidr to inet) keep every stored value valid as it is, so
+    ALTER COLUMN ... TYPE only updates the catalog. Narrowing a limit
+    re-evaluates every value and rewrites. Changes of array element types
+    and timestamp to timestamptz (free only in a UTC session) are treated
+    as rewrites.
+    """
+    old, new = _storage_type(parse_type(old_type)), _storage_type(parse_type(new_type))
+    if old == new:
+        return NO_CHANGE
+    if old.array or new.array:
+        return REWRITE
+    if (old.name, new.name) in BINARY_COERCIBLE:
+        return METADATA_ONLY
+    if old.name == 'text' and new.name == 'character varying' and not new.modifiers:
+        return METADATA_ONLY
+    if old.name == new.name and old.name in WIDENABLE_TYPES:
+        if not new.modifiers:
+            return METADATA_ONLY
+        if old.modifiers and len(old.modifiers) == len(new.modifiers) and _widens(old.modifiers, new.modifiers):
+            return METADATA_ONLY
+    return REWRITE
+
+def validation_reasons(old: Any, new: Any) -> List[str]:
+    """Checks a column change makes PostgreSQL run over existing rows"""
+    reasons = []
+    if old['nullable'] and not new['nullable']:
+        reasons.append('SET NOT NULL')
+    if new.get('references') and new.get('references') != old.get('references'):
+        reasons.append(f'foreign key to {new["references"]}')
+    added = set(new['constraints']) - set(old['constraints'])
+    reasons.extend(f'new {constraint}' for constraint in sorted(added) if constraint in ('UNIQUE', 'PRIMARY KEY'))
+    return reasons
+
+def classify_column_change(old: Any, new: Any) -> str:
+    """The costliest effect of changing a column from old to new"""
+    type_change = classify_type_change(old['type'], new['type'])
+    if type_change == REWRITE:
+        return REWRITE
+    if validation_reasons(old, new):
+        return VALIDATION_SCAN
+    return METADATA_ONLY
+
+def storage_type_sql(type_text: str) -> str:
+    """The type as ALTER COLUMN ... TYPE accepts it; serial pseudo-types become their integer type"""
+    name = parse_type(type_text).name
+    return SERIAL_TYPES[name].upper() if name in SERIAL_TYPES else type_text
+
+def _storage_type(spec: TypeSpec) -> TypeSpec:
+    return replace(spec, name=SERIAL_TYPES[spec.name]) if spec.name in SERIAL_TYPES else spec
+
+def _widens(old: Tuple[str, ...], new: Tuple[str, ...]) -> bool:
+    if not all(part.isdigit() for part in old + new):
+        return False
+    if len(old) == 2:
+        # numeric(p, s): the scale must stay, the precision may grow
+        return old[1] == new[1] and int(new[0]) >= int(old[0])
+    return int(new[0]) >= int(old[0])
+
+def _balanced(text: str) -> bool:
+    depth = 0
+    for char in QUOTED_PATTERN.sub("''", text):
+        depth += {'(': 1, ')': -1}.get(char, 0)
+        if depth < 0:
+            return False
+    return depth == 0